@@ -0,0 +1,792 @@
+"""
+Shared request handlers for the Patra ML API
+============================================
+
+Framework-neutral implementation of the API contract. Each handler returns a
+``(payload, status_code)`` tuple, so the Flask server (api_server.py) and the
+ASGI server (asgi_server.py) expose exactly the same responses.
+
+Handlers:
+- health(deep) - Health check from maintained counters (deep check on request)
+- liveness() / readiness() - Load balancer probes
+- recommendations(user_id, count, cursor) - One page of ML recommendations for a user
+- interaction(data) - Record user interaction (like/dislike/superlike)
+- interactions_batch(data) - Record many interactions with batched writes
+- recommendations_batch(data) - NDJSON stream of recommendations for many users
+- debug_firebase() - Firebase connectivity and sample data
+- metrics() - Prometheus text exposition, merged across worker processes
+- profile(authorization, params) - CPU / allocation profile of this worker (admin token)
+
+run_admitted(...) applies rate limits, the concurrency cap and the request
+timeout around a handler for servers without their own executor (Flask);
+streamed bodies are wrapped in AdmittedStream, which holds the slot and the
+deadline until the stream ends.
+
+With ``monitoring.timing_header`` on, the recommendation and interaction
+handlers also return their stage breakdown; servers move it from the payload
+to an ``X-Timing`` header with pop_timing_header(payload).
+"""
+
+import contextvars
+import functools
+import hmac
+import json
+import logging
+import os
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from production.main import (record_interaction, record_interactions_batch, get_recommendations_page,
+                             get_batch_recommendations, initialize_firebase,
+                             recommendation_flight, start_feed_scheduler)
+from production.logger import get_logger, log_stats
+from production.firebase_service import get_firebase_service
+from production.config_loader import load_config
+from production.user_store import get_user_store
+from production.feed_cache import get_feed_cache
+from production.feed_scheduler import get_feed_scheduler, QUEUE_ENABLED
+from production.feed_cursor import get_cursor_store
+from production.exclusion_index import get_exclusion_index
+from production.admission import get_admission_controller
+from production.deadline import Deadline
+from production import profiler, timing
+from production.metrics import METRICS_CONTENT_TYPE, get_metrics_registry, ENABLED as METRICS_ENABLED
+
+logger = get_logger(__name__)
+config = load_config()
+
+Response = Tuple[Dict[str, Any], int]
+
+VALID_ACTIONS = ['like', 'dislike', 'superlike']
+MAX_RECOMMENDATIONS = 50
+MAX_BATCH_INTERACTIONS = int(config.get('api', {}).get('max_batch_interactions', 5000))
+INTERACTION_FIELDS = ['user_id', 'target_id', 'action']
+MAX_BATCH_RECOMMENDATION_USERS = int(config.get('api', {}).get('max_batch_recommendation_users', 50000))
+DEEP_HEALTH_TIMEOUT_SECONDS = float(config.get('api', {}).get('health_deep_timeout_seconds', 2))
+
+WORKER_THREADS = int(config.get('performance', {}).get('worker_threads', 4))
+
+# Deep checks run here so a hung Firestore call never holds a request thread
+_deep_check_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="patra-health")
+
+# Admitted requests run here so they can be timed out (Flask path)
+_request_executor = ThreadPoolExecutor(max_workers=WORKER_THREADS, thread_name_prefix="patra-request")
+
+# Bearer token for /api/admin/*; admin endpoints are off without one
+ADMIN_TOKEN = os.getenv('PATRA_ADMIN_TOKEN', '')
+
+# Payload key carrying the X-Timing value from a handler to the server
+TIMING_KEY = '_timing'
+
+
+def with_timing_header(handler: Callable[..., Response]) -> Callable[..., Response]:
+    """Trace the handler's stages and return them under TIMING_KEY (when monitoring.timing_header is on)"""
+    if not timing.TIMING_HEADER:
+        return handler
+
+    @functools.wraps(handler)
+    def traced(*args: Any) -> Response:
+        with timing.trace() as request_timing:
+            payload, status = handler(*args)
+        payload[TIMING_KEY] = request_timing.header()
+        return payload, status
+    return traced
+
+
+def pop_timing_header(payload: Any) -> Optional[str]:
+    """Remove and return the X-Timing value a handler attached to its payload"""
+    return payload.pop(TIMING_KEY, None) if isinstance(payload, dict) else None
+
+
+def _metrics_gauges() -> Dict[Tuple[str, tuple], float]:
+    """Gauges and counters of this process for the metrics registry"""
+    admission = get_admission_controller().stats()
+    feed_cache = get_feed_cache().stats()
+    feed_queues = get_feed_scheduler().stats()
+    coalescing = recommendation_flight.stats()
+    snapshot = get_user_store().status()
+    logging_stats = log_stats()
+    return {
+        ('patra_in_flight_requests', ()): admission['concurrency']['in_flight'],
+        ('patra_executor_queue_depth', (('executor', 'request'),)): _request_executor._work_queue.qsize(),
+        ('patra_admission_rejected_total', ()): (admission['per_user']['rejected'] + admission['per_ip']['rejected']
+                                                 + admission['concurrency']['rejected']),
+        ('patra_request_timeouts_total', ()): admission['timeouts'],
+        ('patra_feed_cache_hits_total', ()): feed_cache['hits'],
+        ('patra_feed_cache_misses_total', ()): feed_cache['misses'],
+        ('patra_feed_cache_users', ()): feed_cache['users'],
+        ('patra_feed_queue_depth', ()): feed_queues['queued_total'],
+        ('patra_feed_refills_pending', ()): feed_queues['pending_refills'],
+        ('patra_coalescing_requests_total', ()): coalescing['requests'],
+        ('patra_coalescing_executions_total', ()): coalescing['executions'],
+        ('patra_snapshot_users', ()): snapshot['users'],
+        ('patra_snapshot_age_seconds', ()): snapshot.get('age_seconds', 0.0),
+        ('patra_circuit_open', ()): int(get_firebase_service().is_stale()),
+        ('patra_log_records_sampled_out_total', ()): logging_stats['sampled_out'],
+        ('patra_log_records_dropped_total', ()): logging_stats['dropped'],
+        ('patra_log_queue_depth', ()): logging_stats['queued'],
+    }
+
+
+get_metrics_registry().register_gauges(_metrics_gauges)
+
+
+def init_backend() -> bool:
+    """Initialize Firebase from FIREBASE_SERVICE_ACCOUNT_PATH (or default credentials)"""
+    get_metrics_registry().start_publisher()
+    service_account_path = os.getenv('FIREBASE_SERVICE_ACCOUNT_PATH', 'firebase-service-account.json')
+    initialized = initialize_firebase(service_account_path if os.path.exists(service_account_path) else None)
+
+    if not initialized:
+        logger.warning("Firebase initialization failed - some features may not work")
+    else:
+        # Warm the user snapshot so readiness does not wait for the first feed request
+        threading.Thread(target=get_user_store().refresh, name="patra-snapshot-warmup", daemon=True).start()
+        if QUEUE_ENABLED:
+            start_feed_scheduler()
+    return initialized
+
+
+def run_admitted(func: Callable, *args: Any, client_ip: Optional[str] = None,
+                 user_id: Optional[str] = None) -> Tuple[Any, int]:
+    """
+    Run a handler under admission control
+
+    Rejects with 429/503 before doing any work, then runs the handler in the
+    bounded request pool and answers 504 once ``api.timeout_seconds`` passes.
+    A timed-out request still queued is cancelled; one already running keeps
+    its concurrency slot until it finishes. A streamed body keeps the slot
+    and the deadline until it is exhausted or closed (see AdmittedStream).
+    """
+    admission = get_admission_controller()
+    rejection = admission.admit(client_ip, user_id)
+    if rejection is not None:
+        return rejection
+    deadline = Deadline(admission.timeout_seconds)
+
+    try:
+        # Copy the context so the request id (and any trace) follows the handler into the pool
+        future = _request_executor.submit(contextvars.copy_context().run, func, *args)
+    except Exception:
+        admission.release()
+        raise
+
+    try:
+        body, status = future.result(timeout=deadline.remaining())
+    except FutureTimeoutError:
+        future.cancel()
+        future.add_done_callback(lambda _: admission.release())
+        logger.warning(f"Request timed out after {admission.timeout_seconds}s in {func.__name__}")
+        return admission.timed_out()
+    except BaseException:
+        future.add_done_callback(lambda _: admission.release())
+        raise
+    return admitted_body(admission, body, status, deadline)
+
+
+def admitted_body(admission, body: Any, status: int, deadline: Deadline) -> Tuple[Any, int]:
+    """Release the concurrency slot of a finished handler, or hand it to its streamed body"""
+    if isinstance(body, Iterator):
+        return AdmittedStream(admission, body, deadline), status
+    admission.release()
+    return body, status
+
+
+class AdmittedStream:
+    """
+    NDJSON body of an admitted request that keeps its concurrency slot
+
+    The slot is released when the stream is exhausted, fails or is closed
+    (client gone). Each step runs under the request deadline; once it has
+    passed, a timeout line ends the stream.
+    """
+
+    def __init__(self, admission, lines: Iterator[str], deadline: Deadline):
+        self.admission = admission
+        self.lines = lines
+        self.deadline = deadline
+        self._closed = False
+        self._lock = threading.Lock()
+
+    def __iter__(self) -> "AdmittedStream":
+        return self
+
+    def __next__(self) -> str:
+        if self._closed:
+            raise StopIteration
+        if self.deadline.expired():
+            self.close()
+            logger.warning(f"Streamed response timed out after {self.admission.timeout_seconds}s")
+            payload, _ = self.admission.timed_out()
+            return json.dumps(payload) + '\n'
+        try:
+            with self.deadline.activate():
+                return next(self.lines)
+        except BaseException:
+            self.close()
+            raise
+
+    def close(self):
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        try:
+            close = getattr(self.lines, 'close', None)
+            if close is not None:
+                close()
+        except ValueError:
+            pass   # A step is still running in another thread; __next__ stops after it
+        finally:
+            self.admission.release()
+
+
+def _service_unavailable() -> Response:
+    return {
+        'success': False,
+        'error': 'Service unavailable',
+        'message': 'Firebase connection not available'
+    }, 503
+
+
+def _deep_check() -> Dict[str, Any]:
+    """Run one Firestore round trip with a strict timeout"""
+    future = _deep_check_executor.submit(get_firebase_service().ping, DEEP_HEALTH_TIMEOUT_SECONDS)
+    try:
+        ok = future.result(timeout=DEEP_HEALTH_TIMEOUT_SECONDS)
+        return {'ok': ok, 'timeout_seconds': DEEP_HEALTH_TIMEOUT_SECONDS}
+    except FutureTimeoutError:
+        future.cancel()
+        return {'ok': False, 'timeout_seconds': DEEP_HEALTH_TIMEOUT_SECONDS, 'error': 'timed out'}
+
+
+def health(deep: bool = False) -> Response:
+    """
+    Health check endpoint
+
+    Reports maintained counters and the snapshot cache status without touching
+    Firestore. A deep check (one bounded Firestore read) runs only when
+    ``deep`` is requested.
+    """
+    try:
+        firebase_service = get_firebase_service()
+        firebase_status = firebase_service.is_connected()
+        snapshot_status = get_user_store().status()
+
+        payload = {
+            'status': 'healthy' if firebase_status else 'degraded',
+            'message': 'Patra ML API is running',
+            'version': '2.0.0',
+            'firebase_connected': firebase_status,
+            'storage_backend': firebase_service.name,
+            'users_in_database': snapshot_status['users'],
+            'snapshot_cache': snapshot_status,
+            'counters': firebase_service.get_counters(),
+            'circuit_breaker': firebase_service.breaker.stats(),
+            'call_policy': firebase_service.policy.stats(),
+            'coalescing': recommendation_flight.stats(),
+            'feed_cache': get_feed_cache().stats(),
+            'feed_queues': get_feed_scheduler().stats(),
+            'feed_cursors': get_cursor_store().stats(),
+            'exclusion_index': get_exclusion_index().stats(),
+            'admission': get_admission_controller().stats(),
+            'stage_timing': timing.get_timing_registry().snapshot(),
+            'logging': log_stats(),
+            'features': {
+                'ml_recommendations': firebase_status,
+                'interaction_tracking': firebase_status,
+                'real_time_data': firebase_status
+            }
+        }
+
+        if firebase_service.is_stale():
+            payload['status'] = 'degraded'
+
+        if deep:
+            payload['deep_check'] = _deep_check()
+            if not payload['deep_check']['ok']:
+                payload['status'] = 'degraded'
+
+        return payload, 200
+    except Exception as e:
+        logger.error(f"Health check failed: {e}")
+        return {
+            'status': 'unhealthy',
+            'message': 'API health check failed',
+            'error': str(e)
+        }, 500
+
+
+def metrics() -> Tuple[str, int]:
+    """Prometheus metrics of all worker processes (text exposition format)"""
+    if not METRICS_ENABLED:
+        return 'metrics disabled (monitoring.metrics_enabled)\n', 404
+    try:
+        return get_metrics_registry().render(), 200
+    except Exception as e:
+        logger.error(f"Metrics rendering failed: {e}")
+        return f'metrics unavailable: {e}\n', 500
+
+
+def profile(authorization: Optional[str], params: Dict[str, str]) -> Tuple[str, int]:
+    """
+    Profile this worker for ``seconds`` (admin only; blocks for the capture)
+
+    Args:
+        authorization: ``Authorization`` header, ``Bearer <PATRA_ADMIN_TOKEN>``
+        params: Query parameters: mode (sample|cprofile|tracemalloc), seconds,
+            interval_ms and idle (sample), fraction and sort (cprofile),
+            group_by and frames (tracemalloc), limit
+
+    Returns:
+        (text report, status code)
+    """
+    if not ADMIN_TOKEN:
+        return 'Admin endpoints are disabled (set PATRA_ADMIN_TOKEN)\n', 404
+    scheme, _, token = (authorization or '').partition(' ')
+    if scheme.lower() != 'bearer' or not hmac.compare_digest(token.strip().encode(), ADMIN_TOKEN.encode()):
+        return 'Unauthorized\n', 401
+
+    try:
+        return profiler.capture(params.get('mode', 'sample'), float(params.get('seconds', 10)), params), 200
+    except ValueError as e:
+        return f'Invalid request: {e}\n', 400
+    except profiler.ProfilerBusy as e:
+        return f'{e}\n', 409
+    except Exception as e:
+        logger.error(f"Profiler capture failed: {e}")
+        logger.error(traceback.format_exc())
+        return f'Profiler capture failed: {e}\n', 500
+
+
+def liveness() -> Response:
+    """Liveness probe: the process is up and serving requests"""
+    return {'status': 'alive'}, 200
+
+
+def readiness() -> Response:
+    """Readiness probe: Firebase is connected and the user snapshot is loaded"""
+    firebase_status = get_firebase_service().is_connected()
+    snapshot_loaded = get_user_store().status()['loaded']
+    ready = firebase_status and snapshot_loaded
+    return {
+        'status': 'ready' if ready else 'not_ready',
+        'firebase_connected': firebase_status,
+        'snapshot_loaded': snapshot_loaded
+    }, 200 if ready else 503
+
+
+@with_timing_header
+@profiler.profiled
+def recommendations(user_id: str, count: Optional[str] = None, cursor: Optional[str] = None) -> Response:
+    """
+    Get ML-powered recommendations for a user using Firebase data
+
+    Args:
+        user_id: The ID of the user to get recommendations for
+        count: Raw ``count`` query parameter (default: 10)
+        cursor: ``next_cursor`` from the previous page, if paging
+    """
+    try:
+        # Check Firebase connection
+        firebase_service = get_firebase_service()
+        if not firebase_service.is_connected():
+            return _service_unavailable()
+
+        count = int(count if count is not None else 10)
+        count = min(count, MAX_RECOMMENDATIONS)  # Maximum 50 recommendations
+
+        logger.debug(f"ML API: Getting recommendations for user {user_id}, count: {count}")
+
+        # Generate recommendations using Firebase ML backend, within the feed time budget
+        deadline = Deadline()
+        recs, next_cursor = get_recommendations_page(user_id, count, cursor, deadline)
+
+        # Score breakdown of the top 10 only at DEBUG: one line instead of five per recommendation
+        if recs:
+            logger.info(f"🎯 ML API: Generated {len(recs)} recommendations for user {user_id}")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Top recommendations: " + "; ".join(
+                    f"#{i + 1} {rec.get('user_id', 'Unknown')} compatibility={rec.get('compatibility_score', 'N/A')} "
+                    f"age={rec.get('age_score', 'N/A')} location={rec.get('location_score', 'N/A')} "
+                    f"interest={rec.get('interest_score', 'N/A')}"
+                    for i, rec in enumerate(recs[:10])))
+        else:
+            logger.info(f"⚠️  ML API: No recommendations generated for user {user_id}")
+
+        if not recs and cursor:
+            # Paged past the end of the ranked snapshot
+            return {
+                'success': True,
+                'user_id': user_id,
+                'count': 0,
+                'recommendations': [],
+                'next_cursor': None
+            }, 200
+
+        if not recs:
+            # Try to check if user exists
+            user_data = firebase_service.get_user_by_id(user_id)
+            if not user_data:
+                return {
+                    'success': False,
+                    'error': 'User not found',
+                    'message': f'User {user_id} not found in database'
+                }, 404
+            else:
+                # User exists but no recommendations available
+                return {
+                    'success': True,
+                    'user_id': user_id,
+                    'count': 0,
+                    'recommendations': [],
+                    'message': 'No recommendations available for this user'
+                }, 200
+
+        logger.debug(f"ML API: Returning {len(recs)} recommendations for user {user_id}")
+
+        return {
+            'success': True,
+            'user_id': user_id,
+            'count': len(recs),
+            'recommendations': recs,
+            'next_cursor': next_cursor,
+            'degraded_stages': deadline.degraded_stages,
+            'stale': deadline.degraded.get('backend') == 'stale',
+            'generated_at': pd.Timestamp.now().isoformat(),
+            'ml_version': '2.0.0'
+        }, 200
+
+    except ValueError as e:
+        logger.error(f"Invalid input: {e}")
+        return {
+            'success': False,
+            'error': 'Invalid input',
+            'message': str(e)
+        }, 400
+
+    except Exception as e:
+        logger.error(f"Error generating recommendations: {e}")
+        logger.error(traceback.format_exc())
+        return {
+            'success': False,
+            'error': 'Internal server error',
+            'message': 'Failed to generate recommendations'
+        }, 500
+
+
+def recommendations_batch(data: Optional[Dict[str, Any]]) -> Tuple[Union[Dict[str, Any], Iterator[str]], int]:
+    """
+    Get recommendations for many users in one request
+
+    Expected JSON payload:
+    {
+        "user_ids": ["user123", "user456", ...],
+        "count": 3
+    }
+
+    Returns:
+        (error payload, status) for a bad request, otherwise (iterator of
+        NDJSON lines, 200) with one ``{"user_id", "recommendations"}`` object
+        per user, in request order
+    """
+    firebase_service = get_firebase_service()
+    if not firebase_service.is_connected():
+        return _service_unavailable()
+
+    user_ids = data.get('user_ids') if isinstance(data, dict) else None
+    if not isinstance(user_ids, list) or not user_ids or not all(isinstance(uid, str) for uid in user_ids):
+        return {
+            'success': False,
+            'error': 'Invalid request',
+            'message': 'JSON payload with a non-empty "user_ids" list of strings required'
+        }, 400
+
+    if len(user_ids) > MAX_BATCH_RECOMMENDATION_USERS:
+        return {
+            'success': False,
+            'error': 'Batch too large',
+            'message': f'At most {MAX_BATCH_RECOMMENDATION_USERS} users per request'
+        }, 400
+
+    try:
+        count = min(int(data.get('count', 3)), MAX_RECOMMENDATIONS)
+    except (TypeError, ValueError):
+        return {
+            'success': False,
+            'error': 'Invalid input',
+            'message': 'count must be an integer'
+        }, 400
+
+    logger.info(f"🤖 ML API: Batch recommendations for {len(user_ids)} users, count: {count}")
+
+    def stream() -> Iterator[str]:
+        try:
+            for user_id, recs in get_batch_recommendations(user_ids, count):
+                if recs is None:
+                    line = {'user_id': user_id, 'error': 'User not found'}
+                else:
+                    line = {'user_id': user_id, 'count': len(recs), 'recommendations': recs}
+                yield json.dumps(line) + '\n'
+        except Exception as e:
+            logger.error(f"Error streaming batch recommendations: {e}")
+            logger.error(traceback.format_exc())
+            yield json.dumps({'error': 'Internal server error',
+                              'message': 'Batch recommendations stopped early'}) + '\n'
+
+    return stream(), 200
+
+
+@with_timing_header
+@profiler.profiled
+def interaction(data: Optional[Dict[str, Any]]) -> Response:
+    """
+    Record a user interaction (like, dislike, superlike) to Firebase
+
+    Expected JSON payload:
+    {
+        "user_id": "user123",
+        "target_id": "user456",
+        "action": "like|dislike|superlike"
+    }
+    """
+    try:
+        # Check Firebase connection
+        firebase_service = get_firebase_service()
+        if not firebase_service.is_connected():
+            return _service_unavailable()
+
+        if not data:
+            return {
+                'success': False,
+                'error': 'Invalid request',
+                'message': 'JSON payload required'
+            }, 400
+
+        user_id = data.get('user_id')
+        target_id = data.get('target_id')
+        action = data.get('action')
+
+        # Validate required fields
+        if not all([user_id, target_id, action]):
+            return {
+                'success': False,
+                'error': 'Missing fields',
+                'message': 'user_id, target_id, and action are required'
+            }, 400
+
+        # Validate action
+        if action not in VALID_ACTIONS:
+            return {
+                'success': False,
+                'error': 'Invalid action',
+                'message': 'action must be one of: like, dislike, superlike'
+            }, 400
+
+        logger.info(f"Recording interaction: {user_id} -> {target_id} ({action})")
+
+        # Record the interaction using Firebase ML backend
+        success = record_interaction(user_id, target_id, action)
+
+        if success:
+            return {
+                'success': True,
+                'message': 'Interaction recorded successfully',
+                'user_id': user_id,
+                'target_id': target_id,
+                'action': action,
+                'recorded_at': pd.Timestamp.now().isoformat()
+            }, 200
+        else:
+            return {
+                'success': False,
+                'error': 'Recording failed',
+                'message': 'Failed to record interaction'
+            }, 500
+
+    except Exception as e:
+        logger.error(f"Error recording interaction: {e}")
+        logger.error(traceback.format_exc())
+        return {
+            'success': False,
+            'error': 'Internal server error',
+            'message': 'Failed to record interaction'
+        }, 500
+
+
+def _validate_interactions(items: list) -> Tuple[pd.DataFrame, np.ndarray]:
+    """
+    Column-wise validation of a swipe batch
+
+    Returns:
+        (interactions DataFrame, per-row error message or None)
+    """
+    records = [item if isinstance(item, dict) else {} for item in items]
+    df = pd.DataFrame.from_records(records, columns=INTERACTION_FIELDS + ['timestamp']) \
+        if records else pd.DataFrame(columns=INTERACTION_FIELDS + ['timestamp'])
+
+    missing = np.zeros(len(df), dtype=bool)
+    for field in INTERACTION_FIELDS:
+        is_text = df[field].map(type).eq(str).to_numpy()
+        missing |= ~is_text | (df[field].fillna('').astype(str).str.len().to_numpy() == 0)
+
+    bad_action = ~df['action'].isin(VALID_ACTIONS).to_numpy()
+
+    timestamps = pd.to_datetime(df['timestamp'], errors='coerce', utc=True, format='ISO8601')
+    bad_timestamp = (df['timestamp'].notna() & timestamps.isna()).to_numpy()
+    df['timestamp'] = timestamps.astype(object).where(timestamps.notna(), None)
+
+    errors = np.select(
+        [missing, bad_action, bad_timestamp],
+        ['user_id, target_id, and action are required',
+         'action must be one of: like, dislike, superlike',
+         'timestamp must be an ISO 8601 string'],
+        default=''
+    ).astype(object)
+    errors[errors == ''] = None
+    return df, errors
+
+
+@with_timing_header
+@profiler.profiled
+def interactions_batch(data: Optional[Dict[str, Any]]) -> Response:
+    """
+    Record a batch of user interactions (offline swipes) to Firebase
+
+    Expected JSON payload:
+    {
+        "interactions": [
+            {"user_id": "user123", "target_id": "user456", "action": "like",
+             "timestamp": "2024-01-01T12:00:00Z"},
+            ...
+        ]
+    }
+
+    Interactions are applied in list order; ``timestamp`` is optional. Every
+    item gets a status of recorded, invalid or failed.
+    """
+    try:
+        # Check Firebase connection
+        firebase_service = get_firebase_service()
+        if not firebase_service.is_connected():
+            return _service_unavailable()
+
+        items = data.get('interactions') if isinstance(data, dict) else None
+        if not isinstance(items, list) or not items:
+            return {
+                'success': False,
+                'error': 'Invalid request',
+                'message': 'JSON payload with a non-empty "interactions" list required'
+            }, 400
+
+        if len(items) > MAX_BATCH_INTERACTIONS:
+            return {
+                'success': False,
+                'error': 'Batch too large',
+                'message': f'At most {MAX_BATCH_INTERACTIONS} interactions per request'
+            }, 400
+
+        df, errors = _validate_interactions(items)
+        valid = np.fromiter((error is None for error in errors), dtype=bool, count=len(errors))
+
+        saved = np.zeros(len(df), dtype=bool)
+        if valid.any():
+            saved[valid] = record_interactions_batch(df[valid].reset_index(drop=True))
+
+        results = []
+        for index, (error, ok) in enumerate(zip(errors, saved)):
+            if error is not None:
+                results.append({'index': index, 'status': 'invalid', 'error': error})
+            elif ok:
+                results.append({'index': index, 'status': 'recorded'})
+            else:
+                results.append({'index': index, 'status': 'failed', 'error': 'Failed to record interaction'})
+
+        recorded = int(saved.sum())
+        invalid = int((~valid).sum())
+        logger.info(f"Batch interactions: {recorded} recorded, {invalid} invalid, "
+                    f"{len(df) - recorded - invalid} failed")
+
+        return {
+            'success': recorded + invalid == len(df),
+            'received': len(df),
+            'recorded': recorded,
+            'invalid': invalid,
+            'failed': len(df) - recorded - invalid,
+            'results': results,
+            'recorded_at': pd.Timestamp.now().isoformat()
+        }, 200
+
+    except Exception as e:
+        logger.error(f"Error recording interaction batch: {e}")
+        logger.error(traceback.format_exc())
+        return {
+            'success': False,
+            'error': 'Internal server error',
+            'message': 'Failed to record interactions'
+        }, 500
+
+
+def debug_firebase() -> Response:
+    """Debug endpoint to test Firebase connectivity and show sample data"""
+    try:
+        firebase_service = get_firebase_service()
+
+        if not firebase_service.is_connected():
+            return {
+                'firebase_connected': False,
+                'error': 'Firebase not connected'
+            }, 200
+
+        # Test operations
+        users_df = firebase_service.get_all_users()
+        swipes_df = firebase_service.get_swipe_data()
+
+        # Get sample user IDs safely
+        sample_user_ids = []
+        sample_users = []
+
+        if not users_df.empty:
+            try:
+                # Get sample user IDs
+                if 'id' in users_df.columns:
+                    sample_user_ids = users_df['id'].head(5).fillna('').astype(str).tolist()
+
+                # Get sample users with safe conversion
+                sample_users_raw = users_df.head(3).fillna('').to_dict('records')
+                for user in sample_users_raw:
+                    cleaned_user = {}
+                    for k, v in user.items():
+                        try:
+                            if v is None or (hasattr(v, '__len__') and len(str(v)) == 0):
+                                cleaned_user[k] = None
+                            elif hasattr(v, 'isoformat'):  # datetime objects
+                                cleaned_user[k] = v.isoformat()
+                            else:
+                                cleaned_user[k] = str(v) if v is not None else None
+                        except:
+                            cleaned_user[k] = str(v) if v is not None else None
+                    sample_users.append(cleaned_user)
+            except Exception as e:
+                logger.error(f"Error processing sample data: {e}")
+                sample_user_ids = []
+                sample_users = []
+
+        return {
+            'firebase_connected': True,
+            'users_count': len(users_df),
+            'swipes_count': len(swipes_df),
+            'sample_user_ids': sample_user_ids,
+            'sample_users': sample_users
+        }, 200
+    except Exception as e:
+        return {
+            'firebase_connected': False,
+            'error': str(e),
+            'traceback': traceback.format_exc()
+        }, 200
@@ -6,27 +6,37 @@ This server provides ML-powered user recommendations and handles user interactio
 for the Patra dating app using Firebase real-time data.
 
 Endpoints:
-- GET /api/recommendations/<user_id> - Get ML recommendations for a user
+- GET /api/recommendations/<user_id> - Get ML recommendations for a user (?cursor= for next page)
 - POST /api/interaction - Record user interaction (like/dislike/superlike)
-- GET /api/health - Health check endpoint
+- POST /api/interactions/batch - Record many interactions in one request
+- POST /api/recommendations/batch - Stream recommendations for many users as NDJSON
+- GET /api/health - Health check endpoint (?deep=1 adds a bounded Firestore round trip)
+- GET /api/health/live - Liveness probe
+- GET /api/health/ready - Readiness probe
+- GET /metrics - Prometheus metrics (latency histograms, cache/queue gauges) of all workers
+- GET /api/admin/profile - CPU / allocation profile of this worker (Bearer PATRA_ADMIN_TOKEN)
+
+The request handling itself lives in api_handlers.py and is shared with the
+ASGI server (asgi_server.py).
+Scoring and write endpoints pass admission control first (per-user and
+per-IP token buckets, a global in-flight cap, ``api.timeout_seconds``).
 """
 
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, request, jsonify, stream_with_context
 from flask_cors import CORS
 import os
 import sys
-import pandas as pd
+import time
 import logging
-from typing import Dict, List, Any
-import traceback
 
 # Add production directory to path
 sys.path.append(os.path.join(os.path.dirname(__file__), 'production'))
 
 try:
-    from production.main import generate_user_feed, record_interaction, get_user_recommendations, initialize_firebase
-    from production.logger import get_logger
-    from production.firebase_service import get_firebase_service
+    import api_handlers
+    from production.admission import client_ip
+    from production.logger import get_logger, new_request_id, bind_request_id, reset_request_id
+    from production import metrics
 except ImportError as e:
     print(f"Error importing ML modules: {e}")
     print("Make sure the production modules are properly installed")
@@ -40,285 +50,159 @@ logging.basicConfig(level=logging.INFO)
 logger = get_logger(__name__)
 
 # Initialize Firebase
-service_account_path = os.getenv('FIREBASE_SERVICE_ACCOUNT_PATH', 'firebase-service-account.json')
-firebase_initialized = initialize_firebase(service_account_path if os.path.exists(service_account_path) else None)
+firebase_initialized = api_handlers.init_backend()
+
+def _client_ip() -> str:
+    return client_ip(request.remote_addr, request.headers.get('X-Forwarded-For'))
+
+@app.before_request
+def _begin_request():
+    g.request_started = time.perf_counter()
+    g.request_id = new_request_id(request.headers.get('X-Request-ID'))
+    g.request_id_token = bind_request_id(g.request_id)
+
+@app.after_request
+def _finish_request(response):
+    """Request latency by route template (not raw path, which would explode label cardinality)"""
+    started = getattr(g, 'request_started', None)
+    if started is not None:
+        route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        metrics.observe('patra_request_duration_seconds', time.perf_counter() - started,
+                        route=route, method=request.method, status=str(response.status_code))
+        response.headers['X-Request-ID'] = g.request_id
+    return response
 
-if not firebase_initialized:
-    logger.warning("Firebase initialization failed - some features may not work")
+@app.teardown_request
+def _end_request(_exc):
+    token = g.pop('request_id_token', None)
+    if token is not None:
+        reset_request_id(token)
+
+def _respond(payload, status):
+    """JSON response, with Retry-After on load-shedding rejections and the optional X-Timing breakdown"""
+    timing_header = api_handlers.pop_timing_header(payload)
+    response = jsonify(payload)
+    if status in (429, 503) and 'retry_after_seconds' in payload:
+        response.headers['Retry-After'] = str(max(1, int(payload['retry_after_seconds'] + 0.999)))
+    if timing_header:
+        response.headers['X-Timing'] = timing_header
+    return response, status
 
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
-    try:
-        firebase_service = get_firebase_service()
-        firebase_status = firebase_service.is_connected()
-        
-        # Test Firebase connectivity
-        user_count = 0
-        if firebase_status:
-            try:
-                users_df = firebase_service.get_all_users()
-                user_count = len(users_df)
-            except:
-                firebase_status = False
-        
-        return jsonify({
-            'status': 'healthy' if firebase_status else 'degraded',
-            'message': 'Patra ML API is running',
-            'version': '2.0.0',
-            'firebase_connected': firebase_status,
-            'users_in_database': user_count,
-            'features': {
-                'ml_recommendations': firebase_status,
-                'interaction_tracking': firebase_status,
-                'real_time_data': firebase_status
-            }
-        })
-    except Exception as e:
-        logger.error(f"Health check failed: {e}")
-        return jsonify({
-            'status': 'unhealthy',
-            'message': 'API health check failed',
-            'error': str(e)
-        }), 500
+    deep = request.args.get('deep', '').lower() in ('1', 'true', 'yes')
+    payload, status = api_handlers.health(deep)
+    return jsonify(payload), status
+
+@app.route('/api/health/live', methods=['GET'])
+def liveness_check():
+    """Liveness probe"""
+    payload, status = api_handlers.liveness()
+    return jsonify(payload), status
+
+@app.route('/api/health/ready', methods=['GET'])
+def readiness_check():
+    """Readiness probe"""
+    payload, status = api_handlers.readiness()
+    return jsonify(payload), status
 
 @app.route('/api/recommendations/<user_id>', methods=['GET'])
 def get_recommendations(user_id: str):
     """
     Get ML-powered recommendations for a user using Firebase data
-    
+
     Args:
         user_id: The ID of the user to get recommendations for
-        
+
     Query Parameters:
         count: Number of recommendations to return (default: 10)
+        cursor: next_cursor from the previous page (optional)
+    """
+    payload, status = api_handlers.run_admitted(api_handlers.recommendations, user_id,
+                                                request.args.get('count'), request.args.get('cursor'),
+                                                client_ip=_client_ip(), user_id=user_id)
+    return _respond(payload, status)
+
+@app.route('/api/recommendations/batch', methods=['POST'])
+def get_batch_recommendations():
+    """
+    Stream recommendations for many users as NDJSON (one JSON object per line)
+
+    Expected JSON payload:
+    {
+        "user_ids": ["user123", "user456", ...],
+        "count": 3
+    }
     """
-    try:
-        # Check Firebase connection
-        firebase_service = get_firebase_service()
-        if not firebase_service.is_connected():
-            return jsonify({
-                'success': False,
-                'error': 'Service unavailable',
-                'message': 'Firebase connection not available'
-            }), 503
-        
-        # Get count from query params
-        count = int(request.args.get('count', 10))
-        count = min(count, 50)  # Maximum 50 recommendations
-        
-        logger.info(f"🤖 ML API: Getting recommendations for user {user_id}, count: {count}")
-        
-        # Generate recommendations using Firebase ML backend
-        recommendations = get_user_recommendations(user_id, count)
-        
-        # Enhanced logging for debugging
-        if recommendations:
-            logger.info(f"🎯 ML API: Generated {len(recommendations)} recommendations for user {user_id}")
-            logger.info("📊 TOP RECOMMENDATIONS:")
-            for i, rec in enumerate(recommendations[:10]):  # Log first 10 recommendations
-                logger.info(f"   #{i+1}: User {rec.get('user_id', 'Unknown')}")
-                logger.info(f"        💯 Compatibility: {rec.get('compatibility_score', 'N/A')}")
-                logger.info(f"        🎪 Age Score: {rec.get('age_score', 'N/A')}")
-                logger.info(f"        📍 Location Score: {rec.get('location_score', 'N/A')}")
-                logger.info(f"        💝 Interest Score: {rec.get('interest_score', 'N/A')}")
-        else:
-            logger.info(f"⚠️  ML API: No recommendations generated for user {user_id}")
-        
-        if not recommendations:
-            # Try to check if user exists
-            user_data = firebase_service.get_user_by_id(user_id)
-            if not user_data:
-                return jsonify({
-                    'success': False,
-                    'error': 'User not found',
-                    'message': f'User {user_id} not found in database'
-                }), 404
-            else:
-                # User exists but no recommendations available
-                return jsonify({
-                    'success': True,
-                    'user_id': user_id,
-                    'count': 0,
-                    'recommendations': [],
-                    'message': 'No recommendations available for this user'
-                })
-        
-        logger.info(f"✅ ML API: Successfully returning {len(recommendations)} recommendations for user {user_id}")
-        
-        return jsonify({
-            'success': True,
-            'user_id': user_id,
-            'count': len(recommendations),
-            'recommendations': recommendations,
-            'generated_at': pd.Timestamp.now().isoformat(),
-            'ml_version': '2.0.0'
-        })
-        
-    except ValueError as e:
-        logger.error(f"Invalid input: {e}")
-        return jsonify({
-            'success': False,
-            'error': 'Invalid input',
-            'message': str(e)
-        }), 400
-        
-    except Exception as e:
-        logger.error(f"Error generating recommendations: {e}")
-        logger.error(traceback.format_exc())
-        return jsonify({
-            'success': False,
-            'error': 'Internal server error',
-            'message': 'Failed to generate recommendations'
-        }), 500
+    body, status = api_handlers.run_admitted(api_handlers.recommendations_batch, request.get_json(silent=True),
+                                             client_ip=_client_ip())
+    if isinstance(body, dict):
+        return _respond(body, status)
+    return Response(stream_with_context(body), status=status, mimetype='application/x-ndjson')
 
 @app.route('/api/interaction', methods=['POST'])
 def record_user_interaction():
     """
     Record a user interaction (like, dislike, superlike) to Firebase
-    
+
     Expected JSON payload:
     {
         "user_id": "user123",
-        "target_id": "user456", 
+        "target_id": "user456",
         "action": "like|dislike|superlike"
     }
     """
-    try:
-        # Check Firebase connection
-        firebase_service = get_firebase_service()
-        if not firebase_service.is_connected():
-            return jsonify({
-                'success': False,
-                'error': 'Service unavailable',
-                'message': 'Firebase connection not available'
-            }), 503
-        
-        data = request.get_json()
-        
-        if not data:
-            return jsonify({
-                'success': False,
-                'error': 'Invalid request',
-                'message': 'JSON payload required'
-            }), 400
-        
-        user_id = data.get('user_id')
-        target_id = data.get('target_id')
-        action = data.get('action')
-        
-        # Validate required fields
-        if not all([user_id, target_id, action]):
-            return jsonify({
-                'success': False,
-                'error': 'Missing fields',
-                'message': 'user_id, target_id, and action are required'
-            }), 400
-        
-        # Validate action
-        if action not in ['like', 'dislike', 'superlike']:
-            return jsonify({
-                'success': False,
-                'error': 'Invalid action',
-                'message': 'action must be one of: like, dislike, superlike'
-            }), 400
-        
-        logger.info(f"Recording interaction: {user_id} -> {target_id} ({action})")
-        
-        # Record the interaction using Firebase ML backend
-        success = record_interaction(user_id, target_id, action)
-        
-        if success:
-            return jsonify({
-                'success': True,
-                'message': 'Interaction recorded successfully',
-                'user_id': user_id,
-                'target_id': target_id,
-                'action': action,
-                'recorded_at': pd.Timestamp.now().isoformat()
-            })
-        else:
-            return jsonify({
-                'success': False,
-                'error': 'Recording failed',
-                'message': 'Failed to record interaction'
-            }), 500
-        
-    except Exception as e:
-        logger.error(f"Error recording interaction: {e}")
-        logger.error(traceback.format_exc())
-        return jsonify({
-            'success': False,
-            'error': 'Internal server error',
-            'message': 'Failed to record interaction'
-        }), 500
+    data = request.get_json(silent=True)
+    user_id = data.get('user_id') if isinstance(data, dict) else None
+    payload, status = api_handlers.run_admitted(api_handlers.interaction, data,
+                                                client_ip=_client_ip(), user_id=user_id)
+    return _respond(payload, status)
+
+@app.route('/api/interactions/batch', methods=['POST'])
+def record_user_interactions_batch():
+    """
+    Record a batch of user interactions (e.g. swipes queued while offline)
+
+    Expected JSON payload:
+    {
+        "interactions": [{"user_id": "...", "target_id": "...", "action": "like"}, ...]
+    }
+    """
+    payload, status = api_handlers.run_admitted(api_handlers.interactions_batch, request.get_json(silent=True),
+                                                client_ip=_client_ip())
+    return _respond(payload, status)
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Prometheus metrics, merged across worker processes"""
+    body, status = api_handlers.metrics()
+    return Response(body, status=status, content_type=api_handlers.METRICS_CONTENT_TYPE)
+
+@app.route('/api/admin/profile', methods=['GET'])
+def admin_profile():
+    """
+    Profile this worker (blocks for ``seconds``)
+
+    Query Parameters:
+        mode: sample (collapsed stacks), cprofile (pstats of sampled requests) or tracemalloc
+        seconds: Capture length (default: 10)
+    """
+    body, status = api_handlers.profile(request.headers.get('Authorization'), request.args.to_dict())
+    return Response(body, status=status, mimetype='text/plain', headers={'X-Worker-Pid': str(os.getpid())})
 
 @app.route('/api/debug/firebase', methods=['GET'])
 def debug_firebase():
     """Debug endpoint to test Firebase connectivity and show sample data"""
-    try:
-        firebase_service = get_firebase_service()
-        
-        if not firebase_service.is_connected():
-            return jsonify({
-                'firebase_connected': False,
-                'error': 'Firebase not connected'
-            })
-        
-        # Test operations
-        users_df = firebase_service.get_all_users()
-        swipes_df = firebase_service.get_swipe_data()
-        
-        # Get sample user IDs safely
-        sample_user_ids = []
-        sample_users = []
-        
-        if not users_df.empty:
-            try:
-                # Get sample user IDs
-                if 'id' in users_df.columns:
-                    sample_user_ids = users_df['id'].head(5).fillna('').astype(str).tolist()
-                
-                # Get sample users with safe conversion
-                sample_users_raw = users_df.head(3).fillna('').to_dict('records')
-                for user in sample_users_raw:
-                    cleaned_user = {}
-                    for k, v in user.items():
-                        try:
-                            if v is None or (hasattr(v, '__len__') and len(str(v)) == 0):
-                                cleaned_user[k] = None
-                            elif hasattr(v, 'isoformat'):  # datetime objects
-                                cleaned_user[k] = v.isoformat()
-                            else:
-                                cleaned_user[k] = str(v) if v is not None else None
-                        except:
-                            cleaned_user[k] = str(v) if v is not None else None
-                    sample_users.append(cleaned_user)
-            except Exception as e:
-                logger.error(f"Error processing sample data: {e}")
-                sample_user_ids = []
-                sample_users = []
-        
-        return jsonify({
-            'firebase_connected': True,
-            'users_count': len(users_df),
-            'swipes_count': len(swipes_df),
-            'sample_user_ids': sample_user_ids,
-            'sample_users': sample_users
-        })
-    except Exception as e:
-        return jsonify({
-            'firebase_connected': False,
-            'error': str(e),
-            'traceback': traceback.format_exc()
-        })
+    payload, status = api_handlers.debug_firebase()
+    return jsonify(payload), status
 
 if __name__ == '__main__':
     debug_mode = os.getenv('FLASK_ENV') == 'development'
     port = int(os.getenv('PORT', 5000))
-    
+
     logger.info(f"Starting Patra ML API server on port {port}")
     logger.info(f"Debug mode: {debug_mode}")
     logger.info(f"Firebase initialized: {firebase_initialized}")
-    
-    app.run(host='0.0.0.0', port=port, debug=debug_mode)
\ No newline at end of file
+
+    app.run(host='0.0.0.0', port=port, debug=debug_mode)
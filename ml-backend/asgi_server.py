@@ -0,0 +1,280 @@
+"""
+ASGI API Server for Patra ML Recommendations
+============================================
+
+Production serving mode for the Patra ML API. Exposes the same contract as the
+Flask development server (api_server.py) with async handlers on FastAPI.
+Blocking work (Firestore reads, scoring) runs in a bounded thread pool sized
+by ``performance.worker_threads`` so the event loop stays responsive.
+Scoring and write endpoints pass admission control first (per-user and
+per-IP token buckets, a global in-flight cap, ``api.timeout_seconds``).
+
+Endpoints:
+- GET /api/recommendations/{user_id} - Get ML recommendations for a user (?cursor= for next page)
+- POST /api/interaction - Record user interaction (like/dislike/superlike)
+- POST /api/interactions/batch - Record many interactions in one request
+- POST /api/recommendations/batch - Stream recommendations for many users as NDJSON
+- GET /api/health - Health check endpoint (?deep=1 adds a bounded Firestore round trip)
+- GET /api/health/live - Liveness probe
+- GET /api/health/ready - Readiness probe
+- GET /api/debug/firebase - Firebase connectivity and sample data
+- GET /metrics - Prometheus metrics (latency histograms, cache/queue gauges) of all workers
+- GET /api/admin/profile - CPU / allocation profile of this worker (Bearer PATRA_ADMIN_TOKEN)
+
+Run:
+    uvicorn asgi_server:app --host 0.0.0.0 --port 8000 --workers 4
+"""
+
+import asyncio
+import contextlib
+import contextvars
+import functools
+import math
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, Optional, Tuple
+
+from fastapi import FastAPI, Request
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+
+# Add production directory to path
+sys.path.append(os.path.join(os.path.dirname(__file__), 'production'))
+
+try:
+    import api_handlers
+    from production.admission import client_ip, get_admission_controller
+    from production.config_loader import load_config
+    from production.deadline import Deadline
+    from production.logger import get_logger, new_request_id, bind_request_id, reset_request_id
+    from production import metrics
+except ImportError as e:
+    print(f"Error importing ML modules: {e}")
+    print("Make sure the production modules are properly installed")
+    sys.exit(1)
+
+logger = get_logger(__name__)
+config = load_config()
+
+WORKER_THREADS = int(config.get("performance", {}).get("worker_threads", 4))
+
+# Bounded pool for blocking Firestore and scoring work
+executor = ThreadPoolExecutor(max_workers=WORKER_THREADS, thread_name_prefix="patra-worker")
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """Shut the worker pool down with the app"""
+    yield
+    executor.shutdown(wait=False)
+
+
+app = FastAPI(title="Patra ML API", version="2.0.0", lifespan=lifespan)
+app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"])
+
+# Initialize Firebase
+firebase_initialized = api_handlers.init_backend()
+
+metrics.get_metrics_registry().register_gauges(
+    lambda: {('patra_executor_queue_depth', (('executor', 'asgi'),)): executor._work_queue.qsize()})
+
+
+@app.middleware('http')
+async def request_context(request: Request, call_next):
+    """
+    Bind a request id for log records and observe latency by route template
+    (not raw path, which would explode label cardinality)
+    """
+    started = time.perf_counter()
+    request_id = new_request_id(request.headers.get('x-request-id'))
+    token = bind_request_id(request_id)
+    try:
+        response = await call_next(request)
+    finally:
+        reset_request_id(token)
+    route = request.scope.get('route')
+    metrics.observe('patra_request_duration_seconds', time.perf_counter() - started,
+                    route=route.path if route is not None else 'unmatched', method=request.method,
+                    status=str(response.status_code))
+    response.headers['X-Request-ID'] = request_id
+    return response
+
+
+async def run_blocking(func: Callable, *args: Any) -> JSONResponse:
+    """Run a shared handler in the bounded executor and wrap its response."""
+    loop = asyncio.get_running_loop()
+    payload, status = await loop.run_in_executor(executor, functools.partial(contextvars.copy_context().run,
+                                                                             func, *args))
+    return JSONResponse(payload, status_code=status)
+
+
+async def call_admitted(request: Request, func: Callable, *args: Any,
+                        user_id: Optional[str] = None) -> Tuple[Any, int]:
+    """
+    Run a shared handler under admission control
+
+    Rate limits and the concurrency cap are checked on the event loop before
+    any work is queued; the handler then gets ``api.timeout_seconds`` in the
+    executor. A timed-out call still queued is cancelled; one already running
+    keeps its concurrency slot until it finishes. A streamed body keeps the
+    slot and the remaining deadline until it is exhausted or closed.
+    """
+    admission = get_admission_controller()
+    ip = client_ip(request.client.host if request.client else None, request.headers.get('x-forwarded-for'))
+    rejection = admission.admit(ip, user_id)
+    if rejection is not None:
+        return rejection
+    deadline = Deadline(admission.timeout_seconds)
+
+    try:
+        # Copy the context so the request id follows the handler into the pool
+        future = executor.submit(contextvars.copy_context().run, func, *args)
+    except Exception:
+        admission.release()
+        raise
+
+    try:
+        body, status = await asyncio.wait_for(asyncio.wrap_future(future), timeout=deadline.remaining())
+    except asyncio.TimeoutError:
+        future.add_done_callback(lambda _: admission.release())
+        logger.warning(f"Request timed out after {admission.timeout_seconds}s in {func.__name__}")
+        return admission.timed_out()
+    except BaseException:
+        future.add_done_callback(lambda _: admission.release())
+        raise
+    return api_handlers.admitted_body(admission, body, status, deadline)
+
+
+def respond(payload: Dict[str, Any], status: int) -> JSONResponse:
+    """JSON response, with Retry-After on load-shedding rejections and the optional X-Timing breakdown"""
+    headers = {}
+    timing_header = api_handlers.pop_timing_header(payload)
+    if timing_header:
+        headers['X-Timing'] = timing_header
+    if status in (429, 503) and 'retry_after_seconds' in payload:
+        headers['Retry-After'] = str(max(1, math.ceil(payload['retry_after_seconds'])))
+    return JSONResponse(payload, status_code=status, headers=headers or None)
+
+
+async def iterate_blocking(lines: Iterator[str], context: contextvars.Context) -> AsyncIterator[str]:
+    """
+    Drain a blocking generator through the bounded executor, one item at a time
+
+    Each step runs in ``context`` (copied while the request id was still
+    bound; the response body is sent after the middleware has reset it).
+    """
+    loop = asyncio.get_running_loop()
+    done = object()
+    try:
+        while True:
+            line = await loop.run_in_executor(executor, context.run, next, lines, done)
+            if line is done:
+                return
+            yield line
+    finally:
+        # Client gone or stream finished: release what the body holds (its admission slot)
+        close = getattr(lines, 'close', None)
+        if close is not None:
+            close()
+
+
+@app.get('/api/health')
+async def health_check(deep: str = ''):
+    """Health check endpoint"""
+    return await run_blocking(api_handlers.health, deep.lower() in ('1', 'true', 'yes'))
+
+
+@app.get('/api/health/live')
+async def liveness_check():
+    """Liveness probe (answered on the event loop, no executor hop)"""
+    payload, status = api_handlers.liveness()
+    return JSONResponse(payload, status_code=status)
+
+
+@app.get('/api/health/ready')
+async def readiness_check():
+    """Readiness probe"""
+    payload, status = api_handlers.readiness()
+    return JSONResponse(payload, status_code=status)
+
+
+@app.get('/api/recommendations/{user_id}')
+async def get_recommendations(request: Request, user_id: str, count: Optional[str] = None,
+                              cursor: Optional[str] = None):
+    """Get ML-powered recommendations for a user using Firebase data"""
+    payload, status = await call_admitted(request, api_handlers.recommendations, user_id, count, cursor,
+                                          user_id=user_id)
+    return respond(payload, status)
+
+
+@app.post('/api/recommendations/batch')
+async def get_batch_recommendations(request: Request):
+    """Stream recommendations for many users as NDJSON (one JSON object per line)"""
+    try:
+        data = await request.json()
+    except Exception:
+        data = None
+    body, status = await call_admitted(request, api_handlers.recommendations_batch, data)
+    if isinstance(body, dict):
+        return respond(body, status)
+    return StreamingResponse(iterate_blocking(body, contextvars.copy_context()), status_code=status, media_type='application/x-ndjson')
+
+
+@app.post('/api/interaction')
+async def record_user_interaction(request: Request):
+    """Record a user interaction (like, dislike, superlike) to Firebase"""
+    try:
+        data = await request.json()
+    except Exception:
+        data = None
+    user_id = data.get('user_id') if isinstance(data, dict) else None
+    payload, status = await call_admitted(request, api_handlers.interaction, data, user_id=user_id)
+    return respond(payload, status)
+
+
+@app.post('/api/interactions/batch')
+async def record_user_interactions_batch(request: Request):
+    """Record a batch of user interactions (e.g. swipes queued while offline)"""
+    try:
+        data = await request.json()
+    except Exception:
+        data = None
+    payload, status = await call_admitted(request, api_handlers.interactions_batch, data)
+    return respond(payload, status)
+
+
+@app.get('/api/debug/firebase')
+async def debug_firebase():
+    """Debug endpoint to test Firebase connectivity and show sample data"""
+    return await run_blocking(api_handlers.debug_firebase)
+
+
+@app.get('/metrics')
+async def metrics_endpoint():
+    """Prometheus metrics, merged across worker processes"""
+    loop = asyncio.get_running_loop()
+    body, status = await loop.run_in_executor(executor, api_handlers.metrics)
+    return PlainTextResponse(body, status_code=status, media_type=api_handlers.METRICS_CONTENT_TYPE)
+
+
+@app.get('/api/admin/profile')
+async def admin_profile(request: Request):
+    """Profile this worker; runs outside the bounded pool so a capture never takes a scoring slot"""
+    loop = asyncio.get_running_loop()
+    body, status = await loop.run_in_executor(None, api_handlers.profile, request.headers.get('authorization'),
+                                              dict(request.query_params))
+    return PlainTextResponse(body, status_code=status, headers={'X-Worker-Pid': str(os.getpid())})
+
+
+if __name__ == '__main__':
+    import uvicorn
+
+    port = int(os.getenv('PORT', 8000))
+    workers = int(os.getenv('WEB_CONCURRENCY', 1))
+
+    logger.info(f"Starting Patra ML ASGI server on port {port} ({workers} worker(s), {WORKER_THREADS} threads each)")
+    logger.info(f"Firebase initialized: {firebase_initialized}")
+
+    uvicorn.run("asgi_server:app", host='0.0.0.0', port=port, workers=workers)
@@ -0,0 +1,174 @@
+"""
+Decode benchmark: Firestore documents to DataFrames, legacy walk vs. schema decoder
+===================================================================================
+
+Builds synthetic user and swipe documents (production/synthetic_data.py) as
+Firestore would hand them over - snapshot objects whose ``to_dict()`` returns
+a fresh dict with tz-aware UTC timestamps, photo URLs and free text - and
+times turning them into the users and swipes DataFrames:
+
+- legacy: ``to_dict()`` + ``id`` per document, the recursive per-value
+  ``pd.isna`` clean-up the users read used to do, then ``pd.DataFrame`` of
+  the list of dicts
+- schema: firestore_decode.decode_snapshots with USER_SCHEMA / SWIPE_SCHEMA
+  (schema fields only, column-wise conversion)
+
+Reports the best of ``--repeat`` runs per path, the speedup and the deep
+memory of the resulting frames.
+
+Usage:
+    python benchmarks/bench_decode.py --users 100000 --swipes 500000
+    python benchmarks/bench_decode.py --users 20000 --repeat 5 --json decode.json
+"""
+
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List
+
+import pandas as pd
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class _Snapshot:
+    """Stand-in for a Firestore DocumentSnapshot"""
+
+    __slots__ = ('id', '_data')
+
+    def __init__(self, doc_id: str, data: Dict[str, Any]):
+        self.id = doc_id
+        self._data = data
+
+    def to_dict(self) -> Dict[str, Any]:
+        return dict(self._data)
+
+
+# -------------------- DOCUMENTS --------------------
+def build_documents(n_users: int, n_swipes: int, seed: int):
+    from production.synthetic_data import SyntheticPopulation
+
+    population = SyntheticPopulation(n_users, seed=seed)
+    users = []
+    for chunk in population.users():
+        for user in chunk:
+            user_id = user.pop('id')
+            user['createdAt'] = user['createdAt'].replace(tzinfo=timezone.utc)
+            user['elo_updated'] = datetime.now(timezone.utc)
+            users.append(_Snapshot(user_id, user))
+
+    swipes = []
+    for chunk in population.swipes(n_swipes):
+        chunk['timestamp'] = chunk['timestamp'].dt.tz_localize('UTC').dt.to_pydatetime()
+        for i, record in enumerate(chunk.to_dict('records')):
+            record['ml_version'] = '2.0.0'
+            swipes.append(_Snapshot(f"sw{len(swipes) + i}", record))
+    return users, swipes
+
+
+# -------------------- PATHS --------------------
+def _clean_data(data):
+    """The recursive clean-up formerly applied to every user document"""
+    if isinstance(data, dict):
+        return {k: _clean_data(v) for k, v in data.items()}
+    elif isinstance(data, list):
+        return [_clean_data(item) for item in data]
+    elif pd.isna(data):
+        return None
+    elif isinstance(data, pd.Timestamp):
+        return data.isoformat() if not pd.isna(data) else None
+    elif isinstance(data, datetime):
+        return data.isoformat()
+    else:
+        return data
+
+
+def legacy_users(docs: List[_Snapshot]) -> pd.DataFrame:
+    users_data = []
+    for doc in docs:
+        user_data = doc.to_dict()
+        user_data['id'] = doc.id
+        users_data.append(_clean_data(user_data))
+    return pd.DataFrame(users_data)
+
+
+def legacy_swipes(docs: List[_Snapshot]) -> pd.DataFrame:
+    swipes_data = []
+    for doc in docs:
+        swipe_data = doc.to_dict()
+        swipe_data['id'] = doc.id
+        swipes_data.append(swipe_data)
+    return pd.DataFrame(swipes_data)
+
+
+def schema_users(docs: List[_Snapshot]) -> pd.DataFrame:
+    from production.firestore_decode import USER_SCHEMA, decode_snapshots
+    return decode_snapshots(docs, USER_SCHEMA)
+
+
+def schema_swipes(docs: List[_Snapshot]) -> pd.DataFrame:
+    from production.firestore_decode import SWIPE_SCHEMA, decode_snapshots
+    return decode_snapshots(docs, SWIPE_SCHEMA)
+
+
+def best_of(fn: Callable, docs: List[_Snapshot], repeat: int):
+    best, frame = float('inf'), None
+    for _ in range(repeat):
+        frame = None
+        gc.collect()
+        started = time.perf_counter()
+        frame = fn(docs)
+        best = min(best, time.perf_counter() - started)
+    return best, frame
+
+
+def compare(name: str, legacy: Callable, schema: Callable, docs: List[_Snapshot], repeat: int) -> Dict:
+    legacy_seconds, legacy_df = best_of(legacy, docs, repeat)
+    schema_seconds, schema_df = best_of(schema, docs, repeat)
+    result = {
+        'documents': len(docs),
+        'legacy_seconds': round(legacy_seconds, 4),
+        'schema_seconds': round(schema_seconds, 4),
+        'speedup': round(legacy_seconds / schema_seconds, 2) if schema_seconds else None,
+        'legacy_columns': len(legacy_df.columns),
+        'schema_columns': len(schema_df.columns),
+        'legacy_mb': round(legacy_df.memory_usage(deep=True).sum() / 1e6, 1),
+        'schema_mb': round(schema_df.memory_usage(deep=True).sum() / 1e6, 1),
+    }
+    print(f"{name:<7} {len(docs):>9,} docs  legacy {legacy_seconds * 1000:9.1f} ms  "
+          f"schema {schema_seconds * 1000:9.1f} ms  x{result['speedup']:<6}  "
+          f"frame {result['legacy_mb']} MB -> {result['schema_mb']} MB")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time Firestore document decoding, legacy vs. schema-driven")
+    parser.add_argument("--users", type=int, default=50_000, help="User documents")
+    parser.add_argument("--swipes", type=int, default=200_000, help="Swipe documents")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per path; the best is reported")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", dest="json_out", help="Write the results to this JSON file")
+    args = parser.parse_args()
+
+    os.chdir(BACKEND_DIR)   # settings.yaml is resolved relative to the backend directory
+    sys.path.insert(0, BACKEND_DIR)
+
+    users, swipes = build_documents(args.users, args.swipes, args.seed)
+    # Keep the collector from re-scanning the synthetic corpus inside the timed runs
+    gc.collect()
+    gc.freeze()
+    results = {
+        'users': compare('users', legacy_users, schema_users, users, args.repeat),
+        'swipes': compare('swipes', legacy_swipes, schema_swipes, swipes, args.repeat),
+    }
+    if args.json_out:
+        with open(args.json_out, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,314 @@
+"""
+Hot-path benchmark: recommendation stages at 1k to 1M synthetic users
+=====================================================================
+
+Times the scoring functions and the feed pipeline in-process against a local
+storage backend (in-memory or SQLite) seeded with production/synthetic_data.py,
+and reports throughput, p50/p99 latency and peak RSS per case and scale.
+
+Every scale runs in a fresh worker process, so singletons (user store, feed
+cache, storage backend) and peak RSS never leak from one scale to the next.
+Each case repeats until ``--budget`` seconds or ``--iterations`` calls, and
+always runs at least once, so slow cases at 1M users still finish.
+
+Results are written as JSON; ``--compare`` checks them (or an existing
+``--current`` file) against a baseline and exits non-zero on regressions.
+
+Usage:
+    python benchmarks/bench_hotpaths.py --scales 1000 10000 100000 1000000 \\
+        --out benchmarks/baselines/hotpaths.json
+
+    python benchmarks/bench_hotpaths.py --scales 1000 10000 \\
+        --compare benchmarks/baselines/hotpaths.json --threshold 0.2
+
+    python benchmarks/bench_hotpaths.py --current new.json --compare old.json
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_SCALES = [1_000, 10_000, 100_000, 1_000_000]
+CASES = ['jaccard_score', 'match_score', 'get_top_matches', 'adjust_candidate_scores',
+         'top_similar_bios', 'elo_update', 'elo_update_batch', 'generate_user_feed']
+
+
+# -------------------- MEASUREMENT --------------------
+def _reset_peak_rss():
+    """Reset the kernel's RSS high-water mark (Linux); elsewhere the peak is process-wide"""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+    except OSError:
+        pass
+
+
+def _peak_rss_mb() -> float:
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def time_case(fn: Callable[[int], object], ops_per_call: int, budget: float, max_iterations: int) -> Dict:
+    """
+    Call ``fn(i)`` until the time budget or iteration cap is used up
+
+    ``ops_per_call`` scales throughput for cases that process many items per
+    call (e.g. a batch of swipes); latency is always per call.
+    """
+    _reset_peak_rss()
+    latencies = []
+    started = time.perf_counter()
+    while len(latencies) < max_iterations:
+        t0 = time.perf_counter()
+        fn(len(latencies))
+        latencies.append(time.perf_counter() - t0)
+        if time.perf_counter() - started >= budget:
+            break
+    samples = np.array(latencies) * 1000
+    return {
+        'iterations': len(latencies),
+        'ops_per_sec': round(ops_per_call * len(latencies) / max(samples.sum() / 1000, 1e-9), 2),
+        'p50_ms': round(float(np.percentile(samples, 50)), 4),
+        'p99_ms': round(float(np.percentile(samples, 99)), 4),
+        'peak_rss_mb': round(_peak_rss_mb(), 1),
+    }
+
+
+# -------------------- WORKER --------------------
+def _build_cases(population, sample_ids: List[str], bio_max_users: Optional[int]) -> Dict[str, tuple]:
+    """(fn(i), ops_per_call) per case; imported late so modules bind the seeded backend"""
+    from production.bio_match import get_model, top_similar_bios
+    from production.data_match_firebase import get_top_matches, jaccard_score, match_score
+    from production.elo_update import process_interaction_firebase, process_interactions_batch_firebase
+    from production.firebase_service import get_firebase_service
+    from production.main import generate_user_feed
+    from production.reject_superlike_like import adjust_candidate_scores
+    from production.user_store import get_user_store
+
+    backend = get_firebase_service()
+    get_user_store().snapshot()
+    profiles = [backend.get_user_by_id(uid) for uid in sample_ids]
+    pairs = list(zip(profiles, profiles[1:] + profiles[:1]))
+    n = len(sample_ids)
+
+    candidates = {}
+
+    def top_matches(i):
+        user_id = sample_ids[i % n]
+        candidates[user_id] = get_top_matches(user_id, top_n=20)
+
+    def adjust(i):
+        user_id = sample_ids[i % n]
+        if user_id not in candidates:
+            candidates[user_id] = get_top_matches(user_id, top_n=20)
+        adjust_candidate_scores(user_id, candidates[user_id].copy())
+
+    bio_users = None
+    if bio_max_users is None or population.n_users <= bio_max_users:
+        bio_users = backend.get_all_users().rename(columns={'id': 'user_id'})[['user_id', 'bio']]
+        model = get_model()
+
+    def bios(i):
+        top_similar_bios(bio_users, sample_ids[i % n], top_n=50, model=model)
+
+    rng = np.random.default_rng(population.seed)
+    actions = ['like', 'superlike', 'reject']
+    swipers = population.user_ids(rng.integers(0, population.n_users, 100_000))
+    targets = population.user_ids(rng.integers(0, population.n_users, 100_000))
+    swipe_actions = [actions[a] for a in rng.integers(0, 3, 100_000).tolist()]
+    batch = 1000
+
+    def elo_batch(i):
+        start = (i * batch) % (len(swipers) - batch)
+        process_interactions_batch_firebase(swipers[start:start + batch], targets[start:start + batch],
+                                            swipe_actions[start:start + batch])
+
+    cases = {
+        'jaccard_score': (lambda i: jaccard_score(pairs[i % n][0].get('interests'), pairs[i % n][1].get('interests')), 1),
+        'match_score': (lambda i: match_score(*pairs[i % n]), 1),
+        'get_top_matches': (top_matches, 1),
+        'adjust_candidate_scores': (adjust, 1),
+        'elo_update': (lambda i: process_interaction_firebase(swipers[i], targets[i], swipe_actions[i]), 1),
+        'elo_update_batch': (elo_batch, batch),
+        'generate_user_feed': (lambda i: generate_user_feed(sample_ids[i % n], top_n=10), 1),
+    }
+    if bio_users is not None:
+        cases['top_similar_bios'] = (bios, 1)
+    return cases
+
+
+def run_scale(n_users: int, args) -> Dict:
+    """Seed a backend with ``n_users`` and time every selected case (runs inside a worker process)"""
+    # Per-call INFO logs would swamp the output; their formatting cost is not what is measured here
+    logging.disable(logging.INFO)
+
+    # Modules bind the global backend when the production package is first imported
+    workdir = tempfile.mkdtemp(prefix='patra-bench-')
+    os.environ['PATRA_STORAGE_BACKEND'] = args.backend
+    os.environ['PATRA_SQLITE_PATH'] = os.path.join(workdir, 'bench.sqlite3')
+    from production.firebase_service import get_firebase_service
+    from production.synthetic_data import populate
+
+    backend = get_firebase_service()
+    backend.initialize()
+
+    _reset_peak_rss()
+    started = time.perf_counter()
+    population = populate(backend, n_users, int(n_users * args.swipes_per_user), seed=args.seed)
+    result = {'users': n_users, 'swipes': int(n_users * args.swipes_per_user),
+              'setup_seconds': round(time.perf_counter() - started, 2), 'setup_peak_rss_mb': round(_peak_rss_mb(), 1),
+              'cases': {}}
+
+    rng = np.random.default_rng(args.seed + 1)
+    sample_ids = population.user_ids(rng.choice(n_users, min(n_users, 200), replace=False))
+    cases = _build_cases(population, sample_ids, args.bio_max_users)
+    for name in args.cases:
+        if name not in cases:
+            result['cases'][name] = {'skipped': f"over --bio-max-users ({args.bio_max_users})"}
+            continue
+        fn, ops = cases[name]
+        fn(0)   # warm caches and lazy imports, as a long-running server would have
+        result['cases'][name] = time_case(fn, ops, args.budget, args.iterations)
+    shutil.rmtree(workdir, ignore_errors=True)
+    return result
+
+
+# -------------------- REPORTING --------------------
+def print_results(results: Dict):
+    print(f"{'users':>9} {'case':<24} {'iters':>6} {'ops/s':>11} {'p50 ms':>10} {'p99 ms':>10} {'peak MB':>9}")
+    for scale in results['scales'].values():
+        if 'error' in scale:
+            print(f"{scale['users']:>9} {'-':<24} failed: {scale['error']}")
+        for name, stats in scale['cases'].items():
+            if 'skipped' in stats:
+                print(f"{scale['users']:>9} {name:<24} skipped: {stats['skipped']}")
+                continue
+            print(f"{scale['users']:>9} {name:<24} {stats['iterations']:>6} {stats['ops_per_sec']:>11} "
+                  f"{stats['p50_ms']:>10} {stats['p99_ms']:>10} {stats['peak_rss_mb']:>9}")
+
+
+def compare(current: Dict, baseline: Dict, threshold: float) -> List[str]:
+    """
+    Regressions of ``current`` against ``baseline``
+
+    A case regresses when its p50 or p99 latency grows, or its throughput
+    drops, by more than ``threshold`` (0.2 = 20%). A scale that failed only in
+    ``current`` is a regression too. Cases or scales missing from either side
+    are ignored.
+    """
+    regressions = []
+    for scale_key, scale in current['scales'].items():
+        base_scale = baseline.get('scales', {}).get(scale_key)
+        if base_scale is None:
+            continue
+        if 'error' in scale and 'error' not in base_scale:
+            regressions.append(f"{scale['users']} users: {scale['error']}")
+            continue
+        for name, stats in scale['cases'].items():
+            base = base_scale['cases'].get(name)
+            if base is None or 'skipped' in stats or 'skipped' in base:
+                continue
+            checks = [(metric, stats[metric] / base[metric] - 1) for metric in ('p50_ms', 'p99_ms') if base[metric] > 0]
+            if base['ops_per_sec'] > 0 and stats['ops_per_sec'] > 0:
+                checks.append(('ops_per_sec', base['ops_per_sec'] / stats['ops_per_sec'] - 1))
+            for metric, slowdown in checks:
+                if slowdown > threshold:
+                    regressions.append(f"{scale['users']} users / {name}: {metric} {base[metric]} -> "
+                                       f"{stats[metric]} ({slowdown:+.0%} slower)")
+    return regressions
+
+
+# -------------------- CLI --------------------
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark recommendation hot paths at several population sizes")
+    parser.add_argument("--scales", type=int, nargs='+', default=DEFAULT_SCALES, help="Population sizes")
+    parser.add_argument("--cases", nargs='+', default=CASES, choices=CASES)
+    parser.add_argument("--backend", choices=['memory', 'sqlite'], default='memory')
+    parser.add_argument("--swipes-per-user", type=float, default=20.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--budget", type=float, default=5.0, help="Seconds per case (at least one call)")
+    parser.add_argument("--iterations", type=int, default=2000, help="Max calls per case")
+    parser.add_argument("--bio-max-users", type=int, default=100_000,
+                        help="Skip top_similar_bios above this size (it encodes every bio per call)")
+    parser.add_argument("--out", help="Write results to this JSON file")
+    parser.add_argument("--compare", help="Baseline JSON to check results against")
+    parser.add_argument("--current", help="Compare this results file instead of running")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed slowdown before flagging (0.2 = 20%%)")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        with open(args.worker, 'w') as f:
+            json.dump(run_scale(args.scales[0], args), f)
+        return
+
+    if args.current:
+        with open(args.current) as f:
+            results = json.load(f)
+    else:
+        results = {'meta': {'created': datetime.now().isoformat(timespec='seconds'), 'backend': args.backend,
+                            'seed': args.seed, 'swipes_per_user': args.swipes_per_user,
+                            'python': platform.python_version(), 'machine': platform.platform(),
+                            'cpus': os.cpu_count()},
+                   'scales': {}}
+        for n_users in args.scales:
+            with tempfile.NamedTemporaryFile(suffix='.json', delete=False) as tmp:
+                worker_out = tmp.name
+            cmd = [sys.executable, os.path.abspath(__file__), '--worker', worker_out, '--scales', str(n_users),
+                   '--cases', *args.cases, '--backend', args.backend, '--swipes-per-user', str(args.swipes_per_user),
+                   '--seed', str(args.seed), '--budget', str(args.budget), '--iterations', str(args.iterations),
+                   '--bio-max-users', str(args.bio_max_users)]
+            try:
+                proc = subprocess.run(cmd, cwd=BACKEND_DIR,
+                                      env=dict(os.environ, PYTHONPATH=os.pathsep.join(
+                                          filter(None, [BACKEND_DIR, os.environ.get('PYTHONPATH')]))))
+                if proc.returncode == 0:
+                    with open(worker_out) as f:
+                        results['scales'][str(n_users)] = json.load(f)
+                else:
+                    # Typically SIGKILL from the OOM killer at the largest scales; keep the smaller ones
+                    results['scales'][str(n_users)] = {'users': n_users, 'cases': {},
+                                                       'error': f"worker exited with {proc.returncode}"}
+            finally:
+                os.unlink(worker_out)
+        if args.out:
+            os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+            with open(args.out, 'w') as f:
+                json.dump(results, f, indent=2)
+
+    print_results(results)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) beyond {args.threshold:.0%}:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print(f"\nNo regressions beyond {args.threshold:.0%} against {args.compare}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+"""
+Serving benchmark: Flask dev server vs ASGI server
+==================================================
+
+Drives both serving modes with the same closed-loop load (fixed number of
+concurrent clients for a fixed duration) and reports requests/sec and
+p50/p99 latency per endpoint. Throughput and latency cover served (2xx/3xx)
+responses only; 4xx answers are counted separately, and any 429 marks the
+run as invalid (admission control was measured, not serving). ``--launch``
+starts the servers with per-client rate limits lifted, as loadgen.py does.
+
+Usage (servers already running):
+    python benchmarks/bench_serving.py --flask-url http://localhost:5000 \\
+        --asgi-url http://localhost:8000 --user-id <USER_ID>
+
+Usage (let the benchmark start both servers locally):
+    python benchmarks/bench_serving.py --launch --user-id <USER_ID>
+"""
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from typing import Dict, List, Optional
+
+import numpy as np
+import yaml
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _request(url: str, body: Optional[bytes] = None, timeout: float = 30.0) -> int:
+    req = urllib.request.Request(url, data=body, headers={'Content-Type': 'application/json'})
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as resp:
+            resp.read()
+            return resp.status
+    except urllib.error.HTTPError as e:
+        e.read()
+        return e.code
+
+
+def run_closed_loop(url: str, concurrency: int, duration: float,
+                    body: Optional[bytes] = None) -> Dict[str, float]:
+    """Keep ``concurrency`` clients busy against ``url`` for ``duration`` seconds."""
+    latencies: List[List[float]] = [[] for _ in range(concurrency)]
+    errors = [0] * concurrency          # no response or 5xx
+    client_errors = [0] * concurrency   # 4xx other than 429
+    rate_limited = [0] * concurrency    # 429
+    deadline = time.perf_counter() + duration
+
+    def client(slot: int):
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                status = _request(url, body)
+            except Exception:
+                status = 0
+            elapsed = time.perf_counter() - start
+            if status == 0 or status >= 500:
+                errors[slot] += 1
+            elif status == 429:
+                rate_limited[slot] += 1
+            elif status >= 400:
+                client_errors[slot] += 1
+            else:
+                latencies[slot].append(elapsed)
+
+    threads = [threading.Thread(target=client, args=(i,), daemon=True) for i in range(concurrency)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    samples = np.array([x for slot in latencies for x in slot]) * 1000
+    stats = {'requests': int(samples.size), 'rps': 0.0, 'p50_ms': 0.0, 'p99_ms': 0.0,
+             'errors': sum(errors), 'client_errors': sum(client_errors), 'rate_limited': sum(rate_limited)}
+    if samples.size:
+        stats.update({
+            'rps': round(samples.size / elapsed, 1),
+            'p50_ms': round(float(np.percentile(samples, 50)), 2),
+            'p99_ms': round(float(np.percentile(samples, 99)), 2),
+        })
+    return stats
+
+
+def _wait_ready(base_url: str, timeout: float = 60.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            _request(f"{base_url}/api/health", timeout=2)
+            return
+        except Exception:
+            time.sleep(0.5)
+    raise RuntimeError(f"Server at {base_url} did not become ready")
+
+
+def write_load_test_settings(workdir: str, keep_rate_limits: bool) -> str:
+    """settings.yaml copy for the launched servers; returns its path"""
+    with open(os.path.join(BACKEND_DIR, 'production', 'settings.yaml')) as f:
+        settings = yaml.safe_load(f)
+    if not keep_rate_limits:
+        # One benchmark client (one IP, one user) sends every request
+        settings.setdefault('security', {}).update({'rate_limit_per_minute': 1e9, 'ip_rate_limit_per_minute': 1e9,
+                                                    'rate_limit_burst': 1e9})
+    config_path = os.path.join(workdir, 'settings.yaml')
+    with open(config_path, 'w') as f:
+        yaml.safe_dump(settings, f)
+    return config_path
+
+
+def launch_servers(flask_port: int, asgi_port: int, asgi_workers: int, config_path: str) -> List[subprocess.Popen]:
+    env = dict(os.environ, PATRA_CONFIG=config_path)
+    flask_proc = subprocess.Popen([sys.executable, 'api_server.py'], cwd=BACKEND_DIR,
+                                  env=dict(env, PORT=str(flask_port)),
+                                  stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    asgi_proc = subprocess.Popen([sys.executable, '-m', 'uvicorn', 'asgi_server:app', '--port', str(asgi_port),
+                                  '--workers', str(asgi_workers), '--log-level', 'warning'],
+                                 cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return [flask_proc, asgi_proc]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare Flask and ASGI serving throughput/latency")
+    parser.add_argument("--flask-url", default="http://localhost:5000")
+    parser.add_argument("--asgi-url", default="http://localhost:8000")
+    parser.add_argument("--launch", action="store_true", help="Start both servers locally first")
+    parser.add_argument("--asgi-workers", type=int, default=1)
+    parser.add_argument("--keep-rate-limits", action="store_true", help="Keep per-user/IP limits when launching")
+    parser.add_argument("--user-id", default="test_user_123", help="User for /api/recommendations")
+    parser.add_argument("--target-id", default="test_target_456", help="Target for /api/interaction")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=15.0, help="Seconds per endpoint and server")
+    parser.add_argument("--json", dest="json_out", help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    procs = []
+    workdir = tempfile.mkdtemp(prefix='patra-bench-')
+    if args.launch:
+        config_path = write_load_test_settings(workdir, args.keep_rate_limits)
+        procs = launch_servers(int(args.flask_url.rsplit(':', 1)[1]), int(args.asgi_url.rsplit(':', 1)[1]),
+                               args.asgi_workers, config_path)
+    rate_limited = []
+    try:
+        for base_url in (args.flask_url, args.asgi_url):
+            _wait_ready(base_url)
+
+        swipe = json.dumps({'user_id': args.user_id, 'target_id': args.target_id, 'action': 'like'}).encode()
+        endpoints = {
+            'health': ('/api/health', None),
+            'recommendations': (f'/api/recommendations/{args.user_id}?count=10', None),
+            'interaction': ('/api/interaction', swipe),
+        }
+
+        results = {}
+        print(f"{'endpoint':<16} {'server':<6} {'req/s':>9} {'p50 ms':>9} {'p99 ms':>9} {'errors':>7} "
+              f"{'4xx':>7} {'429':>7}")
+        for name, (path, body) in endpoints.items():
+            for server, base_url in (('flask', args.flask_url), ('asgi', args.asgi_url)):
+                stats = run_closed_loop(base_url + path, args.concurrency, args.duration, body)
+                results.setdefault(name, {})[server] = stats
+                print(f"{name:<16} {server:<6} {stats['rps']:>9} {stats['p50_ms']:>9} "
+                      f"{stats['p99_ms']:>9} {stats['errors']:>7} {stats['client_errors']:>7} "
+                      f"{stats['rate_limited']:>7}")
+                if stats['rate_limited']:
+                    rate_limited.append(f"{name}/{server}")
+
+        if args.json_out:
+            with open(args.json_out, 'w') as f:
+                json.dump({'concurrency': args.concurrency, 'duration': args.duration, 'results': results}, f, indent=2)
+    finally:
+        for proc in procs:
+            proc.terminate()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if rate_limited:
+        print(f"Rate limited (429) during {', '.join(rate_limited)}: these numbers measure admission control. "
+              f"Raise the limits of the servers under test or use --launch.", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,452 @@
+"""
+Load generator: open- and closed-loop HTTP load against the API server
+======================================================================
+
+Replays a mix of recommendation fetches and swipes against api_server.py or
+asgi_server.py. Users are drawn from a Zipf distribution (a few heavy users,
+a long tail), and a user's swipes target profiles from their last fetched
+feed when there is one.
+
+Two load models:
+- open loop (``--rate``): requests are scheduled at a fixed rate whether or
+  not earlier ones have finished. Latency is measured from the *intended*
+  send time, so queueing behind a stalled server is counted (no coordinated
+  omission).
+- closed loop (``--concurrency``): a fixed number of clients each wait for
+  their previous response. Raw service times understate tail latency here, so
+  a corrected histogram is also reported, back-filling the requests a stalled
+  client would have sent at ``--expected-interval-ms`` (HdrHistogram's
+  recordValueWithExpectedInterval).
+
+Several ``--rate`` / ``--concurrency`` values sweep the load and report the
+saturation point: the last step that keeps up with its target rate, stays
+under 1% errors and (with ``--slo-ms``) meets the p99 objective.
+
+Usage (launch a server on a generated SQLite population):
+    python benchmarks/loadgen.py --launch asgi --asgi-workers 4 --users 10000 \\
+        --rate 20 50 100 200 --duration 30
+
+Usage (existing server; user IDs from its SQLite file or a text file):
+    python benchmarks/loadgen.py --url http://localhost:5000 --sqlite data/patra.sqlite3 \\
+        --concurrency 1 4 16 64 --json results.json
+
+Run the generator on other cores (or another machine) than the server; on a
+shared core it competes with the server for CPU.
+"""
+
+import argparse
+import http.client
+import json
+import os
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import quote, urlsplit
+
+import numpy as np
+import yaml
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PERCENTILES = [50, 90, 99, 99.9, 99.99, 100]
+ACTIONS = ['like', 'dislike', 'superlike']
+ACTION_SHARE = [0.55, 0.41, 0.04]
+
+# (op, intended start, actual start, finish, status); times from time.perf_counter()
+Sample = Tuple[str, float, float, float, int]
+
+
+# -------------------- WORKLOAD --------------------
+class Workload:
+    """
+    Seeded stream of (op, user_id, fallback_target_id, action) requests
+
+    Requests are drawn in blocks ahead of time, so the same seed replays the
+    same user sequence. Swipes prefer targets from the user's last fetched
+    feed (``remember``) and fall back to a Zipf-drawn profile.
+    """
+
+    def __init__(self, user_ids: List[str], fetch_share: float = 0.3, zipf_s: float = 1.1,
+                 seed: int = 42, block: int = 10_000):
+        self.user_ids = user_ids
+        self.fetch_share = fetch_share
+        self.block = block
+        self.rng = np.random.default_rng(seed)
+        self.order = self.rng.permutation(len(user_ids))   # which user holds each popularity rank
+        weights = 1.0 / np.arange(1, len(user_ids) + 1) ** zipf_s
+        self.cdf = np.cumsum(weights) / weights.sum()
+        self.feeds: Dict[str, List[str]] = {}
+        self._pending: List[tuple] = []
+        self._lock = threading.Lock()
+
+    def _draw_users(self, n: int) -> List[str]:
+        ranks = np.minimum(np.searchsorted(self.cdf, self.rng.random(n)), len(self.user_ids) - 1)
+        return [self.user_ids[i] for i in self.order[ranks].tolist()]
+
+    def _refill(self):
+        n = self.block
+        ops = np.where(self.rng.random(n) < self.fetch_share, 'fetch', 'swipe').tolist()
+        actions = [ACTIONS[i] for i in self.rng.choice(len(ACTIONS), n, p=ACTION_SHARE).tolist()]
+        self._pending = list(zip(ops, self._draw_users(n), self._draw_users(n), actions))
+        self._pending.reverse()
+
+    def next(self) -> tuple:
+        with self._lock:
+            if not self._pending:
+                self._refill()
+            return self._pending.pop()
+
+    def remember(self, user_id: str, recommended: List[str]):
+        self.feeds[user_id] = list(reversed(recommended))
+
+    def swipe_target(self, user_id: str, fallback: str) -> str:
+        feed = self.feeds.get(user_id)
+        if feed:
+            try:
+                return feed.pop()
+            except IndexError:   # emptied by a concurrent swipe of the same user
+                pass
+        return fallback
+
+
+# -------------------- HTTP --------------------
+class HttpClient:
+    """Keep-alive HTTP/1.1 connection per thread, reopened when the server closes it"""
+
+    def __init__(self, base_url: str, timeout: float = 30.0):
+        parts = urlsplit(base_url)
+        self.host, self.port = parts.hostname, parts.port or 80
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def request(self, method: str, path: str, body: Optional[bytes] = None) -> Tuple[int, bytes]:
+        for attempt in range(2):
+            conn = getattr(self._local, 'conn', None)
+            if conn is None:
+                conn = self._local.conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+            try:
+                conn.request(method, path, body=body, headers={'Content-Type': 'application/json'})
+                resp = conn.getresponse()
+                data = resp.read()
+                if resp.will_close:
+                    conn.close()
+                    self._local.conn = None
+                return resp.status, data
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                # Stale keep-alive connection: retry once on a fresh one
+                conn.close()
+                self._local.conn = None
+                if attempt:
+                    return 0, b''
+            except Exception:
+                conn.close()
+                self._local.conn = None
+                return 0, b''
+        return 0, b''
+
+
+def execute(client: HttpClient, workload: Workload, item: tuple, count: int) -> Tuple[str, int]:
+    """Send one workload request; returns (op, HTTP status or 0 on connection failure)"""
+    op, user_id, fallback_target, action = item
+    if op == 'fetch':
+        status, body = client.request('GET', f"/api/recommendations/{quote(user_id)}?count={count}")
+        if status == 200:
+            try:
+                recs = json.loads(body).get('recommendations') or []
+                workload.remember(user_id, [rec['user_id'] for rec in recs])
+            except (ValueError, KeyError, TypeError):
+                pass
+        return op, status
+
+    target_id = workload.swipe_target(user_id, fallback_target)
+    if target_id == user_id:
+        target_id = fallback_target if fallback_target != user_id else workload.user_ids[0]
+    payload = json.dumps({'user_id': user_id, 'target_id': target_id, 'action': action}).encode()
+    status, _ = client.request('POST', '/api/interaction', payload)
+    return op, status
+
+
+# -------------------- LOAD MODELS --------------------
+def run_open_loop(client: HttpClient, workload: Workload, rate: float, duration: float,
+                  max_in_flight: int = 512, poisson: bool = False, count: int = 10,
+                  seed: int = 42) -> List[Sample]:
+    """Issue requests at ``rate``/s for ``duration`` seconds, each stamped with its intended start"""
+    samples: List[Sample] = []
+    rng = np.random.default_rng(seed)
+    n = max(1, int(rate * duration))
+    gaps = rng.exponential(1.0 / rate, n) if poisson else np.full(n, 1.0 / rate)
+    offsets = np.concatenate([[0.0], np.cumsum(gaps[:-1])]).tolist()
+
+    def task(item, intended):
+        started = time.perf_counter()
+        op, status = execute(client, workload, item, count)
+        samples.append((op, intended, started, time.perf_counter(), status))
+
+    with ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix='loadgen') as pool:
+        t0 = time.perf_counter() + 0.05
+        for offset in offsets:
+            intended = t0 + offset
+            delay = intended - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            # Behind schedule: send now, but latency still counts from ``intended``
+            pool.submit(task, workload.next(), intended)
+    return samples
+
+
+def run_closed_loop(client: HttpClient, workload: Workload, concurrency: int, duration: float,
+                    think_time: float = 0.0, count: int = 10) -> List[Sample]:
+    """Keep ``concurrency`` clients each sending their next request once the last one returns"""
+    samples: List[Sample] = []
+    stop_at = time.perf_counter() + duration
+
+    def client_loop():
+        while time.perf_counter() < stop_at:
+            started = time.perf_counter()
+            op, status = execute(client, workload, workload.next(), count)
+            samples.append((op, started, started, time.perf_counter(), status))
+            if think_time:
+                time.sleep(think_time)
+
+    threads = [threading.Thread(target=client_loop, daemon=True) for _ in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return samples
+
+
+# -------------------- REPORTING --------------------
+def co_corrected(latencies_ms: np.ndarray, expected_interval_ms: float) -> np.ndarray:
+    """
+    Add the samples a stalled closed-loop client never sent
+
+    Each latency L above the expected interval I also stands for requests that
+    would have been issued at I, 2I, ... into the stall, with latencies L - I,
+    L - 2I, ... down to I.
+    """
+    if expected_interval_ms <= 0:
+        return latencies_ms
+    extra = [np.arange(value - expected_interval_ms, expected_interval_ms - 1e-9, -expected_interval_ms)
+             for value in latencies_ms[latencies_ms > 2 * expected_interval_ms].tolist()]
+    return np.concatenate([latencies_ms, *extra]) if extra else latencies_ms
+
+
+def histogram(latencies_ms: np.ndarray, buckets_per_octave: int = 4) -> List[List[float]]:
+    """[upper bound ms, count] over log-spaced buckets (~19% wide), empty buckets omitted"""
+    if latencies_ms.size == 0:
+        return []
+    exponents = np.ceil(np.log2(np.maximum(latencies_ms, 1e-3)) * buckets_per_octave)
+    uppers, counts = np.unique(exponents, return_counts=True)
+    return [[round(float(2 ** (u / buckets_per_octave)), 3), int(c)] for u, c in zip(uppers, counts)]
+
+
+def summarize(latencies_ms: np.ndarray) -> Dict:
+    if latencies_ms.size == 0:
+        return {'count': 0}
+    summary = {'count': int(latencies_ms.size), 'mean_ms': round(float(latencies_ms.mean()), 2)}
+    for p in PERCENTILES:
+        summary[f"p{p:g}_ms"] = round(float(np.percentile(latencies_ms, p)), 2)
+    summary['histogram'] = histogram(latencies_ms)
+    return summary
+
+
+def report(samples: List[Sample], mode: str, target: float, warmup: float,
+           expected_interval_ms: Optional[float], think_time: float) -> Dict:
+    """Per-op and overall latency summaries for one load step, warmup excluded"""
+    if not samples:
+        return {'mode': mode, 'target': target, 'requests': 0}
+    data = np.array([(s[1], s[2], s[3], s[4]) for s in samples])
+    ops = np.array([s[0] for s in samples])
+    t_begin = data[:, 0].min() + warmup
+    keep = data[:, 0] >= t_begin
+    data, ops = data[keep], ops[keep]
+    elapsed = max(data[:, 2].max() - t_begin, 1e-9) if len(data) else 1e-9
+
+    statuses = data[:, 3].astype(int)
+    result = {
+        'mode': mode, 'target': target, 'requests': int(len(data)),
+        'achieved_rps': round(len(data) / elapsed, 2),
+        'errors': int(((statuses == 0) | (statuses >= 500)).sum()),
+        'status_codes': {str(code): int(n) for code, n in zip(*np.unique(statuses, return_counts=True))},
+        'ops': {},
+    }
+    if mode == 'closed' and expected_interval_ms is None and len(data):
+        expected_interval_ms = float(np.median(data[:, 2] - data[:, 1])) * 1000 + think_time * 1000
+    result['expected_interval_ms'] = round(expected_interval_ms, 3) if mode == 'closed' else None
+
+    for op in ['all', *sorted(set(ops.tolist()))]:
+        rows = data if op == 'all' else data[ops == op]
+        service = (rows[:, 2] - rows[:, 1]) * 1000
+        if mode == 'open':
+            response = (rows[:, 2] - rows[:, 0]) * 1000
+        else:
+            response = co_corrected(service, expected_interval_ms)
+        result['ops'][op] = {'response_time': summarize(response), 'service_time': summarize(service)}
+    return result
+
+
+def print_step(step: Dict):
+    label = f"{step['mode']} {'rate' if step['mode'] == 'open' else 'clients'}={step['target']:g}"
+    print(f"\n== {label}: {step['requests']} requests, {step.get('achieved_rps', 0)} req/s, "
+          f"{step.get('errors', 0)} errors, status {step.get('status_codes', {})}")
+    if not step['requests']:
+        return
+    header = ''.join(f"{'p' + format(p, 'g'):>10}" for p in PERCENTILES)
+    print(f"{'op':<7}{'latency (ms)':<15}{header}")
+    for op, stats in step['ops'].items():
+        for kind in ('response_time', 'service_time'):
+            summary = stats[kind]
+            cells = ''.join(f"{summary.get(f'p{p:g}_ms', 0):>10}" for p in PERCENTILES)
+            print(f"{op:<7}{kind.replace('_time', ''):<15}{cells}")
+
+
+def saturation(steps: List[Dict], slo_ms: Optional[float]) -> Optional[float]:
+    """Highest load step that keeps up with its target, <1% errors and the p99 SLO"""
+    best = None
+    for step in steps:
+        if not step['requests']:
+            break
+        keeps_up = step['mode'] == 'closed' or step['achieved_rps'] >= 0.95 * step['target']
+        healthy = step['errors'] <= 0.01 * step['requests']
+        overall = step['ops']['all']
+        # Back-filled closed-loop samples can pull the corrected p99 below the raw one
+        within_slo = slo_ms is None or max(overall['response_time']['p99_ms'],
+                                           overall['service_time']['p99_ms']) <= slo_ms
+        if not (keeps_up and healthy and within_slo):
+            break
+        best = step['target']
+    return best
+
+
+# -------------------- SERVER SETUP --------------------
+def load_user_ids(sqlite_path: Optional[str], user_ids_file: Optional[str]) -> List[str]:
+    if user_ids_file:
+        with open(user_ids_file) as f:
+            return [line.strip() for line in f if line.strip()]
+    conn = sqlite3.connect(sqlite_path)
+    try:
+        return [row[0] for row in conn.execute("SELECT id FROM users ORDER BY id")]
+    finally:
+        conn.close()
+
+
+def launch_server(mode: str, port: int, sqlite_path: str, workdir: str, asgi_workers: int,
+                  keep_rate_limits: bool) -> subprocess.Popen:
+    """Start api_server.py (flask) or asgi_server.py (asgi) on ``sqlite_path`` with a load-test settings file"""
+    with open(os.path.join(BACKEND_DIR, 'production', 'settings.yaml')) as f:
+        settings = yaml.safe_load(f)
+    settings.setdefault('storage', {}).update({'backend': 'sqlite', 'sqlite_path': sqlite_path})
+    if not keep_rate_limits:
+        # Every simulated user shares the generator's IP; per-client limits would cap the whole run
+        settings.setdefault('security', {}).update({'rate_limit_per_minute': 1e9, 'ip_rate_limit_per_minute': 1e9,
+                                                    'rate_limit_burst': 1e9})
+    config_path = os.path.join(workdir, 'settings.yaml')
+    with open(config_path, 'w') as f:
+        yaml.safe_dump(settings, f)
+
+    env = dict(os.environ, PATRA_CONFIG=config_path, PATRA_STORAGE_BACKEND='sqlite',
+               PATRA_SQLITE_PATH=sqlite_path, PORT=str(port))
+    if mode == 'flask':
+        cmd = [sys.executable, 'api_server.py']
+    else:
+        cmd = [sys.executable, '-m', 'uvicorn', 'asgi_server:app', '--port', str(port),
+               '--workers', str(asgi_workers), '--log-level', 'warning']
+    return subprocess.Popen(cmd, cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def wait_ready(client: HttpClient, timeout: float = 120.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if client.request('GET', '/api/health/ready')[0] == 200:
+            return
+        time.sleep(0.5)
+    raise RuntimeError(f"Server at {client.host}:{client.port} did not become ready")
+
+
+# -------------------- CLI --------------------
+def main():
+    parser = argparse.ArgumentParser(description="Open/closed-loop load generator for the Patra API")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--launch", choices=['flask', 'asgi'], help="Start this server on a local SQLite population")
+    parser.add_argument("--asgi-workers", type=int, default=1)
+    parser.add_argument("--keep-rate-limits", action="store_true", help="Keep per-user/IP limits when launching")
+    parser.add_argument("--sqlite", help="SQLite file to serve (--launch) and/or read user IDs from")
+    parser.add_argument("--user-ids", help="File with one user ID per line (instead of --sqlite)")
+    parser.add_argument("--users", type=int, default=10_000, help="Population to generate when --launch has no --sqlite")
+    parser.add_argument("--swipes-per-user", type=float, default=20.0)
+    load = parser.add_mutually_exclusive_group(required=True)
+    load.add_argument("--rate", type=float, nargs='+', help="Open loop: requests/s (several values sweep)")
+    load.add_argument("--concurrency", type=int, nargs='+', help="Closed loop: clients (several values sweep)")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds per load step")
+    parser.add_argument("--warmup", type=float, default=5.0, help="Seconds excluded from each step's stats")
+    parser.add_argument("--poisson", action="store_true", help="Open loop: exponential inter-arrival times")
+    parser.add_argument("--max-in-flight", type=int, default=512, help="Open loop: client-side connection cap")
+    parser.add_argument("--think-time", type=float, default=0.0, help="Closed loop: seconds between a client's requests")
+    parser.add_argument("--expected-interval-ms", type=float,
+                        help="Closed loop: interval for the corrected histogram (default: median latency + think time)")
+    parser.add_argument("--fetch-share", type=float, default=0.3, help="Share of requests that fetch recommendations")
+    parser.add_argument("--zipf", type=float, default=1.1, help="Zipf exponent of user activity")
+    parser.add_argument("--count", type=int, default=10, help="Recommendations per fetch")
+    parser.add_argument("--slo-ms", type=float, help="p99 response-time objective for the saturation point")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", dest="json_out", help="Write all steps to this JSON file")
+    args = parser.parse_args()
+
+    if not args.launch and not (args.sqlite or args.user_ids):
+        parser.error("--sqlite or --user-ids is required without --launch")
+
+    client = HttpClient(args.url)
+    proc = None
+    workdir = tempfile.mkdtemp(prefix='patra-loadgen-')
+    try:
+        sqlite_path = args.sqlite
+        if args.launch:
+            if sqlite_path is None:
+                sqlite_path = os.path.join(workdir, 'patra.sqlite3')
+                print(f"Generating {args.users} users into {sqlite_path}")
+                subprocess.run([sys.executable, '-m', 'production.synthetic_data', '--users', str(args.users),
+                                '--swipes', str(int(args.users * args.swipes_per_user)), '--seed', str(args.seed),
+                                '--sqlite', sqlite_path], cwd=BACKEND_DIR, check=True)
+            proc = launch_server(args.launch, client.port, os.path.abspath(sqlite_path), workdir,
+                                 args.asgi_workers, args.keep_rate_limits)
+        wait_ready(client)
+
+        user_ids = load_user_ids(sqlite_path, args.user_ids)
+        workload = Workload(user_ids, args.fetch_share, args.zipf, args.seed)
+        steps = []
+        for target in (args.rate or args.concurrency):
+            if args.rate:
+                samples = run_open_loop(client, workload, target, args.duration + args.warmup,
+                                        args.max_in_flight, args.poisson, args.count, args.seed)
+                step = report(samples, 'open', target, args.warmup, None, 0.0)
+            else:
+                samples = run_closed_loop(client, workload, target, args.duration + args.warmup,
+                                          args.think_time, args.count)
+                step = report(samples, 'closed', target, args.warmup, args.expected_interval_ms, args.think_time)
+            print_step(step)
+            steps.append(step)
+
+        point = saturation(steps, args.slo_ms)
+        unit = 'req/s' if args.rate else 'clients'
+        print(f"\nSaturation point: {point if point is not None else 'below the first step'} {unit}"
+              + (f" (p99 <= {args.slo_ms} ms)" if args.slo_ms else ''))
+
+        if args.json_out:
+            with open(args.json_out, 'w') as f:
+                json.dump({'url': args.url, 'server': args.launch, 'users': len(user_ids), 'zipf': args.zipf,
+                           'fetch_share': args.fetch_share, 'saturation': point, 'steps': steps}, f, indent=2)
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait(timeout=30)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+"""
+Offline replay evaluator: ranking quality vs. compute time
+==========================================================
+
+Replays a swipe history in time order through the real write path
+(record_interactions_batch: swipe log, exclusions, Elo) on an in-memory
+backend. At the start of each user session it asks the real
+generate_user_feed for that user's top K, built only from what had happened
+before that moment, and scores the feed against the likes the user gave
+during the session:
+
+- hit rate@K: share of sessions where at least one liked profile was served
+- NDCG@K: graded by action (superlike 2, like 1)
+- compute time: wall time of each generate_user_feed call
+
+So any change to match_score, ACTION_WEIGHTS, the Elo blend or the pipeline
+can be measured before shipping. Module-level constants that are read at
+call time can also be varied without editing code, e.g.
+``--set production.reject_superlike_like.DEFAULT_WEIGHT=0.8``.
+
+Sessions are sharded by user across worker processes. The state at any moment
+depends on every earlier swipe, so each worker replays the whole timeline and
+only generates feeds for its own users. Feed generation dominates, so
+throughput grows with the number of workers.
+
+History comes from a SQLite file or a Parquet directory (users.parquet +
+swipes.parquet), e.g. as written by production/synthetic_data.py.
+Timestamps are shifted so the newest swipe is "now", because the pipeline's
+look-back windows are relative to the wall clock.
+
+Usage:
+    python benchmarks/replay_eval.py --parquet data/synthetic --workers 4 --sample 0.05 --k 10
+    python benchmarks/replay_eval.py --sqlite data/patra.sqlite3 --max-sessions 2000 \\
+        --set production.reject_superlike_like.ACTION_WEIGHTS='{"superlike": 4, "like": 2, "reject": 0}' \\
+        --json variant.json
+"""
+
+import argparse
+import importlib
+import json
+import logging
+import multiprocessing
+import os
+import sys
+import time
+import zlib
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+GAINS = {'like': 1.0, 'superlike': 2.0}
+
+
+# -------------------- HISTORY --------------------
+def load_history(sqlite_path: Optional[str], parquet_dir: Optional[str]) -> Tuple[List[Dict], pd.DataFrame]:
+    """Users (dicts with ``id``) and swipes (user_id, target_id, action, timestamp) sorted by time"""
+    if parquet_dir:
+        import pyarrow.parquet as pq
+        users = pq.read_table(os.path.join(parquet_dir, 'users.parquet')).to_pylist()
+        swipes = pd.read_parquet(os.path.join(parquet_dir, 'swipes.parquet'),
+                                 columns=['user_id', 'target_id', 'action', 'timestamp'])
+    else:
+        from production.sqlite_backend import SQLiteBackend
+        source = SQLiteBackend(sqlite_path)
+        source.initialize()
+        users = source.get_all_users().to_dict('records')
+        swipes = source.get_swipe_data(days_back=365 * 100)[['user_id', 'target_id', 'action', 'timestamp']]
+    swipes = swipes.sort_values('timestamp', kind='stable').reset_index(drop=True)
+    swipes['timestamp'] = pd.to_datetime(swipes['timestamp'])
+    swipes['timestamp'] += pd.Timestamp(datetime.now()) - swipes['timestamp'].max()
+    return users, swipes
+
+
+def mark_sessions(swipes: pd.DataFrame, session_gap: timedelta) -> pd.DataFrame:
+    """Add ``session`` (id) and ``session_start`` columns; a session ends after ``session_gap`` idle"""
+    by_user = swipes.sort_values(['user_id', 'timestamp'], kind='stable')
+    gap = by_user.groupby('user_id', sort=False)['timestamp'].diff()
+    starts = gap.isna() | (gap > session_gap)
+    swipes = swipes.copy()
+    swipes['session_start'] = starts.reindex(swipes.index).astype(bool)
+    swipes['session'] = starts.cumsum().reindex(swipes.index)
+    return swipes
+
+
+def selected(user_id: str, session: int, shard: int, n_shards: int, sample: float) -> bool:
+    """Stable assignment of sessions to workers, and a seed-free sample of them"""
+    if zlib.crc32(user_id.encode()) % n_shards != shard:
+        return False
+    return sample >= 1.0 or zlib.crc32(f"{user_id}:{session}".encode()) / 2 ** 32 < sample
+
+
+# -------------------- METRICS --------------------
+def ndcg(ranked: List[str], gains: Dict[str, float], k: int) -> float:
+    dcg = sum(gains.get(uid, 0.0) / np.log2(rank + 2) for rank, uid in enumerate(ranked[:k]))
+    ideal = sum(g / np.log2(rank + 2) for rank, g in enumerate(sorted(gains.values(), reverse=True)[:k]))
+    return dcg / ideal if ideal > 0 else 0.0
+
+
+def summarize(sessions: List[Dict], k: int) -> Dict:
+    if not sessions:
+        return {'sessions': 0}
+    compute = np.array([s['compute_ms'] for s in sessions])
+    return {
+        'sessions': len(sessions),
+        f'hit_rate@{k}': round(float(np.mean([s['hit'] for s in sessions])), 4),
+        f'ndcg@{k}': round(float(np.mean([s['ndcg'] for s in sessions])), 4),
+        'empty_feeds': int(sum(s['served'] == 0 for s in sessions)),
+        'compute_ms': {'mean': round(float(compute.mean()), 2), 'p50': round(float(np.percentile(compute, 50)), 2),
+                       'p99': round(float(np.percentile(compute, 99)), 2), 'max': round(float(compute.max()), 2)},
+    }
+
+
+# -------------------- WORKER --------------------
+def apply_overrides(overrides: List[str]):
+    """``module.NAME=json`` assignments, applied after the production modules are imported"""
+    for item in overrides:
+        target, _, raw = item.partition('=')
+        module_name, _, attr = target.rpartition('.')
+        try:
+            value = json.loads(raw)
+        except ValueError:
+            value = raw
+        setattr(importlib.import_module(module_name), attr, value)
+
+
+def replay_shard(shard: int, args) -> List[Dict]:
+    """Replay the whole history, generating and scoring feeds for this shard's sampled sessions"""
+    logging.disable(logging.INFO)
+    # The production package binds the global backend on first import
+    os.environ['PATRA_STORAGE_BACKEND'] = 'memory'
+    os.chdir(BACKEND_DIR)   # settings.yaml is resolved relative to the backend directory
+    sys.path.insert(0, BACKEND_DIR)
+    from production.firebase_service import get_firebase_service
+    from production.main import generate_user_feed, record_interactions_batch
+    from production.user_store import get_user_store
+    apply_overrides(args.set)
+
+    users, swipes = load_history(args.sqlite, args.parquet)
+    swipes = mark_sessions(swipes, timedelta(minutes=args.session_gap_minutes))
+
+    backend = get_firebase_service()
+    backend.initialize()
+    backend.save_users(users)
+    get_user_store().refresh()
+
+    liked = swipes[swipes['action'].isin(list(GAINS))]
+    gains_by_session: Dict[int, Dict[str, float]] = {}
+    for session, target, action in zip(liked['session'].tolist(), liked['target_id'].tolist(),
+                                       liked['action'].tolist()):
+        gains = gains_by_session.setdefault(session, {})
+        gains[target] = max(gains.get(target, 0.0), GAINS[action])
+
+    starts = swipes.index[swipes['session_start']].tolist()
+    points = [i for i in starts
+              if swipes.at[i, 'session'] in gains_by_session
+              and selected(swipes.at[i, 'user_id'], swipes.at[i, 'session'], shard, args.workers, args.sample)]
+    cap = args.max_sessions and max(1, args.max_sessions // args.workers)
+    if cap and len(points) > cap:
+        # Spread over the whole timeline rather than only the earliest, thin-history sessions
+        points = [points[j] for j in np.linspace(0, len(points) - 1, cap).round().astype(int).tolist()]
+
+    results = []
+    applied = 0
+    history = swipes[['user_id', 'target_id', 'action', 'timestamp']]
+    for i in points:
+        if i > applied:
+            record_interactions_batch(history.iloc[applied:i])
+            applied = i
+        user_id, session = swipes.at[i, 'user_id'], int(swipes.at[i, 'session'])
+        started = time.perf_counter()
+        feed = generate_user_feed(user_id, top_n=args.k)
+        compute_ms = (time.perf_counter() - started) * 1000
+
+        ranked = feed['user_id'].tolist() if not feed.empty else []
+        gains = gains_by_session[session]
+        results.append({
+            'user_id': user_id, 'session': session, 'at': str(swipes.at[i, 'timestamp']),
+            'served': len(ranked), 'liked': len(gains),
+            'hit': bool(set(ranked[:args.k]) & gains.keys()), 'ndcg': ndcg(ranked, gains, args.k),
+            'compute_ms': compute_ms,
+        })
+    return results
+
+
+# -------------------- CLI --------------------
+def main():
+    parser = argparse.ArgumentParser(description="Replay swipe history and score the recommender offline")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--sqlite", help="SQLite file with users and swipes")
+    source.add_argument("--parquet", help="Directory with users.parquet and swipes.parquet")
+    parser.add_argument("--k", type=int, default=10, help="Feed size scored per session")
+    parser.add_argument("--session-gap-minutes", type=float, default=30.0, help="Idle time that ends a session")
+    parser.add_argument("--sample", type=float, default=1.0, help="Share of sessions to evaluate")
+    parser.add_argument("--max-sessions", type=int, help="Cap on evaluated sessions (split across workers)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--set", action="append", default=[], metavar="MODULE.NAME=JSON",
+                        help="Override a module-level constant in every worker (repeatable)")
+    parser.add_argument("--json", dest="json_out", help="Write the summary to this JSON file")
+    parser.add_argument("--sessions-out", help="Write per-session results as JSON lines")
+    args = parser.parse_args()
+    args.sqlite = args.sqlite and os.path.abspath(args.sqlite)
+    args.parquet = args.parquet and os.path.abspath(args.parquet)
+
+    started = time.perf_counter()
+    ctx = multiprocessing.get_context('spawn')   # fresh interpreter per worker: no inherited singletons
+    with ctx.Pool(args.workers) as pool:
+        shards = pool.starmap(replay_shard, [(shard, args) for shard in range(args.workers)])
+    sessions = [s for shard in shards for s in shard]
+
+    summary = summarize(sessions, args.k)
+    summary.update({'workers': args.workers, 'sample': args.sample, 'overrides': args.set,
+                    'wall_seconds': round(time.perf_counter() - started, 1)})
+    print(json.dumps(summary, indent=2))
+
+    if args.json_out:
+        with open(args.json_out, 'w') as f:
+            json.dump(summary, f, indent=2)
+    if args.sessions_out:
+        with open(args.sessions_out, 'w') as f:
+            for s in sessions:
+                f.write(json.dumps(s) + '\n')
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+"""
+admission.py
+------------
+Purpose:
+    Admission control for the API servers. Requests are checked against
+    per-user and per-IP token buckets (429 when empty) and a global limit on
+    in-flight requests (503 when full) before any work is done; admitted
+    requests run under ``api.timeout_seconds``.
+
+Integration Order:
+    Used BY:
+        - api_handlers.py (admit / run_admitted, Flask path)
+        - asgi_server.py (admit / release around the executor call)
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from production.config_loader import load_config
+from production.logger import get_logger
+
+# -------------------- INIT --------------------
+logger = get_logger(__name__)
+config = load_config()
+
+SECURITY_CONFIG = config.get("security", {})
+RATE_LIMIT_PER_MINUTE = float(SECURITY_CONFIG.get("rate_limit_per_minute", 60))
+IP_RATE_LIMIT_PER_MINUTE = float(SECURITY_CONFIG.get("ip_rate_limit_per_minute", 600))
+RATE_LIMIT_BURST = float(SECURITY_CONFIG.get("rate_limit_burst", 20))
+RATE_LIMIT_MAX_KEYS = int(SECURITY_CONFIG.get("rate_limit_max_keys", 100000))
+TRUST_FORWARDED_FOR = bool(SECURITY_CONFIG.get("trust_forwarded_for", False))
+
+MAX_CONCURRENT_REQUESTS = int(config.get("performance", {}).get("max_concurrent_requests", 100))
+REQUEST_TIMEOUT_SECONDS = float(config.get("api", {}).get("timeout_seconds", 30))
+
+Rejection = Tuple[Dict[str, Any], int]
+
+
+# -------------------- TOKEN BUCKETS --------------------
+class TokenBucketLimiter:
+    """
+    One token bucket per key, refilled continuously at ``rate_per_minute``.
+
+    Buckets live in an LRU bounded by ``max_keys``; an evicted key simply
+    starts again from a full bucket.
+    """
+
+    def __init__(self, rate_per_minute: float, burst: float, max_keys: int = RATE_LIMIT_MAX_KEYS):
+        self.rate = rate_per_minute / 60.0
+        self.burst = max(1.0, burst)
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()  # key -> (tokens, updated_at)
+        self._lock = threading.Lock()
+        self.rejected = 0
+
+    def acquire(self, key: str) -> float:
+        """Take one token for ``key``; return 0 on success, else seconds until one is available."""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated_at = self._buckets.get(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated_at) * self.rate)
+            if tokens >= 1.0:
+                self._buckets[key] = (tokens - 1.0, now)
+                wait = 0.0
+            else:
+                self._buckets[key] = (tokens, now)
+                wait = (1.0 - tokens) / self.rate if self.rate > 0 else 60.0
+                self.rejected += 1
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return wait
+
+    def refund(self, key: str):
+        """Return a token taken by acquire() for a request that was rejected elsewhere."""
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is not None:
+                tokens, updated_at = bucket
+                self._buckets[key] = (min(self.burst, tokens + 1.0), updated_at)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {'keys': len(self._buckets), 'rejected': self.rejected}
+
+
+# -------------------- CONCURRENCY --------------------
+class ConcurrencyLimiter:
+    """Non-blocking cap on in-flight requests."""
+
+    def __init__(self, max_concurrent: int):
+        self.max_concurrent = max_concurrent
+        self.in_flight = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    def try_acquire(self) -> bool:
+        with self._lock:
+            if self.in_flight >= self.max_concurrent:
+                self.rejected += 1
+                return False
+            self.in_flight += 1
+            return True
+
+    def release(self):
+        with self._lock:
+            self.in_flight = max(0, self.in_flight - 1)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {'in_flight': self.in_flight, 'max_concurrent': self.max_concurrent,
+                    'rejected': self.rejected}
+
+
+# -------------------- CONTROLLER --------------------
+class AdmissionController:
+    """
+    Rate limits plus the global concurrency cap, checked in that order.
+    """
+
+    def __init__(self, user_rate_per_minute: float = RATE_LIMIT_PER_MINUTE,
+                 ip_rate_per_minute: float = IP_RATE_LIMIT_PER_MINUTE, burst: float = RATE_LIMIT_BURST,
+                 max_concurrent: int = MAX_CONCURRENT_REQUESTS, timeout_seconds: float = REQUEST_TIMEOUT_SECONDS):
+        self.user_limiter = TokenBucketLimiter(user_rate_per_minute, burst)
+        self.ip_limiter = TokenBucketLimiter(ip_rate_per_minute, burst * (ip_rate_per_minute / user_rate_per_minute)
+                                             if user_rate_per_minute else burst)
+        self.concurrency = ConcurrencyLimiter(max_concurrent)
+        self.timeout_seconds = timeout_seconds
+        self.timeouts = 0
+
+    def admit(self, client_ip: Optional[str], user_id: Optional[str] = None) -> Optional[Rejection]:
+        """
+        Admit a request or return the (payload, status) to reject it with
+
+        On admission the caller holds a concurrency slot and must call release().
+        """
+        ip_key = client_ip or 'unknown'
+        wait = self.ip_limiter.acquire(ip_key)
+        if not wait and user_id:
+            wait = self.user_limiter.acquire(str(user_id))
+            if wait:
+                # One user's limit must not use up the allowance of everyone behind the same IP
+                self.ip_limiter.refund(ip_key)
+        if wait:
+            return {
+                'success': False,
+                'error': 'Rate limit exceeded',
+                'message': 'Too many requests, slow down',
+                'retry_after_seconds': round(wait, 2)
+            }, 429
+
+        if not self.concurrency.try_acquire():
+            return {
+                'success': False,
+                'error': 'Server busy',
+                'message': 'Too many requests in flight, retry shortly',
+                'retry_after_seconds': 1
+            }, 503
+        return None
+
+    def release(self):
+        self.concurrency.release()
+
+    def timed_out(self) -> Rejection:
+        self.timeouts += 1
+        return {
+            'success': False,
+            'error': 'Request timeout',
+            'message': f'Request exceeded {self.timeout_seconds:g}s'
+        }, 504
+
+    def stats(self) -> Dict:
+        return {
+            'per_user': self.user_limiter.stats(),
+            'per_ip': self.ip_limiter.stats(),
+            'concurrency': self.concurrency.stats(),
+            'timeouts': self.timeouts,
+            'timeout_seconds': self.timeout_seconds,
+        }
+
+
+def client_ip(remote_addr: Optional[str], forwarded_for: Optional[str] = None) -> str:
+    """Client address for rate limiting; X-Forwarded-For only when security.trust_forwarded_for is set."""
+    if TRUST_FORWARDED_FOR and forwarded_for:
+        return forwarded_for.split(',')[0].strip()
+    return remote_addr or 'unknown'
+
+
+# Global admission controller instance
+_admission_controller = None
+
+def get_admission_controller() -> AdmissionController:
+    """
+    Get the global admission controller instance
+
+    Returns:
+        AdmissionController instance
+    """
+    global _admission_controller
+    if _admission_controller is None:
+        _admission_controller = AdmissionController()
+    return _admission_controller
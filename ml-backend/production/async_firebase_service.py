@@ -0,0 +1,243 @@
+"""
+Async Firebase Service for Patra ML Backend
+===========================================
+
+asyncio-based variant of FirebaseService. Reads go through the Firestore
+AsyncClient on a dedicated event loop thread, and the independent reads of a
+feed request (target user document, users collection, interaction history,
+Elo snapshot) are fired concurrently, so feed latency is max(reads) rather
+than sum(reads). In-flight RPCs are bounded by a semaphore.
+
+The class keeps the synchronous FirebaseService interface, so it is a drop-in
+replacement for main.generate_user_feed and every module that calls
+get_firebase_service(). Enable it with ``firebase.async_reads: true`` in
+settings.yaml or ``PATRA_ASYNC_FIRESTORE=1``.
+"""
+
+import asyncio
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+import pandas as pd
+from firebase_admin import firestore_async
+
+from production import metrics, timing
+from production.circuit_breaker import CircuitOpenError
+from production.firebase_service import FirebaseService
+from production.firestore_decode import SWIPE_SCHEMA, USER_SCHEMA, decode_snapshots
+
+# Reads prefetched for the feed request running in the current context
+_prefetched: contextvars.ContextVar = contextvars.ContextVar("patra_prefetched_reads", default=None)
+
+# Interaction windows read by the feed stages (data_match_firebase, reject_superlike_like)
+FEED_INTERACTION_WINDOWS = (90, 365)
+
+
+class AsyncFirebaseService(FirebaseService):
+    """
+    FirebaseService with concurrent, semaphore-bounded async reads
+    """
+
+    def __init__(self, max_in_flight: int = 16):
+        super().__init__()
+        self.async_db = None
+        self.max_in_flight = max_in_flight
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    # -------------------- EVENT LOOP --------------------
+    def _start_loop(self):
+        """Start the private event loop thread that owns the AsyncClient"""
+        if self._loop is not None:
+            return
+        self._loop = asyncio.new_event_loop()
+        thread = threading.Thread(target=self._loop.run_forever, name="firestore-async", daemon=True)
+        thread.start()
+
+    def _run(self, coro) -> Any:
+        """
+        Run a coroutine on the service loop and block for its result
+
+        The task runs in a copy of the caller's context, so the request
+        deadline seen by _rpc_timeout() follows it into the loop thread.
+        """
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+
+    async def _open_client(self):
+        self._semaphore = asyncio.Semaphore(self.max_in_flight)
+        self.async_db = firestore_async.client()
+
+    async def _bounded(self, coro) -> Any:
+        async with self._semaphore:
+            return await coro
+
+    def initialize(self, service_account_path: Optional[str] = None):
+        """
+        Initialize both the sync client (used for writes) and the async client
+
+        Args:
+            service_account_path: Path to Firebase service account JSON file
+        """
+        if not super().initialize(service_account_path):
+            return False
+
+        try:
+            self._start_loop()
+            self._run(self._open_client())
+            self.logger.info(f"Async Firestore reads enabled (max {self.max_in_flight} in flight)")
+            return True
+        except Exception as e:
+            self.logger.error(f"Failed to initialize async Firestore client: {e}")
+            self.connected = False
+            return False
+
+    def is_connected(self) -> bool:
+        """Check if Firebase is connected"""
+        return super().is_connected() and self.async_db is not None
+
+    # -------------------- ASYNC READS --------------------
+    async def _rpc_async(self, site: str, make_coro, hedge: bool = False) -> Any:
+        """Async counterpart of _rpc: each attempt passes the circuit breaker"""
+        async def attempt():
+            with self.breaker.call(site):
+                return await make_coro()
+        if not (metrics.ENABLED or timing.enabled()):
+            return await self.policy.call_async(site, attempt, hedge=hedge and self.hedge_reads)
+        started = time.perf_counter()
+        outcome = 'error'
+        try:
+            result = await self.policy.call_async(site, attempt, hedge=hedge and self.hedge_reads)
+            outcome = 'ok'
+        finally:
+            elapsed = time.perf_counter() - started
+            metrics.observe('patra_backend_call_duration_seconds', elapsed,
+                            backend=self.name, method=site, outcome=outcome)
+        if timing.enabled():
+            timing.record_backend_call(site, elapsed, result)
+        return result
+
+    async def get_all_users_async(self) -> pd.DataFrame:
+        try:
+            async def read_users():
+                return [doc async for doc in self.async_db.collection('users').stream(timeout=self._rpc_timeout())]
+
+            df = decode_snapshots(await self._rpc_async('get_all_users', read_users), USER_SCHEMA)
+            self._count('reads')
+            self._count('documents_read', len(df))
+            self._remember_users(df)
+            self.logger.info(f"Retrieved {len(df)} users from Firebase")
+            return df
+
+        except CircuitOpenError:
+            return self._stale_users()
+        except Exception as e:
+            self._count('errors')
+            self.logger.error(f"Error getting users: {e}")
+            return self._stale_users()
+
+    async def get_user_by_id_async(self, user_id: str) -> Optional[Dict]:
+        try:
+            user_ref = self.async_db.collection('users').document(user_id)
+            doc = await self._rpc_async('get_user_by_id', lambda: user_ref.get(timeout=self._rpc_timeout()),
+                                        hedge=True)
+            self._count('reads')
+            if doc.exists:
+                self._count('documents_read')
+                user_data = doc.to_dict()
+                user_data['id'] = doc.id
+                return user_data
+            return None
+
+        except CircuitOpenError:
+            return self._stale_user(user_id)
+        except Exception as e:
+            self._count('errors')
+            self.logger.error(f"Error getting user {user_id}: {e}")
+            return self._stale_user(user_id)
+
+    async def get_user_interactions_async(self, user_id: str, days_back: int = 30) -> pd.DataFrame:
+        try:
+            cutoff_date = datetime.now() - timedelta(days=days_back)
+            query = self.async_db.collection('interactions') \
+                .where('user_id', '==', user_id).where('timestamp', '>=', cutoff_date)
+
+            async def read_interactions():
+                return [doc async for doc in query.stream(timeout=self._rpc_timeout())]
+
+            df = decode_snapshots(await self._rpc_async('get_user_interactions', read_interactions, hedge=True),
+                                  SWIPE_SCHEMA)
+            self._count('reads')
+            self._count('documents_read', len(df))
+            self.logger.info(f"Retrieved {len(df)} interactions for user {user_id}")
+            return df
+
+        except CircuitOpenError:
+            return pd.DataFrame()
+        except Exception as e:
+            self._count('errors')
+            self.logger.error(f"Error getting user interactions: {e}")
+            return pd.DataFrame()
+
+    async def prefetch_feed_async(self, user_id: str) -> Dict[tuple, Any]:
+        """Fire all independent reads of a feed request concurrently"""
+        keys = [('get_user_by_id', user_id), ('get_all_users',)]
+        coros = [self.get_user_by_id_async(user_id), self.get_all_users_async()]
+        for days_back in FEED_INTERACTION_WINDOWS:
+            keys.append(('get_user_interactions', user_id, days_back))
+            coros.append(self.get_user_interactions_async(user_id, days_back))
+
+        results = await asyncio.gather(*(self._bounded(c) for c in coros))
+        return dict(zip(keys, results))
+
+    # -------------------- SYNC INTERFACE --------------------
+    @contextmanager
+    def feed_reads(self, user_id: str):
+        """
+        Prefetch every read of a feed request concurrently and serve the
+        pipeline's synchronous calls from those results for its duration
+        """
+        if not self.is_connected():
+            yield
+            return
+
+        token = _prefetched.set(self._run(self.prefetch_feed_async(user_id)))
+        try:
+            yield
+        finally:
+            _prefetched.reset(token)
+
+    def _lookup(self, key: tuple):
+        prefetched = _prefetched.get()
+        if prefetched is not None and key in prefetched:
+            return True, prefetched[key]
+        return False, None
+
+    def get_all_users(self) -> pd.DataFrame:
+        found, value = self._lookup(('get_all_users',))
+        if found:
+            return value
+        if not self.is_connected():
+            self.logger.error("Error getting users: Firebase not connected")
+            return pd.DataFrame()
+        return self._run(self._bounded(self.get_all_users_async()))
+
+    def get_user_by_id(self, user_id: str) -> Optional[Dict]:
+        found, value = self._lookup(('get_user_by_id', user_id))
+        if found:
+            return dict(value) if value is not None else None
+        if not self.is_connected():
+            return None
+        return self._run(self._bounded(self.get_user_by_id_async(user_id)))
+
+    def get_user_interactions(self, user_id: str, days_back: int = 30) -> pd.DataFrame:
+        found, value = self._lookup(('get_user_interactions', user_id, days_back))
+        if found:
+            return value
+        if not self.is_connected():
+            self.logger.error("Error getting user interactions: Firebase not connected")
+            return pd.DataFrame()
+        return self._run(self._bounded(self.get_user_interactions_async(user_id, days_back)))
@@ -0,0 +1,270 @@
+"""
+batch_match.py
+--------------
+Purpose:
+    Score many users against the whole candidate set at once. Candidate
+    features are encoded once from the cached user snapshot (numeric ages,
+    gender codes, a sparse multi-hot interest matrix, unique-location codes)
+    and each chunk of requesting users is scored with matrix operations
+    instead of one match_score call per (user, candidate) pair.
+
+    Scores follow data_match_firebase.match_score and the candidate filters of
+    get_top_matches, combined with Elo as in main.apply_elo_scores_firebase.
+
+Integration Order:
+    Runs AFTER:
+        - user_store.py (shared snapshot)
+    Read BY:
+        - main.py (get_batch_recommendations)
+"""
+
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from production import metrics
+from production.config_loader import load_config
+from production.exclusion_index import get_exclusion_index
+from production.firebase_service import get_firebase_service
+from production.logger import get_logger
+from production.user_store import UserSnapshot, get_user_store
+
+# -------------------- INIT --------------------
+logger = get_logger(__name__)
+config = load_config()
+
+CHUNK_SIZE = int(config.get("performance", {}).get("batch_recommendation_chunk_size", 64))
+SWIPE_LOOKBACK_DAYS = 90  # Same window as get_top_matches
+
+# match_score weights
+AGE_WEIGHT, LOCATION_WEIGHT, INTEREST_WEIGHT, GENDER_WEIGHT = 0.3, 0.2, 0.3, 0.2
+
+
+# -------------------- ENCODING --------------------
+def _split_interests(value) -> List[str]:
+    """Interests as a list, accepting lists or comma-separated strings (as jaccard_score does)."""
+    if isinstance(value, str):
+        return [x.strip() for x in value.split(',') if x.strip()]
+    if isinstance(value, (list, tuple, set, np.ndarray)):
+        return list(value)
+    return []
+
+
+def _lower_column(df: pd.DataFrame, column: str, default: str) -> np.ndarray:
+    if column not in df.columns:
+        return np.full(len(df), default, dtype=object)
+    values = df[column].where(df[column].map(lambda v: isinstance(v, str)), default)
+    return values.str.lower().to_numpy(dtype=object)
+
+
+def _location_score(loc1: str, loc2: str) -> float:
+    """match_score's location rule for two non-empty, lower-cased locations."""
+    if loc1 == loc2:
+        return 1.0
+    if any(word in loc2 for word in loc1.split()) or any(word in loc1 for word in loc2.split()):
+        return 0.6
+    return 0.1
+
+
+class CandidateMatrix:
+    """
+    Column-encoded candidate features for one user snapshot.
+    """
+
+    def __init__(self, snapshot: UserSnapshot):
+        users = snapshot.users_df
+        self.snapshot = snapshot
+        self.size = len(users)
+
+        id_column = 'uid' if 'uid' in users.columns else 'id'
+        self.ids = users[id_column].fillna(users['id']).astype(str).to_numpy(dtype=object)
+        self.names = (users['username'] if 'username' in users.columns else
+                      users.get('name', pd.Series('Unknown', index=users.index))).fillna('Unknown').to_numpy(dtype=object)
+        self.genders_raw = users.get('gender', pd.Series('', index=users.index)).fillna('').to_numpy(dtype=object)
+
+        self.age = pd.to_numeric(users.get('age', pd.Series(25, index=users.index)),
+                                 errors='coerce').fillna(25).to_numpy(dtype=np.float64)
+        self.age_min = pd.to_numeric(users.get('ageMin', pd.Series(18, index=users.index)),
+                                     errors='coerce').fillna(18).to_numpy(dtype=np.float64)
+        self.age_max = pd.to_numeric(users.get('ageMax', pd.Series(50, index=users.index)),
+                                     errors='coerce').fillna(50).to_numpy(dtype=np.float64)
+
+        # Gender and preference as integer codes over one shared vocabulary
+        gender = _lower_column(users, 'gender', '')
+        preference = _lower_column(users, 'genderPreference', 'all')
+        vocabulary, codes = np.unique(np.concatenate([gender, preference, ['', 'all']]), return_inverse=True)
+        self.gender = codes[:self.size]
+        self.preference = codes[self.size:2 * self.size]
+        self.no_gender = int(np.searchsorted(vocabulary, ''))
+        self.any_gender = int(np.searchsorted(vocabulary, 'all'))
+
+        # Locations as codes into the table of unique locations
+        locations = _lower_column(users, 'location', '')
+        self.locations, self.location_code = np.unique(locations, return_inverse=True)
+        self.has_location = self.locations[self.location_code] != ''
+        self._location_rows: Dict[int, np.ndarray] = {}
+
+        # Interests as a sparse multi-hot matrix (users x interest vocabulary)
+        interest_lists = users['interests'].map(_split_interests) if 'interests' in users.columns \
+            else pd.Series([[]] * self.size)
+        interest_sets = [set(values) for values in interest_lists]
+        interest_vocabulary = {}
+        rows, cols = [], []
+        for row, values in enumerate(interest_sets):
+            for value in values:
+                cols.append(interest_vocabulary.setdefault(value, len(interest_vocabulary)))
+                rows.append(row)
+        self.interests = sparse.csr_matrix(
+            (np.ones(len(rows), dtype=np.float32), (rows, cols)),
+            shape=(self.size, max(1, len(interest_vocabulary)))
+        )
+        self.interest_count = np.fromiter((len(values) for values in interest_sets), dtype=np.float32,
+                                          count=self.size)
+
+        # Elo normalized over the global range, as the live feed does
+        user_store = get_user_store()
+        min_elo, max_elo = user_store.elo_range()
+        elo = snapshot.elo
+        self.elo_norm = (elo - min_elo) / (max_elo - min_elo) if max_elo > min_elo \
+            else np.full(self.size, 0.5, dtype=np.float64)
+
+    def location_scores(self, code: int) -> np.ndarray:
+        """Location score of unique location ``code`` against every candidate."""
+        row = self._location_rows.get(code)
+        if row is None:
+            origin = self.locations[code]
+            table = np.array([_location_score(origin, other) if other else 0.0 for other in self.locations])
+            row = self._location_rows[code] = table
+        return row[self.location_code]
+
+    def score(self, rows: np.ndarray) -> np.ndarray:
+        """
+        match_score of each user row in ``rows`` against every candidate
+
+        Returns:
+            (len(rows), size) array of scores in [0, 1]
+        """
+        age = 1 - np.abs(self.age[rows, None] - self.age[None, :]) / 15
+        total = AGE_WEIGHT * np.clip(age, 0, None)
+        weights = np.full(total.shape, AGE_WEIGHT + GENDER_WEIGHT)
+
+        # Location: scored only when both sides have one
+        for i, row in enumerate(rows):
+            if self.has_location[row]:
+                both = self.has_location
+                total[i] += LOCATION_WEIGHT * np.where(both, self.location_scores(self.location_code[row]), 0.0)
+                weights[i] += LOCATION_WEIGHT * both
+
+        # Interests: Jaccard from sparse intersections, scored when either side has any
+        shared = (self.interests[rows] @ self.interests.T).toarray()
+        union = self.interest_count[rows, None] + self.interest_count[None, :] - shared
+        jaccard = np.divide(shared, union, out=np.zeros_like(shared), where=union > 0)
+        has_interests = union > 0
+        total += INTEREST_WEIGHT * jaccard
+        weights += INTEREST_WEIGHT * has_interests
+
+        # Gender preference compatibility in both directions
+        pref_user, gender_user = self.preference[rows, None], self.gender[rows, None]
+        blocked = ((pref_user != self.any_gender) & (self.gender[None, :] != self.no_gender)
+                   & (pref_user != self.gender[None, :]))
+        blocked |= ((self.preference[None, :] != self.any_gender) & (gender_user != self.no_gender)
+                    & (self.preference[None, :] != gender_user))
+        total += GENDER_WEIGHT * ~blocked
+
+        return np.clip(total / weights, 0.0, 1.0)
+
+    def eligible(self, rows: np.ndarray) -> np.ndarray:
+        """get_top_matches filters: not self, inside the age range, matching gender preference."""
+        in_age = (self.age[None, :] >= self.age_min[rows, None]) & (self.age[None, :] <= self.age_max[rows, None])
+        pref_user = self.preference[rows, None]
+        gender_ok = (pref_user == self.any_gender) | (self.gender[None, :] == pref_user)
+        mask = in_age & gender_ok
+        mask[np.arange(len(rows)), rows] = False
+        return mask
+
+
+# -------------------- BATCH SCORING --------------------
+def _swiped_by(user_ids: Set[str]) -> Dict[str, Set[str]]:
+    """Swiped targets per user from one swipe-log read plus this process's exclusion index."""
+    swiped: Dict[str, Set[str]] = {}
+    swipes = get_firebase_service().get_swipe_data(days_back=SWIPE_LOOKBACK_DAYS)
+    # App-written swipes use userId/targetUserId, backend-written ones user_id/target_id
+    for user_column, target_column in (('user_id', 'target_id'), ('userId', 'targetUserId')):
+        if swipes.empty or not {user_column, target_column} <= set(swipes.columns):
+            continue
+        rows = swipes[swipes[user_column].isin(user_ids) & swipes[target_column].notna()]
+        for user_id, target_id in zip(rows[user_column], rows[target_column]):
+            swiped.setdefault(user_id, set()).add(target_id)
+
+    exclusion_index = get_exclusion_index()
+    for user_id in user_ids:
+        recent = exclusion_index.swiped(user_id)
+        if recent:
+            swiped.setdefault(user_id, set()).update(recent)
+    return swiped
+
+
+def batch_top_matches(user_ids: Iterable[str], top_n: int = 3,
+                      chunk_size: int = CHUNK_SIZE) -> Iterator[Tuple[str, Optional[List[Dict]]]]:
+    """
+    Rank candidates for many users against one shared snapshot
+
+    Args:
+        user_ids: Users to build recommendations for
+        top_n: Recommendations per user
+        chunk_size: Users scored per matrix operation
+
+    Yields:
+        (user_id, recommendations) in input order; recommendations is None
+        for users missing from the snapshot
+    """
+    user_ids = [str(uid) for uid in user_ids]
+    snapshot = get_user_store().snapshot()
+    if snapshot is None:
+        for user_id in user_ids:
+            yield user_id, None
+        return
+
+    candidates = CandidateMatrix(snapshot)
+    swiped = _swiped_by(set(user_ids))
+    id_position = {uid: i for i, uid in enumerate(candidates.ids)}
+
+    for start in range(0, len(user_ids), chunk_size):
+        chunk = user_ids[start:start + chunk_size]
+        metrics.observe('patra_batch_size', len(chunk), stage='batch_match')
+        rows = snapshot.rows_for(chunk)
+        known = rows >= 0
+
+        scores = np.full((len(chunk), candidates.size), -np.inf)
+        if known.any():
+            known_rows = rows[known]
+            match = candidates.score(known_rows)
+            final = 0.7 * match + 0.3 * candidates.elo_norm[None, :]
+            scores[known] = np.where(candidates.eligible(known_rows), final, -np.inf)
+
+        for i, user_id in enumerate(chunk):
+            if not known[i]:
+                yield user_id, None
+                continue
+            row_scores = scores[i]
+            for target_id in swiped.get(user_id, ()):
+                position = id_position.get(target_id)
+                if position is not None:
+                    row_scores[position] = -np.inf
+
+            k = min(top_n, candidates.size)
+            top = np.argpartition(-row_scores, k - 1)[:k] if k else np.array([], dtype=np.int64)
+            top = top[np.argsort(-row_scores[top], kind='stable')]
+            top = top[np.isfinite(row_scores[top])]
+            yield user_id, [
+                {
+                    'user_id': candidates.ids[c],
+                    'name': candidates.names[c],
+                    'gender': candidates.genders_raw[c],
+                    'score': float(row_scores[c]),
+                    'rank': rank
+                }
+                for rank, c in enumerate(top, start=1)
+            ]
@@ -15,6 +15,7 @@ from sentence_transformers import SentenceTransformer
 from sklearn.metrics.pairwise import cosine_similarity
 from functools import lru_cache
 from typing import Optional
+from production import metrics
 from production.firebase_service import get_firebase_service
 from production.logger import get_logger
 
@@ -85,6 +86,7 @@ def top_similar_bios(
 
     # Encode all bios
     bios = users_df["bio"].fillna("").tolist()
+    metrics.observe('patra_batch_size', len(bios), stage='bio_encoder')
     bio_embeddings = model.encode(bios, convert_to_numpy=True)
 
     # Get target user embedding
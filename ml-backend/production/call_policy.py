@@ -0,0 +1,279 @@
+"""
+call_policy.py
+--------------
+Purpose:
+    Retry and hedging policy for backend calls. Each call site (e.g.
+    'get_user_by_id') gets:
+        - retries of transient errors with jittered exponential backoff,
+          bounded per call (attempts, remaining request deadline) and per
+          site (a retry budget earned as a fraction of first attempts, so
+          an outage cannot multiply load);
+        - optional hedged reads: when the first attempt is slower than the
+          site's recent latency percentile, a duplicate is sent and the first
+          answer wins (off by default, ``firebase.hedge_reads``, since every
+          hedge is a second billed read);
+        - outcome and latency stats per call site.
+
+Integration Order:
+    Used BY:
+        - firebase_service.py (every Firestore read and write)
+"""
+
+import asyncio
+import contextvars
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+import numpy as np
+
+from production.circuit_breaker import CircuitOpenError
+from production.deadline import current_deadline
+from production.logger import get_logger
+
+# -------------------- INIT --------------------
+logger = get_logger(__name__)
+
+# gRPC / HTTP errors worth another attempt (google.api_core.exceptions class names)
+TRANSIENT_ERRORS = {
+    'ServiceUnavailable', 'DeadlineExceeded', 'InternalServerError', 'Aborted',
+    'ResourceExhausted', 'TooManyRequests', 'GatewayTimeout', 'RetryError',
+}
+
+LATENCY_SAMPLES = 512
+
+
+def is_transient(error: BaseException) -> bool:
+    """Whether ``error`` is worth retrying."""
+    if isinstance(error, CircuitOpenError):
+        return False
+    if isinstance(error, (ConnectionError, TimeoutError)):
+        return True
+    return type(error).__name__ in TRANSIENT_ERRORS
+
+
+# -------------------- PER-SITE STATE --------------------
+class CallSite:
+    """Latency samples, retry budget and outcome counters for one call site."""
+
+    def __init__(self, name: str, retry_budget_ratio: float, min_retry_budget: float = 10.0):
+        self.name = name
+        self.retry_budget_ratio = retry_budget_ratio
+        self.max_retry_tokens = max(min_retry_budget, 100 * retry_budget_ratio)
+        self.retry_tokens = min_retry_budget
+        self.latencies: deque = deque(maxlen=LATENCY_SAMPLES)
+        self.counts = {'calls': 0, 'successes': 0, 'failures': 0, 'retries': 0,
+                       'retry_budget_exhausted': 0, 'hedges': 0, 'hedge_wins': 0}
+        self.lock = threading.Lock()
+
+    def begin(self):
+        with self.lock:
+            self.counts['calls'] += 1
+            self.retry_tokens = min(self.max_retry_tokens, self.retry_tokens + self.retry_budget_ratio)
+
+    def take_retry(self) -> bool:
+        with self.lock:
+            if self.retry_tokens < 1.0:
+                self.counts['retry_budget_exhausted'] += 1
+                return False
+            self.retry_tokens -= 1.0
+            self.counts['retries'] += 1
+            return True
+
+    def record(self, name: str, latency: Optional[float] = None):
+        with self.lock:
+            self.counts[name] += 1
+            if latency is not None:
+                self.latencies.append(latency)
+
+    def percentile(self, q: float, min_samples: int) -> Optional[float]:
+        with self.lock:
+            if len(self.latencies) < min_samples:
+                return None
+            samples = np.fromiter(self.latencies, dtype=np.float64)
+        return float(np.percentile(samples, q))
+
+    def stats(self) -> Dict:
+        with self.lock:
+            stats = dict(self.counts, retry_tokens=round(self.retry_tokens, 2))
+            samples = np.fromiter(self.latencies, dtype=np.float64) if self.latencies else None
+        if samples is not None:
+            p50, p95, p99 = np.percentile(samples, [50, 95, 99])
+            stats.update({'p50_ms': round(float(p50) * 1000, 2), 'p95_ms': round(float(p95) * 1000, 2),
+                          'p99_ms': round(float(p99) * 1000, 2)})
+        return stats
+
+
+# -------------------- POLICY --------------------
+class CallPolicy:
+    """
+    Retries, backoff and hedging for backend calls, tracked per call site.
+    """
+
+    def __init__(self, max_attempts: int = 3, base_delay: float = 0.05, max_delay: float = 1.0,
+                 retry_budget_ratio: float = 0.1, hedge_percentile: float = 95.0,
+                 hedge_min_samples: int = 50, hedge_workers: int = 8,
+                 sleep: Callable[[float], None] = time.sleep, rng: Optional[random.Random] = None):
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retry_budget_ratio = retry_budget_ratio
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self.hedge_workers = hedge_workers
+        self._sleep = sleep
+        self._rng = rng or random.Random()
+        self._sites: Dict[str, CallSite] = {}
+        self._sites_lock = threading.Lock()
+        self._hedge_executor: Optional[ThreadPoolExecutor] = None
+
+    def site(self, name: str) -> CallSite:
+        site = self._sites.get(name)
+        if site is None:
+            with self._sites_lock:
+                site = self._sites.setdefault(name, CallSite(name, self.retry_budget_ratio))
+        return site
+
+    def backoff(self, attempt: int) -> float:
+        """Full-jitter backoff before retry number ``attempt`` (1-based)."""
+        cap = min(self.max_delay, self.base_delay * (2 ** (attempt - 1)))
+        return self._rng.uniform(0, cap)
+
+    # -------------------- CALLS --------------------
+    def call(self, site_name: str, fn: Callable[[], Any], hedge: bool = False) -> Any:
+        """
+        Run ``fn`` under the policy and return its result
+
+        Args:
+            site_name: Call site the outcome is recorded under
+            fn: Zero-argument callable issuing one attempt; must be safe to
+                repeat (reads, or writes with client-chosen document IDs)
+            hedge: Allow a duplicate attempt once the first is slower than the
+                site's latency percentile (reads only)
+
+        Raises:
+            The last error once retries are exhausted or not allowed
+        """
+        site = self.site(site_name)
+        site.begin()
+        attempt = 1
+        while True:
+            started = time.perf_counter()
+            try:
+                result = self._hedged(site, fn) if hedge else fn()
+            except Exception as e:
+                site.record('failures')
+                if not self._may_retry(site, e, attempt):
+                    raise
+                delay = self.backoff(attempt)
+                logger.warning(f"{site_name} attempt {attempt} failed ({type(e).__name__}), "
+                               f"retrying in {delay * 1000:.0f}ms")
+                self._sleep(delay)
+                attempt += 1
+                continue
+            site.record('successes', time.perf_counter() - started)
+            return result
+
+    def _may_retry(self, site: CallSite, error: Exception, attempt: int) -> bool:
+        if attempt >= self.max_attempts or not is_transient(error):
+            return False
+        deadline = current_deadline()
+        if deadline is not None and deadline.remaining() < self.backoff(attempt):
+            return False
+        return site.take_retry()
+
+    def _hedged(self, site: CallSite, fn: Callable[[], Any]) -> Any:
+        hedge_after = site.percentile(self.hedge_percentile, self.hedge_min_samples)
+        if hedge_after is None:
+            return fn()
+
+        executor = self._executor()
+        primary = executor.submit(contextvars.copy_context().run, fn)
+        done, _ = wait([primary], timeout=hedge_after)
+        if done:
+            return primary.result()
+
+        site.record('hedges')
+        backup = executor.submit(contextvars.copy_context().run, fn)
+        pending = {primary, backup}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is backup:
+                        site.record('hedge_wins')
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    # -------------------- ASYNC CALLS --------------------
+    async def call_async(self, site_name: str, make_coro: Callable[[], Awaitable[Any]],
+                         hedge: bool = False) -> Any:
+        """
+        Coroutine counterpart of call(); ``make_coro`` builds one attempt
+
+        Backoff sleeps and hedges run on the caller's event loop.
+        """
+        site = self.site(site_name)
+        site.begin()
+        attempt = 1
+        while True:
+            started = time.perf_counter()
+            try:
+                result = await (self._hedged_async(site, make_coro) if hedge else make_coro())
+            except Exception as e:
+                site.record('failures')
+                if not self._may_retry(site, e, attempt):
+                    raise
+                delay = self.backoff(attempt)
+                logger.warning(f"{site_name} attempt {attempt} failed ({type(e).__name__}), "
+                               f"retrying in {delay * 1000:.0f}ms")
+                await asyncio.sleep(delay)
+                attempt += 1
+                continue
+            site.record('successes', time.perf_counter() - started)
+            return result
+
+    async def _hedged_async(self, site: CallSite, make_coro: Callable[[], Awaitable[Any]]) -> Any:
+        hedge_after = site.percentile(self.hedge_percentile, self.hedge_min_samples)
+        if hedge_after is None:
+            return await make_coro()
+
+        primary = asyncio.ensure_future(make_coro())
+        done, _ = await asyncio.wait({primary}, timeout=hedge_after)
+        if done:
+            return primary.result()
+
+        site.record('hedges')
+        backup = asyncio.ensure_future(make_coro())
+        pending = {primary, backup}
+        error = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    for loser in pending:
+                        loser.cancel()
+                    if task is backup:
+                        site.record('hedge_wins')
+                    return task.result()
+                error = task.exception()
+        raise error
+
+    def _executor(self) -> ThreadPoolExecutor:
+        if self._hedge_executor is None:
+            with self._sites_lock:
+                if self._hedge_executor is None:
+                    self._hedge_executor = ThreadPoolExecutor(max_workers=self.hedge_workers,
+                                                              thread_name_prefix="hedged-read")
+        return self._hedge_executor
+
+    def stats(self) -> Dict[str, Dict]:
+        """Outcome counters and latency percentiles per call site"""
+        with self._sites_lock:
+            sites = list(self._sites.values())
+        return {site.name: site.stats() for site in sites}
@@ -0,0 +1,150 @@
+"""
+circuit_breaker.py
+------------------
+Purpose:
+    Circuit breaker for backend calls. Outcomes of recent calls are kept in a
+    rolling window; calls slower than their site's latency threshold and
+    errors the caller classifies as failures (transient ones, for storage)
+    count as failed. Once the failure rate crosses its threshold the breaker
+    opens and calls fail fast with CircuitOpenError instead of waiting for
+    RPC timeouts. While open, a background probe checks the backend and
+    closes the breaker as soon as it answers again.
+
+Integration Order:
+    Used BY:
+        - firebase_service.py (wraps every Firestore RPC)
+"""
+
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional
+
+from production.logger import get_logger
+
+# -------------------- INIT --------------------
+logger = get_logger(__name__)
+
+CLOSED, OPEN = 'closed', 'open'
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling the backend while the breaker is open."""
+
+
+class CircuitBreaker:
+    """
+    Failure-rate and latency based breaker with background recovery probes.
+    """
+
+    def __init__(self, name: str, failure_rate_threshold: float = 0.5, slow_call_seconds: float = 2.0,
+                 window_size: int = 20, min_calls: int = 10, open_seconds: float = 10.0,
+                 probe: Optional[Callable[[], bool]] = None,
+                 slow_call_seconds_by_site: Optional[Dict[str, float]] = None,
+                 is_failure: Optional[Callable[[BaseException], bool]] = None):
+        self.name = name
+        self.failure_rate_threshold = failure_rate_threshold
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_call_seconds_by_site = dict(slow_call_seconds_by_site or {})
+        self.is_failure = is_failure or (lambda error: True)
+        self.window_size = window_size
+        self.min_calls = min_calls
+        self.open_seconds = open_seconds
+        self.probe = probe
+
+        self.state = CLOSED
+        self.opened_at: Optional[float] = None
+        self._outcomes: deque = deque(maxlen=window_size)   # True = failed or slow
+        self._lock = threading.Lock()
+        self._prober: Optional[threading.Thread] = None
+        self._stats = {'opened': 0, 'short_circuited': 0, 'probes': 0}
+
+    @property
+    def is_open(self) -> bool:
+        return self.state == OPEN
+
+    # -------------------- CALLS --------------------
+    def slow_threshold(self, site: Optional[str] = None) -> float:
+        """Latency above which a call from ``site`` counts as a failure."""
+        return self.slow_call_seconds_by_site.get(site, self.slow_call_seconds)
+
+    @contextmanager
+    def call(self, site: Optional[str] = None):
+        """
+        Guard one backend call
+
+        Args:
+            site: Call site, for its slow-call threshold
+
+        Raises:
+            CircuitOpenError: the breaker is open; the call was not made
+        """
+        if self.state == OPEN:
+            with self._lock:
+                self._stats['short_circuited'] += 1
+            raise CircuitOpenError(f"{self.name} circuit open")
+
+        started = time.monotonic()
+        try:
+            yield
+        except Exception as e:
+            # Errors that are not failures (NotFound, bad input) mean the backend answered
+            self._record(failed=self.is_failure(e) or time.monotonic() - started > self.slow_threshold(site))
+            raise
+        self._record(failed=time.monotonic() - started > self.slow_threshold(site))
+
+    def _record(self, failed: bool):
+        with self._lock:
+            if self.state == OPEN:
+                return
+            self._outcomes.append(failed)
+            if len(self._outcomes) < self.min_calls:
+                return
+            failure_rate = sum(self._outcomes) / len(self._outcomes)
+            if failure_rate >= self.failure_rate_threshold:
+                self._open_locked(failure_rate)
+
+    # -------------------- STATE --------------------
+    def _open_locked(self, failure_rate: float):
+        self.state = OPEN
+        self.opened_at = time.time()
+        self._stats['opened'] += 1
+        logger.warning(f"{self.name} circuit opened: {failure_rate:.0%} of the last "
+                       f"{len(self._outcomes)} calls failed or exceeded {self.slow_call_seconds}s")
+        if self.probe is not None and (self._prober is None or not self._prober.is_alive()):
+            self._prober = threading.Thread(target=self._probe_loop, name=f"{self.name}-probe", daemon=True)
+            self._prober.start()
+
+    def close(self):
+        with self._lock:
+            if self.state == OPEN:
+                logger.info(f"{self.name} circuit closed after {time.time() - self.opened_at:.1f}s")
+            self.state = CLOSED
+            self.opened_at = None
+            self._outcomes.clear()
+
+    def _probe_loop(self):
+        while self.state == OPEN:
+            time.sleep(self.open_seconds)
+            with self._lock:
+                self._stats['probes'] += 1
+            try:
+                healthy = self.probe()
+            except Exception as e:
+                logger.warning(f"{self.name} recovery probe failed: {e}")
+                healthy = False
+            if healthy:
+                self.close()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            outcomes = list(self._outcomes)
+            stats = dict(self._stats)
+        stats.update({
+            'state': self.state,
+            'open_for_seconds': round(time.time() - self.opened_at, 1) if self.opened_at else 0.0,
+            'window_calls': len(outcomes),
+            'window_failure_rate': round(sum(outcomes) / len(outcomes), 4) if outcomes else 0.0,
+        })
+        return stats
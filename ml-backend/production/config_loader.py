@@ -2,12 +2,14 @@
 production/config_loader.py
 ---------------------------
 Load YAML configuration for Patra ML backend.
+``PATRA_CONFIG`` points at an alternative settings file (e.g. a load-test profile).
 """
 
+import os
 import yaml
 from functools import lru_cache
 
-CONFIG_PATH = "production/settings.yaml"
+CONFIG_PATH = os.getenv("PATRA_CONFIG", "production/settings.yaml")
 
 @lru_cache(maxsize=1)
 def load_config() -> dict:
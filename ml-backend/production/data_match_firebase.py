@@ -13,6 +13,7 @@ import pandas as pd
 import numpy as np
 from production.logger import get_logger
 from production.firebase_service import get_firebase_service
+from production import timing
 from datetime import datetime
 from typing import List, Dict, Any, Optional
 
@@ -140,53 +141,60 @@ def get_top_matches(user_id: str, top_n: int = 20, use_swipe_logs: bool = True)
             logger.error("No users found in database")
             return pd.DataFrame()
         
-        # Filter out current user
-        candidate_users = all_users_df[all_users_df['uid'] != user_id].copy()
-        
-        # Filter by age preferences
-        user_age_min = current_user.get('ageMin', 18)
-        user_age_max = current_user.get('ageMax', 50)
-        candidate_users = candidate_users[
-            (candidate_users['age'] >= user_age_min) & 
-            (candidate_users['age'] <= user_age_max)
-        ]
-        
-        # Filter by gender preferences
-        user_gender_pref = current_user.get('genderPreference', 'all').lower()
-        if user_gender_pref != 'all':
+        with timing.stage('match.filter', rows_in=len(all_users_df)) as stage:
+            # Filter out current user
+            candidate_users = all_users_df[all_users_df['uid'] != user_id].copy()
+            
+            # Filter by age preferences
+            user_age_min = current_user.get('ageMin', 18)
+            user_age_max = current_user.get('ageMax', 50)
             candidate_users = candidate_users[
-                candidate_users['gender'].str.lower() == user_gender_pref
+                (candidate_users['age'] >= user_age_min) & 
+                (candidate_users['age'] <= user_age_max)
             ]
+            
+            # Filter by gender preferences
+            user_gender_pref = current_user.get('genderPreference', 'all').lower()
+            if user_gender_pref != 'all':
+                candidate_users = candidate_users[
+                    candidate_users['gender'].str.lower() == user_gender_pref
+                ]
+            stage.rows_out = len(candidate_users)
         
         # Get swipe data if filtering is enabled
         swiped_users = set()
         if use_swipe_logs:
             user_interactions = firebase_service.get_user_interactions(user_id, days_back=90)
             if not user_interactions.empty:
-                swiped_users = set(user_interactions['targetUserId'].unique())
+                # App-written swipes use targetUserId, backend-written ones target_id
+                for target_column in ('targetUserId', 'target_id'):
+                    if target_column in user_interactions.columns:
+                        swiped_users.update(user_interactions[target_column].dropna().unique())
         
         # Calculate match scores
-        matches = []
-        for _, candidate in candidate_users.iterrows():
-            candidate_uid = candidate.get('uid', candidate.get('user_id'))
-            
-            # Skip if already swiped
-            if use_swipe_logs and candidate_uid in swiped_users:
-                continue
-            
-            # Calculate compatibility score
-            score = match_score(current_user, candidate.to_dict())
+        with timing.stage('match.score', rows_in=len(candidate_users)) as stage:
+            matches = []
+            for _, candidate in candidate_users.iterrows():
+                candidate_uid = candidate.get('uid', candidate.get('user_id'))
             
-            matches.append({
-                'user_id': candidate_uid,
-                'uid': candidate_uid,
-                'name': candidate.get('username', candidate.get('name', 'Unknown')),
-                'age': candidate.get('age', 0),
-                'gender': candidate.get('gender', ''),
-                'location': candidate.get('location', ''),
-                'score': score,
-                'timestamp': datetime.now()
-            })
+                # Skip if already swiped
+                if use_swipe_logs and candidate_uid in swiped_users:
+                    continue
+                
+                # Calculate compatibility score
+                score = match_score(current_user, candidate.to_dict())
+                
+                matches.append({
+                    'user_id': candidate_uid,
+                    'uid': candidate_uid,
+                    'name': candidate.get('username', candidate.get('name', 'Unknown')),
+                    'age': candidate.get('age', 0),
+                    'gender': candidate.get('gender', ''),
+                    'location': candidate.get('location', ''),
+                    'score': score,
+                    'timestamp': datetime.now()
+                })
+            stage.rows_out = len(matches)
         
         # Convert to DataFrame and sort by score
         matches_df = pd.DataFrame(matches)
@@ -195,8 +203,10 @@ def get_top_matches(user_id: str, top_n: int = 20, use_swipe_logs: bool = True)
             return pd.DataFrame()
         
         # Sort by score and return top N
-        matches_df = matches_df.sort_values('score', ascending=False).head(top_n)
-        matches_df.reset_index(drop=True, inplace=True)
+        with timing.stage('match.sort', rows_in=len(matches_df)) as stage:
+            matches_df = matches_df.sort_values('score', ascending=False).head(top_n)
+            matches_df.reset_index(drop=True, inplace=True)
+            stage.rows_out = len(matches_df)
         
         logger.info(f"Found {len(matches_df)} matches for user {user_id}")
         return matches_df
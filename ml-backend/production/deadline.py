@@ -0,0 +1,137 @@
+"""
+deadline.py
+-----------
+Purpose:
+    Per-request time budget for the feed pipeline. A Deadline is created when
+    a request arrives and passed through every stage of generate_user_feed.
+    Optional stages (interaction weighting, Elo) run only if the remaining
+    budget covers their typical cost, learned as a moving average of past
+    runs; stages that were skipped or failed are recorded so the response
+    can report them and degraded feeds are not cached.
+
+    The active deadline is also published in a context variable so backend
+    reads can cap their RPC timeouts at the remaining budget.
+
+Integration Order:
+    Created BY:
+        - api_handlers.py (recommendations)
+    Read BY:
+        - main.py (generate_user_feed and the serving layers)
+        - firebase_service.py (RPC timeouts)
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List, Optional
+
+from production.config_loader import load_config
+from production.logger import get_logger
+
+# -------------------- INIT --------------------
+logger = get_logger(__name__)
+config = load_config()
+
+FEED_BUDGET_SECONDS = float(config.get("performance", {}).get("feed_deadline_seconds", 2.5))
+
+# Run an optional stage only if this multiple of its typical cost is left
+SAFETY_FACTOR = 1.5
+# Weight of the newest observation in the per-stage cost average
+COST_SMOOTHING = 0.2
+
+_stage_costs: Dict[str, float] = {}
+_stage_costs_lock = threading.Lock()
+
+_current_deadline: ContextVar[Optional["Deadline"]] = ContextVar("patra_deadline", default=None)
+
+
+def stage_cost(stage: str) -> float:
+    """Moving average of ``stage``'s run time in seconds (0 until observed)."""
+    return _stage_costs.get(stage, 0.0)
+
+
+def _observe(stage: str, seconds: float):
+    with _stage_costs_lock:
+        previous = _stage_costs.get(stage)
+        _stage_costs[stage] = seconds if previous is None else \
+            previous + COST_SMOOTHING * (seconds - previous)
+
+
+def _decay(stage: str):
+    """Shrink a skipped stage's estimate so one slow run cannot disable it for good."""
+    with _stage_costs_lock:
+        if stage in _stage_costs:
+            _stage_costs[stage] *= 1 - COST_SMOOTHING
+
+
+# -------------------- DEADLINE --------------------
+class Deadline:
+    """
+    Absolute deadline for one request plus the stages it had to degrade.
+
+    ``budget_seconds=None`` never expires (background refills, CLI runs).
+    """
+
+    def __init__(self, budget_seconds: Optional[float] = FEED_BUDGET_SECONDS):
+        self.budget_seconds = budget_seconds
+        self.expires_at = time.monotonic() + budget_seconds if budget_seconds is not None else None
+        self.degraded: Dict[str, str] = {}
+
+    def remaining(self) -> float:
+        if self.expires_at is None:
+            return float('inf')
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0.0
+
+    def mark_degraded(self, stage: str, reason: str):
+        self.degraded.setdefault(stage, reason)
+
+    def merge(self, degraded: Dict[str, str]):
+        """Adopt degradations recorded by a computation this request shared."""
+        for stage, reason in degraded.items():
+            self.mark_degraded(stage, reason)
+
+    @property
+    def degraded_stages(self) -> List[str]:
+        return list(self.degraded)
+
+    def run_optional(self, stage: str, fn: Callable[..., Any], fallback: Any, *args, **kwargs) -> Any:
+        """
+        Run an optional stage if the budget allows, else return ``fallback``
+
+        Failures also fall back and are recorded as degraded.
+        """
+        # An unobserved stage costs 0, so an already spent budget needs its own check
+        if self.expired() or self.remaining() < stage_cost(stage) * SAFETY_FACTOR:
+            logger.warning(f"Skipping {stage}: {self.remaining() * 1000:.0f}ms left, "
+                           f"typically takes {stage_cost(stage) * 1000:.0f}ms")
+            self.mark_degraded(stage, 'budget')
+            _decay(stage)
+            return fallback
+
+        started = time.perf_counter()
+        try:
+            result = fn(*args, **kwargs)
+        except Exception as e:
+            logger.warning(f"{stage} not available, continuing without it: {e}")
+            self.mark_degraded(stage, 'error')
+            return fallback
+        _observe(stage, time.perf_counter() - started)
+        return result
+
+    @contextmanager
+    def activate(self):
+        """Publish this deadline to backend calls made in the current context."""
+        token = _current_deadline.set(self)
+        try:
+            yield self
+        finally:
+            _current_deadline.reset(token)
+
+
+def current_deadline() -> Optional[Deadline]:
+    """Deadline of the request being served in this context, if any."""
+    return _current_deadline.get()
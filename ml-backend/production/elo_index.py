@@ -0,0 +1,171 @@
+"""
+elo_index.py
+------------
+Purpose:
+    Maintained order-statistic index over all Elo ratings.
+    A Fenwick (binary indexed) tree over fixed-width rating buckets answers
+    global rank, percentile, min and max in O(log n) and absorbs a single
+    Elo change in O(log n), so scoring code gets stable, population-relative
+    Elo features without sorting or scanning the rating column.
+
+Integration Order:
+    Maintained BY:
+        - user_store.py (rebuilt on snapshot load, updated on Elo changes)
+    Read BY:
+        - main.py, firebase_recommender.py (via user_store.py)
+        - recommender.py (its own index over the candidates' ratings)
+"""
+
+from typing import Iterable
+
+import numpy as np
+
+from production.config_loader import load_config
+
+# -------------------- INIT --------------------
+config = load_config()
+
+ELO_CONFIG = config.get("elo", {})
+MIN_RATING = float(ELO_CONFIG.get("min_rating", 800))
+MAX_RATING = float(ELO_CONFIG.get("max_rating", 2400))
+BUCKET_WIDTH = float(ELO_CONFIG.get("bucket_width", 1))
+
+
+# -------------------- INDEX --------------------
+class EloIndex:
+    """
+    Fenwick tree of rating counts over ``[min_rating, max_rating]``.
+
+    Ratings outside the range are clamped into the edge buckets, so ranks stay
+    exact at bucket resolution and the structure has fixed memory.
+    """
+
+    def __init__(self, min_rating: float = MIN_RATING, max_rating: float = MAX_RATING,
+                 bucket_width: float = BUCKET_WIDTH):
+        self.min_rating = float(min_rating)
+        self.max_rating = float(max_rating)
+        self.bucket_width = float(bucket_width)
+        self.num_buckets = int((self.max_rating - self.min_rating) // self.bucket_width) + 1
+        self._counts = np.zeros(self.num_buckets, dtype=np.int64)
+        self._tree = np.zeros(self.num_buckets + 1, dtype=np.int64)  # 1-based
+        self._total = 0
+        self._top_bit = 1 << (self.num_buckets.bit_length() - 1)
+
+    def __len__(self) -> int:
+        return self._total
+
+    # ---------- bucketing ----------
+    def _bucket(self, rating: float) -> int:
+        bucket = int((float(rating) - self.min_rating) // self.bucket_width)
+        return min(max(bucket, 0), self.num_buckets - 1)
+
+    def _buckets(self, ratings: np.ndarray) -> np.ndarray:
+        buckets = np.floor((np.asarray(ratings, dtype=np.float64) - self.min_rating) / self.bucket_width)
+        return np.clip(buckets, 0, self.num_buckets - 1).astype(np.int64)
+
+    def _rating_of(self, bucket: int) -> float:
+        return self.min_rating + bucket * self.bucket_width
+
+    # ---------- maintenance ----------
+    def build(self, ratings: Iterable[float]):
+        """Rebuild the index from scratch in O(n + buckets)."""
+        ratings = np.asarray(list(ratings) if not isinstance(ratings, np.ndarray) else ratings,
+                             dtype=np.float64)
+        self._counts = np.bincount(self._buckets(ratings), minlength=self.num_buckets).astype(np.int64)
+        self._total = int(self._counts.sum())
+
+        # Linear-time Fenwick construction: push each node into its parent
+        tree = np.zeros(self.num_buckets + 1, dtype=np.int64)
+        tree[1:] = self._counts
+        for i in range(1, self.num_buckets + 1):
+            parent = i + (i & -i)
+            if parent <= self.num_buckets:
+                tree[parent] += tree[i]
+        self._tree = tree
+
+    def _add_bucket(self, bucket: int, delta: int):
+        self._counts[bucket] += delta
+        self._total += delta
+        i = bucket + 1
+        while i <= self.num_buckets:
+            self._tree[i] += delta
+            i += i & -i
+
+    def add(self, rating: float):
+        self._add_bucket(self._bucket(rating), 1)
+
+    def remove(self, rating: float):
+        bucket = self._bucket(rating)
+        if self._counts[bucket] > 0:
+            self._add_bucket(bucket, -1)
+
+    def update(self, old_rating: float, new_rating: float):
+        """Move one rating between buckets (one Elo change)."""
+        old_bucket, new_bucket = self._bucket(old_rating), self._bucket(new_rating)
+        if old_bucket != new_bucket and self._counts[old_bucket] > 0:
+            self._add_bucket(old_bucket, -1)
+            self._add_bucket(new_bucket, 1)
+
+    # ---------- queries ----------
+    def _prefix(self, bucket: int) -> int:
+        """Number of ratings in buckets ``[0, bucket)``."""
+        total, i = 0, bucket
+        while i > 0:
+            total += self._tree[i]
+            i -= i & -i
+        return int(total)
+
+    def _prefix_many(self, buckets: np.ndarray) -> np.ndarray:
+        """Vectorized ``_prefix`` over an array of buckets."""
+        totals = np.zeros(len(buckets), dtype=np.int64)
+        i = buckets.astype(np.int64).copy()
+        while True:
+            active = i > 0
+            if not active.any():
+                return totals
+            totals[active] += self._tree[i[active]]
+            i[active] -= i[active] & -i[active]
+
+    def count_below(self, rating: float) -> int:
+        """Number of users rated strictly below ``rating`` (at bucket resolution)."""
+        return self._prefix(self._bucket(rating))
+
+    def rank(self, rating: float) -> int:
+        """1-based rank of ``rating`` from the top (1 = highest rated)."""
+        bucket = self._bucket(rating)
+        return self._total - self._prefix(bucket + 1) + 1
+
+    def percentile(self, rating: float) -> float:
+        """Mid-rank percentile of ``rating`` in [0, 1]; 0.5 for an empty index."""
+        if self._total == 0:
+            return 0.5
+        bucket = self._bucket(rating)
+        return (self._prefix(bucket) + 0.5 * self._counts[bucket]) / self._total
+
+    def percentiles(self, ratings: Iterable[float]) -> np.ndarray:
+        """Vectorized ``percentile``, O(log n) per rating."""
+        ratings = np.asarray(ratings, dtype=np.float64)
+        if self._total == 0:
+            return np.full(len(ratings), 0.5)
+        buckets = self._buckets(ratings)
+        below = self._prefix_many(buckets)
+        return (below + 0.5 * self._counts[buckets]) / self._total
+
+    def kth(self, k: int) -> float:
+        """Rating of the k-th lowest user (1-based) via Fenwick binary lifting."""
+        if not 1 <= k <= self._total:
+            raise IndexError(f"k={k} out of range for {self._total} ratings")
+        pos, step = 0, self._top_bit
+        while step:
+            nxt = pos + step
+            if nxt <= self.num_buckets and self._tree[nxt] < k:
+                pos = nxt
+                k -= int(self._tree[nxt])
+            step >>= 1
+        return self._rating_of(pos)
+
+    def min(self) -> float:
+        return self.kth(1)
+
+    def max(self) -> float:
+        return self.kth(self._total)
@@ -18,6 +18,7 @@ from functools import lru_cache
 from production.config_loader import load_config
 from production.logger import get_logger
 from production.firebase_service import get_firebase_service
+from production.user_store import get_user_store
 
 # -------------------- INIT --------------------
 logger = get_logger(__name__)
@@ -127,32 +128,78 @@ def process_interaction_firebase(user_id: str, target_id: str, action: str):
         firebase_service.update_user_elo_score(user_id, new_user_elo)
         firebase_service.update_user_elo_score(target_id, new_target_elo)
         
+        # Keep the cached rating vector in sync for the feed's Elo stage
+        user_store = get_user_store()
+        user_store.update_elo(user_id, new_user_elo)
+        user_store.update_elo(target_id, new_target_elo)
+        
         logger.info(f"Updated Elo → {user_id}: {new_user_elo:.1f}, {target_id}: {new_target_elo:.1f}")
         
     except Exception as e:
         logger.error(f"Error updating Elo scores: {e}")
 
 
+def process_interactions_batch_firebase(user_ids, target_ids, actions) -> dict:
+    """
+    Apply the Elo updates of many interactions in one pass.
+
+    Ratings are seeded from the cached user snapshot, updated in interaction
+    order (so repeated users chain correctly), then written back once per
+    user with batch commits and through to the snapshot.
+
+    Args:
+        user_ids: Users performing the actions, in interaction order.
+        target_ids: Target users, aligned with ``user_ids``.
+        actions: Action types, aligned with ``user_ids``.
+
+    Returns:
+        user_id -> new Elo rating for every user whose rating changed.
+    """
+    try:
+        if not firebase_service.is_connected():
+            logger.error("Firebase not connected - cannot update Elo scores")
+            return {}
+
+        user_store = get_user_store()
+        unique_ids = pd.unique(pd.Series(list(user_ids) + list(target_ids), dtype=object))
+        ratings = dict(zip(unique_ids, user_store.elo_for(unique_ids).tolist()))
+
+        for user_id, target_id, action in zip(user_ids, target_ids, actions):
+            Sa, Sb = ACTION_SCORES.get(action.lower(), (0, 0))
+            ratings[user_id], ratings[target_id] = update_elo_score(ratings[user_id], ratings[target_id], Sa, Sb)
+
+        # Only users in the snapshot have a document to update
+        snapshot = user_store.snapshot()
+        known = {uid: elo for uid, elo in ratings.items()
+                 if snapshot is not None and str(uid) in snapshot.id_to_row}
+        firebase_service.update_user_elo_scores(known)
+        for uid, elo in known.items():
+            user_store.update_elo(uid, elo)
+
+        logger.info(f"Updated Elo for {len(known)} users from {len(user_ids)} interactions")
+        return known
+
+    except Exception as e:
+        logger.error(f"Error updating Elo scores in batch: {e}")
+        return {}
+
+
 def get_elo_scores_firebase() -> pd.DataFrame:
-    """Return current Elo scores for all users from Firebase."""
+    """Return current Elo scores for all users from the cached user snapshot."""
     try:
         if not firebase_service.is_connected():
             logger.error("Firebase not connected")
             return pd.DataFrame()
         
-        users_df = firebase_service.get_all_users()
-        if users_df.empty:
+        snapshot = get_user_store().snapshot()
+        if snapshot is None or "id" not in snapshot.users_df.columns:
             return pd.DataFrame()
         
-        # Ensure elo_score column exists
-        if 'elo_score' not in users_df.columns:
-            users_df['elo_score'] = 1200  # Default Elo
-        
         # Return with consistent column names
-        result_df = users_df[['id', 'elo_score']].copy()
-        result_df = result_df.rename(columns={'id': 'user_id', 'elo_score': 'elo'})
-        
-        return result_df
+        return pd.DataFrame({
+            'user_id': snapshot.users_df['id'].to_numpy(),
+            'elo': snapshot.elo.copy()
+        })
         
     except Exception as e:
         logger.error(f"Error getting Elo scores from Firebase: {e}")
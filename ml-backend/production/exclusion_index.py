@@ -0,0 +1,83 @@
+"""
+exclusion_index.py
+------------------
+Purpose:
+    In-process index of who each user has already swiped, maintained from
+    recorded interactions. Lets serving paths drop swiped candidates from
+    cached or paginated feeds without re-reading interaction history.
+
+Integration Order:
+    Updated BY:
+        - main.py (record_interaction)
+    Read BY:
+        - feed_cursor.py (skip swiped items when paging)
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, Set, Tuple
+
+from production.config_loader import load_config
+
+# -------------------- INIT --------------------
+config = load_config()
+
+MAX_USERS = int(config.get("performance", {}).get("exclusion_index_max_users", 100000))
+
+
+class ExclusionIndex:
+    """
+    user_id -> set of swiped target IDs, bounded to the most recently active users.
+    """
+
+    def __init__(self, max_users: int = MAX_USERS):
+        self.max_users = max_users
+        self._swiped: "OrderedDict[str, Set[str]]" = OrderedDict()
+        self._swipes = 0   # Total targets across all users, kept for stats()
+        self._lock = threading.Lock()
+
+    def add(self, user_id: str, target_id: str):
+        self.add_many([(user_id, target_id)])
+
+    def add_many(self, pairs: Iterable[Tuple[str, str]]):
+        """Record many (user_id, target_id) swipes under one lock acquisition."""
+        with self._lock:
+            for user_id, target_id in pairs:
+                targets = self._swiped.get(user_id)
+                if targets is None:
+                    targets = self._swiped[user_id] = set()
+                if target_id not in targets:
+                    targets.add(target_id)
+                    self._swipes += 1
+                self._swiped.move_to_end(user_id)
+            while len(self._swiped) > self.max_users:
+                _, evicted = self._swiped.popitem(last=False)
+                self._swipes -= len(evicted)
+
+    def is_excluded(self, user_id: str, target_id: str) -> bool:
+        targets = self._swiped.get(user_id)
+        return targets is not None and target_id in targets
+
+    def swiped(self, user_id: str) -> Set[str]:
+        with self._lock:
+            return set(self._swiped.get(user_id, ()))
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {'users': len(self._swiped), 'swipes': self._swipes}
+
+
+# Global exclusion index instance
+_exclusion_index = None
+
+def get_exclusion_index() -> ExclusionIndex:
+    """
+    Get the global exclusion index instance
+
+    Returns:
+        ExclusionIndex instance
+    """
+    global _exclusion_index
+    if _exclusion_index is None:
+        _exclusion_index = ExclusionIndex()
+    return _exclusion_index
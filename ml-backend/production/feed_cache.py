@@ -0,0 +1,179 @@
+"""
+feed_cache.py
+-------------
+Purpose:
+    Bounded LRU cache of ranked feeds per user. Each entry holds more
+    candidates than one page, so reopening the feed is an O(1) lookup.
+    New swipes by the user consume entries from the cached list instead of
+    invalidating it; the feed is recomputed only when the user's profile
+    changes or their Elo moves beyond a threshold.
+
+Integration Order:
+    Read/Written BY:
+        - main.py (get_user_recommendations, record_interaction)
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional
+
+from production.config_loader import load_config
+from production.logger import get_logger
+from production.user_store import get_user_store
+
+# -------------------- INIT --------------------
+logger = get_logger(__name__)
+config = load_config()
+
+PERFORMANCE_CONFIG = config.get("performance", {})
+CACHE_ENABLED = bool(PERFORMANCE_CONFIG.get("enable_caching", True))
+MAX_CACHED_USERS = int(PERFORMANCE_CONFIG.get("max_cache_size", 1000))
+POOL_SIZE = int(PERFORMANCE_CONFIG.get("feed_cache_pool_size", 100))
+ELO_THRESHOLD = float(PERFORMANCE_CONFIG.get("feed_cache_elo_threshold", 100))
+MAX_AGE_SECONDS = float(PERFORMANCE_CONFIG.get("feed_cache_ttl_seconds", 900))
+
+
+# -------------------- ENTRY --------------------
+class FeedEntry:
+    """Ranked candidates for one user plus the inputs they were computed from."""
+
+    def __init__(self, recommendations: List[Dict], profile_signature: int, user_elo: float):
+        self.recommendations = list(recommendations)
+        self.profile_signature = profile_signature
+        self.user_elo = user_elo
+        self.created_at = time.time()
+
+
+# -------------------- CACHE --------------------
+class FeedCache:
+    """
+    Per-user ranked feed cache with interaction-driven consumption.
+    """
+
+    def __init__(self, max_users: int = MAX_CACHED_USERS, max_age_seconds: float = MAX_AGE_SECONDS,
+                 elo_threshold: float = ELO_THRESHOLD, enabled: bool = CACHE_ENABLED):
+        self.max_users = max_users
+        self.max_age_seconds = max_age_seconds
+        self.elo_threshold = elo_threshold
+        self.enabled = enabled
+        self._entries: "OrderedDict[str, FeedEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'invalidations': 0, 'evictions': 0, 'consumed': 0}
+
+    def _fingerprint(self, user_id: str):
+        user_store = get_user_store()
+        return user_store.profile_signature(user_id), float(user_store.elo_for([user_id])[0])
+
+    def _is_fresh(self, entry: FeedEntry, user_id: str) -> bool:
+        if time.time() - entry.created_at > self.max_age_seconds:
+            return False
+        profile_signature, user_elo = self._fingerprint(user_id)
+        if profile_signature != entry.profile_signature:
+            return False
+        return abs(user_elo - entry.user_elo) <= self.elo_threshold
+
+    def _fresh_entry(self, user_id: str, count: int, allow_stale: bool = False) -> Optional[FeedEntry]:
+        if not self.enabled:
+            return None
+
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None:
+                self._entries.move_to_end(user_id)
+
+        if entry is None or len(entry.recommendations) < count:
+            return None
+
+        if not allow_stale and not self._is_fresh(entry, user_id):
+            self.invalidate(user_id)
+            return None
+        return entry
+
+    def get(self, user_id: str, count: int, allow_stale: bool = False) -> Optional[List[Dict]]:
+        """
+        Return the top ``count`` cached recommendations, or None on a miss
+
+        ``allow_stale`` skips the freshness checks (used while the backend is
+        unavailable and any cached feed beats none).
+        """
+        entry = self._fresh_entry(user_id, count, allow_stale)
+        if entry is None:
+            if self.enabled:
+                self._record('misses')
+            return None
+
+        self._record('hits')
+        page = entry.recommendations[:count]
+        return [dict(rec, rank=rank) for rank, rec in enumerate(page, start=1)]
+
+    def peek(self, user_id: str) -> Optional[List[Dict]]:
+        """Full cached ranked list for ``user_id`` if still valid (no hit/miss accounting)."""
+        entry = self._fresh_entry(user_id, 1)
+        return list(entry.recommendations) if entry is not None else None
+
+    def put(self, user_id: str, recommendations: List[Dict]):
+        """Cache a freshly ranked candidate list for ``user_id``."""
+        if not self.enabled or not recommendations:
+            return
+
+        profile_signature, user_elo = self._fingerprint(user_id)
+        entry = FeedEntry(recommendations, profile_signature, user_elo)
+        with self._lock:
+            self._entries[user_id] = entry
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_users:
+                self._entries.popitem(last=False)
+                self._stats['evictions'] += 1
+
+    def consume(self, user_id: str, target_id: str):
+        """Drop ``target_id`` from ``user_id``'s cached feed after a swipe."""
+        self.consume_many(user_id, (target_id,))
+
+    def consume_many(self, user_id: str, target_ids: Iterable[str]):
+        """Drop every swiped ``target_ids`` entry from ``user_id``'s cached feed in one pass."""
+        targets = set(target_ids)
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return
+            remaining = [rec for rec in entry.recommendations if rec.get('user_id') not in targets]
+            if len(remaining) != len(entry.recommendations):
+                self._stats['consumed'] += len(entry.recommendations) - len(remaining)
+                entry.recommendations = remaining
+
+    def invalidate(self, user_id: str):
+        with self._lock:
+            if self._entries.pop(user_id, None) is not None:
+                self._stats['invalidations'] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _record(self, name: str):
+        with self._lock:
+            self._stats[name] += 1
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats, users=len(self._entries))
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_ratio'] = round(stats['hits'] / lookups, 4) if lookups else 0.0
+        return stats
+
+
+# Global feed cache instance
+_feed_cache = None
+
+def get_feed_cache() -> FeedCache:
+    """
+    Get the global feed cache instance
+
+    Returns:
+        FeedCache instance
+    """
+    global _feed_cache
+    if _feed_cache is None:
+        _feed_cache = FeedCache()
+    return _feed_cache
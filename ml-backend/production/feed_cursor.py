@@ -0,0 +1,144 @@
+"""
+feed_cursor.py
+--------------
+Purpose:
+    Cursor-based pagination over server-side ranked feed snapshots.
+    The first page of a feed stores the rest of the ranked list under a
+    snapshot ID; each page returns an opaque cursor (snapshot ID + offset)
+    and the next page is a slice of the stored list in O(page size),
+    skipping anything the user swiped in the meantime.
+
+Integration Order:
+    Read/Written BY:
+        - main.py (get_recommendations_page)
+"""
+
+import base64
+import json
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from production.config_loader import load_config
+from production.exclusion_index import get_exclusion_index
+from production.logger import get_logger
+
+# -------------------- INIT --------------------
+logger = get_logger(__name__)
+config = load_config()
+
+PERFORMANCE_CONFIG = config.get("performance", {})
+CURSOR_TTL_SECONDS = float(PERFORMANCE_CONFIG.get("cursor_ttl_seconds", 600))
+MAX_SNAPSHOTS = int(PERFORMANCE_CONFIG.get("cursor_max_snapshots", 5000))
+
+
+# -------------------- CURSOR ENCODING --------------------
+def encode_cursor(snapshot_id: str, offset: int) -> str:
+    raw = json.dumps({'s': snapshot_id, 'o': offset}, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Tuple[str, int]:
+    """Return (snapshot_id, offset); raise ValueError for malformed cursors."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        snapshot_id, offset = str(data['s']), int(data['o'])
+    except Exception:
+        raise ValueError("Malformed cursor")
+    if offset < 0:
+        raise ValueError("Malformed cursor")
+    return snapshot_id, offset
+
+
+# -------------------- SNAPSHOT STORE --------------------
+class RankedSnapshot:
+    """The ranked candidate list a user is paging through."""
+
+    def __init__(self, user_id: str, recommendations: List[Dict], rank_offset: int = 0):
+        self.user_id = user_id
+        self.recommendations = recommendations
+        self.rank_offset = rank_offset
+        self.created_at = time.time()
+
+
+class CursorStore:
+    """
+    Bounded, expiring store of ranked snapshots keyed by snapshot ID.
+    """
+
+    def __init__(self, ttl_seconds: float = CURSOR_TTL_SECONDS, max_snapshots: int = MAX_SNAPSHOTS):
+        self.ttl_seconds = ttl_seconds
+        self.max_snapshots = max_snapshots
+        self._snapshots: "OrderedDict[str, RankedSnapshot]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def create(self, user_id: str, recommendations: List[Dict], rank_offset: int = 0) -> Optional[str]:
+        """
+        Store ``recommendations`` and return a cursor to their first item
+
+        Args:
+            user_id: Owner of the snapshot
+            recommendations: Ranked candidates not yet served
+            rank_offset: Number of items already served before this list
+        """
+        if not recommendations:
+            return None
+        snapshot_id = uuid.uuid4().hex
+        with self._lock:
+            self._snapshots[snapshot_id] = RankedSnapshot(user_id, recommendations, rank_offset)
+            while len(self._snapshots) > self.max_snapshots:
+                self._snapshots.popitem(last=False)
+        return encode_cursor(snapshot_id, 0)
+
+    def next_page(self, cursor: str, user_id: str, count: int) -> Tuple[List[Dict], Optional[str]]:
+        """
+        Return the page at ``cursor`` and the cursor for the page after it
+
+        Raises:
+            ValueError: malformed, expired or foreign cursor
+        """
+        snapshot_id, offset = decode_cursor(cursor)
+        with self._lock:
+            snapshot = self._snapshots.get(snapshot_id)
+        if snapshot is None or time.time() - snapshot.created_at > self.ttl_seconds:
+            raise ValueError("Cursor expired, request the first page again")
+        if snapshot.user_id != user_id:
+            raise ValueError("Cursor does not belong to this user")
+
+        exclusion_index = get_exclusion_index()
+        ranked = snapshot.recommendations
+        page, position = [], offset
+        while position < len(ranked) and len(page) < count:
+            rec = ranked[position]
+            position += 1
+            if not exclusion_index.is_excluded(user_id, rec.get('user_id')):
+                page.append(rec)
+
+        # Ranks continue from the previous pages
+        first_rank = snapshot.rank_offset + offset + 1
+        page = [dict(rec, rank=first_rank + i) for i, rec in enumerate(page)]
+        next_cursor = encode_cursor(snapshot_id, position) if position < len(ranked) else None
+        return page, next_cursor
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {'snapshots': len(self._snapshots)}
+
+
+# Global cursor store instance
+_cursor_store = None
+
+def get_cursor_store() -> CursorStore:
+    """
+    Get the global cursor store instance
+
+    Returns:
+        CursorStore instance
+    """
+    global _cursor_store
+    if _cursor_store is None:
+        _cursor_store = CursorStore()
+    return _cursor_store
@@ -0,0 +1,256 @@
+"""
+feed_scheduler.py
+-----------------
+Purpose:
+    Keeps a ready queue of the next N recommendations for each active user.
+    Queues are refilled in the background on a worker pool using the regular
+    feed pipeline (main.generate_user_feed); refill priority follows recent
+    activity, so the users swiping right now are served first. The API only
+    pops from a queue and falls back to synchronous generation on a miss.
+
+Integration Order:
+    Started BY:
+        - api_handlers.py (when performance.feed_queue_enabled is set)
+    Read/Written BY:
+        - main.py (get_user_recommendations, record_interaction)
+"""
+
+import heapq
+import itertools
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Deque, Dict, Iterable, List, Optional
+
+from production.config_loader import load_config
+from production.logger import get_logger
+
+# -------------------- INIT --------------------
+logger = get_logger(__name__)
+config = load_config()
+
+PERFORMANCE_CONFIG = config.get("performance", {})
+QUEUE_ENABLED = bool(PERFORMANCE_CONFIG.get("feed_queue_enabled", False))
+QUEUE_SIZE = int(PERFORMANCE_CONFIG.get("feed_queue_size", 30))
+LOW_WATERMARK = int(PERFORMANCE_CONFIG.get("feed_queue_low_watermark", 10))
+ACTIVE_WINDOW_SECONDS = float(PERFORMANCE_CONFIG.get("feed_queue_active_window_seconds", 1800))
+MAX_QUEUED_USERS = int(PERFORMANCE_CONFIG.get("feed_queue_max_users", 10000))
+WORKER_THREADS = int(PERFORMANCE_CONFIG.get("worker_threads", 4))
+
+# Recently served IDs per user, kept out of refills until the user swipes them
+SERVED_HISTORY = 200
+
+
+# -------------------- SCHEDULER --------------------
+class FeedScheduler:
+    """
+    Per-user ready queues refilled by a background worker pool.
+    """
+
+    def __init__(self, queue_size: int = QUEUE_SIZE, low_watermark: int = LOW_WATERMARK,
+                 workers: int = WORKER_THREADS, active_window_seconds: float = ACTIVE_WINDOW_SECONDS,
+                 max_users: int = MAX_QUEUED_USERS):
+        self.queue_size = queue_size
+        self.low_watermark = low_watermark
+        self.workers = workers
+        self.active_window_seconds = active_window_seconds
+        self.max_users = max_users
+
+        self._producer: Optional[Callable[[str, int], List[Dict]]] = None
+        self._queues: Dict[str, Deque[Dict]] = {}
+        self._served: Dict[str, Deque[str]] = {}
+        self._last_activity: Dict[str, float] = {}
+        self._pending: list = []                  # heap of (-last_activity, seq, user_id)
+        self._scheduled: Dict[str, float] = {}    # user_id -> time the refill was requested
+        self._sequence = itertools.count()
+
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._slots = threading.Semaphore(workers)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._dispatcher: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+        self._stats = {'hits': 0, 'misses': 0, 'refills': 0, 'refill_errors': 0,
+                       'last_lag_seconds': 0.0, 'max_lag_seconds': 0.0, 'total_lag_seconds': 0.0}
+
+    @property
+    def running(self) -> bool:
+        return self._dispatcher is not None and not self._stop.is_set()
+
+    # -------------------- LIFECYCLE --------------------
+    def start(self, producer: Callable[[str, int], List[Dict]]):
+        """
+        Start the dispatcher thread and worker pool
+
+        Args:
+            producer: ``producer(user_id, n)`` returning ranked recommendation dicts
+        """
+        if self.running:
+            return
+        self._producer = producer
+        self._stop.clear()
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="feed-refill")
+        self._dispatcher = threading.Thread(target=self._dispatch_loop, name="feed-scheduler", daemon=True)
+        self._dispatcher.start()
+        logger.info(f"Feed scheduler started: queue size {self.queue_size}, {self.workers} workers")
+
+    def stop(self):
+        self._stop.set()
+        with self._wakeup:
+            self._wakeup.notify_all()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+        self._dispatcher = None
+
+    # -------------------- API SIDE --------------------
+    def touch(self, user_id: str):
+        """Record activity for ``user_id`` and schedule a refill if its queue is low."""
+        with self._wakeup:
+            self._last_activity[user_id] = time.time()
+            depth = len(self._queues.get(user_id, ()))
+            if depth < self.low_watermark:
+                self._schedule_locked(user_id)
+
+    def pop(self, user_id: str, count: int) -> Optional[List[Dict]]:
+        """Take the next ``count`` queued recommendations, or None on a miss."""
+        with self._wakeup:
+            self._last_activity[user_id] = time.time()
+            queue = self._queues.get(user_id)
+            if queue is None or len(queue) < count:
+                self._stats['misses'] += 1
+                self._schedule_locked(user_id)
+                return None
+
+            page = [queue.popleft() for _ in range(count)]
+            served = self._served.setdefault(user_id, deque(maxlen=SERVED_HISTORY))
+            served.extend(rec.get('user_id') for rec in page)
+            self._stats['hits'] += 1
+            if len(queue) < self.low_watermark:
+                self._schedule_locked(user_id)
+
+        return [dict(rec, rank=rank) for rank, rec in enumerate(page, start=1)]
+
+    def peek(self, user_id: str) -> List[Dict]:
+        """Copy of the recommendations still queued for ``user_id``."""
+        with self._wakeup:
+            return list(self._queues.get(user_id, ()))
+
+    def consume(self, user_id: str, target_id: str):
+        """Drop ``target_id`` from ``user_id``'s queue after a swipe."""
+        self.consume_many(user_id, (target_id,))
+
+    def consume_many(self, user_id: str, target_ids: Iterable[str]):
+        """Drop every swiped ``target_ids`` entry from ``user_id``'s queue in one pass."""
+        targets = set(target_ids)
+        with self._wakeup:
+            queue = self._queues.get(user_id)
+            if queue:
+                self._queues[user_id] = deque(rec for rec in queue if rec.get('user_id') not in targets)
+        self.touch(user_id)
+
+    # -------------------- BACKGROUND --------------------
+    def _schedule_locked(self, user_id: str):
+        if user_id in self._scheduled:
+            return
+        self._scheduled[user_id] = time.time()
+        priority = -self._last_activity.get(user_id, 0.0)
+        heapq.heappush(self._pending, (priority, next(self._sequence), user_id))
+        self._wakeup.notify()
+
+    def _dispatch_loop(self):
+        while not self._stop.is_set():
+            with self._wakeup:
+                while not self._pending and not self._stop.is_set():
+                    self._wakeup.wait(timeout=self.active_window_seconds / 10)
+                    self._evict_idle_locked()
+                if self._stop.is_set():
+                    return
+                _, _, user_id = heapq.heappop(self._pending)
+                if user_id not in self._scheduled:
+                    continue   # Evicted while waiting
+
+            # Bound in-flight refills to the worker pool size
+            self._slots.acquire()
+            try:
+                self._executor.submit(self._refill, user_id)
+            except RuntimeError:
+                self._slots.release()
+                return
+
+    def _refill(self, user_id: str):
+        try:
+            with self._wakeup:
+                served = set(self._served.get(user_id, ()))
+            recommendations = self._producer(user_id, self.queue_size + len(served))
+            fresh = [rec for rec in recommendations if rec.get('user_id') not in served][:self.queue_size]
+
+            with self._wakeup:
+                requested_at = self._scheduled.pop(user_id, time.time())
+                if user_id not in self._last_activity:
+                    # Evicted while the refill ran; a queue stored now could never be evicted
+                    return
+                self._queues[user_id] = deque(fresh)
+                lag = time.time() - requested_at
+                self._stats['refills'] += 1
+                self._stats['last_lag_seconds'] = lag
+                self._stats['max_lag_seconds'] = max(self._stats['max_lag_seconds'], lag)
+                self._stats['total_lag_seconds'] += lag
+                self._evict_idle_locked()
+        except Exception as e:
+            logger.error(f"Feed refill failed for user {user_id}: {e}")
+            with self._wakeup:
+                self._scheduled.pop(user_id, None)
+                self._stats['refill_errors'] += 1
+        finally:
+            self._slots.release()
+
+    def _evict_idle_locked(self):
+        """Drop queues of users idle past the active window, and the oldest beyond max_users."""
+        cutoff = time.time() - self.active_window_seconds
+        idle = [uid for uid, seen in self._last_activity.items() if seen < cutoff]
+        if len(self._last_activity) - len(idle) > self.max_users:
+            by_age = sorted(self._last_activity, key=self._last_activity.get)
+            idle = by_age[:len(self._last_activity) - self.max_users]
+        for user_id in idle:
+            self._last_activity.pop(user_id, None)
+            self._queues.pop(user_id, None)
+            self._served.pop(user_id, None)
+            self._scheduled.pop(user_id, None)
+
+    # -------------------- STATS --------------------
+    def stats(self) -> Dict:
+        """Queue depths, hit counts and refill lag"""
+        with self._wakeup:
+            depths = [len(q) for q in self._queues.values()]
+            stats = dict(self._stats)
+            stats.update({
+                'running': self.running,
+                'users': len(depths),
+                'queued_total': sum(depths),
+                'min_depth': min(depths) if depths else 0,
+                'avg_depth': round(sum(depths) / len(depths), 2) if depths else 0.0,
+                'pending_refills': len(self._scheduled),
+                'oldest_pending_seconds': round(time.time() - min(self._scheduled.values()), 3)
+                if self._scheduled else 0.0,
+            })
+        stats['avg_lag_seconds'] = round(stats.pop('total_lag_seconds') / stats['refills'], 4) \
+            if stats['refills'] else 0.0
+        return stats
+
+
+# Global feed scheduler instance
+_feed_scheduler = None
+
+def get_feed_scheduler() -> FeedScheduler:
+    """
+    Get the global feed scheduler instance
+
+    Returns:
+        FeedScheduler instance
+    """
+    global _feed_scheduler
+    if _feed_scheduler is None:
+        _feed_scheduler = FeedScheduler()
+    return _feed_scheduler
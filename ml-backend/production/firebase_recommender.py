@@ -8,6 +8,7 @@ import numpy as np
 from typing import List, Dict
 from production.logger import get_logger
 from production.config_loader import load_config
+from production.user_store import get_user_store
 
 logger = get_logger(__name__)
 config = load_config()
@@ -33,12 +34,17 @@ def get_recommendations_from_firebase(user_id: str, candidates_df: pd.DataFrame,
         
         recommendations = []
         
-        for _, candidate in candidates_df.iterrows():
+        # Population percentiles of all candidates in one index lookup
+        elo_scores = candidates_df['elo_score'].fillna(1200) if 'elo_score' in candidates_df.columns \
+            else pd.Series(1200, index=candidates_df.index)
+        elo_percentiles = get_user_store().elo_percentiles(elo_scores)
+        
+        for (_, candidate), elo_percentile in zip(candidates_df.iterrows(), elo_percentiles):
             if candidate['user_id'] == user_id:
                 continue
                 
             # Calculate recommendation score
-            score = calculate_compatibility_score(current_user, candidate)
+            score = calculate_compatibility_score(current_user, candidate, elo_percentile)
             
             recommendation = {
                 'user_id': candidate['user_id'],
@@ -62,13 +68,15 @@ def get_recommendations_from_firebase(user_id: str, candidates_df: pd.DataFrame,
         logger.error(f"Error generating recommendations: {e}")
         return []
 
-def calculate_compatibility_score(current_user: pd.Series, candidate: pd.Series) -> float:
+def calculate_compatibility_score(current_user: pd.Series, candidate: pd.Series,
+                                  elo_percentile: float = 0.5) -> float:
     """
     Calculate compatibility score between two users
     
     Args:
         current_user: Current user data
         candidate: Candidate user data
+        elo_percentile: Candidate's Elo percentile in the user population
     
     Returns:
         Compatibility score (0-100)
@@ -76,8 +84,8 @@ def calculate_compatibility_score(current_user: pd.Series, candidate: pd.Series)
     try:
         score = 0.0
         
-        # Base score from Elo rating
-        elo_score = candidate.get('elo_score', 1200) / 1200.0 * 30  # Max 30 points from Elo
+        # Base score from Elo rating, relative to the whole user population
+        elo_score = elo_percentile * 30  # Max 30 points from Elo
         score += elo_score
         
         # Age compatibility (prefer similar ages)
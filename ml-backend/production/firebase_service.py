@@ -10,36 +10,26 @@ import firebase_admin
 from firebase_admin import credentials, firestore
 import pandas as pd
 from datetime import datetime, timedelta
-import logging
 from typing import Dict, List, Optional, Any
 import os
 import json
 
-class FirebaseService:
+from production.circuit_breaker import CircuitOpenError
+from production.firestore_decode import SWIPE_SCHEMA, USER_SCHEMA, decode_snapshots
+from production.storage_backend import ML_VERSION, StorageBackend, create_storage_backend
+
+class FirebaseService(StorageBackend):
     """
     Handles all Firebase operations for the ML backend
     """
     
+    name = 'firestore'
+    
     def __init__(self):
+        super().__init__()
         self.db = None
-        self.connected = False
-        self.logger = logging.getLogger(__name__)
+        self._last_users: Optional[pd.DataFrame] = None
     
-    def _clean_data(self, data):
-        """Clean data for JSON serialization, handling pandas NaT and other issues"""
-        if isinstance(data, dict):
-            return {k: self._clean_data(v) for k, v in data.items()}
-        elif isinstance(data, list):
-            return [self._clean_data(item) for item in data]
-        elif pd.isna(data):
-            return None
-        elif isinstance(data, pd.Timestamp):
-            return data.isoformat() if not pd.isna(data) else None
-        elif isinstance(data, datetime):
-            return data.isoformat()
-        else:
-            return data
-        
     def initialize(self, service_account_path: Optional[str] = None):
         """
         Initialize Firebase connection
@@ -68,10 +58,40 @@ class FirebaseService:
             self.connected = False
             return False
     
+    def _rpc_timeout(self) -> Optional[float]:
+        """RPC timeout capped at the remaining budget of the request being served"""
+        from production.deadline import current_deadline
+        deadline = current_deadline()
+        if deadline is None or deadline.budget_seconds is None:
+            return None
+        return max(0.05, deadline.remaining())
+    
     def is_connected(self) -> bool:
         """Check if Firebase is connected"""
         return self.connected and self.db is not None
     
+    def _remember_users(self, df: pd.DataFrame):
+        if not df.empty:
+            self._last_users = df
+    
+    def _stale_users(self) -> pd.DataFrame:
+        """Last users collection read successfully (empty if none yet)"""
+        if self._last_users is None:
+            return pd.DataFrame()
+        self._count('stale_reads')
+        return self._last_users.copy()
+    
+    def _stale_user(self, user_id: str) -> Optional[Dict]:
+        """User document from the last good users read, if present"""
+        users = self._last_users
+        if users is None or 'id' not in users.columns:
+            return None
+        rows = users[users['id'] == user_id]
+        if rows.empty:
+            return None
+        self._count('stale_reads')
+        return rows.iloc[0].to_dict()
+    
     def get_all_users(self) -> pd.DataFrame:
         """
         Get all users from Firebase
@@ -83,24 +103,46 @@ class FirebaseService:
             if not self.is_connected():
                 raise Exception("Firebase not connected")
             
-            users_ref = self.db.collection('users')
-            docs = users_ref.stream()
-            
-            users_data = []
-            for doc in docs:
-                user_data = doc.to_dict()
-                user_data['id'] = doc.id
-                # Clean data to handle NaT and other serialization issues
-                user_data = self._clean_data(user_data)
-                users_data.append(user_data)
+            def read_users():
+                users_ref = self.db.collection('users')
+                docs = users_ref.stream(timeout=self._rpc_timeout())
+                return list(docs)
             
-            df = pd.DataFrame(users_data)
+            # Only the fields the recommender reads, converted column by column
+            df = decode_snapshots(self._rpc('get_all_users', read_users), USER_SCHEMA)
+            self._count('reads')
+            self._count('documents_read', len(df))
+            self._remember_users(df)
             self.logger.info(f"Retrieved {len(df)} users from Firebase")
             return df
             
+        except CircuitOpenError:
+            return self._stale_users()
         except Exception as e:
+            self._count('errors')
             self.logger.error(f"Error getting users: {e}")
-            return pd.DataFrame()
+            return self._stale_users()
+    
+    def ping(self, timeout: float = 2.0) -> bool:
+        """
+        Deep connectivity check: read at most one user document
+        
+        Args:
+            timeout: RPC timeout in seconds
+            
+        Returns:
+            True if Firestore answered within the timeout
+        """
+        if not self.is_connected():
+            return False
+        try:
+            self.db.collection('users').limit(1).get(timeout=timeout)
+            self._count('reads')
+            return True
+        except Exception as e:
+            self._count('errors')
+            self.logger.error(f"Firebase ping failed: {e}")
+            return False
     
     def get_user_by_id(self, user_id: str) -> Optional[Dict]:
         """
@@ -117,18 +159,23 @@ class FirebaseService:
                 return None
             
             user_ref = self.db.collection('users').document(user_id)
-            doc = user_ref.get()
+            doc = self._rpc('get_user_by_id', lambda: user_ref.get(timeout=self._rpc_timeout()), hedge=True)
+            self._count('reads')
             
             if doc.exists:
+                self._count('documents_read')
                 user_data = doc.to_dict()
                 user_data['id'] = doc.id
                 return user_data
             else:
                 return None
                 
+        except CircuitOpenError:
+            return self._stale_user(user_id)
         except Exception as e:
+            self._count('errors')
             self.logger.error(f"Error getting user {user_id}: {e}")
-            return None
+            return self._stale_user(user_id)
     
     def get_swipe_data(self, days_back: int = 30) -> pd.DataFrame:
         """
@@ -148,19 +195,20 @@ class FirebaseService:
             
             swipes_ref = self.db.collection('swipes')
             query = swipes_ref.where('timestamp', '>=', cutoff_date)
-            docs = query.stream()
             
-            swipes_data = []
-            for doc in docs:
-                swipe_data = doc.to_dict()
-                swipe_data['id'] = doc.id
-                swipes_data.append(swipe_data)
+            def read_swipes():
+                return list(query.stream(timeout=self._rpc_timeout()))
             
-            df = pd.DataFrame(swipes_data)
+            df = decode_snapshots(self._rpc('get_swipe_data', read_swipes), SWIPE_SCHEMA)
+            self._count('reads')
+            self._count('documents_read', len(df))
             self.logger.info(f"Retrieved {len(df)} swipes from last {days_back} days")
             return df
             
+        except CircuitOpenError:
+            return pd.DataFrame()
         except Exception as e:
+            self._count('errors')
             self.logger.error(f"Error getting swipe data: {e}")
             return pd.DataFrame()
     
@@ -183,22 +231,55 @@ class FirebaseService:
             
             interactions_ref = self.db.collection('interactions')
             query = interactions_ref.where('user_id', '==', user_id).where('timestamp', '>=', cutoff_date)
-            docs = query.stream()
             
-            interactions_data = []
-            for doc in docs:
-                interaction_data = doc.to_dict()
-                interaction_data['id'] = doc.id
-                interactions_data.append(interaction_data)
+            def read_interactions():
+                return list(query.stream(timeout=self._rpc_timeout()))
             
-            df = pd.DataFrame(interactions_data)
+            df = decode_snapshots(self._rpc('get_user_interactions', read_interactions, hedge=True), SWIPE_SCHEMA)
+            self._count('reads')
+            self._count('documents_read', len(df))
             self.logger.info(f"Retrieved {len(df)} interactions for user {user_id}")
             return df
             
+        except CircuitOpenError:
+            return pd.DataFrame()
         except Exception as e:
+            self._count('errors')
             self.logger.error(f"Error getting user interactions: {e}")
             return pd.DataFrame()
     
+    def save_users(self, users: List[Dict[str, Any]]) -> int:
+        """
+        Create or replace user documents with chunked batch commits
+        
+        Args:
+            users: User dicts; ``id`` becomes the document ID
+            
+        Returns:
+            Number of users written
+        """
+        if not self.is_connected() or not users:
+            return 0
+        
+        users_ref = self.db.collection('users')
+        chunk_size = self._batch_size()
+        written = 0
+        
+        for start in range(0, len(users), chunk_size):
+            chunk = users[start:start + chunk_size]
+            try:
+                writes = [(users_ref.document(str(user['id'])), {k: v for k, v in user.items() if k != 'id'})
+                          for user in chunk]
+                self._rpc('save_users', lambda: self._commit_sets(writes))
+                self._count('writes', len(chunk))
+                written += len(chunk)
+            except CircuitOpenError:
+                self.logger.warning(f"Not committing user batch at offset {start}: Firestore circuit open")
+            except Exception as e:
+                self._count('errors')
+                self.logger.error(f"Error committing user batch at offset {start}: {e}")
+        return written
+    
     def save_interaction(self, user_id: str, target_id: str, action: str) -> bool:
         """
         Save user interaction to Firebase
@@ -220,43 +301,133 @@ class FirebaseService:
                 'target_id': target_id,
                 'action': action,
                 'timestamp': datetime.now(),
-                'ml_version': '2.0.0'
+                'ml_version': ML_VERSION
             }
             
-            # Save to interactions collection
-            interactions_ref = self.db.collection('interactions')
-            interactions_ref.add(interaction_data)
-            
+            # Document IDs are chosen up front so a retried write overwrites
+            # rather than duplicates (add() would mint a new ID per attempt)
+            interaction_doc = self.db.collection('interactions').document()
             # Also save to swipes collection for compatibility
-            swipes_ref = self.db.collection('swipes')
-            swipes_ref.add(interaction_data)
+            swipe_doc = self.db.collection('swipes').document()
+            
+            def write_interaction():
+                interaction_doc.set(interaction_data)
+                swipe_doc.set(interaction_data)
+            
+            self._rpc('save_interaction', write_interaction)
+            self._count('writes', 2)
+            self._count('interactions_saved')
             
             self.logger.info(f"Saved interaction: {user_id} -> {target_id} ({action})")
             return True
             
+        except CircuitOpenError:
+            self.logger.warning(f"Not saving interaction {user_id} -> {target_id}: Firestore circuit open")
+            return False
         except Exception as e:
+            self._count('errors')
             self.logger.error(f"Error saving interaction: {e}")
             return False
     
-    def get_user_elo_score(self, user_id: str) -> int:
+    def _batch_size(self) -> int:
+        return int(_firebase_config().get('batch_size', 500))
+    
+    def save_interactions_batch(self, interactions: List[Dict[str, Any]]) -> List[bool]:
         """
-        Get user's Elo rating score
+        Save many interactions with chunked batch commits
+        
+        Each interaction is written to both the interactions and swipes
+        collections, so one commit carries batch_size / 2 interactions.
         
         Args:
-            user_id: User ID
+            interactions: Dicts with user_id, target_id, action and optional timestamp
             
         Returns:
-            Elo score (default 1200 if not found)
+            Per-interaction success flags (a failed commit fails its whole chunk)
         """
-        try:
-            user_data = self.get_user_by_id(user_id)
-            if user_data:
-                return user_data.get('elo_score', 1200)
-            return 1200
+        results = [False] * len(interactions)
+        if not self.is_connected() or not interactions:
+            return results
+        
+        chunk_size = max(1, self._batch_size() // 2)
+        interactions_ref = self.db.collection('interactions')
+        swipes_ref = self.db.collection('swipes')
+        now = datetime.now()
+        
+        for start in range(0, len(interactions), chunk_size):
+            chunk = interactions[start:start + chunk_size]
+            try:
+                writes = []
+                for item in chunk:
+                    interaction_data = {
+                        'user_id': item['user_id'],
+                        'target_id': item['target_id'],
+                        'action': item['action'],
+                        'timestamp': item.get('timestamp') or now,
+                        'ml_version': ML_VERSION
+                    }
+                    writes.append((interactions_ref.document(), interaction_data))
+                    writes.append((swipes_ref.document(), interaction_data))
+                self._rpc('save_interactions_batch', lambda: self._commit_sets(writes))
+                self._count('writes', 2 * len(chunk))
+                self._count('interactions_saved', len(chunk))
+                results[start:start + len(chunk)] = [True] * len(chunk)
+            except CircuitOpenError:
+                self.logger.warning(f"Not committing interaction batch at offset {start}: Firestore circuit open")
+            except Exception as e:
+                self._count('errors')
+                self.logger.error(f"Error committing interaction batch at offset {start}: {e}")
+        
+        self.logger.info(f"Saved {sum(results)}/{len(interactions)} interactions in batches of {chunk_size}")
+        return results
+    
+    def _commit_sets(self, writes: List[tuple]):
+        """Commit (document, data) sets as one batch; rebuilt per attempt"""
+        batch = self.db.batch()
+        for doc_ref, data in writes:
+            batch.set(doc_ref, data)
+        batch.commit()
+    
+    def _commit_updates(self, updates: List[tuple]):
+        """Commit (document, fields) updates as one batch; rebuilt per attempt"""
+        batch = self.db.batch()
+        for doc_ref, fields in updates:
+            batch.update(doc_ref, fields)
+        batch.commit()
+    
+    def update_user_elo_scores(self, scores: Dict[str, float]) -> bool:
+        """
+        Update many users' Elo scores with chunked batch commits
+        
+        Args:
+            scores: user_id -> new Elo score
             
-        except Exception as e:
-            self.logger.error(f"Error getting Elo score for {user_id}: {e}")
-            return 1200
+        Returns:
+            True if every chunk committed, False otherwise
+        """
+        if not self.is_connected():
+            return False
+        
+        items = list(scores.items())
+        chunk_size = self._batch_size()
+        users_ref = self.db.collection('users')
+        now = datetime.now()
+        ok = True
+        
+        for start in range(0, len(items), chunk_size):
+            try:
+                chunk = items[start:start + chunk_size]
+                self._rpc('update_user_elo_scores', lambda: self._commit_updates(
+                    [(users_ref.document(user_id), {'elo_score': new_score, 'elo_updated': now})
+                     for user_id, new_score in chunk]))
+                self._count('writes', len(items[start:start + chunk_size]))
+            except CircuitOpenError:
+                ok = False
+            except Exception as e:
+                self._count('errors')
+                self.logger.error(f"Error committing Elo batch at offset {start}: {e}")
+                ok = False
+        return ok
     
     def update_user_elo_score(self, user_id: str, new_score: int) -> bool:
         """
@@ -274,92 +445,52 @@ class FirebaseService:
                 return False
             
             user_ref = self.db.collection('users').document(user_id)
-            user_ref.update({
+            fields = {
                 'elo_score': new_score,
                 'elo_updated': datetime.now()
-            })
+            }
+            self._rpc('update_user_elo_score', lambda: user_ref.update(fields))
+            self._count('writes')
             
             self.logger.info(f"Updated Elo score for {user_id}: {new_score}")
             return True
             
+        except CircuitOpenError:
+            return False
         except Exception as e:
+            self._count('errors')
             self.logger.error(f"Error updating Elo score: {e}")
             return False
-    
-    def get_potential_matches(self, user_id: str, limit: int = 50) -> pd.DataFrame:
-        """
-        Get potential matches for a user (excluding already swiped users)
-        
-        Args:
-            user_id: User ID
-            limit: Maximum number of matches to return
-            
-        Returns:
-            DataFrame with potential matches
-        """
-        try:
-            if not self.is_connected():
-                raise Exception("Firebase not connected")
-            
-            # Get user's own data first
-            user_data = self.get_user_by_id(user_id)
-            if not user_data:
-                return pd.DataFrame()
-            
-            # Get all users except self
-            all_users_df = self.get_all_users()
-            potential_matches = all_users_df[all_users_df['id'] != user_id].copy()
-            
-            # Filter by gender preferences
-            user_looking_for = user_data.get('looking_for', [])
-            user_gender = user_data.get('gender', '')
-            
-            if user_looking_for:
-                potential_matches = potential_matches[
-                    potential_matches['gender'].isin(user_looking_for)
-                ]
-            
-            # Filter out users who don't want this user's gender
-            if user_gender:
-                potential_matches = potential_matches[
-                    potential_matches['looking_for'].apply(
-                        lambda x: isinstance(x, list) and user_gender in x
-                    )
-                ]
-            
-            # Get user's interaction history to exclude already swiped users
-            interactions_df = self.get_user_interactions(user_id, days_back=365)  # Last year
-            if not interactions_df.empty:
-                swiped_user_ids = set(interactions_df['target_id'].tolist())
-                potential_matches = potential_matches[
-                    ~potential_matches['id'].isin(swiped_user_ids)
-                ]
-            
-            # Limit results
-            potential_matches = potential_matches.head(limit)
-            
-            self.logger.info(f"Found {len(potential_matches)} potential matches for {user_id}")
-            return potential_matches
-            
-        except Exception as e:
-            self.logger.error(f"Error getting potential matches: {e}")
-            return pd.DataFrame()
 
 # Global Firebase service instance
 _firebase_service = None
 
-def get_firebase_service() -> FirebaseService:
+def get_firebase_service() -> StorageBackend:
     """
-    Get the global Firebase service instance
+    Get the global storage backend instance
+    
+    Firestore unless ``storage.backend`` / ``PATRA_STORAGE_BACKEND`` selects
+    the in-memory or SQLite backend.
     
     Returns:
-        FirebaseService instance
+        StorageBackend instance
     """
     global _firebase_service
     if _firebase_service is None:
-        _firebase_service = FirebaseService()
+        _firebase_service = create_storage_backend()
     return _firebase_service
 
+def _firebase_config() -> Dict:
+    from production.config_loader import load_config
+    return load_config().get('firebase', {}) or {}
+
+def _use_async_reads() -> bool:
+    """Whether to serve reads through the asyncio-based service"""
+    env_value = os.getenv('PATRA_ASYNC_FIRESTORE')
+    if env_value is not None:
+        return env_value.lower() in ('1', 'true', 'yes')
+    return bool(_firebase_config().get('async_reads', False))
+
 def initialize_firebase_service(service_account_path: Optional[str] = None) -> bool:
     """
     Initialize the global Firebase service
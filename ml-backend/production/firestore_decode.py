@@ -0,0 +1,142 @@
+"""
+firestore_decode.py
+-------------------
+Purpose:
+    Schema-driven decoding of user and swipe documents into DataFrames.
+    Each schema lists the fields the recommender reads and their kind. One
+    list per schema field is gathered from the documents and then converted
+    as a whole (numbers, timestamps, lists, text), instead of walking and
+    checking every value of every document.
+
+    Fields outside the schema (photoUrls, prompts, device tokens, ...) never
+    reach the DataFrame, and free text is cut to ``decode_max_text_chars``.
+    Extra user fields can be kept with ``firebase.decode_extra_user_fields``.
+
+Integration Order:
+    Used BY:
+        - firebase_service.py / async_firebase_service.py (users, swipes, interactions)
+        - memory_backend.py / sqlite_backend.py (users)
+"""
+
+from datetime import datetime
+from typing import Any, Callable, Dict, List
+
+import pandas as pd
+
+from production.config_loader import load_config
+from production.storage_backend import naive_timestamp
+
+# -------------------- INIT --------------------
+config = load_config()
+
+FIREBASE_CONFIG = config.get("firebase", {}) or {}
+MAX_TEXT_CHARS = int(FIREBASE_CONFIG.get("decode_max_text_chars", 500))
+
+# Field -> kind: str (short string), text (free text, truncated), number,
+# list (missing -> []), timestamp (naive local datetime64), value (as stored)
+USER_SCHEMA: Dict[str, str] = {
+    'uid': 'str',
+    'name': 'str',
+    'username': 'str',
+    'age': 'number',
+    'gender': 'str',
+    'genderPreference': 'str',
+    'looking_for': 'list',
+    'ageMin': 'number',
+    'ageMax': 'number',
+    'interests': 'list',
+    'location': 'value',
+    'bio': 'text',
+    'elo_score': 'number',
+    'elo_updated': 'timestamp',
+}
+USER_SCHEMA.update({field: 'value' for field in FIREBASE_CONFIG.get("decode_extra_user_fields") or []
+                    if field not in USER_SCHEMA})
+
+SWIPE_SCHEMA: Dict[str, str] = {
+    'user_id': 'str',
+    'target_id': 'str',
+    'target_user_id': 'str',   # Written by older app versions
+    'userId': 'str',           # Written by the Flutter app (read by data_match_firebase.get_top_matches)
+    'targetUserId': 'str',
+    'isLike': 'value',
+    'action': 'str',
+    'timestamp': 'timestamp',
+    'ml_version': 'str',
+}
+
+
+# -------------------- COLUMN CONVERTERS --------------------
+def _as_is(values: List[Any]) -> List[Any]:
+    return values
+
+
+def _numbers(values: List[Any]) -> pd.Series:
+    return pd.to_numeric(pd.Series(values, dtype=object), errors='coerce')
+
+
+def _lists(values: List[Any]) -> List[Any]:
+    # Strings are kept: interests may be stored as "a, b, c" (see batch_match._split_interests)
+    return [v if v.__class__ is list or isinstance(v, str) else list(v) if isinstance(v, tuple) else []
+            for v in values]
+
+
+def _text(values: List[Any]) -> List[Any]:
+    limit = MAX_TEXT_CHARS
+    return [v[:limit] if isinstance(v, str) and len(v) > limit else v for v in values]
+
+
+def _naive_or_none(value: Any) -> Any:
+    try:
+        return None if value is None else naive_timestamp(value)
+    except (TypeError, ValueError, AttributeError):
+        return None
+
+
+def _timestamps(values: List[Any]) -> pd.Series:
+    """Naive local datetimes; Firestore returns tz-aware UTC, local backends naive or ISO strings"""
+    series = pd.Series(values, dtype=object)
+    try:
+        converted = pd.to_datetime(series, format='ISO8601')
+    except (TypeError, ValueError):
+        # Mixed tz-aware and naive values, or unparseable ones: convert one by one
+        return pd.to_datetime(series.map(_naive_or_none))
+    if getattr(converted.dt, 'tz', None) is not None:
+        converted = converted.dt.tz_convert(datetime.now().astimezone().tzinfo).dt.tz_localize(None)
+    return converted
+
+
+CONVERTERS: Dict[str, Callable[[List[Any]], Any]] = {
+    'str': _as_is,
+    'value': _as_is,
+    'text': _text,
+    'number': _numbers,
+    'list': _lists,
+    'timestamp': _timestamps,
+}
+
+
+# -------------------- DECODING --------------------
+def decode_documents(ids: List[str], docs: List[Dict[str, Any]], schema: Dict[str, str]) -> pd.DataFrame:
+    """
+    Decode documents (``docs[i]`` has id ``ids[i]``) into a DataFrame with an ``id`` column
+
+    Only schema fields are kept; a field that no document has gets no column.
+    """
+    data: Dict[str, Any] = {'id': ids}
+    for field, kind in schema.items():
+        values = [doc.get(field) for doc in docs]
+        if values.count(None) == len(values):
+            continue
+        data[field] = CONVERTERS[kind](values)
+    return pd.DataFrame(data)
+
+
+def decode_users(ids: List[str], docs: List[Dict[str, Any]]) -> pd.DataFrame:
+    """Users DataFrame for the scoring path (USER_SCHEMA fields plus ``id``)"""
+    return decode_documents(ids, docs, USER_SCHEMA)
+
+
+def decode_snapshots(snapshots: List[Any], schema: Dict[str, str]) -> pd.DataFrame:
+    """Decode Firestore document snapshots (``.id`` / ``.to_dict()``)"""
+    return decode_documents([doc.id for doc in snapshots], [doc.to_dict() for doc in snapshots], schema)
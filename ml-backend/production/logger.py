@@ -3,18 +3,210 @@ production/logger.py
 --------------------
 Centralized logging for Patra ML backend.
 Supports console logging and optional file logging with configurable levels.
+
+Optional modes (``logging`` in settings.yaml):
+- format: json - one JSON object per record, including the request id
+- async - records are queued; a background thread formats and writes them,
+  so request threads never block on the console or file
+- sampling - INFO/DEBUG records from one call site beyond ``burst`` per
+  window are thinned to 1 in ``every``; WARNING and above are always kept
+
+Servers bind a request id per request (bind_request_id); it is attached to
+every record logged while handling that request.
 """
 
+import atexit
+import json
 import logging
+import logging.handlers
+import queue
+import threading
+import time
+import uuid
+from contextvars import ContextVar, Token
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
 from production.config_loader import load_config
 
 config = load_config()
 
+LOGGING_CONFIG = config.get("logging", {}) or {}
+LEVEL = getattr(logging, str(LOGGING_CONFIG.get("level", "INFO")).upper(), logging.INFO)
+LOG_FORMAT = str(LOGGING_CONFIG.get("format", "text")).lower()
+ASYNC = bool(LOGGING_CONFIG.get("async", False))
+QUEUE_SIZE = int(LOGGING_CONFIG.get("queue_size", 10000))
+SAMPLING_CONFIG = LOGGING_CONFIG.get("sampling", {}) or {}
+
+TEXT_FORMAT = "[%(asctime)s] [%(levelname)s] %(name)s%(request_tag)s: %(message)s"
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+_request_id: ContextVar[Optional[str]] = ContextVar("patra_request_id", default=None)
+
+
+# -------------------- REQUEST IDS --------------------
+def new_request_id(incoming: Optional[str] = None) -> str:
+    """The caller's X-Request-ID if it looks sane, else a fresh random id"""
+    if incoming and len(incoming) <= 64 and incoming.isprintable() and ' ' not in incoming:
+        return incoming
+    return uuid.uuid4().hex[:16]
+
+
+def bind_request_id(request_id: str) -> Token:
+    """Attach ``request_id`` to records logged in this context; undo with reset_request_id(token)"""
+    return _request_id.set(request_id)
+
+
+def reset_request_id(token: Token):
+    _request_id.reset(token)
+
+
+def current_request_id() -> Optional[str]:
+    return _request_id.get()
+
+
+# -------------------- FILTERS & FORMATTERS --------------------
+class RequestIdFilter(logging.Filter):
+    """Stamps the bound request id on each record (in the logging thread, before any queue)"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        request_id = _request_id.get()
+        record.request_id = request_id
+        record.request_tag = f" [{request_id}]" if request_id else ""
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Bounds INFO/DEBUG volume per call site (logger name and line)
+
+    Within each ``window_seconds`` the first ``burst`` records of a call site
+    pass, then 1 in ``every``. Kept records past the burst carry
+    ``sample_rate`` so totals can be scaled back up.
+    """
+
+    def __init__(self, window_seconds: float = 1.0, burst: int = 20, every: int = 100):
+        super().__init__()
+        self.window_seconds = window_seconds
+        self.burst = burst
+        self.every = max(1, every)
+        self.sampled_out = 0
+        self._windows: Dict[tuple, List] = {}   # call site -> [window start, records seen]
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        key = (record.name, record.lineno)
+        now = time.monotonic()
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None or now - window[0] >= self.window_seconds:
+                window = self._windows[key] = [now, 0]
+            window[1] += 1
+            seen = window[1]
+            if seen > self.burst and (seen - self.burst) % self.every:
+                self.sampled_out += 1
+                return False
+        if seen > self.burst:
+            record.sample_rate = self.every
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'request_id': getattr(record, 'request_id', None),
+            'thread': record.threadName,
+        }
+        if getattr(record, 'sample_rate', None):
+            entry['sample_rate'] = record.sample_rate
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class _DroppingQueueHandler(logging.handlers.QueueHandler):
+    """Queue handler that leaves all formatting to the listener and drops (and counts) on overflow"""
+
+    def __init__(self, record_queue: queue.Queue):
+        super().__init__(record_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        if record.args:
+            # Render now: the arguments may change before the listener gets to them
+            record.msg = record.getMessage()
+            record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+# -------------------- SETUP --------------------
+_setup_lock = threading.Lock()
+_front_handlers: Optional[List[logging.Handler]] = None
+_filters: List[logging.Filter] = []
+_queue_handler: Optional[_DroppingQueueHandler] = None
+_sampling_filter: Optional[SamplingFilter] = None
+
+
+def _setup() -> List[logging.Handler]:
+    """Build the shared handlers once: console (+ file), behind a queue in async mode"""
+    global _front_handlers, _queue_handler, _sampling_filter
+    with _setup_lock:
+        if _front_handlers is not None:
+            return _front_handlers
+
+        formatter = JsonFormatter() if LOG_FORMAT == 'json' else logging.Formatter(TEXT_FORMAT, datefmt=DATE_FORMAT)
+        handlers: List[logging.Handler] = [logging.StreamHandler()]
+        log_file = LOGGING_CONFIG.get("file")
+        if log_file:
+            handlers.append(logging.FileHandler(log_file))
+        for handler in handlers:
+            handler.setLevel(LEVEL)
+            handler.setFormatter(formatter)
+
+        _filters.append(RequestIdFilter())
+        if SAMPLING_CONFIG.get("enabled", False):
+            _sampling_filter = SamplingFilter(float(SAMPLING_CONFIG.get("window_seconds", 1)),
+                                              int(SAMPLING_CONFIG.get("burst", 20)),
+                                              int(SAMPLING_CONFIG.get("every", 100)))
+            _filters.append(_sampling_filter)
+
+        if ASYNC:
+            _queue_handler = _DroppingQueueHandler(queue.Queue(QUEUE_SIZE))
+            listener = logging.handlers.QueueListener(_queue_handler.queue, *handlers, respect_handler_level=True)
+            listener.start()
+            atexit.register(listener.stop)   # Flush what is still queued on shutdown
+            handlers = [_queue_handler]
+        _front_handlers = handlers
+        return _front_handlers
+
+
+def log_stats() -> Dict[str, int]:
+    """Records sampled out, dropped on a full queue, and waiting in the queue"""
+    return {
+        'sampled_out': _sampling_filter.sampled_out if _sampling_filter else 0,
+        'dropped': _queue_handler.dropped if _queue_handler else 0,
+        'queued': _queue_handler.queue.qsize() if _queue_handler else 0,
+    }
+
 
 def get_logger(name: str) -> logging.Logger:
     """
     Create a logger with console and optional file handlers.
-    
+
     Args:
         name: Logger name, usually __name__ from the calling module.
 
@@ -23,29 +215,16 @@ def get_logger(name: str) -> logging.Logger:
     """
     logger = logging.getLogger(name)
 
-    if logger.hasHandlers():
+    if logger.handlers:
         # Avoid adding multiple handlers if logger is reused
         return logger
 
-    # Logging level
-    level_str = config.get("logging", {}).get("level", "INFO")
-    level = getattr(logging, level_str.upper(), logging.INFO)
-    logger.setLevel(level)
-
-    # Console handler
-    ch = logging.StreamHandler()
-    ch.setLevel(level)
-    ch_formatter = logging.Formatter("[%(asctime)s] [%(levelname)s] %(name)s: %(message)s",
-                                     datefmt="%Y-%m-%d %H:%M:%S")
-    ch.setFormatter(ch_formatter)
-    logger.addHandler(ch)
-
-    # Optional file handler
-    log_file = config.get("logging", {}).get("file")
-    if log_file:
-        fh = logging.FileHandler(log_file)
-        fh.setLevel(level)
-        fh.setFormatter(ch_formatter)
-        logger.addHandler(fh)
+    logger.setLevel(LEVEL)
+    for handler in _setup():
+        logger.addHandler(handler)
+    for log_filter in _filters:
+        logger.addFilter(log_filter)
+    # Written by the handlers above; a root handler (e.g. basicConfig) would print it twice
+    logger.propagate = False
 
     return logger
@@ -9,18 +9,36 @@ Purpose:
 
 import argparse
 import pandas as pd
-from typing import Optional, List, Dict
+from typing import Optional, List, Dict, Tuple, Iterable, Iterator
 
 from production.logger import get_logger
 from production.firebase_service import get_firebase_service, initialize_firebase_service
 from production.data_match_firebase import get_top_matches, prepare_candidate_pool
 from production.bio_match import top_similar_bios_firebase
 from production.reject_superlike_like import adjust_candidate_scores, update_user_interactions
-from production.elo_update import process_interaction_firebase, get_elo_scores_firebase
+from production.elo_update import (process_interaction_firebase, process_interactions_batch_firebase,
+                                   get_elo_scores_firebase)
+from production.user_store import get_user_store
+from production.singleflight import SingleFlight
+from production.feed_cache import get_feed_cache, POOL_SIZE
+from production.feed_scheduler import get_feed_scheduler
+from production.feed_cursor import get_cursor_store
+from production.exclusion_index import get_exclusion_index
+from production.batch_match import batch_top_matches
+from production.deadline import Deadline
+from production import timing
 
 # -------------------- INIT --------------------
 logger = get_logger(__name__)
 
+# Coalesces identical concurrent recommendation requests (retry storms, reconnects)
+recommendation_flight = SingleFlight()
+
+def start_feed_scheduler():
+    """Start background refills of per-user feed queues"""
+    get_feed_scheduler().start(_build_user_recommendations)
+
+
 def initialize_firebase(service_account_path: Optional[str] = None):
     """Initialize Firebase service"""
     firebase_service = get_firebase_service()
@@ -35,38 +53,53 @@ def initialize_firebase(service_account_path: Optional[str] = None):
 
 
 # -------------------- CORE FUNCTIONS --------------------
-def generate_user_feed(user_id: str, top_n: int = 10) -> pd.DataFrame:
+def generate_user_feed(user_id: str, top_n: int = 10, deadline: Optional[Deadline] = None) -> pd.DataFrame:
     """
     Generate top recommendations for a given user using Firebase data.
     Combines base features, bio similarity, interaction weights, and Elo.
+    
+    Optional stages are skipped when ``deadline`` has too little budget left
+    for them; skipped or failed stages are recorded on the deadline.
     """
+    deadline = deadline or Deadline(None)
     try:
         logger.info(f"Generating feed for user {user_id} (top {top_n})")
         
-        # 1. Get base matches from Firebase
-        base_matches = get_top_matches(user_id, top_n=top_n * 2, use_swipe_logs=True)
-        if base_matches.empty:
-            logger.warning(f"No base matches found for user {user_id}")
-            return pd.DataFrame()
-        
-        # 2. Apply interaction weights (if implemented)
-        try:
-            weighted_matches = adjust_candidate_scores(user_id, base_matches)
-        except:
-            logger.warning("Interaction weighting not available, using base scores")
-            weighted_matches = base_matches
-        
-        # 3. Apply Elo scores (if implemented)
-        try:
-            elo_enhanced = apply_elo_scores_firebase(weighted_matches)
-        except:
-            logger.warning("Elo scoring not available, using weighted scores")
-            elo_enhanced = weighted_matches
+        # Independent backend reads are issued up front where the service supports it
+        with deadline.activate(), get_firebase_service().feed_reads(user_id):
+            # 1. Get base matches from Firebase. The candidate set does not depend on
+            # top_n, so a cached pool, a queued refill and a direct feed rank the same
+            # candidates and agree on their common prefix
+            with timing.stage('feed.base_matches') as stage:
+                base_matches = get_top_matches(user_id, top_n=2 * max(top_n, POOL_SIZE), use_swipe_logs=True)
+                stage.rows_out = len(base_matches)
+            if base_matches.empty:
+                logger.warning(f"No base matches found for user {user_id}")
+                return pd.DataFrame()
+            
+            # 2. Apply interaction weights (if implemented)
+            with timing.stage('feed.interaction_weighting', rows_in=len(base_matches)) as stage:
+                weighted_matches = deadline.run_optional('interaction_weighting', adjust_candidate_scores,
+                                                         base_matches, user_id, base_matches)
+                stage.rows_out = len(weighted_matches)
+            
+            # 3. Apply Elo scores (if implemented)
+            with timing.stage('feed.elo', rows_in=len(weighted_matches)) as stage:
+                elo_enhanced = deadline.run_optional('elo', apply_elo_scores_firebase, weighted_matches,
+                                                     weighted_matches)
+                stage.rows_out = len(elo_enhanced)
         
         # 4. Final ranking and selection
-        final_feed = elo_enhanced.head(top_n)
-        final_feed = final_feed.rename(columns={'score': 'final_score'})
+        with timing.stage('feed.rank', rows_in=len(elo_enhanced)) as stage:
+            final_feed = elo_enhanced.head(top_n)
+            if 'final_score' not in final_feed.columns:
+                final_feed = final_feed.rename(columns={'score': 'final_score'})
+            stage.rows_out = len(final_feed)
         
+        if get_firebase_service().is_stale():
+            deadline.mark_degraded('backend', 'stale')
+        if deadline.degraded:
+            logger.warning(f"Feed for user {user_id} degraded: {deadline.degraded}")
         logger.info(f"Generated feed with {len(final_feed)} recommendations for user {user_id}")
         return final_feed
         
@@ -92,18 +125,30 @@ def record_interaction(user_id: str, target_id: str, action: str) -> bool:
         
         # Save interaction to Firebase
         firebase_service = get_firebase_service()
-        success = firebase_service.save_interaction(user_id, target_id, action)
+        with timing.stage('interaction.save'):
+            success = firebase_service.save_interaction(user_id, target_id, action)
         
         if success:
+            # Feeds computed before this swipe must not be shared with later requests
+            with timing.stage('interaction.caches'):
+                get_user_store().bump_user_version(user_id)
+                get_exclusion_index().add(user_id, target_id)
+                get_feed_cache().consume(user_id, target_id)
+                feed_scheduler = get_feed_scheduler()
+                if feed_scheduler.running:
+                    feed_scheduler.consume(user_id, target_id)
+            
             # Update Elo if available
             try:
-                process_interaction_firebase(user_id, target_id, action)
+                with timing.stage('interaction.elo'):
+                    process_interaction_firebase(user_id, target_id, action)
             except:
                 logger.warning("Elo update not available")
             
             # Update interaction weights if available
             try:
-                update_user_interactions(user_id, target_id, action)
+                with timing.stage('interaction.weights'):
+                    update_user_interactions(user_id, target_id, action)
             except:
                 logger.warning("Interaction weight update not available")
                 
@@ -117,9 +162,66 @@ def record_interaction(user_id: str, target_id: str, action: str) -> bool:
         return False
 
 
+def record_interactions_batch(interactions: pd.DataFrame) -> List[bool]:
+    """
+    Record many validated interactions with batched writes.
+    
+    Interactions are written with chunked batch commits, then the exclusion
+    index, feed caches and Elo ratings are updated once for the whole batch.
+    
+    Args:
+        interactions: DataFrame with user_id, target_id, action (and optional
+            timestamp) columns, in the order the swipes happened
+        
+    Returns:
+        Per-row success flags, aligned with ``interactions``
+    """
+    saved = [False] * len(interactions)
+    try:
+        logger.info(f"Recording {len(interactions)} interactions in batch")
+        
+        firebase_service = get_firebase_service()
+        with timing.stage('interaction_batch.save', rows_in=len(interactions)) as stage:
+            saved = firebase_service.save_interactions_batch(interactions.to_dict('records'))
+            stage.rows_out = sum(saved)
+        
+        done = interactions[pd.Series(saved, index=interactions.index, dtype=bool)]
+        if done.empty:
+            return saved
+        
+        user_ids, target_ids = done['user_id'].tolist(), done['target_id'].tolist()
+        targets_by_user: Dict[str, List[str]] = {}
+        for user_id, target_id in zip(user_ids, target_ids):
+            targets_by_user.setdefault(user_id, []).append(target_id)
+        
+        with timing.stage('interaction_batch.caches', rows_in=len(done)):
+            user_store = get_user_store()
+            feed_cache = get_feed_cache()
+            feed_scheduler = get_feed_scheduler()
+            get_exclusion_index().add_many(zip(user_ids, target_ids))
+            for user_id, targets in targets_by_user.items():
+                user_store.bump_user_version(user_id)
+                feed_cache.consume_many(user_id, targets)
+                if feed_scheduler.running:
+                    feed_scheduler.consume_many(user_id, targets)
+        
+        with timing.stage('interaction_batch.elo', rows_in=len(done)):
+            process_interactions_batch_firebase(user_ids, target_ids, done['action'].tolist())
+        
+        logger.info(f"Recorded {len(done)}/{len(interactions)} interactions in batch")
+        return saved
+        
+    except Exception as e:
+        logger.error(f"Error recording interaction batch: {e}")
+        return saved
+
+
 def apply_elo_scores_firebase(matches_df: pd.DataFrame) -> pd.DataFrame:
     """
-    Apply Elo scores to matches (placeholder implementation)
+    Apply Elo scores to matches using the cached rating vector
+    
+    Ratings are joined by row id from the user store snapshot and min-max
+    normalized against the global rating range kept by its order index.
     
     Args:
         matches_df: DataFrame with match data
@@ -128,36 +230,156 @@ def apply_elo_scores_firebase(matches_df: pd.DataFrame) -> pd.DataFrame:
         DataFrame with Elo scores applied
     """
     try:
-        # For now, just add a default Elo score
+        user_store = get_user_store()
         matches_df = matches_df.copy()
-        matches_df['elo_score'] = 1500  # Default Elo
+        matches_df['elo_score'] = user_store.elo_for(matches_df['user_id'])
+        
+        # Normalize Elo to 0-1 range against the whole population
+        elo_min, elo_max = user_store.elo_range()
+        elo_norm = (matches_df['elo_score'] - elo_min) / max(elo_max - elo_min, 1)
         
         # Combine with existing score
         matches_df['final_score'] = (
             0.7 * matches_df['score'] + 
-            0.3 * (matches_df['elo_score'] / 3000)  # Normalize Elo to 0-1 range
+            0.3 * elo_norm
         )
         
-        return matches_df.sort_values('final_score', ascending=False)
+        return matches_df.sort_values('final_score', ascending=False).reset_index(drop=True)
         
     except Exception as e:
         logger.error(f"Error applying Elo scores: {e}")
         return matches_df
 
 
-def get_user_recommendations(user_id: str, count: int = 10) -> List[Dict]:
+def get_user_recommendations(user_id: str, count: int = 10, deadline: Optional[Deadline] = None) -> List[Dict]:
     """
     Get formatted recommendations for API response
     
+    Popped from the user's precomputed queue when the feed scheduler is
+    running, else served from the per-user feed cache when it is still valid.
+    On a miss, concurrent calls for the same user and data version share a
+    single feed computation, which ranks a full candidate pool and caches it;
+    each caller takes its own first ``count`` from the shared pool. Feeds that
+    skipped stages to meet ``deadline`` are not cached.
+    
+    While the Firestore circuit is open, cached feeds are served regardless of
+    age and the result is marked stale on ``deadline``.
+    
+    Args:
+        user_id: User ID to get recommendations for
+        count: Number of recommendations to return
+        deadline: Request time budget; degraded stages are recorded on it
+        
+    Returns:
+        List of recommendation dictionaries
+    """
+    stale = get_firebase_service().is_stale()
+    if stale and deadline is not None:
+        deadline.mark_degraded('backend', 'stale')
+    
+    feed_scheduler = get_feed_scheduler()
+    if feed_scheduler.running:
+        queued = feed_scheduler.pop(user_id, count)
+        if queued is not None:
+            return queued
+    
+    cached = get_feed_cache().get(user_id, count, allow_stale=stale)
+    if cached is not None:
+        return cached
+    
+    # Every build ranks at least POOL_SIZE, so callers with different counts share one
+    pool_size = max(count, POOL_SIZE)
+    key = (user_id, pool_size, get_user_store().data_version(user_id))
+    recommendations, degraded = recommendation_flight.do(key, _build_and_cache_recommendations,
+                                                         user_id, pool_size, deadline)
+    if deadline is not None:
+        deadline.merge(degraded)
+    return recommendations[:count]
+
+
+def get_recommendations_page(user_id: str, count: int = 10, cursor: Optional[str] = None,
+                             deadline: Optional[Deadline] = None) -> Tuple[List[Dict], Optional[str]]:
+    """
+    Get one page of recommendations plus an opaque cursor for the next page
+    
+    Without a cursor the first page comes from get_user_recommendations and the
+    rest of the user's ranked pool is kept server-side as a snapshot. With a
+    cursor the next slice of that snapshot is returned in O(page size),
+    skipping users swiped since it was taken.
+    
+    Args:
+        user_id: User ID to get recommendations for
+        count: Page size
+        cursor: Cursor returned with the previous page
+        deadline: Request time budget (see get_user_recommendations)
+        
+    Returns:
+        (recommendations, next_cursor); next_cursor is None on the last page
+        
+    Raises:
+        ValueError: malformed, expired or foreign cursor
+    """
+    cursor_store = get_cursor_store()
+    if cursor:
+        return cursor_store.next_page(cursor, user_id, count)
+    
+    recommendations = get_user_recommendations(user_id, count, deadline)
+    if not recommendations:
+        return recommendations, None
+    
+    # Rest of the ranked pool, from the ready queue or the feed cache
+    feed_scheduler = get_feed_scheduler()
+    ranked = feed_scheduler.peek(user_id) if feed_scheduler.running else []
+    if not ranked:
+        ranked = get_feed_cache().peek(user_id) or []
+    
+    served = {rec['user_id'] for rec in recommendations}
+    remaining = [rec for rec in ranked if rec['user_id'] not in served]
+    return recommendations, cursor_store.create(user_id, remaining, rank_offset=len(recommendations))
+
+
+def get_batch_recommendations(user_ids: Iterable[str], count: int = 3) -> Iterator[Tuple[str, Optional[List[Dict]]]]:
+    """
+    Get recommendations for many users against one shared snapshot
+    
+    Intended for offline jobs (e.g. notifications). Candidates are scored in
+    matrix form per chunk of users and results are yielded as they are ready,
+    so memory stays flat however many users are requested.
+    
+    Args:
+        user_ids: User IDs to get recommendations for
+        count: Recommendations per user
+        
+    Yields:
+        (user_id, recommendations) in input order; None for unknown users
+    """
+    return batch_top_matches(user_ids, top_n=count)
+
+
+def _build_and_cache_recommendations(user_id: str, pool_size: int,
+                                     deadline: Optional[Deadline] = None) -> Tuple[List[Dict], Dict[str, str]]:
+    """Rank a candidate pool, cache it unless cut for time or built from stale data, and return all of it"""
+    deadline = deadline or Deadline(None)
+    recommendations = _build_user_recommendations(user_id, pool_size, deadline)
+    if not {'budget', 'stale'} & set(deadline.degraded.values()):
+        get_feed_cache().put(user_id, recommendations)
+    return recommendations, dict(deadline.degraded)
+
+
+def _build_user_recommendations(user_id: str, count: int = 10, deadline: Optional[Deadline] = None) -> List[Dict]:
+    """
+    Build formatted recommendations for API response
+    
     Args:
         user_id: User ID to get recommendations for
         count: Number of recommendations to return
+        deadline: Request time budget passed to generate_user_feed
         
     Returns:
         List of recommendation dictionaries
     """
     try:
-        feed_df = generate_user_feed(user_id, top_n=count)
+        feed_df = generate_user_feed(user_id, top_n=count, deadline=deadline)
         
         if feed_df.empty:
             return []
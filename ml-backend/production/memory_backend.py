@@ -0,0 +1,266 @@
+"""
+In-Memory Storage Backend for Patra ML Backend
+==============================================
+
+Dict-backed StorageBackend for tests, benchmarks and local load runs. Users
+are kept by ID with a cached DataFrame rebuilt only after writes;
+interactions are indexed by the swiping user so per-user history reads do
+not scan the whole log. Nothing is persisted; an optional Parquet seed
+(``storage.memory_seed_path``, written by the synthetic data generator) is
+loaded on initialize.
+"""
+
+import os
+import itertools
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+
+from production.firestore_decode import decode_users
+from production.storage_backend import ML_VERSION, StorageBackend, _storage_section, naive_timestamp
+
+
+class InMemoryBackend(StorageBackend):
+    """
+    StorageBackend kept entirely in process memory
+    """
+
+    name = 'memory'
+
+    def __init__(self):
+        super().__init__()
+        self.users: Dict[str, Dict[str, Any]] = {}
+        self.interactions: List[Dict[str, Any]] = []
+        self.swipes: List[Dict[str, Any]] = []
+        self._interactions_by_user: Dict[str, List[int]] = {}
+        self._users_df: Optional[pd.DataFrame] = None
+        self._ids = itertools.count(1)
+        self._lock = threading.RLock()
+
+    def initialize(self, service_account_path: Optional[str] = None) -> bool:
+        """
+        Mark the backend connected and load the optional Parquet seed
+
+        Args:
+            service_account_path: Ignored (kept for interface compatibility)
+        """
+        self.connected = True
+        seed_path = _storage_section('storage').get('memory_seed_path')
+        if seed_path and os.path.exists(seed_path):
+            self.load_parquet(seed_path)
+        self.logger.info(f"In-memory storage ready with {len(self.users)} users")
+        return True
+
+    def load_parquet(self, directory: str):
+        """Load users.parquet / swipes.parquet from ``directory`` if present"""
+        users_path = os.path.join(directory, 'users.parquet')
+        swipes_path = os.path.join(directory, 'swipes.parquet')
+        if os.path.exists(users_path):
+            import pyarrow.parquet as pq   # read_parquet would hand list columns back as numpy arrays
+            self.save_users(pq.read_table(users_path).to_pylist())
+        if os.path.exists(swipes_path):
+            self.save_interactions_frame(pd.read_parquet(swipes_path))
+
+    def is_connected(self) -> bool:
+        """Check if the backend is ready"""
+        return self.connected
+
+    def ping(self, timeout: float = 2.0) -> bool:
+        return self.connected
+
+    # -------------------- READS --------------------
+    def get_all_users(self) -> pd.DataFrame:
+        """
+        Get all users
+
+        Returns:
+            DataFrame with user data
+        """
+        if not self.is_connected():
+            return pd.DataFrame()
+
+        def read_users():
+            with self._lock:
+                if self._users_df is None:
+                    self._users_df = decode_users(list(self.users), list(self.users.values()))
+                return self._users_df
+
+        df = self._rpc('get_all_users', read_users).copy()
+        self._count('reads')
+        self._count('documents_read', len(df))
+        return df
+
+    def get_user_by_id(self, user_id: str) -> Optional[Dict]:
+        """
+        Get specific user by ID
+
+        Args:
+            user_id: User ID to fetch
+
+        Returns:
+            User data dictionary or None
+        """
+        if not self.is_connected():
+            return None
+
+        doc = self._rpc('get_user_by_id', lambda: self.users.get(user_id))
+        self._count('reads')
+        if doc is None:
+            return None
+        self._count('documents_read')
+        return dict(doc, id=user_id)
+
+    def get_swipe_data(self, days_back: int = 30) -> pd.DataFrame:
+        """
+        Get swipe interaction data
+
+        Args:
+            days_back: Number of days to look back
+
+        Returns:
+            DataFrame with swipe data
+        """
+        if not self.is_connected():
+            return pd.DataFrame()
+
+        cutoff_date = datetime.now() - timedelta(days=days_back)
+
+        def read_swipes():
+            with self._lock:
+                return [dict(s) for s in self.swipes if s['timestamp'] >= cutoff_date]
+
+        df = pd.DataFrame(self._rpc('get_swipe_data', read_swipes))
+        self._count('reads')
+        self._count('documents_read', len(df))
+        return df
+
+    def get_user_interactions(self, user_id: str, days_back: int = 30) -> pd.DataFrame:
+        """
+        Get interactions for a specific user
+
+        Args:
+            user_id: User ID
+            days_back: Number of days to look back
+
+        Returns:
+            DataFrame with user interactions
+        """
+        if not self.is_connected():
+            return pd.DataFrame()
+
+        cutoff_date = datetime.now() - timedelta(days=days_back)
+
+        def read_interactions():
+            with self._lock:
+                rows = (self.interactions[i] for i in self._interactions_by_user.get(user_id, ()))
+                return [dict(r) for r in rows if r['timestamp'] >= cutoff_date]
+
+        df = pd.DataFrame(self._rpc('get_user_interactions', read_interactions))
+        self._count('reads')
+        self._count('documents_read', len(df))
+        return df
+
+    # -------------------- WRITES --------------------
+    def save_users(self, users: List[Dict[str, Any]]) -> int:
+        """
+        Create or replace users keyed by ``id``
+
+        Returns:
+            Number of users written
+        """
+        if not self.is_connected() or not users:
+            return 0
+
+        def write_users():
+            with self._lock:
+                for user in users:
+                    self.users[str(user['id'])] = {k: v for k, v in user.items() if k != 'id'}
+                self._users_df = None
+
+        self._rpc('save_users', write_users)
+        self._count('writes', len(users))
+        return len(users)
+
+    def save_interaction(self, user_id: str, target_id: str, action: str) -> bool:
+        """
+        Save user interaction
+
+        Returns:
+            True if successful, False otherwise
+        """
+        if not self.is_connected():
+            return False
+        return self.save_interactions_batch([{'user_id': user_id, 'target_id': target_id, 'action': action}])[0]
+
+    def save_interactions_batch(self, interactions: List[Dict[str, Any]]) -> List[bool]:
+        """
+        Save many interactions to both the interactions and swipes logs
+
+        Returns:
+            Per-interaction success flags
+        """
+        if not self.is_connected() or not interactions:
+            return [False] * len(interactions)
+
+        now = datetime.now()
+        records = [{
+            'user_id': item['user_id'],
+            'target_id': item['target_id'],
+            'action': item['action'],
+            'timestamp': naive_timestamp(item.get('timestamp') or now),
+            'ml_version': ML_VERSION,
+        } for item in interactions]
+
+        def write_interactions():
+            with self._lock:
+                for record in records:
+                    self.interactions.append(dict(record, id=str(next(self._ids))))
+                    self._interactions_by_user.setdefault(record['user_id'], []).append(len(self.interactions) - 1)
+                    self.swipes.append(dict(record, id=str(next(self._ids))))
+
+        self._rpc('save_interactions_batch', write_interactions)
+        self._count('writes', 2 * len(records))
+        self._count('interactions_saved', len(records))
+        return [True] * len(records)
+
+    def update_user_elo_score(self, user_id: str, new_score: int) -> bool:
+        """
+        Update user's Elo rating score
+
+        Returns:
+            True if successful, False if the user does not exist
+        """
+        if not self.is_connected():
+            return False
+        return self.update_user_elo_scores({user_id: new_score})
+
+    def update_user_elo_scores(self, scores: Dict[str, float]) -> bool:
+        """
+        Update many users' Elo scores
+
+        Returns:
+            True if every user exists and was updated, False otherwise
+        """
+        if not self.is_connected():
+            return False
+
+        now = datetime.now()
+
+        def write_scores():
+            updated = 0
+            with self._lock:
+                for user_id, new_score in scores.items():
+                    doc = self.users.get(user_id)
+                    if doc is not None:
+                        doc['elo_score'] = new_score
+                        doc['elo_updated'] = now
+                        updated += 1
+                if updated:
+                    self._users_df = None
+            return updated
+
+        updated = self._rpc('update_user_elo_scores', write_scores)
+        self._count('writes', updated)
+        return updated == len(scores)
@@ -0,0 +1,335 @@
+"""
+metrics.py
+----------
+Purpose:
+    Prometheus-format metrics for capacity planning and SLO alerting:
+    request latency per route and status, storage call latency per method,
+    batch sizes, and gauges for caches, queues and in-flight requests.
+
+    Histograms use fixed HDR-style log-linear buckets (``histogram_sub_buckets``
+    per power of two, so every bucket is within 1/sub_buckets of its values)
+    over integer microseconds (or counts); recording is one bucket increment.
+
+    Each worker process publishes its state to ``<metrics_dir>/<pid>.json``
+    every ``metrics_publish_seconds``. A scrape, served by any worker, merges
+    its own live state with the files of the other live workers, so totals
+    cover all processes and lag by at most one publish interval.
+
+Integration Order:
+    Recorded BY:
+        - api_server.py / asgi_server.py (request latency)
+        - storage_backend.py / async_firebase_service.py (backend call latency)
+        - bio_match.py, batch_match.py (batch sizes)
+    Gauges FROM:
+        - api_handlers.py, asgi_server.py (register_gauges)
+    Read BY:
+        - api_handlers.py (metrics() -> /metrics)
+"""
+
+import json
+import os
+import tempfile
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from production.config_loader import load_config
+from production.logger import get_logger
+
+# -------------------- INIT --------------------
+logger = get_logger(__name__)
+config = load_config()
+
+MONITORING_CONFIG = config.get("monitoring", {}) or {}
+ENABLED = bool(MONITORING_CONFIG.get("metrics_enabled", True))
+PUBLISH_SECONDS = float(MONITORING_CONFIG.get("metrics_publish_seconds", 5))
+SUB_BUCKET_BITS = max(1, int(MONITORING_CONFIG.get("histogram_sub_buckets", 8)).bit_length() - 1)
+MAX_VALUE_BITS = 36   # Up to ~19h in microseconds; larger values land in the last bucket
+# Workers started by one server (e.g. ``uvicorn --workers``) share a parent, so share a directory
+METRICS_DIR = (os.getenv('PATRA_METRICS_DIR') or MONITORING_CONFIG.get("metrics_dir")
+               or os.path.join(tempfile.gettempdir(), f"patra-metrics-{os.getppid()}"))
+
+METRICS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+Labels = Tuple[Tuple[str, str], ...]
+
+# name -> (type, help, unit scale for histograms / cross-process aggregation for gauges)
+METRICS: Dict[str, Tuple[str, str, object]] = {
+    'patra_request_duration_seconds': ('histogram', 'Request latency by route, method and status', 1e-6),
+    'patra_backend_call_duration_seconds': ('histogram', 'Storage call latency (incl. retries) by method', 1e-6),
+    'patra_batch_size': ('histogram', 'Items per encoder / scoring batch', 1),
+    'patra_in_flight_requests': ('gauge', 'Admitted requests currently running', 'sum'),
+    'patra_executor_queue_depth': ('gauge', 'Tasks waiting for a worker thread', 'sum'),
+    'patra_admission_rejected_total': ('counter', 'Requests rejected by rate limits or the concurrency cap', 'sum'),
+    'patra_request_timeouts_total': ('counter', 'Requests answered 504 after api.timeout_seconds', 'sum'),
+    'patra_feed_cache_hits_total': ('counter', 'Ranked feed cache hits', 'sum'),
+    'patra_feed_cache_misses_total': ('counter', 'Ranked feed cache misses', 'sum'),
+    'patra_feed_cache_hit_ratio': ('gauge', 'Ranked feed cache hits / lookups', None),
+    'patra_feed_cache_users': ('gauge', 'Users with a cached feed', 'sum'),
+    'patra_feed_queue_depth': ('gauge', 'Recommendations ready in precomputed feed queues', 'sum'),
+    'patra_feed_refills_pending': ('gauge', 'Feed queue refills waiting to run', 'sum'),
+    'patra_coalescing_requests_total': ('counter', 'Recommendation requests seen by the coalescer', 'sum'),
+    'patra_coalescing_executions_total': ('counter', 'Recommendation requests actually computed', 'sum'),
+    'patra_coalescing_hit_ratio': ('gauge', 'Share of recommendation requests served by a concurrent call', None),
+    'patra_snapshot_users': ('gauge', 'Users in the in-memory snapshot', 'max'),
+    'patra_snapshot_age_seconds': ('gauge', 'Age of the in-memory user snapshot', 'max'),
+    'patra_circuit_open': ('gauge', '1 while the storage circuit breaker is open', 'max'),
+    'patra_log_records_sampled_out_total': ('counter', 'INFO/DEBUG log records dropped by sampling', 'sum'),
+    'patra_log_records_dropped_total': ('counter', 'Log records dropped because the async queue was full', 'sum'),
+    'patra_log_queue_depth': ('gauge', 'Log records waiting for the async writer', 'sum'),
+    'patra_worker_processes': ('gauge', 'Worker processes included in this scrape', None),
+}
+
+# ratio gauge -> (numerator counter, counter added to it for the denominator)
+RATIOS = {
+    'patra_feed_cache_hit_ratio': ('patra_feed_cache_hits_total', 'patra_feed_cache_misses_total'),
+}
+
+
+# -------------------- HISTOGRAM --------------------
+class HdrHistogram:
+    """
+    Log-linear histogram over non-negative integers
+
+    Values below 2**sub_bits get one bucket each; above that every power of
+    two is split into 2**sub_bits equal buckets. Memory is fixed by
+    ``max_bits`` regardless of how many values are recorded.
+    """
+
+    __slots__ = ('sub_bits', 'counts', 'count', 'sum')
+
+    def __init__(self, sub_bits: int = SUB_BUCKET_BITS, max_bits: int = MAX_VALUE_BITS):
+        self.sub_bits = sub_bits
+        self.counts = [0] * ((max_bits - sub_bits + 1) << sub_bits)
+        self.count = 0
+        self.sum = 0.0
+
+    def index(self, value: int) -> int:
+        if value < (1 << self.sub_bits):
+            return max(value, 0)
+        shift = value.bit_length() - 1 - self.sub_bits
+        return min(((shift + 1) << self.sub_bits) + (value >> shift) - (1 << self.sub_bits), len(self.counts) - 1)
+
+    def upper_bound(self, index: int) -> int:
+        """Smallest integer above bucket ``index``"""
+        if index < (1 << self.sub_bits):
+            return index + 1
+        shift = (index >> self.sub_bits) - 1
+        mantissa = (index & ((1 << self.sub_bits) - 1)) + (1 << self.sub_bits)
+        return (mantissa + 1) << shift
+
+    def record(self, value: int, original: float):
+        self.counts[self.index(value)] += 1
+        self.count += 1
+        self.sum += original
+
+    def merge(self, buckets: Dict, count: int, total: float):
+        for index, n in buckets.items():
+            self.counts[int(index)] += n
+        self.count += count
+        self.sum += total
+
+    def sparse(self) -> Dict[int, int]:
+        return {i: n for i, n in enumerate(self.counts) if n}
+
+
+# -------------------- REGISTRY --------------------
+class MetricsRegistry:
+    """Histograms recorded in this process plus gauge sources read at publish/scrape time."""
+
+    def __init__(self, metrics_dir: str = METRICS_DIR):
+        self.metrics_dir = metrics_dir
+        self._lock = threading.Lock()
+        self._histograms: Dict[Tuple[str, Labels], HdrHistogram] = {}
+        self._gauge_sources: List[Callable[[], Dict[Tuple[str, Labels], float]]] = []
+        self._publisher: Optional[threading.Thread] = None
+
+    def observe(self, name: str, value: float, labels: Labels = ()):
+        """Record ``value`` (seconds for *_seconds metrics) in histogram ``name``"""
+        scaled = int(value / METRICS[name][2])
+        key = (name, labels)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = HdrHistogram()
+            histogram.record(scaled, value)
+
+    def register_gauges(self, source: Callable[[], Dict[Tuple[str, Labels], float]]):
+        """``source()`` returns {(metric name, labels): value} for metrics declared in METRICS"""
+        self._gauge_sources.append(source)
+
+    def gauges(self) -> Dict[Tuple[str, Labels], float]:
+        values = {}
+        for source in self._gauge_sources:
+            try:
+                values.update(source())
+            except Exception as e:
+                logger.warning(f"Metrics gauge source failed: {e}")
+        return values
+
+    # -------------------- CROSS-PROCESS --------------------
+    def state(self) -> Dict:
+        """This process's metrics in the published file format"""
+        with self._lock:
+            histograms = [[name, list(labels), h.sparse(), h.count, h.sum]
+                          for (name, labels), h in self._histograms.items()]
+        gauges = [[name, list(labels), value] for (name, labels), value in self.gauges().items()]
+        return {'pid': os.getpid(), 'sub_bits': SUB_BUCKET_BITS, 'published_at': time.time(),
+                'histograms': histograms, 'gauges': gauges}
+
+    def publish(self):
+        """Write this process's state for the other workers to merge (atomic replace)"""
+        os.makedirs(self.metrics_dir, exist_ok=True)
+        path = os.path.join(self.metrics_dir, f"{os.getpid()}.json")
+        with open(path + '.tmp', 'w') as f:
+            json.dump(self.state(), f)
+        os.replace(path + '.tmp', path)
+
+    def start_publisher(self):
+        """Publish every PUBLISH_SECONDS from a daemon thread (once per process)"""
+        if not ENABLED or (self._publisher is not None and self._publisher.is_alive()):
+            return
+
+        idle = threading.Event()
+
+        def run():
+            while True:
+                try:
+                    self.publish()
+                except Exception as e:
+                    logger.warning(f"Failed to publish metrics: {e}")
+                idle.wait(PUBLISH_SECONDS)
+
+        self._publisher = threading.Thread(target=run, name="patra-metrics", daemon=True)
+        self._publisher.start()
+
+    def _peer_states(self) -> List[Dict]:
+        """Last published state of every other live worker; files of exited workers are removed"""
+        states = []
+        try:
+            names = os.listdir(self.metrics_dir)
+        except FileNotFoundError:
+            return states
+        for name in names:
+            pid_text, _, ext = name.partition('.')
+            if ext != 'json' or not pid_text.isdigit() or int(pid_text) == os.getpid():
+                continue
+            path = os.path.join(self.metrics_dir, name)
+            if not _alive(int(pid_text)):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+                continue
+            try:
+                with open(path) as f:
+                    state = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if state.get('sub_bits') == SUB_BUCKET_BITS:
+                states.append(state)
+        return states
+
+    # -------------------- EXPOSITION --------------------
+    def render(self) -> str:
+        """All processes' metrics in the Prometheus text format (0.0.4)"""
+        states = [self.state()] + self._peer_states()
+
+        histograms: Dict[Tuple[str, Labels], HdrHistogram] = {}
+        gauges: Dict[Tuple[str, Labels], float] = {}
+        for state in states:
+            for name, labels, buckets, count, total in state['histograms']:
+                key = (name, tuple(tuple(pair) for pair in labels))
+                histogram = histograms.get(key)
+                if histogram is None:
+                    histogram = histograms[key] = HdrHistogram()
+                histogram.merge(buckets, count, total)
+            for name, labels, value in state['gauges']:
+                key = (name, tuple(tuple(pair) for pair in labels))
+                if key not in gauges:
+                    gauges[key] = value
+                elif METRICS[name][2] == 'max':
+                    gauges[key] = max(gauges[key], value)
+                else:
+                    gauges[key] += value
+
+        for ratio, (part, other) in RATIOS.items():
+            hits, rest = gauges.get((part, ()), 0), gauges.get((other, ()), 0)
+            gauges[(ratio, ())] = round(hits / (hits + rest), 4) if hits + rest else 0.0
+        requests = gauges.get(('patra_coalescing_requests_total', ()), 0)
+        executions = gauges.get(('patra_coalescing_executions_total', ()), 0)
+        gauges[('patra_coalescing_hit_ratio', ())] = round(1 - executions / requests, 4) if requests else 0.0
+        gauges[('patra_worker_processes', ())] = len(states)
+
+        lines = []
+        for name, (kind, help_text, scale) in METRICS.items():
+            if kind == 'histogram':
+                series = sorted((k, h) for k, h in histograms.items() if k[0] == name)
+                if series:
+                    lines += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+                for (_, labels), histogram in series:
+                    lines += _histogram_lines(name, labels, histogram, scale)
+            else:
+                series = sorted((k, v) for k, v in gauges.items() if k[0] == name)
+                if series:
+                    lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+                for (_, labels), value in series:
+                    lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return '\n'.join(lines) + '\n'
+
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ''
+    escaped = (k + '="' + str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') + '"'
+               for k, v in labels)
+    return '{' + ','.join(escaped) + '}'
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _histogram_lines(name: str, labels: Labels, histogram: HdrHistogram, scale) -> List[str]:
+    """Cumulative buckets from the lowest to the highest occupied one, then +Inf, sum and count"""
+    occupied = [i for i, n in enumerate(histogram.counts) if n]
+    lines = []
+    cumulative = 0
+    if occupied:
+        for index in range(occupied[0], occupied[-1] + 1):
+            cumulative += histogram.counts[index]
+            le = _format_value(histogram.upper_bound(index) * scale)
+            lines.append(f"{name}_bucket{_format_labels(labels + (('le', le),))} {cumulative}")
+    lines.append(f"{name}_bucket{_format_labels(labels + (('le', '+Inf'),))} {histogram.count}")
+    lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(histogram.sum)}")
+    lines.append(f"{name}_count{_format_labels(labels)} {histogram.count}")
+    return lines
+
+
+_registry = MetricsRegistry()
+
+
+def get_metrics_registry() -> MetricsRegistry:
+    """
+    Get the global metrics registry
+
+    Returns:
+        MetricsRegistry instance
+    """
+    return _registry
+
+
+def observe(name: str, value: float, **labels: str):
+    """Record ``value`` in histogram ``name`` (no-op when monitoring.metrics_enabled is off)"""
+    if ENABLED:
+        _registry.observe(name, value, tuple(sorted(labels.items())))
@@ -0,0 +1,238 @@
+"""
+profiler.py
+-----------
+Purpose:
+    On-demand profiling of one live worker process, for the admin endpoint:
+
+    - sample:      statistical stack sampler over all threads; returns
+                   collapsed stacks (``frame;frame;frame count``) for
+                   flamegraph.pl / speedscope
+    - cprofile:    deterministic cProfile of a sampled fraction of the
+                   requests handled during the window; returns pstats text
+    - tracemalloc: allocation snapshots at the start and end of the window;
+                   returns the largest growth by line (or traceback)
+
+    One capture runs per process at a time. Nothing is installed until a
+    capture starts; the request hook is a single attribute check otherwise.
+
+Integration Order:
+    Hooked BY:
+        - api_handlers.py (profiled handlers, profile() -> /api/admin/profile)
+"""
+
+import cProfile
+import functools
+import io
+import linecache
+import os
+import pstats
+import random
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from typing import Any, Callable, Dict, Optional
+
+from production.config_loader import load_config
+from production.logger import get_logger
+
+# -------------------- INIT --------------------
+logger = get_logger(__name__)
+config = load_config()
+
+MONITORING_CONFIG = config.get("monitoring", {}) or {}
+MAX_SECONDS = float(MONITORING_CONFIG.get("profiler_max_seconds", 60))
+DEFAULT_INTERVAL_MS = float(MONITORING_CONFIG.get("profiler_sample_interval_ms", 5))
+
+MODES = ('sample', 'cprofile', 'tracemalloc')
+PSTATS_SORTS = ('cumulative', 'tottime', 'ncalls', 'time')
+TRACEMALLOC_GROUPS = ('lineno', 'filename', 'traceback')
+
+# Leaf frames of threads parked waiting for work, left out of samples unless asked for
+IDLE_LEAVES = {
+    ('threading.py', 'wait'), ('queue.py', 'get'), ('selectors.py', 'select'),
+    ('thread.py', '_worker'), ('socketserver.py', 'serve_forever'), ('socket.py', 'accept'),
+}
+
+_capture_lock = threading.Lock()
+_request_profiling: Optional["RequestProfiling"] = None
+
+
+class ProfilerBusy(Exception):
+    """Another capture is running in this process"""
+
+
+# -------------------- STACK SAMPLER --------------------
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def sample_stacks(seconds: float, interval: float, include_idle: bool = False) -> str:
+    """Collapsed stacks of every other thread, sampled every ``interval`` seconds"""
+    own = threading.get_ident()
+    names = {}
+    counts: Counter = Counter()
+    samples = 0
+    frames = {}
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        frames = sys._current_frames()
+        if len(names) != len(frames):
+            names = {t.ident: t.name for t in threading.enumerate()}
+        for ident, frame in frames.items():
+            if ident == own:
+                continue
+            code = frame.f_code
+            if not include_idle and (os.path.basename(code.co_filename), code.co_name) in IDLE_LEAVES:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame))
+                frame = frame.f_back
+            stack.append(names.get(ident, f"thread-{ident}"))
+            counts[';'.join(reversed(stack))] += 1
+        samples += 1
+        time.sleep(interval)
+    frames = None   # Drop the last references to other threads' frames
+    logger.info(f"Stack sampler: {samples} samples, {len(counts)} distinct stacks in {seconds}s")
+    return ''.join(f"{stack} {n}\n" for stack, n in counts.most_common())
+
+
+# -------------------- REQUEST cPROFILE --------------------
+class RequestProfiling:
+    """cProfile of a random ``fraction`` of requests, merged into one pstats table."""
+
+    def __init__(self, fraction: float):
+        self.fraction = fraction
+        self.seen = 0
+        self.profiled = 0
+        self.skipped = 0   # Sampled but another profiler was active in the interpreter
+        self._stats: Optional[pstats.Stats] = None
+        self._lock = threading.Lock()
+
+    def run(self, handler: Callable, *args: Any) -> Any:
+        with self._lock:
+            self.seen += 1
+        if random.random() >= self.fraction:
+            return handler(*args)
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Python 3.12+ allows one active cProfile per interpreter
+            with self._lock:
+                self.skipped += 1
+            return handler(*args)
+        try:
+            return handler(*args)
+        finally:
+            profile.disable()
+            with self._lock:
+                self.profiled += 1
+                if self._stats is None:
+                    self._stats = pstats.Stats(profile)
+                else:
+                    self._stats.add(profile)
+
+    def report(self, sort: str, limit: int) -> str:
+        out = io.StringIO()
+        out.write(f"# {self.profiled} of {self.seen} requests profiled (fraction {self.fraction}"
+                  f"{f', {self.skipped} skipped: profiler busy' if self.skipped else ''})\n")
+        with self._lock:
+            if self._stats is not None:
+                self._stats.stream = out
+                self._stats.sort_stats(sort).print_stats(limit)
+        return out.getvalue()
+
+
+def profiled(handler: Callable) -> Callable:
+    """Let a cprofile capture sample calls of ``handler``"""
+    @functools.wraps(handler)
+    def wrapper(*args: Any) -> Any:
+        session = _request_profiling
+        if session is None:
+            return handler(*args)
+        return session.run(handler, *args)
+    return wrapper
+
+
+def profile_requests(seconds: float, fraction: float, sort: str, limit: int) -> str:
+    """Profile sampled requests handled in the next ``seconds``"""
+    global _request_profiling
+    session = RequestProfiling(fraction)
+    _request_profiling = session
+    try:
+        time.sleep(seconds)
+    finally:
+        _request_profiling = None
+    return session.report(sort, limit)
+
+
+# -------------------- ALLOCATIONS --------------------
+def allocation_growth(seconds: float, group_by: str, limit: int, frames: int) -> str:
+    """Allocation growth between two tracemalloc snapshots ``seconds`` apart"""
+    started_here = not tracemalloc.is_tracing()
+    if started_here:
+        tracemalloc.start(frames)
+    try:
+        before = tracemalloc.take_snapshot()
+        time.sleep(seconds)
+        after = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        if started_here:
+            tracemalloc.stop()
+
+    ignore = (tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, linecache.__file__),
+              tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"))
+    growth = after.filter_traces(ignore).compare_to(before.filter_traces(ignore), group_by)
+    lines = [f"# allocation growth over {seconds}s by {group_by}; traced now {current / 1e6:.1f} MB, "
+             f"peak {peak / 1e6:.1f} MB{'' if started_here else ' (tracing was already on)'}"]
+    for stat in growth[:limit]:
+        if group_by == 'traceback':
+            lines.append(f"{stat.size_diff / 1e3:+.1f} kB, {stat.count_diff:+d} blocks "
+                         f"(now {stat.size / 1e3:.1f} kB in {stat.count} blocks)")
+            lines += [f"    {line}" for line in stat.traceback.format()]
+        else:
+            lines.append(str(stat))
+    return '\n'.join(lines) + '\n'
+
+
+# -------------------- ENTRY POINT --------------------
+def capture(mode: str, seconds: float, options: Dict[str, str]) -> str:
+    """
+    Run one capture in the calling thread and return its text report
+
+    Raises:
+        ValueError: unknown mode or bad option
+        ProfilerBusy: a capture is already running in this process
+    """
+    if mode not in MODES:
+        raise ValueError(f"mode must be one of: {', '.join(MODES)}")
+    if not 0 < seconds <= MAX_SECONDS:
+        raise ValueError(f"seconds must be in (0, {MAX_SECONDS:g}]")
+    limit = int(options.get('limit', 50))
+
+    if not _capture_lock.acquire(blocking=False):
+        raise ProfilerBusy("a capture is already running in this worker")
+    try:
+        logger.info(f"Profiler capture: {mode} for {seconds}s")
+        if mode == 'sample':
+            interval = float(options.get('interval_ms', DEFAULT_INTERVAL_MS)) / 1000
+            if interval <= 0:
+                raise ValueError("interval_ms must be positive")
+            return sample_stacks(seconds, interval, options.get('idle', '').lower() in ('1', 'true', 'yes'))
+        if mode == 'cprofile':
+            fraction = float(options.get('fraction', 0.1))
+            sort = options.get('sort', 'cumulative')
+            if not 0 < fraction <= 1 or sort not in PSTATS_SORTS:
+                raise ValueError(f"fraction must be in (0, 1] and sort one of: {', '.join(PSTATS_SORTS)}")
+            return profile_requests(seconds, fraction, sort, limit)
+        group_by = options.get('group_by', 'lineno')
+        if group_by not in TRACEMALLOC_GROUPS:
+            raise ValueError(f"group_by must be one of: {', '.join(TRACEMALLOC_GROUPS)}")
+        return allocation_growth(seconds, group_by, limit, int(options.get('frames', 10)))
+    finally:
+        _capture_lock.release()
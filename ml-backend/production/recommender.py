@@ -20,6 +20,7 @@ from production.data_match import get_top_matches
 from production.bio_match import top_similar_bios
 from production.reject_superlike_like import adjust_candidate_scores
 from production.elo_update import get_elo_scores
+from production.elo_index import EloIndex
 from production.logger import get_logger
 from production.config_loader import load_config
 
@@ -81,9 +82,10 @@ def get_recommendations(user_id: str, top_n: int = TOP_N) -> pd.DataFrame:
         "elo": 0.1
     })
 
-    # Normalize Elo to 0-1
-    elo_min, elo_max = merged["elo"].min(), merged["elo"].max()
-    merged["elo_norm"] = (merged["elo"] - elo_min) / max(elo_max - elo_min, 1)
+    # Normalize Elo to 0-1 as a percentile among this feed's candidates
+    elo_index = EloIndex()
+    elo_index.build(merged["elo"].to_numpy())
+    merged["elo_norm"] = elo_index.percentiles(merged["elo"].to_numpy())
 
     merged["final_score"] = (
         WEIGHTS["base"] * merged["base_score"] +
@@ -139,6 +139,10 @@ def adjust_candidate_scores(user_id: str, candidates_df: pd.DataFrame) -> pd.Dat
     # Initialize weights
     candidates_df["interaction_weight"] = DEFAULT_WEIGHT
 
+    # No swipe history yet (new users): nothing to adjust
+    if user_swipes.empty or "target_user_id" not in user_swipes.columns:
+        return candidates_df
+
     for idx, row in candidates_df.iterrows():
         target_id = row["user_id"]
         previous_action = user_swipes[user_swipes["target_user_id"] == target_id]
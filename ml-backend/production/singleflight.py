@@ -0,0 +1,77 @@
+"""
+singleflight.py
+---------------
+Purpose:
+    In-process request coalescing. While a call for a key is in flight,
+    concurrent callers with the same key wait for that call and share its
+    result instead of running the same work again. Used to collapse retry
+    storms of identical recommendation requests into one feed computation.
+"""
+
+import threading
+from typing import Any, Callable, Dict, Hashable
+
+
+class _Call:
+    """One in-flight execution and the callers waiting on it."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException = None
+
+
+class SingleFlight:
+    """
+    Deduplicate concurrent calls by key.
+
+    The first caller for a key (the leader) runs the function; callers that
+    arrive while it runs block until it finishes and receive the same result
+    or exception. Nothing is cached once the call completes.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+        self._requests = 0
+        self._executions = 0
+
+    def do(self, key: Hashable, fn: Callable, *args, **kwargs) -> Any:
+        with self._lock:
+            self._requests += 1
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+                self._executions += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def stats(self) -> Dict[str, Any]:
+        """Request, execution and coalescing counts since startup."""
+        with self._lock:
+            requests, executions, in_flight = self._requests, self._executions, len(self._calls)
+        coalesced = requests - executions
+        return {
+            'requests': requests,
+            'executions': executions,
+            'coalesced': coalesced,
+            'coalescing_rate': round(coalesced / requests, 4) if requests else 0.0,
+            'in_flight': in_flight,
+        }
@@ -0,0 +1,391 @@
+"""
+SQLite Storage Backend for Patra ML Backend
+===========================================
+
+StorageBackend on a local SQLite file, for running the API and benchmarks at
+realistic scale without a Firebase project. User documents are stored as
+JSON next to an ``elo_score`` column (so Elo updates do not rewrite the
+document); interactions and swipes are separate tables keyed by an
+append-only integer rowid (random text keys made bulk loads ~20x slower)
+and indexed on (user_id, timestamp) and (timestamp), matching the Firestore
+queries the recommender issues. Timestamps are ISO-8601 strings of naive
+local time, so range filters use the index.
+
+One connection in WAL mode is shared behind a lock; SQLite serializes writes
+anyway, and the recommender's reads are few and large.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from production.firestore_decode import decode_users
+from production.storage_backend import ML_VERSION, StorageBackend, naive_timestamp, naive_timestamps
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    id TEXT PRIMARY KEY,
+    elo_score REAL,
+    elo_updated TEXT,
+    doc TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS interactions (
+    id INTEGER PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    target_id TEXT NOT NULL,
+    action TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    ml_version TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_interactions_user_ts ON interactions (user_id, timestamp);
+CREATE TABLE IF NOT EXISTS swipes (
+    id INTEGER PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    target_id TEXT NOT NULL,
+    action TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    ml_version TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_swipes_ts ON swipes (timestamp);
+"""
+
+INTERACTION_COLUMNS = ['id', 'user_id', 'target_id', 'action', 'timestamp', 'ml_version']
+INTERACTION_SELECT = "SELECT CAST(id AS TEXT), user_id, target_id, action, timestamp, ml_version"
+
+
+def _iso(value: datetime) -> str:
+    return value.isoformat(timespec='microseconds')
+
+
+def _json_default(value: Any):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if hasattr(value, 'tolist'):
+        return value.tolist()
+    return str(value)
+
+
+# One shared encoder: json.dumps(..., default=...) builds a new one per call
+_encode_doc = json.JSONEncoder(default=_json_default, separators=(',', ':')).encode
+
+
+class SQLiteBackend(StorageBackend):
+    """
+    StorageBackend on an indexed local SQLite database
+    """
+
+    name = 'sqlite'
+
+    def __init__(self, path: str = ':memory:'):
+        super().__init__()
+        self.path = path
+        self.conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.RLock()
+
+    def initialize(self, service_account_path: Optional[str] = None) -> bool:
+        """
+        Open (creating if needed) the database file and its schema
+
+        Args:
+            service_account_path: Ignored (kept for interface compatibility)
+        """
+        try:
+            if self.path != ':memory:' and os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self.conn = sqlite3.connect(self.path, check_same_thread=False)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+            self.conn.execute("PRAGMA cache_size=-65536")   # 64 MB: keeps index pages hot during bulk loads
+            self.conn.executescript(SCHEMA)
+            self.connected = True
+            self.logger.info(f"SQLite storage ready at {self.path}")
+            return True
+        except Exception as e:
+            self.logger.error(f"Failed to open SQLite storage at {self.path}: {e}")
+            self.connected = False
+            return False
+
+    def is_connected(self) -> bool:
+        """Check if the database is open"""
+        return self.connected and self.conn is not None
+
+    def ping(self, timeout: float = 2.0) -> bool:
+        if not self.is_connected():
+            return False
+        try:
+            with self._lock:
+                self.conn.execute("SELECT 1").fetchone()
+            return True
+        except Exception as e:
+            self.logger.error(f"SQLite ping failed: {e}")
+            return False
+
+    def _query(self, sql: str, params: tuple = ()) -> List[tuple]:
+        with self._lock:
+            return self.conn.execute(sql, params).fetchall()
+
+    def _interactions_frame(self, rows: List[tuple]) -> pd.DataFrame:
+        if not rows:
+            return pd.DataFrame()
+        df = pd.DataFrame(rows, columns=INTERACTION_COLUMNS)
+        df['timestamp'] = pd.to_datetime(df['timestamp'], format='ISO8601')
+        return df
+
+    # -------------------- READS --------------------
+    def get_all_users(self) -> pd.DataFrame:
+        """
+        Get all users
+
+        Returns:
+            DataFrame with user data
+        """
+        try:
+            if not self.is_connected():
+                raise Exception("SQLite storage not connected")
+
+            rows = self._rpc('get_all_users', lambda: self._query("SELECT id, elo_score, elo_updated, doc FROM users"))
+            df = decode_users([row[0] for row in rows], [self._decode_user(row) for row in rows])
+            self._count('reads')
+            self._count('documents_read', len(df))
+            return df
+
+        except Exception as e:
+            self._count('errors')
+            self.logger.error(f"Error getting users: {e}")
+            return pd.DataFrame()
+
+    def _decode_user(self, row: tuple, clean: bool = True) -> Dict[str, Any]:
+        user_id, elo_score, elo_updated, doc = row
+        user = json.loads(doc)
+        user['id'] = user_id
+        if elo_score is not None:
+            user['elo_score'] = elo_score
+        if elo_updated is not None:
+            user['elo_updated'] = elo_updated if clean else datetime.fromisoformat(elo_updated)
+        return user
+
+    def get_user_by_id(self, user_id: str) -> Optional[Dict]:
+        """
+        Get specific user by ID
+
+        Args:
+            user_id: User ID to fetch
+
+        Returns:
+            User data dictionary or None
+        """
+        try:
+            if not self.is_connected():
+                return None
+
+            rows = self._rpc('get_user_by_id', lambda: self._query(
+                "SELECT id, elo_score, elo_updated, doc FROM users WHERE id = ?", (user_id,)))
+            self._count('reads')
+            if not rows:
+                return None
+            self._count('documents_read')
+            return self._decode_user(rows[0], clean=False)
+
+        except Exception as e:
+            self._count('errors')
+            self.logger.error(f"Error getting user {user_id}: {e}")
+            return None
+
+    def get_swipe_data(self, days_back: int = 30) -> pd.DataFrame:
+        """
+        Get swipe interaction data
+
+        Args:
+            days_back: Number of days to look back
+
+        Returns:
+            DataFrame with swipe data
+        """
+        try:
+            if not self.is_connected():
+                raise Exception("SQLite storage not connected")
+
+            cutoff = _iso(datetime.now() - timedelta(days=days_back))
+            rows = self._rpc('get_swipe_data', lambda: self._query(
+                f"{INTERACTION_SELECT} FROM swipes WHERE timestamp >= ?", (cutoff,)))
+            df = self._interactions_frame(rows)
+            self._count('reads')
+            self._count('documents_read', len(df))
+            return df
+
+        except Exception as e:
+            self._count('errors')
+            self.logger.error(f"Error getting swipe data: {e}")
+            return pd.DataFrame()
+
+    def get_user_interactions(self, user_id: str, days_back: int = 30) -> pd.DataFrame:
+        """
+        Get interactions for a specific user
+
+        Args:
+            user_id: User ID
+            days_back: Number of days to look back
+
+        Returns:
+            DataFrame with user interactions
+        """
+        try:
+            if not self.is_connected():
+                raise Exception("SQLite storage not connected")
+
+            cutoff = _iso(datetime.now() - timedelta(days=days_back))
+            rows = self._rpc('get_user_interactions', lambda: self._query(
+                f"{INTERACTION_SELECT} FROM interactions "
+                f"WHERE user_id = ? AND timestamp >= ?", (user_id, cutoff)))
+            df = self._interactions_frame(rows)
+            self._count('reads')
+            self._count('documents_read', len(df))
+            return df
+
+        except Exception as e:
+            self._count('errors')
+            self.logger.error(f"Error getting user interactions: {e}")
+            return pd.DataFrame()
+
+    # -------------------- WRITES --------------------
+    def save_users(self, users: List[Dict[str, Any]]) -> int:
+        """
+        Create or replace users keyed by ``id``
+
+        Returns:
+            Number of users written
+        """
+        if not self.is_connected() or not users:
+            return 0
+
+        rows = []
+        for user in users:
+            doc = dict(user)
+            user_id = doc.pop('id')
+            elo_score = doc.pop('elo_score', None)
+            elo_updated = doc.pop('elo_updated', None)
+            rows.append((str(user_id), elo_score,
+                         _iso(naive_timestamp(elo_updated)) if elo_updated is not None else None,
+                         _encode_doc(doc)))
+
+        def write_users():
+            with self._lock, self.conn:
+                self.conn.executemany("INSERT OR REPLACE INTO users (id, elo_score, elo_updated, doc) "
+                                      "VALUES (?, ?, ?, ?)", rows)
+
+        try:
+            self._rpc('save_users', write_users)
+        except Exception as e:
+            self._count('errors')
+            self.logger.error(f"Error saving users: {e}")
+            return 0
+        self._count('writes', len(rows))
+        return len(rows)
+
+    def save_interaction(self, user_id: str, target_id: str, action: str) -> bool:
+        """
+        Save user interaction
+
+        Returns:
+            True if successful, False otherwise
+        """
+        if not self.is_connected():
+            return False
+        return self.save_interactions_batch([{'user_id': user_id, 'target_id': target_id, 'action': action}])[0]
+
+    def save_interactions_batch(self, interactions: List[Dict[str, Any]]) -> List[bool]:
+        """
+        Save many interactions to both tables in one transaction
+
+        Returns:
+            Per-interaction success flags (all or nothing)
+        """
+        if not self.is_connected() or not interactions:
+            return [False] * len(interactions)
+
+        now = datetime.now()
+        rows = [(item['user_id'], item['target_id'], item['action'],
+                 _iso(naive_timestamp(item.get('timestamp') or now)), ML_VERSION)
+                for item in interactions]
+        return self._insert_interactions(rows)
+
+    def save_interactions_frame(self, interactions: pd.DataFrame) -> int:
+        """
+        Bulk-insert a DataFrame of interactions with vectorized timestamp formatting
+
+        Returns:
+            Number of interactions saved
+        """
+        if not self.is_connected() or interactions.empty:
+            return 0
+        if 'timestamp' in interactions.columns:
+            timestamps = naive_timestamps(interactions['timestamp']).to_numpy(dtype='datetime64[us]')
+        else:
+            timestamps = np.full(len(interactions), np.datetime64(datetime.now(), 'us'))
+        rows = list(zip(interactions['user_id'].tolist(), interactions['target_id'].tolist(),
+                        interactions['action'].tolist(), np.datetime_as_string(timestamps, unit='us').tolist(),
+                        [ML_VERSION] * len(interactions)))
+        return sum(self._insert_interactions(rows))
+
+    def _insert_interactions(self, rows: List[tuple]) -> List[bool]:
+        """Insert (user_id, target_id, action, timestamp, ml_version) rows into both tables"""
+        # One transaction: a failed attempt rolls back entirely, so retrying cannot duplicate rows
+        def write_interactions():
+            with self._lock, self.conn:
+                for table in ('interactions', 'swipes'):
+                    self.conn.executemany(f"INSERT INTO {table} (user_id, target_id, action, timestamp, ml_version) "
+                                          f"VALUES (?, ?, ?, ?, ?)", rows)
+
+        try:
+            self._rpc('save_interactions_batch', write_interactions)
+        except Exception as e:
+            self._count('errors')
+            self.logger.error(f"Error saving {len(rows)} interactions: {e}")
+            return [False] * len(rows)
+        self._count('writes', 2 * len(rows))
+        self._count('interactions_saved', len(rows))
+        return [True] * len(rows)
+
+    def update_user_elo_score(self, user_id: str, new_score: int) -> bool:
+        """
+        Update user's Elo rating score
+
+        Returns:
+            True if successful, False if the user does not exist
+        """
+        if not self.is_connected():
+            return False
+        return self.update_user_elo_scores({user_id: new_score})
+
+    def update_user_elo_scores(self, scores: Dict[str, float]) -> bool:
+        """
+        Update many users' Elo scores in one transaction
+
+        Returns:
+            True if every user exists and was updated, False otherwise
+        """
+        if not self.is_connected():
+            return False
+
+        now = _iso(datetime.now())
+        rows = [(float(score), now, user_id) for user_id, score in scores.items()]
+
+        def write_scores():
+            with self._lock, self.conn:
+                cursor = self.conn.executemany("UPDATE users SET elo_score = ?, elo_updated = ? WHERE id = ?", rows)
+                return cursor.rowcount
+
+        try:
+            updated = self._rpc('update_user_elo_scores', write_scores)
+        except Exception as e:
+            self._count('errors')
+            self.logger.error(f"Error updating Elo scores: {e}")
+            return False
+        self._count('writes', updated)
+        return updated == len(rows)
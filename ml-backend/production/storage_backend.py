@@ -0,0 +1,371 @@
+"""
+Storage Backend Interface for Patra ML Backend
+==============================================
+
+Every module reaches storage through the ``get_firebase_service()``
+singleton. StorageBackend is the interface that singleton implements, plus
+the behaviour shared by all implementations (operation counters, circuit
+breaker, call policy, Elo lookups, potential-match filtering):
+
+    - FirebaseService / AsyncFirebaseService  (firebase_service.py) - Firestore
+    - InMemoryBackend                         (memory_backend.py)   - dicts, for tests and benchmarks
+    - SQLiteBackend                           (sqlite_backend.py)   - indexed local file
+
+Select one with ``storage.backend`` in settings.yaml or the
+``PATRA_STORAGE_BACKEND`` environment variable (firestore | memory | sqlite).
+
+Records have the same shape everywhere: users carry the scoring fields of
+firestore_decode.USER_SCHEMA plus ``id`` (get_user_by_id returns the whole
+document); interactions and swipes carry ``id``, ``user_id``, ``target_id``,
+``action``, ``timestamp`` (naive local datetime) and ``ml_version``.
+"""
+
+import logging
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+
+from production import metrics, timing
+from production.call_policy import CallPolicy, is_transient
+from production.circuit_breaker import CircuitBreaker
+
+ML_VERSION = '2.0.0'
+
+BACKENDS = ('firestore', 'memory', 'sqlite')
+
+
+class StorageBackend(ABC):
+    """
+    Storage operations used by the recommender, API and batch jobs
+    """
+
+    name = 'abstract'
+
+    def __init__(self):
+        self.connected = False
+        self.logger = logging.getLogger(self.__module__)
+
+        # Maintained operation counters, read by health checks instead of querying storage
+        self.counters = {
+            'reads': 0,
+            'writes': 0,
+            'errors': 0,
+            'documents_read': 0,
+            'interactions_saved': 0,
+            'stale_reads': 0,
+        }
+        self.last_success_at = None
+        self._counters_lock = threading.Lock()
+
+        # Fail fast while storage is erroring or slow (settings under firebase.breaker_*)
+        call_config = _storage_section('firebase')
+        self.breaker = CircuitBreaker(
+            self.name,
+            failure_rate_threshold=float(call_config.get('breaker_failure_rate', 0.5)),
+            slow_call_seconds=float(call_config.get('breaker_slow_call_seconds', 2.0)),
+            window_size=int(call_config.get('breaker_window', 20)),
+            min_calls=int(call_config.get('breaker_min_calls', 10)),
+            open_seconds=float(call_config.get('breaker_open_seconds', 10)),
+            probe=lambda: self.ping(timeout=float(call_config.get('breaker_slow_call_seconds', 2.0))),
+            slow_call_seconds_by_site={site: float(seconds) for site, seconds in
+                                       (call_config.get('breaker_slow_call_seconds_by_site') or {}).items()},
+            is_failure=is_transient
+        )
+
+        # Retry transient errors within per-site budgets; hedge slow point reads
+        self.policy = CallPolicy(
+            max_attempts=int(call_config.get('retry_max_attempts', 3)),
+            base_delay=float(call_config.get('retry_base_delay_seconds', 0.05)),
+            max_delay=float(call_config.get('retry_max_delay_seconds', 1.0)),
+            retry_budget_ratio=float(call_config.get('retry_budget_ratio', 0.1)),
+            hedge_percentile=float(call_config.get('hedge_percentile', 95)),
+            hedge_min_samples=int(call_config.get('hedge_min_samples', 50))
+        )
+        self.hedge_reads = bool(call_config.get('hedge_reads', False))
+
+    # -------------------- COUNTERS --------------------
+    def _count(self, name: str, amount: int = 1):
+        """Increment an operation counter"""
+        with self._counters_lock:
+            self.counters[name] += amount
+            if name != 'errors':
+                self.last_success_at = time.time()
+
+    def get_counters(self) -> Dict[str, Any]:
+        """Snapshot of the operation counters"""
+        with self._counters_lock:
+            counters = dict(self.counters)
+            counters['last_success_at'] = (
+                datetime.fromtimestamp(self.last_success_at).isoformat() if self.last_success_at else None
+            )
+        return counters
+
+    # -------------------- CALLS --------------------
+    def _rpc(self, site: str, fn, hedge: bool = False) -> Any:
+        """
+        Run one storage operation under the call policy
+
+        Every attempt passes the circuit breaker, so retries and hedges count
+        towards its failure rate and stop as soon as it opens. Only transient
+        errors and calls slower than the site's threshold count as failures.
+
+        Args:
+            site: Call site name for the policy stats
+            fn: Zero-argument callable doing the operation; must be safe to repeat
+            hedge: Allow a hedged duplicate (point reads only)
+        """
+        def attempt():
+            with self.breaker.call(site):
+                return fn()
+        if not (metrics.ENABLED or timing.enabled()):
+            return self.policy.call(site, attempt, hedge=hedge and self.hedge_reads)
+        started = time.perf_counter()
+        outcome = 'error'
+        try:
+            result = self.policy.call(site, attempt, hedge=hedge and self.hedge_reads)
+            outcome = 'ok'
+        finally:
+            elapsed = time.perf_counter() - started
+            metrics.observe('patra_backend_call_duration_seconds', elapsed,
+                            backend=self.name, method=site, outcome=outcome)
+        if timing.enabled():
+            timing.record_backend_call(site, elapsed, result)
+        return result
+
+    def is_stale(self) -> bool:
+        """True while the circuit is open and reads are served from the last good data"""
+        return self.breaker.is_open
+
+    @contextmanager
+    def feed_reads(self, user_id: str):
+        """
+        Scope the reads of one feed request for ``user_id``
+
+        Backends issue reads as the pipeline asks for them; the async
+        Firestore variant overrides this to prefetch them concurrently.
+        """
+        yield
+
+    # -------------------- INTERFACE --------------------
+    @abstractmethod
+    def initialize(self, service_account_path: Optional[str] = None) -> bool:
+        """Connect to storage; True on success"""
+
+    @abstractmethod
+    def is_connected(self) -> bool:
+        """Whether the backend is ready for reads and writes"""
+
+    @abstractmethod
+    def ping(self, timeout: float = 2.0) -> bool:
+        """Deep connectivity check used by health checks and breaker probes"""
+
+    @abstractmethod
+    def get_all_users(self) -> pd.DataFrame:
+        """All users, one row per user with an ``id`` column (empty DataFrame if none)"""
+
+    @abstractmethod
+    def get_user_by_id(self, user_id: str) -> Optional[Dict]:
+        """User document plus ``id``, or None"""
+
+    @abstractmethod
+    def get_swipe_data(self, days_back: int = 30) -> pd.DataFrame:
+        """Swipes from the last ``days_back`` days"""
+
+    @abstractmethod
+    def get_user_interactions(self, user_id: str, days_back: int = 30) -> pd.DataFrame:
+        """Interactions made by ``user_id`` in the last ``days_back`` days"""
+
+    @abstractmethod
+    def save_users(self, users: List[Dict[str, Any]]) -> int:
+        """Create or replace user documents keyed by their ``id``; returns the number written"""
+
+    @abstractmethod
+    def save_interaction(self, user_id: str, target_id: str, action: str) -> bool:
+        """Record one swipe in both the interactions and swipes collections"""
+
+    @abstractmethod
+    def save_interactions_batch(self, interactions: List[Dict[str, Any]]) -> List[bool]:
+        """Record many swipes (user_id, target_id, action, optional timestamp); per-item success flags"""
+
+    def save_interactions_frame(self, interactions: pd.DataFrame) -> int:
+        """
+        Bulk variant of save_interactions_batch for loaders holding a DataFrame
+
+        Args:
+            interactions: user_id, target_id, action and optional timestamp columns
+
+        Returns:
+            Number of interactions saved
+        """
+        return sum(self.save_interactions_batch(frame_records(interactions)))
+
+    @abstractmethod
+    def update_user_elo_score(self, user_id: str, new_score: int) -> bool:
+        """Set one existing user's Elo score; False if the user does not exist"""
+
+    @abstractmethod
+    def update_user_elo_scores(self, scores: Dict[str, float]) -> bool:
+        """Set many users' Elo scores; True only if every user was updated"""
+
+    # -------------------- SHARED --------------------
+    def get_user_elo_score(self, user_id: str) -> int:
+        """
+        Get user's Elo rating score
+
+        Args:
+            user_id: User ID
+
+        Returns:
+            Elo score (default 1200 if not found)
+        """
+        try:
+            user_data = self.get_user_by_id(user_id)
+            if user_data:
+                return user_data.get('elo_score', 1200)
+            return 1200
+
+        except Exception as e:
+            self.logger.error(f"Error getting Elo score for {user_id}: {e}")
+            return 1200
+
+    def get_potential_matches(self, user_id: str, limit: int = 50) -> pd.DataFrame:
+        """
+        Get potential matches for a user (excluding already swiped users)
+
+        Args:
+            user_id: User ID
+            limit: Maximum number of matches to return
+
+        Returns:
+            DataFrame with potential matches
+        """
+        try:
+            if not self.is_connected():
+                raise Exception(f"{self.name} backend not connected")
+
+            # Get user's own data first
+            user_data = self.get_user_by_id(user_id)
+            if not user_data:
+                return pd.DataFrame()
+
+            # Get all users except self
+            all_users_df = self.get_all_users()
+            potential_matches = all_users_df[all_users_df['id'] != user_id].copy()
+
+            # Filter by gender preferences
+            user_looking_for = user_data.get('looking_for', [])
+            user_gender = user_data.get('gender', '')
+
+            if user_looking_for:
+                potential_matches = potential_matches[
+                    potential_matches['gender'].isin(user_looking_for)
+                ]
+
+            # Filter out users who don't want this user's gender
+            if user_gender:
+                potential_matches = potential_matches[
+                    potential_matches['looking_for'].apply(
+                        lambda x: isinstance(x, list) and user_gender in x
+                    )
+                ]
+
+            # Get user's interaction history to exclude already swiped users
+            interactions_df = self.get_user_interactions(user_id, days_back=365)  # Last year
+            if not interactions_df.empty:
+                swiped_user_ids = set(interactions_df['target_id'].tolist())
+                potential_matches = potential_matches[
+                    ~potential_matches['id'].isin(swiped_user_ids)
+                ]
+
+            # Limit results
+            potential_matches = potential_matches.head(limit)
+
+            self.logger.info(f"Found {len(potential_matches)} potential matches for {user_id}")
+            return potential_matches
+
+        except Exception as e:
+            self.logger.error(f"Error getting potential matches: {e}")
+            return pd.DataFrame()
+
+
+def naive_timestamp(value: Any) -> datetime:
+    """Timestamp as a naive local datetime (tz-aware values are converted)"""
+    if value is None:
+        return datetime.now()
+    if value.__class__ is datetime and value.tzinfo is None:
+        return value
+    if isinstance(value, str):
+        value = pd.Timestamp(value)
+    if isinstance(value, pd.Timestamp):
+        value = value.to_pydatetime()
+    if value.tzinfo is not None:
+        value = value.astimezone().replace(tzinfo=None)
+    return value
+
+
+def naive_timestamps(values: pd.Series) -> pd.Series:
+    """Vectorized naive_timestamp for a datetime-like Series (missing values become now)"""
+    values = pd.to_datetime(values, format='ISO8601') if values.dtype == object else values
+    if getattr(values.dt, 'tz', None) is not None:
+        values = values.dt.tz_convert(datetime.now().astimezone().tzinfo).dt.tz_localize(None)
+    return values.fillna(pd.Timestamp(datetime.now()))
+
+
+def frame_records(interactions: pd.DataFrame) -> List[Dict[str, Any]]:
+    """
+    Interaction rows as dicts with datetime timestamps
+
+    Much cheaper than DataFrame.to_dict('records'), which boxes every value
+    through pandas.
+    """
+    columns = [c for c in ('user_id', 'target_id', 'action') if c in interactions.columns]
+    values = [interactions[c].tolist() for c in columns]
+    if 'timestamp' in interactions.columns:
+        columns.append('timestamp')
+        values.append(list(naive_timestamps(interactions['timestamp']).dt.to_pydatetime()))
+    return [dict(zip(columns, row)) for row in zip(*values)]
+
+
+def _storage_section(name: str) -> Dict:
+    from production.config_loader import load_config
+    return load_config().get(name, {}) or {}
+
+
+def selected_backend() -> str:
+    """Backend name from PATRA_STORAGE_BACKEND, else storage.backend (default firestore)"""
+    name = (os.getenv('PATRA_STORAGE_BACKEND') or _storage_section('storage').get('backend') or 'firestore').lower()
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown storage backend '{name}', expected one of {', '.join(BACKENDS)}")
+    return name
+
+
+def create_storage_backend(name: Optional[str] = None) -> StorageBackend:
+    """
+    Build an (uninitialized) storage backend
+
+    Args:
+        name: firestore, memory or sqlite; defaults to selected_backend()
+
+    Returns:
+        StorageBackend instance
+    """
+    name = name or selected_backend()
+    if name == 'memory':
+        from production.memory_backend import InMemoryBackend
+        return InMemoryBackend()
+    if name == 'sqlite':
+        from production.sqlite_backend import SQLiteBackend
+        return SQLiteBackend(os.getenv('PATRA_SQLITE_PATH')
+                             or _storage_section('storage').get('sqlite_path', 'data/patra.sqlite3'))
+
+    from production.firebase_service import FirebaseService, _use_async_reads
+    if _use_async_reads():
+        from production.async_firebase_service import AsyncFirebaseService
+        return AsyncFirebaseService(max_in_flight=_storage_section('firebase').get('max_in_flight_rpcs', 16))
+    return FirebaseService()
@@ -0,0 +1,401 @@
+"""
+synthetic_data.py
+-----------------
+Purpose:
+    Seeded generator of a realistic user population and swipe log, for sizing,
+    benchmarks and load tests against the local storage backends.
+
+    Users carry the fields the recommender reads (uid, name, age, gender,
+    genderPreference, looking_for, ageMin/ageMax, interests, location, bio,
+    elo_score, photoUrls) and are shaped like a campus dating app:
+        - campuses of Zipf-distributed size; interests are tilted per campus,
+          and locations read "<campus>, <city>" so same-city users partially
+          match;
+        - a latent attractiveness per user drives both Elo and how many
+          likes they receive (skewed, log-normal popularity);
+        - swipe activity per user is Pareto distributed (a few heavy swipers
+          produce most swipes); targets are mostly same-campus, of the
+          preferred gender, and picked in proportion to popularity.
+
+    Everything is vectorized with numpy and produced in chunks, so output
+    streams to the storage backends and Parquet without holding the whole
+    swipe log in memory.
+
+Usage:
+    python -m production.synthetic_data --users 1000000 --swipes 10000000 \
+        --parquet data/synthetic --sqlite data/patra.sqlite3
+
+Integration Order:
+    Writes TO:
+        - storage_backend.py implementations (save_users / save_interactions_batch)
+        - Parquet (users.parquet / swipes.parquet, read by memory_backend.py)
+    Used BY:
+        - benchmarks/ and load tests
+"""
+
+import argparse
+import gc
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from production.logger import get_logger
+
+# -------------------- INIT --------------------
+logger = get_logger(__name__)
+
+CAMPUSES = [
+    ("IIT Delhi", "Delhi"), ("Delhi University", "Delhi"), ("JNU", "Delhi"), ("IIT Bombay", "Mumbai"),
+    ("Mumbai University", "Mumbai"), ("NMIMS", "Mumbai"), ("IISc", "Bangalore"), ("Christ University", "Bangalore"),
+    ("PES University", "Bangalore"), ("IIT Madras", "Chennai"), ("Anna University", "Chennai"),
+    ("IIT Kanpur", "Kanpur"), ("IIT Kharagpur", "Kharagpur"), ("Jadavpur University", "Kolkata"),
+    ("IIT Roorkee", "Roorkee"), ("BITS Pilani", "Pilani"), ("BITS Goa", "Goa"), ("IIIT Hyderabad", "Hyderabad"),
+    ("Osmania University", "Hyderabad"), ("Symbiosis", "Pune"), ("COEP", "Pune"), ("Manipal", "Manipal"),
+    ("VIT", "Vellore"), ("SRM", "Chennai"), ("Amity", "Noida"), ("IIT Guwahati", "Guwahati"),
+    ("NIT Trichy", "Trichy"), ("NIT Surathkal", "Mangalore"), ("IIM Ahmedabad", "Ahmedabad"),
+    ("Nirma University", "Ahmedabad"), ("Chandigarh University", "Chandigarh"), ("Panjab University", "Chandigarh"),
+    ("IIT BHU", "Varanasi"), ("Jamia Millia", "Delhi"), ("Ashoka University", "Sonipat"),
+    ("Thapar", "Patiala"), ("IIT Indore", "Indore"), ("LPU", "Jalandhar"), ("KIIT", "Bhubaneswar"),
+    ("IIT Hyderabad", "Hyderabad"),
+]
+
+INTERESTS = [
+    "music", "movies", "travel", "gaming", "coding", "photography", "fitness", "football", "cricket",
+    "basketball", "dance", "reading", "writing", "poetry", "art", "design", "fashion", "food", "cooking",
+    "coffee", "startups", "finance", "anime", "k-dramas", "hiking", "yoga", "meditation", "theatre",
+    "standup", "podcasts", "science", "astronomy", "robotics", "debating", "quizzing", "volunteering",
+    "pets", "cycling", "badminton", "chess",
+]
+
+FIRST_NAMES = [
+    "Aarav", "Vivaan", "Aditya", "Arjun", "Kabir", "Rohan", "Ishaan", "Karan", "Rahul", "Dev",
+    "Ananya", "Diya", "Aisha", "Saanvi", "Meera", "Priya", "Riya", "Kavya", "Nisha", "Tara",
+    "Sam", "Alex", "Noor", "Kiran", "Ria", "Zoya", "Neha", "Aman", "Yash", "Ira",
+]
+
+BIO_TEMPLATES = [
+    "Into {a} and {b}. {campus} '{year}.",
+    "{a} by day, {b} by night.",
+    "Can't live without {a}. Ask me about {b}!",
+    "{campus} | {a}, {b} & {c}",
+    "Looking for someone to share {a} and {c} with.",
+    "Probably talking about {b} right now.",
+    "New to {city}, love {a}, {b} and good conversations.",
+    "Part-time {c} enthusiast, full-time student.",
+]
+
+GENDERS = np.array(["male", "female", "non-binary"])
+GENDER_SHARE = [0.51, 0.47, 0.02]
+# Rows: own gender; columns: P(genderPreference = male, female, all)
+PREFERENCE_TABLE = np.array([
+    [0.04, 0.90, 0.06],
+    [0.88, 0.05, 0.07],
+    [0.15, 0.15, 0.70],
+])
+PREFERENCES = np.array(["male", "female", "all"])
+
+ACTIONS = np.array(["dislike", "like", "superlike"])
+SAME_CAMPUS_SHARE = 0.7
+SUPERLIKE_SHARE = 0.04
+HISTORY_DAYS = 120
+MAX_INTERESTS = 7
+LOCATIONS = [f"{campus}, {city}" for campus, city in CAMPUSES]
+PHOTO_URL_ROOT = "https://cdn.patra.app/u/"
+PHOTO_FILES = tuple(f"{p}.jpg" for p in range(4))
+
+
+# -------------------- POPULATION --------------------
+class SyntheticPopulation:
+    """
+    Latent traits of N users; emits user documents and swipes in chunks.
+    """
+
+    def __init__(self, n_users: int, seed: int = 42, id_prefix: str = "S", now: Optional[datetime] = None):
+        self.n_users = n_users
+        self.seed = seed
+        self.id_prefix = id_prefix
+        # Timestamps are relative to ``now``; pin it to reproduce a run exactly
+        self.now = (now or datetime.now()).replace(microsecond=0)
+        self.width = max(7, len(str(n_users)))
+        rng = np.random.default_rng(seed)
+
+        n_campuses = len(CAMPUSES)
+        campus_size = 1.0 / np.arange(1, n_campuses + 1) ** 0.8
+        self.campus = rng.choice(n_campuses, n_users, p=campus_size / campus_size.sum())
+        self.gender = rng.choice(len(GENDERS), n_users, p=GENDER_SHARE)
+        self.preference = _choose_rows(rng, PREFERENCE_TABLE[self.gender])
+        self.age = np.clip(np.rint(rng.normal(21.0, 2.2, n_users)), 18, 32).astype(np.int16)
+
+        # Latent attractiveness: drives Elo and likes received
+        self.attractiveness = rng.standard_normal(n_users)
+        self.popularity = np.exp(1.2 * self.attractiveness)
+        self.elo = np.clip(np.rint(1200 + 110 * self.attractiveness + rng.normal(0, 30, n_users)), 800, 2400)
+
+        # Pareto swipe activity, capped so one user cannot produce most of the log
+        activity = rng.pareto(1.16, n_users) + 1.0
+        self.activity = np.minimum(activity, np.quantile(activity, 0.9999))
+
+        # Campus-specific interest tastes around a Zipf global popularity
+        global_taste = 1.0 / np.arange(1, len(INTERESTS) + 1) ** 0.7
+        tilt = np.exp(rng.normal(0, 0.8, (n_campuses, len(INTERESTS))))
+        taste = global_taste * tilt
+        self.interest_cdf = np.cumsum(taste / taste.sum(axis=1, keepdims=True), axis=1)
+
+        self._build_target_index()
+
+    def user_id(self, index: int) -> str:
+        return f"{self.id_prefix}{index:0{self.width}d}"
+
+    def user_ids(self, indices: np.ndarray) -> List[str]:
+        return [f"{self.id_prefix}{i:0{self.width}d}" for i in indices.tolist()]
+
+    # -------------------- USERS --------------------
+    def users(self, chunk_size: int = 100_000) -> Iterator[List[Dict]]:
+        """Yield user documents (with ``id``) in chunks"""
+        for start in range(0, self.n_users, chunk_size):
+            yield self._user_chunk(np.arange(start, min(start + chunk_size, self.n_users)))
+
+    def _user_chunk(self, idx: np.ndarray) -> List[Dict]:
+        rng = np.random.default_rng([self.seed, 1, int(idx[0])])
+        n = len(idx)
+
+        draws = np.minimum((rng.random((n, MAX_INTERESTS))[..., None] > self.interest_cdf[self.campus[idx]][:, None, :])
+                           .sum(axis=-1), len(INTERESTS) - 1)
+        counts = rng.integers(3, MAX_INTERESTS + 1, n)
+        interests = [[INTERESTS[i] for i in dict.fromkeys(row[:k])] for row, k in zip(draws.tolist(), counts.tolist())]
+
+        ages = self.age[idx].astype(np.int64)
+        age_min = np.maximum(18, ages - rng.integers(1, 4, n)).tolist()
+        age_max = (ages + rng.integers(2, 7, n)).tolist()
+        ages = ages.tolist()
+        names = np.array(FIRST_NAMES)[rng.integers(0, len(FIRST_NAMES), n)].tolist()
+        templates = rng.integers(0, len(BIO_TEMPLATES), n).tolist()
+        years = (rng.integers(24, 29, n)).tolist()
+        n_photos = rng.integers(1, 5, n).tolist()
+        created = self.now - timedelta(days=HISTORY_DAYS)
+
+        ids = self.user_ids(idx)
+        genders = GENDERS[self.gender[idx]].tolist()
+        preferences = PREFERENCES[self.preference[idx]].tolist()
+        campuses = self.campus[idx].tolist()
+        elos = self.elo[idx].astype(int).tolist()
+
+        users = []
+        for j in range(n):
+            campus, city = CAMPUSES[campuses[j]]
+            location = LOCATIONS[campuses[j]]
+            mine = interests[j]
+            preference = preferences[j]
+            users.append({
+                'id': ids[j],
+                'uid': ids[j],
+                'name': names[j],
+                'username': f"{names[j].lower()}{ids[j][-4:]}",
+                'age': ages[j],
+                'gender': genders[j],
+                'genderPreference': preference,
+                'looking_for': ['male', 'female'] if preference == 'all' else [preference],
+                'ageMin': age_min[j],
+                'ageMax': age_max[j],
+                'interests': mine,
+                'location': location,
+                'bio': BIO_TEMPLATES[templates[j]].format(
+                    a=mine[0], b=mine[1 % len(mine)], c=mine[2 % len(mine)],
+                    campus=campus, city=city, year=years[j]),
+                'elo_score': elos[j],
+                'photoUrls': list(map(f"{PHOTO_URL_ROOT}{ids[j]}/".__add__, PHOTO_FILES[:n_photos[j]])),
+                'createdAt': created,
+            })
+        return users
+
+    # -------------------- SWIPES --------------------
+    def _build_target_index(self):
+        """Users ordered by (gender, campus) with cumulative popularity for weighted sampling"""
+        n_campuses = len(CAMPUSES)
+        group = self.gender * n_campuses + self.campus
+        self.target_order = np.argsort(group, kind='stable')
+        self.target_cum = np.cumsum(self.popularity[self.target_order])
+        bounds = np.searchsorted(group[self.target_order], np.arange(len(GENDERS) * n_campuses + 1))
+        cum0 = np.concatenate([[0.0], self.target_cum])
+        self.group_base = cum0[bounds[:-1]]
+        self.group_total = cum0[bounds[1:]] - self.group_base
+        gender_bounds = bounds[::n_campuses]
+        self.gender_base = cum0[gender_bounds[:-1]]
+        self.gender_total = cum0[gender_bounds[1:]] - self.gender_base
+        self.activity_cum = np.cumsum(self.activity)
+
+    def swipes(self, n_swipes: int, chunk_size: int = 500_000) -> Iterator[pd.DataFrame]:
+        """Yield swipes (user_id, target_id, action, timestamp) in chunks"""
+        for start in range(0, n_swipes, chunk_size):
+            n = min(chunk_size, n_swipes - start)
+            yield self._swipe_chunk(np.random.default_rng([self.seed, 2, start]), n)
+
+    def _swipe_chunk(self, rng: np.random.Generator, n: int) -> pd.DataFrame:
+        n_campuses = len(CAMPUSES)
+        swiper = np.minimum(np.searchsorted(self.activity_cum, rng.random(n) * self.activity_cum[-1], 'right'),
+                            self.n_users - 1)
+
+        # Preferred gender of the target ('all' -> male or female at random)
+        wanted = self.preference[swiper].copy()
+        open_to_all = wanted == 2
+        wanted[open_to_all] = rng.integers(0, 2, open_to_all.sum())
+
+        same_campus = rng.random(n) < SAME_CAMPUS_SHARE
+        group = wanted * n_campuses + self.campus[swiper]
+        base = np.where(same_campus, self.group_base[group], self.gender_base[wanted])
+        total = np.where(same_campus, self.group_total[group], self.gender_total[wanted])
+        empty = total <= 0
+        base[empty], total[empty] = self.gender_base[wanted[empty]], self.gender_total[wanted[empty]]
+        empty = total <= 0
+        base[empty], total[empty] = 0.0, self.target_cum[-1]
+
+        position = np.minimum(np.searchsorted(self.target_cum, base + rng.random(n) * total, 'right'),
+                              self.n_users - 1)
+        target = self.target_order[position]
+        self_swipe = target == swiper
+        target[self_swipe] = (target[self_swipe] + 1) % self.n_users
+
+        like_p = 1.0 / (1.0 + np.exp(-(-1.0 + 1.1 * self.attractiveness[target] + 0.3 * same_campus)))
+        liked = rng.random(n) < like_p
+        action = np.where(liked, np.where(rng.random(n) < SUPERLIKE_SHARE, 2, 1), 0)
+
+        # Recency-weighted timestamps over the history window
+        age_seconds = (rng.power(0.6, n) * HISTORY_DAYS * 86400.0).astype('timedelta64[s]')
+        timestamps = np.datetime64(self.now, 's') - age_seconds
+
+        return pd.DataFrame({
+            'user_id': self.user_ids(swiper),
+            'target_id': self.user_ids(target),
+            'action': ACTIONS[action],
+            'timestamp': pd.to_datetime(timestamps),
+        })
+
+
+def _choose_rows(rng: np.random.Generator, probabilities: np.ndarray) -> np.ndarray:
+    """One categorical draw per row of ``probabilities``"""
+    return (rng.random(len(probabilities))[:, None] > np.cumsum(probabilities, axis=1)).sum(axis=1)
+
+
+# -------------------- SINKS --------------------
+class ParquetSink:
+    """Streams user and swipe chunks to users.parquet / swipes.parquet in ``directory``."""
+
+    def __init__(self, directory: str):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError("Parquet output requires pyarrow (pip install pyarrow)") from e
+        self.pa, self.pq = pa, pq
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._writers = {}
+
+    def _write(self, name: str, table):
+        writer = self._writers.get(name)
+        if writer is None:
+            writer = self.pq.ParquetWriter(os.path.join(self.directory, f"{name}.parquet"), table.schema)
+            self._writers[name] = writer
+        writer.write_table(table)
+
+    def write_users(self, users: List[Dict]):
+        self._write('users', self.pa.Table.from_pylist(users))
+
+    def write_swipes(self, swipes: pd.DataFrame):
+        self._write('swipes', self.pa.Table.from_pandas(swipes, preserve_index=False))
+
+    def close(self):
+        for writer in self._writers.values():
+            writer.close()
+
+
+class BackendSink:
+    """Streams chunks into a StorageBackend via save_users / save_interactions_batch."""
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    def write_users(self, users: List[Dict]):
+        self.backend.save_users(users)
+
+    def write_swipes(self, swipes: pd.DataFrame):
+        self.backend.save_interactions_frame(swipes)
+
+    def close(self):
+        pass
+
+
+def generate(n_users: int, n_swipes: int, sinks: list, seed: int = 42,
+             user_chunk_size: int = 100_000, swipe_chunk_size: int = 500_000) -> SyntheticPopulation:
+    """
+    Generate a population and stream it to every sink
+
+    Args:
+        n_users: Number of users
+        n_swipes: Number of swipes
+        sinks: ParquetSink / BackendSink instances
+        seed: Random seed; the same seed always yields the same data
+
+    Returns:
+        The SyntheticPopulation (for picking user IDs in benchmarks)
+    """
+    started = time.perf_counter()
+    population = SyntheticPopulation(n_users, seed)
+    # Chunks are millions of short-lived containers; cyclic GC passes over
+    # them cost ~40% of generation time and reclaim nothing
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for chunk in population.users(user_chunk_size):
+            for sink in sinks:
+                sink.write_users(chunk)
+        logger.info(f"Generated {n_users} users in {time.perf_counter() - started:.1f}s")
+
+        for chunk in population.swipes(n_swipes, swipe_chunk_size):
+            for sink in sinks:
+                sink.write_swipes(chunk)
+        for sink in sinks:
+            sink.close()
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    logger.info(f"Generated {n_users} users and {n_swipes} swipes in {time.perf_counter() - started:.1f}s")
+    return population
+
+
+def populate(backend, n_users: int, n_swipes: int, seed: int = 42) -> SyntheticPopulation:
+    """Fill an initialized storage backend with a synthetic population"""
+    return generate(n_users, n_swipes, [BackendSink(backend)], seed)
+
+
+# -------------------- CLI --------------------
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Generate a synthetic Patra population")
+    parser.add_argument("--users", type=int, default=10_000, help="Number of users")
+    parser.add_argument("--swipes", type=int, default=None, help="Number of swipes (default: 20 per user)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--parquet", type=str, default=None, help="Output directory for Parquet files")
+    parser.add_argument("--sqlite", type=str, default=None, help="SQLite database file to load")
+    args = parser.parse_args(argv)
+
+    sinks = []
+    if args.parquet:
+        sinks.append(ParquetSink(args.parquet))
+    if args.sqlite:
+        from production.sqlite_backend import SQLiteBackend
+        backend = SQLiteBackend(args.sqlite)
+        if not backend.initialize():
+            raise SystemExit(f"Cannot open {args.sqlite}")
+        sinks.append(BackendSink(backend))
+    if not sinks:
+        parser.error("choose at least one of --parquet / --sqlite")
+
+    generate(args.users, args.swipes if args.swipes is not None else 20 * args.users, sinks, args.seed)
+
+
+if __name__ == "__main__":
+    main()
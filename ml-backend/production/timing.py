@@ -0,0 +1,244 @@
+"""
+timing.py
+---------
+Purpose:
+    Lightweight per-stage instrumentation for the feed and interaction paths.
+    Pipeline stages record wall time and rows in/out; storage backend calls
+    record count, time and approximate bytes returned. Totals accumulate in
+    an in-process registry (reported by /api/health); a request can also
+    collect its own breakdown, returned as an ``X-Timing`` header.
+
+    Off by default (``monitoring.stage_timing``): stage() then hands back a
+    shared no-op context manager, so instrumented code pays one flag check.
+
+Integration Order:
+    Recorded BY:
+        - main.py (generate_user_feed, record_interaction, record_interactions_batch)
+        - data_match_firebase.py (get_top_matches)
+        - storage_backend.py / async_firebase_service.py (backend calls)
+    Read BY:
+        - api_handlers.py (health payload, X-Timing header)
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from itertools import islice
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+
+from production.config_loader import load_config
+
+# -------------------- INIT --------------------
+config = load_config()
+
+MONITORING_CONFIG = config.get("monitoring", {}) or {}
+TIMING_HEADER = bool(MONITORING_CONFIG.get("timing_header", False))
+# The header is built from the same timers, so it switches them on too
+STAGE_TIMING = bool(MONITORING_CONFIG.get("stage_timing", False)) or TIMING_HEADER
+
+# Items sampled to estimate the size of a large backend result
+BYTES_SAMPLE = 32
+
+_current_trace: ContextVar[Optional["RequestTiming"]] = ContextVar("patra_timing", default=None)
+
+
+def enabled() -> bool:
+    """True when stage and backend timings are being recorded"""
+    return STAGE_TIMING
+
+
+# -------------------- REGISTRY --------------------
+class TimingRegistry:
+    """Process-wide totals per pipeline stage and per backend call site."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stages: Dict[str, List[float]] = {}    # name -> [count, seconds, max seconds, rows in, rows out]
+        self._backend: Dict[str, List[float]] = {}   # site -> [calls, seconds, max seconds, bytes]
+
+    def record_stage(self, name: str, seconds: float, rows_in: Optional[int], rows_out: Optional[int]):
+        with self._lock:
+            stats = self._stages.get(name)
+            if stats is None:
+                stats = self._stages[name] = [0, 0.0, 0.0, 0, 0]
+            stats[0] += 1
+            stats[1] += seconds
+            stats[2] = max(stats[2], seconds)
+            stats[3] += rows_in or 0
+            stats[4] += rows_out or 0
+
+    def record_backend(self, site: str, seconds: float, nbytes: int):
+        with self._lock:
+            stats = self._backend.get(site)
+            if stats is None:
+                stats = self._backend[site] = [0, 0.0, 0.0, 0]
+            stats[0] += 1
+            stats[1] += seconds
+            stats[2] = max(stats[2], seconds)
+            stats[3] += nbytes
+
+    def snapshot(self) -> Dict[str, Dict]:
+        with self._lock:
+            stages = {name: {'count': int(n), 'total_ms': round(total * 1000, 2),
+                             'mean_ms': round(total * 1000 / n, 3), 'max_ms': round(peak * 1000, 2),
+                             'rows_in': int(rows_in), 'rows_out': int(rows_out)}
+                      for name, (n, total, peak, rows_in, rows_out) in self._stages.items()}
+            backend = {site: {'calls': int(n), 'total_ms': round(total * 1000, 2),
+                              'mean_ms': round(total * 1000 / n, 3), 'max_ms': round(peak * 1000, 2),
+                              'bytes': int(nbytes)}
+                       for site, (n, total, peak, nbytes) in self._backend.items()}
+        return {'enabled': STAGE_TIMING, 'stages': stages, 'backend': backend}
+
+    def reset(self):
+        with self._lock:
+            self._stages.clear()
+            self._backend.clear()
+
+
+_registry = TimingRegistry()
+
+
+def get_timing_registry() -> TimingRegistry:
+    """
+    Get the global timing registry
+
+    Returns:
+        TimingRegistry instance
+    """
+    return _registry
+
+
+# -------------------- PER-REQUEST TRACE --------------------
+class RequestTiming:
+    """Stage and backend timings of one request, in the order they finished."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages: List[tuple] = []                # (name, seconds, rows in, rows out)
+        self.backend: Dict[str, List[float]] = {}    # site -> [calls, seconds, bytes]
+
+    def header(self) -> str:
+        """Server-Timing style breakdown: ``total;dur=12.3, feed.base_matches;dur=8.1;in=0;out=20, ...``"""
+        parts = [f"total;dur={(time.perf_counter() - self.started) * 1000:.1f}"]
+        for name, seconds, rows_in, rows_out in self.stages:
+            part = f"{name};dur={seconds * 1000:.1f}"
+            if rows_in is not None:
+                part += f";in={rows_in}"
+            if rows_out is not None:
+                part += f";out={rows_out}"
+            parts.append(part)
+        for site, (calls, seconds, nbytes) in self.backend.items():
+            parts.append(f"backend.{site};dur={seconds * 1000:.1f};calls={int(calls)};bytes={int(nbytes)}")
+        return ', '.join(parts)
+
+
+@contextmanager
+def trace():
+    """Collect the timings recorded by this request (context) into a RequestTiming"""
+    request_timing = RequestTiming()
+    token = _current_trace.set(request_timing)
+    try:
+        yield request_timing
+    finally:
+        _current_trace.reset(token)
+
+
+# -------------------- STAGES --------------------
+class _Stage:
+    """Times a ``with`` block; set ``rows_out`` (and ``rows_in``) inside it."""
+
+    __slots__ = ('name', 'rows_in', 'rows_out', 'started')
+
+    def __init__(self, name: str, rows_in: Optional[int]):
+        self.name = name
+        self.rows_in = rows_in
+        self.rows_out: Optional[int] = None
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        seconds = time.perf_counter() - self.started
+        _registry.record_stage(self.name, seconds, self.rows_in, self.rows_out)
+        request_timing = _current_trace.get()
+        if request_timing is not None:
+            request_timing.stages.append((self.name, seconds, self.rows_in, self.rows_out))
+        return False
+
+
+class _NoopStage:
+    __slots__ = ('rows_in', 'rows_out')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP_STAGE = _NoopStage()
+
+
+def stage(name: str, rows_in: Optional[int] = None):
+    """
+    Time a pipeline stage
+
+    Usage:
+        with timing.stage('match.score', rows_in=len(candidates)) as s:
+            ...
+            s.rows_out = len(matches)
+    """
+    if not STAGE_TIMING:
+        return _NOOP_STAGE
+    return _Stage(name, rows_in)
+
+
+# -------------------- BACKEND CALLS --------------------
+def approx_bytes(result: Any) -> int:
+    """
+    Rough size of a backend result
+
+    Text length of the values for small results; large lists and DataFrames
+    are estimated from their first BYTES_SAMPLE items.
+    """
+    if result is None or isinstance(result, (bool, int, float)):
+        return 0
+    if isinstance(result, (str, bytes)):
+        return len(result)
+    if isinstance(result, pd.DataFrame):
+        if result.empty:
+            return 0
+        sample = result.head(BYTES_SAMPLE)
+        return int(sample.memory_usage(index=False, deep=True).sum() * len(result) / len(sample))
+    if isinstance(result, dict):
+        return sum(len(str(k)) + len(str(v)) for k, v in result.items())
+    if isinstance(result, (list, tuple)):
+        if not result:
+            return 0
+        sample = list(islice(result, BYTES_SAMPLE))
+        return int(sum(approx_bytes(item) for item in sample) * len(result) / len(sample))
+    to_dict = getattr(result, 'to_dict', None)   # Firestore DocumentSnapshot
+    if callable(to_dict):
+        try:
+            return approx_bytes(to_dict() or {})
+        except Exception:
+            return 0
+    return len(str(result))
+
+
+def record_backend_call(site: str, seconds: float, result: Any):
+    """Record one storage call (all of its retries and hedges) and the size of what it returned"""
+    nbytes = approx_bytes(result)
+    _registry.record_backend(site, seconds, nbytes)
+    request_timing = _current_trace.get()
+    if request_timing is not None:
+        stats = request_timing.backend.get(site)
+        if stats is None:
+            stats = request_timing.backend[site] = [0, 0.0, 0]
+        stats[0] += 1
+        stats[1] += seconds
+        stats[2] += nbytes
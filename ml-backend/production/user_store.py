@@ -0,0 +1,217 @@
+"""
+user_store.py
+-------------
+Purpose:
+    In-process snapshot of the Firebase users collection for the feed hot path.
+    Holds the users DataFrame, a user_id -> row id index and a dense Elo rating
+    vector, so pipeline stages can join ratings by row id instead of re-reading
+    the whole collection on every request.
+
+Integration Order:
+    Read BY:
+        - main.py (Elo stage of the live feed)
+        - elo_update.py (get_elo_scores_firebase)
+    Updated BY:
+        - elo_update.py (write-through after every Elo change)
+"""
+
+import threading
+import time
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from production.config_loader import load_config
+from production.elo_index import EloIndex
+from production.firebase_service import get_firebase_service
+from production.logger import get_logger
+
+# -------------------- INIT --------------------
+logger = get_logger(__name__)
+config = load_config()
+
+DEFAULT_ELO = float(config.get("elo", {}).get("initial_rating", 1200))
+SNAPSHOT_TTL_SECONDS = float(config.get("firebase", {}).get("cache_ttl_seconds", 300))
+
+# Profile fields that change how a user's own feed is filtered and scored
+PROFILE_FIELDS = ("age", "gender", "genderPreference", "ageMin", "ageMax", "interests", "location")
+
+
+# -------------------- SNAPSHOT --------------------
+class UserSnapshot:
+    """Immutable view of the users collection taken at ``loaded_at``."""
+
+    def __init__(self, users_df: pd.DataFrame, version: int):
+        self.users_df = users_df.reset_index(drop=True)
+        self.version = version
+        self.loaded_at = time.time()
+
+        ids = self.users_df["id"].astype(str) if "id" in self.users_df.columns else pd.Series(dtype=str)
+        self.id_to_row: Dict[str, int] = {uid: row for row, uid in enumerate(ids)}
+
+        # Candidates are keyed by 'uid' in data_match_firebase; alias it when it differs
+        if "uid" in self.users_df.columns:
+            for row, uid in enumerate(self.users_df["uid"]):
+                if isinstance(uid, str) and uid not in self.id_to_row:
+                    self.id_to_row[uid] = row
+
+        if "elo_score" in self.users_df.columns:
+            elo = pd.to_numeric(self.users_df["elo_score"], errors="coerce").fillna(DEFAULT_ELO)
+            self.elo = elo.to_numpy(dtype=np.float64, copy=True)
+        else:
+            self.elo = np.full(len(self.users_df), DEFAULT_ELO, dtype=np.float64)
+
+    def __len__(self) -> int:
+        return len(self.users_df)
+
+    def rows_for(self, user_ids: Iterable[str]) -> np.ndarray:
+        """Map user IDs to row ids (-1 for unknown users)."""
+        get = self.id_to_row.get
+        return np.fromiter((get(str(uid), -1) for uid in user_ids), dtype=np.int64)
+
+    def age_seconds(self) -> float:
+        return time.time() - self.loaded_at
+
+
+# -------------------- STORE --------------------
+class UserStore:
+    """
+    Cached users snapshot with a maintained Elo order index.
+
+    The snapshot is reloaded from Firebase at most once per ``ttl_seconds``.
+    Elo changes made by this process are written through to the rating vector
+    and the Fenwick index, so they are visible immediately without a reload.
+    """
+
+    def __init__(self, ttl_seconds: float = SNAPSHOT_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._snapshot: Optional[UserSnapshot] = None
+        self.elo_index = EloIndex()
+        self._version = 0
+        self._user_versions: Dict[str, int] = {}
+        self._lock = threading.RLock()
+
+    def snapshot(self) -> Optional[UserSnapshot]:
+        """
+        Return the current snapshot, reloading it when missing or expired.
+
+        While the backend circuit is open an expired snapshot is kept as is.
+        """
+        snap = self._snapshot
+        if snap is None or (snap.age_seconds() > self.ttl_seconds and not get_firebase_service().is_stale()):
+            snap = self.refresh()
+        return snap
+
+    def refresh(self) -> Optional[UserSnapshot]:
+        """Reload the users collection and rebuild the Elo index."""
+        with self._lock:
+            firebase_service = get_firebase_service()
+            users_df = firebase_service.get_all_users()
+            if self._snapshot is not None and (users_df.empty or firebase_service.is_stale()):
+                logger.warning("User snapshot refresh got no fresh users, keeping previous snapshot")
+                return self._snapshot
+            if users_df.empty:
+                return self._snapshot
+
+            self._version += 1
+            snap = UserSnapshot(users_df, self._version)
+            self.elo_index.build(snap.elo)
+            self._snapshot = snap
+            logger.info(f"Loaded user snapshot v{snap.version} with {len(snap)} users")
+            return snap
+
+    def invalidate(self):
+        """Drop the snapshot so the next read reloads it."""
+        with self._lock:
+            self._snapshot = None
+
+    def elo_for(self, user_ids: Iterable[str]) -> np.ndarray:
+        """Return Elo ratings for ``user_ids`` (default rating for unknown users)."""
+        user_ids = list(user_ids)
+        snap = self.snapshot()
+        if snap is None:
+            return np.full(len(user_ids), DEFAULT_ELO, dtype=np.float64)
+
+        rows = snap.rows_for(user_ids)
+        known = rows >= 0
+        ratings = np.full(len(rows), DEFAULT_ELO, dtype=np.float64)
+        ratings[known] = snap.elo[rows[known]]
+        return ratings
+
+    def elo_range(self) -> Tuple[float, float]:
+        """Global (min, max) Elo across all users, without scanning the column."""
+        if self.snapshot() is None:
+            return DEFAULT_ELO, DEFAULT_ELO
+        with self._lock:
+            if len(self.elo_index) == 0:
+                return DEFAULT_ELO, DEFAULT_ELO
+            return self.elo_index.min(), self.elo_index.max()
+
+    def elo_percentiles(self, ratings: Iterable[float]) -> np.ndarray:
+        """Population percentile in [0, 1] for each rating, O(log n) per rating."""
+        self.snapshot()
+        with self._lock:
+            return self.elo_index.percentiles(np.fromiter(ratings, dtype=np.float64))
+
+    def update_elo(self, user_id: str, new_rating: float):
+        """Write an Elo change through to the cached vector and order index."""
+        with self._lock:
+            snap = self._snapshot
+            if snap is None:
+                return
+            row = snap.id_to_row.get(str(user_id))
+            if row is None:
+                return
+            self.elo_index.update(snap.elo[row], new_rating)
+            snap.elo[row] = float(new_rating)
+
+    def profile_signature(self, user_id: str) -> Optional[int]:
+        """Hash of the user's scoring-relevant profile fields (None if unknown)."""
+        snap = self.snapshot()
+        if snap is None:
+            return None
+        row = snap.id_to_row.get(str(user_id))
+        if row is None:
+            return None
+        record = snap.users_df.iloc[row]
+        return hash(repr(tuple(record.get(field) for field in PROFILE_FIELDS)))
+
+    def bump_user_version(self, user_id: str):
+        """Mark that ``user_id``'s own feed inputs changed (e.g. a new swipe)."""
+        with self._lock:
+            self._user_versions[user_id] = self._user_versions.get(user_id, 0) + 1
+
+    def data_version(self, user_id: str) -> Tuple[int, int]:
+        """(snapshot version, per-user version) identifying the data a feed is built from."""
+        return self._version, self._user_versions.get(user_id, 0)
+
+    def status(self) -> Dict:
+        """Cache status for health and debug endpoints."""
+        snap = self._snapshot
+        if snap is None:
+            return {"loaded": False, "users": 0, "version": self._version}
+        return {
+            "loaded": True,
+            "users": len(snap),
+            "version": snap.version,
+            "age_seconds": round(snap.age_seconds(), 1),
+            "ttl_seconds": self.ttl_seconds,
+            "stale": snap.age_seconds() > self.ttl_seconds,
+        }
+
+
+# Global user store instance
+_user_store = None
+
+def get_user_store() -> UserStore:
+    """
+    Get the global user store instance
+
+    Returns:
+        UserStore instance
+    """
+    global _user_store
+    if _user_store is None:
+        _user_store = UserStore()
+    return _user_store
@@ -0,0 +1,229 @@
+"""
+Shared pytest setup for the ML backend tests.
+
+Modules under ``production/`` load ``production/settings.yaml`` relative to
+the working directory, so tests run from the ml-backend folder. Also provides
+a fault-injecting in-memory Firestore for the storage and call-policy tests
+(with an async client view of it), and an in-memory backend installed as the
+global storage service.
+"""
+
+import asyncio
+import os
+import sys
+import threading
+import time
+from collections import deque
+
+import pytest
+from google.api_core import exceptions as gexc
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+sys.path.insert(0, BACKEND_DIR)
+os.chdir(BACKEND_DIR)
+
+
+# -------------------- FAULT-INJECTING FAKE --------------------
+class FaultInjectingFirestore:
+    """
+    Minimal Firestore stand-in. Faults are queued per operation name
+    ('get', 'stream', 'set', 'update', 'commit'); each RPC pops one, which is
+    either an exception to raise or a delay in seconds.
+    """
+
+    def __init__(self):
+        self.collections = {}
+        self.faults = {}
+        self.rpcs = []
+        self._ids = 0
+        self._lock = threading.Lock()
+
+    def inject(self, op, *faults):
+        self.faults.setdefault(op, deque()).extend(faults)
+
+    def rpc(self, op):
+        with self._lock:
+            self.rpcs.append(op)
+            queue = self.faults.get(op)
+            fault = queue.popleft() if queue else None
+        if isinstance(fault, BaseException):
+            raise fault
+        if fault:
+            time.sleep(fault)
+
+    def new_id(self):
+        with self._lock:
+            self._ids += 1
+            return f"auto{self._ids}"
+
+    def collection(self, name):
+        return FakeQuery(self, self.collections.setdefault(name, {}))
+
+    def batch(self):
+        return FakeBatch(self)
+
+
+class FakeSnapshot:
+    def __init__(self, doc_id, data):
+        self.id, self._data = doc_id, data
+        self.exists = data is not None
+
+    def to_dict(self):
+        return dict(self._data)
+
+
+class FakeDocument:
+    def __init__(self, db, docs, doc_id):
+        self.db, self.docs, self.id = db, docs, doc_id
+
+    def get(self, timeout=None):
+        self.db.rpc('get')
+        return FakeSnapshot(self.id, self.docs.get(self.id))
+
+    def set(self, data):
+        self.db.rpc('set')
+        self.docs[self.id] = dict(data)
+
+    def update(self, fields):
+        self.db.rpc('update')
+        if self.id not in self.docs:
+            raise gexc.NotFound(f"No document to update: {self.id}")
+        self.docs[self.id].update(fields)
+
+
+class FakeQuery:
+    def __init__(self, db, docs, filters=()):
+        self.db, self.docs, self.filters = db, docs, filters
+
+    def document(self, doc_id=None):
+        return FakeDocument(self.db, self.docs, doc_id or self.db.new_id())
+
+    def where(self, field, op, value):
+        return FakeQuery(self.db, self.docs, self.filters + ((field, op, value),))
+
+    def limit(self, count):
+        return self
+
+    def get(self, timeout=None):
+        return list(self.stream(timeout))
+
+    def stream(self, timeout=None):
+        self.db.rpc('stream')
+        checks = {'==': lambda a, b: a == b, '>=': lambda a, b: a >= b}
+        for doc_id, data in list(self.docs.items()):
+            if all(checks[op](data.get(field), value) for field, op, value in self.filters):
+                yield FakeSnapshot(doc_id, data)
+
+
+class FakeBatch:
+    def __init__(self, db):
+        self.db, self.ops, self.updates = db, [], []
+
+    def set(self, doc, data):
+        self.ops.append(lambda: doc.docs.__setitem__(doc.id, dict(data)))
+
+    def update(self, doc, fields):
+        self.updates.append(doc)
+        self.ops.append(lambda: doc.docs[doc.id].update(fields))
+
+    def commit(self):
+        self.db.rpc('commit')
+        missing = [doc.id for doc in self.updates if doc.id not in doc.docs]
+        if missing:
+            raise gexc.NotFound(f"No document to update: {missing[0]}")
+        for op in self.ops:
+            op()
+
+
+class AsyncFaultInjectingFirestore:
+    """
+    AsyncClient view of a FaultInjectingFirestore: same documents and fault
+    queues, but delays are awaited. Records the timeout of every RPC and the
+    peak number of RPCs in flight.
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self.timeouts = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def rpc(self, op, timeout):
+        with self.db._lock:
+            self.db.rpcs.append(op)
+            self.timeouts.append(timeout)
+            queue = self.db.faults.get(op)
+            fault = queue.popleft() if queue else None
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            if isinstance(fault, BaseException):
+                raise fault
+            if fault:
+                await asyncio.sleep(fault)
+        finally:
+            self.in_flight -= 1
+
+    def collection(self, name):
+        return AsyncFakeQuery(self, self.db.collections.setdefault(name, {}))
+
+
+class AsyncFakeDocument:
+    def __init__(self, client, docs, doc_id):
+        self.client, self.docs, self.id = client, docs, doc_id
+
+    async def get(self, timeout=None):
+        await self.client.rpc('get', timeout)
+        return FakeSnapshot(self.id, self.docs.get(self.id))
+
+
+class AsyncFakeQuery:
+    def __init__(self, client, docs, filters=()):
+        self.client, self.docs, self.filters = client, docs, filters
+
+    def document(self, doc_id):
+        return AsyncFakeDocument(self.client, self.docs, doc_id)
+
+    def where(self, field, op, value):
+        return AsyncFakeQuery(self.client, self.docs, self.filters + ((field, op, value),))
+
+    async def stream(self, timeout=None):
+        await self.client.rpc('stream', timeout)
+        checks = {'==': lambda a, b: a == b, '>=': lambda a, b: a is not None and a >= b}
+        for doc_id, data in list(self.docs.items()):
+            if all(checks[op](data.get(field), value) for field, op, value in self.filters):
+                yield FakeSnapshot(doc_id, data)
+
+
+@pytest.fixture
+def fake_db():
+    """Fault-injecting Firestore seeded with users U0..U4"""
+    db = FaultInjectingFirestore()
+    db.collections['users'] = {f"U{i}": {'name': f"user {i}", 'elo_score': 1200} for i in range(5)}
+    return db
+
+
+@pytest.fixture
+def async_fake_db(fake_db):
+    """Async client view of ``fake_db``"""
+    return AsyncFaultInjectingFirestore(fake_db)
+
+
+# -------------------- GLOBAL STORAGE --------------------
+@pytest.fixture
+def memory_backend(monkeypatch):
+    """Connected in-memory backend installed as the global storage service"""
+    from production import firebase_service
+    from production.memory_backend import InMemoryBackend
+
+    backend = InMemoryBackend()
+    backend.initialize()
+    monkeypatch.setattr(firebase_service, '_firebase_service', backend)
+    # Snapshots are loaded from this backend
+    monkeypatch.setattr('production.user_store._user_store', None)
+    # Modules that bound the service at import time
+    for name in ('production.elo_update', 'production.reject_superlike_like'):
+        if name in sys.modules:
+            monkeypatch.setattr(sys.modules[name], 'firebase_service', backend)
+    return backend
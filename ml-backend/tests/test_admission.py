@@ -0,0 +1,77 @@
+"""
+Tests for admission control: token buckets, the concurrency cap and
+streamed bodies holding their slot.
+"""
+
+import json
+
+import pytest
+
+import api_handlers
+from production import admission as admission_module
+from production.admission import AdmissionController, TokenBucketLimiter
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(admission_module.time, 'monotonic', lambda: now[0])
+    return now
+
+
+def test_token_bucket_burst_then_refill(clock):
+    limiter = TokenBucketLimiter(rate_per_minute=60, burst=2)
+    assert limiter.acquire('a') == 0 and limiter.acquire('a') == 0
+    assert limiter.acquire('a') == pytest.approx(1.0)
+    assert limiter.acquire('b') == 0   # buckets are per key
+    clock[0] += 1.0
+    assert limiter.acquire('a') == 0
+    assert limiter.stats() == {'keys': 2, 'rejected': 1}
+
+
+def test_user_rejection_refunds_ip_token_and_cap_rejects(clock):
+    controller = AdmissionController(user_rate_per_minute=60, ip_rate_per_minute=60, burst=2, max_concurrent=2)
+    assert controller.admit('1.2.3.4', 'U0') is None   # IP and U0 each have one token left
+    controller.user_limiter.acquire('U0')
+    assert controller.admit('1.2.3.4', 'U0')[1] == 429
+    assert controller.admit('1.2.3.4', 'U1') is None   # the rejected request left its IP token
+
+    rejection, status = controller.admit('9.9.9.9')
+    assert status == 503 and rejection['retry_after_seconds'] == 1
+    controller.release()
+    assert controller.admit('9.9.9.9') is None
+
+
+def _stream_handler(lines):
+    def handler():
+        def stream():
+            yield from lines
+        return stream(), 200
+    return handler
+
+
+def test_streamed_body_holds_slot_until_exhausted_or_closed(monkeypatch):
+    controller = AdmissionController(max_concurrent=1)
+    monkeypatch.setattr(api_handlers, 'get_admission_controller', lambda: controller)
+
+    body, status = api_handlers.run_admitted(_stream_handler(['a\n', 'b\n']), client_ip='1.2.3.4')
+    assert status == 200 and controller.concurrency.in_flight == 1
+    assert controller.admit('5.6.7.8')[1] == 503
+    assert list(body) == ['a\n', 'b\n'] and controller.concurrency.in_flight == 0
+
+    body, _ = api_handlers.run_admitted(_stream_handler(['a\n', 'b\n']), client_ip='1.2.3.4')
+    assert next(body) == 'a\n'
+    body.close()
+    body.close()
+    assert controller.concurrency.in_flight == 0 and list(body) == []
+
+
+def test_streamed_body_ends_with_timeout_line_past_deadline(monkeypatch):
+    controller = AdmissionController(timeout_seconds=0.05)
+    monkeypatch.setattr(api_handlers, 'get_admission_controller', lambda: controller)
+
+    body, _ = api_handlers.run_admitted(_stream_handler(['a\n'] * 5), client_ip='1.2.3.4')
+    assert next(body) == 'a\n'
+    body.deadline.expires_at = 0   # budget used up mid-stream
+    assert json.loads(next(body))['error'] == 'Request timeout'
+    assert list(body) == [] and controller.timeouts == 1 and controller.concurrency.in_flight == 0
@@ -0,0 +1,92 @@
+"""
+Tests for the async Firestore service: concurrent feed reads, the in-flight
+cap, per-read failures and deadline-capped RPC timeouts.
+"""
+
+import asyncio
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from google.api_core import exceptions as gexc
+
+from production.async_firebase_service import AsyncFirebaseService
+from production.deadline import Deadline
+
+
+@pytest.fixture
+def make_service(fake_db, async_fake_db):
+    fake_db.collections['interactions'] = {
+        'I1': {'user_id': 'U0', 'target_id': 'U1', 'action': 'like', 'timestamp': datetime.now() - timedelta(days=10)},
+        'I2': {'user_id': 'U0', 'target_id': 'U2', 'action': 'dislike',
+               'timestamp': datetime.now() - timedelta(days=200)},
+        'I3': {'user_id': 'U3', 'target_id': 'U0', 'action': 'like', 'timestamp': datetime.now()},
+    }
+    services = []
+
+    def make(max_in_flight):
+        service = AsyncFirebaseService(max_in_flight=max_in_flight)
+        service.db, service.async_db, service.connected = fake_db, async_fake_db, True
+        service._start_loop()
+
+        async def open_client():
+            service._semaphore = asyncio.Semaphore(max_in_flight)
+        service._run(open_client())
+        services.append(service)
+        return service
+
+    yield make
+    for service in services:
+        service._loop.call_soon_threadsafe(service._loop.stop)
+
+
+def test_feed_reads_fan_out_and_serve_the_pipeline(make_service, fake_db, async_fake_db):
+    service = make_service(4)
+    for op in ('get', 'stream', 'stream', 'stream'):
+        fake_db.inject(op, 0.2)
+
+    started = time.perf_counter()
+    with service.feed_reads('U0'):
+        elapsed = time.perf_counter() - started
+        rpcs = len(fake_db.rpcs)
+        assert service.get_user_by_id('U0')['name'] == 'user 0'
+        assert len(service.get_all_users()) == 5
+        assert service.get_user_interactions('U0', days_back=90)['target_id'].tolist() == ['U1']
+        assert sorted(service.get_user_interactions('U0', days_back=365)['target_id']) == ['U1', 'U2']
+        assert len(fake_db.rpcs) == rpcs   # served from the prefetch
+    assert rpcs == 4 and async_fake_db.max_in_flight == 4
+    assert elapsed < 0.6   # max of the reads, not their 0.8s sum
+
+
+def test_in_flight_reads_are_capped(make_service, async_fake_db, fake_db):
+    service = make_service(2)
+    fake_db.inject('stream', 0.05, 0.05, 0.05)
+    fake_db.inject('get', 0.05)
+    with service.feed_reads('U0'):
+        pass
+    assert async_fake_db.max_in_flight == 2
+
+
+def test_failed_read_falls_back_without_failing_the_others(make_service, fake_db):
+    service = make_service(4)
+    fake_db.inject('stream', gexc.PermissionDenied('users'))   # first stream is the users collection
+
+    prefetched = service._run(service.prefetch_feed_async('U0'))
+    assert list(prefetched) == [('get_user_by_id', 'U0'), ('get_all_users',),
+                                ('get_user_interactions', 'U0', 90), ('get_user_interactions', 'U0', 365)]
+    assert prefetched[('get_all_users',)].empty and service.counters['errors'] == 1
+    assert prefetched[('get_user_by_id', 'U0')]['id'] == 'U0'
+    assert len(prefetched[('get_user_interactions', 'U0', 365)]) == 2
+
+
+def test_rpc_timeouts_follow_the_callers_deadline(make_service, async_fake_db):
+    service = make_service(2)
+    service.get_user_by_id('U1')
+    assert async_fake_db.timeouts[-1] is None
+
+    with Deadline(1.5).activate():
+        service.get_user_by_id('U1')
+        with service.feed_reads('U0'):
+            pass
+    assert len(async_fake_db.timeouts) == 6
+    assert all(0 < timeout <= 1.5 for timeout in async_fake_db.timeouts[1:])
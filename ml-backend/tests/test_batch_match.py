@@ -0,0 +1,62 @@
+"""
+Tests for vectorized batch scoring against the per-pair match_score.
+"""
+
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from production.batch_match import CandidateMatrix, batch_top_matches
+from production.data_match_firebase import match_score
+from production.synthetic_data import populate
+from production.user_store import get_user_store
+
+# Edge cases the synthetic population does not produce
+EXTRA_USERS = [
+    {'id': 'X0', 'uid': 'X0', 'age': 30, 'gender': 'female', 'genderPreference': 'all',
+     'interests': 'hiking, music,travel', 'elo_score': 1200},
+    {'id': 'X1', 'uid': 'X1', 'age': 41, 'gender': 'Male', 'genderPreference': 'Female',
+     'location': 'New York', 'interests': [], 'elo_score': 1350},
+    {'id': 'X2', 'uid': 'X2', 'age': 22, 'location': 'new york city', 'interests': ['music'], 'elo_score': 1100},
+]
+
+
+@pytest.fixture
+def snapshot(memory_backend):
+    populate(memory_backend, 60, 0, seed=7)
+    memory_backend.save_users([dict(u) for u in EXTRA_USERS])
+    return get_user_store().snapshot()
+
+
+def test_matrix_scores_equal_match_score(snapshot, memory_backend):
+    candidates = CandidateMatrix(snapshot)
+    scores = candidates.score(np.arange(candidates.size))
+    users = [memory_backend.get_user_by_id(uid) for uid in candidates.ids]
+    expected = np.array([[match_score(u1, u2) for u2 in users] for u1 in users])
+    np.testing.assert_allclose(scores, expected, atol=1e-6)
+
+
+def test_batch_recommendations_rank_by_match_and_elo(snapshot, memory_backend):
+    candidates = CandidateMatrix(snapshot)
+    position = {uid: i for i, uid in enumerate(candidates.ids)}
+    for user_id, recommendations in batch_top_matches(['X0', 'X1', 'missing'], top_n=5):
+        if user_id == 'missing':
+            assert recommendations is None
+            continue
+        user = memory_backend.get_user_by_id(user_id)
+        assert recommendations and [r['rank'] for r in recommendations] == list(range(1, len(recommendations) + 1))
+        for rec in recommendations:
+            expected = 0.7 * match_score(user, memory_backend.get_user_by_id(rec['user_id'])) \
+                + 0.3 * candidates.elo_norm[position[rec['user_id']]]
+            assert rec['score'] == pytest.approx(expected, abs=1e-6)
+
+
+def test_swipes_written_by_the_app_are_excluded(snapshot, memory_backend):
+    top = [rec['user_id'] for rec in next(batch_top_matches(['X0'], top_n=3))[1]]
+    memory_backend.save_interactions_batch([{'user_id': 'X0', 'target_id': top[0], 'action': 'like'}])
+    memory_backend.swipes.append({'userId': 'X0', 'targetUserId': top[1], 'isLike': False,
+                                  'timestamp': datetime.now()})
+
+    remaining = [rec['user_id'] for rec in next(batch_top_matches(['X0'], top_n=3))[1]]
+    assert top[0] not in remaining and top[1] not in remaining and top[2] in remaining
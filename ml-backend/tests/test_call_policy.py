@@ -0,0 +1,156 @@
+"""
+Tests for the retry / hedging call policy, alone and wired into
+FirebaseService through a fault-injecting in-memory Firestore.
+"""
+
+import random
+import time
+from collections import deque
+
+import pytest
+from google.api_core import exceptions as gexc
+
+from production.call_policy import CallPolicy, is_transient
+from production.circuit_breaker import CircuitOpenError
+from production.deadline import Deadline
+from production.firebase_service import FirebaseService
+
+
+@pytest.fixture
+def service(fake_db):
+    svc = FirebaseService()
+    svc.db, svc.connected = fake_db, True
+    svc.policy = CallPolicy(max_attempts=3, base_delay=0.001, max_delay=0.002,
+                            hedge_min_samples=5, rng=random.Random(0))
+    return svc
+
+
+# -------------------- POLICY --------------------
+def _flaky(failures, result='ok'):
+    calls = {'n': 0}
+
+    def fn():
+        calls['n'] += 1
+        if calls['n'] <= len(failures):
+            raise failures[calls['n'] - 1]
+        return result
+    return fn, calls
+
+
+def test_transient_classification():
+    assert is_transient(gexc.ServiceUnavailable('x'))
+    assert is_transient(gexc.DeadlineExceeded('x'))
+    assert is_transient(ConnectionError())
+    assert not is_transient(gexc.PermissionDenied('x'))
+    assert not is_transient(CircuitOpenError('x'))
+
+
+def test_retries_transient_errors_then_succeeds():
+    policy = CallPolicy(max_attempts=3, base_delay=0.001, sleep=lambda s: None)
+    fn, calls = _flaky([gexc.ServiceUnavailable('a'), gexc.Aborted('b')])
+    assert policy.call('site', fn) == 'ok'
+    assert calls['n'] == 3
+    stats = policy.stats()['site']
+    assert (stats['calls'], stats['retries'], stats['failures'], stats['successes']) == (1, 2, 2, 1)
+
+
+def test_gives_up_after_max_attempts_and_on_permanent_errors():
+    policy = CallPolicy(max_attempts=2, sleep=lambda s: None)
+    fn, calls = _flaky([gexc.ServiceUnavailable('a')] * 5)
+    with pytest.raises(gexc.ServiceUnavailable):
+        policy.call('site', fn)
+    assert calls['n'] == 2
+
+    fn, calls = _flaky([gexc.PermissionDenied('no')])
+    with pytest.raises(gexc.PermissionDenied):
+        policy.call('other', fn)
+    assert calls['n'] == 1
+
+
+def test_backoff_is_jittered_and_capped():
+    policy = CallPolicy(base_delay=0.1, max_delay=0.3, rng=random.Random(1))
+    delays = [policy.backoff(attempt) for attempt in range(1, 6) for _ in range(50)]
+    assert all(0 <= d <= 0.3 for d in delays)
+    assert len(set(delays)) > 100
+
+
+def test_retry_budget_limits_retries_during_an_outage():
+    policy = CallPolicy(max_attempts=3, retry_budget_ratio=0.1, sleep=lambda s: None)
+    for _ in range(100):
+        fn, _ = _flaky([gexc.ServiceUnavailable('down')] * 3)
+        with pytest.raises(gexc.ServiceUnavailable):
+            policy.call('site', fn)
+    stats = policy.stats()['site']
+    # 10 initial tokens plus 0.1 per call, not 2 retries for each of the 100 calls
+    assert stats['retries'] <= 21
+    assert stats['retry_budget_exhausted'] > 0
+
+
+def test_no_retry_past_the_request_deadline():
+    policy = CallPolicy(max_attempts=5, base_delay=1.0, max_delay=1.0, sleep=lambda s: None,
+                        rng=random.Random(2))
+    fn, calls = _flaky([gexc.ServiceUnavailable('a')] * 5)
+    with Deadline(budget_seconds=0.0).activate():
+        with pytest.raises(gexc.ServiceUnavailable):
+            policy.call('site', fn)
+    assert calls['n'] == 1
+
+
+def test_hedged_read_beats_slow_primary():
+    policy = CallPolicy(hedge_percentile=90, hedge_min_samples=5)
+    for _ in range(10):
+        policy.call('read', lambda: time.sleep(0.002), hedge=True)
+
+    delays = deque([0.5, 0.0])
+    started = time.perf_counter()
+    assert policy.call('read', lambda: time.sleep(delays.popleft()) or 'done', hedge=True) == 'done'
+    assert time.perf_counter() - started < 0.3
+    stats = policy.stats()['read']
+    assert stats['hedges'] == 1 and stats['hedge_wins'] == 1
+
+
+# -------------------- FIREBASE SERVICE --------------------
+def test_service_read_survives_transient_faults(service, fake_db):
+    fake_db.inject('get', gexc.ServiceUnavailable('blip'), gexc.DeadlineExceeded('slow'))
+    user = service.get_user_by_id('U1')
+    assert user['name'] == 'user 1'
+    assert service.policy.stats()['get_user_by_id']['retries'] == 2
+    assert service.get_counters()['errors'] == 0
+
+
+def test_service_stream_is_reread_from_scratch(service, fake_db):
+    fake_db.inject('stream', gexc.ServiceUnavailable('blip'))
+    users = service.get_all_users()
+    assert len(users) == 5
+    assert fake_db.rpcs.count('stream') == 2
+
+
+def test_service_falls_back_after_exhausting_retries(service, fake_db):
+    fake_db.inject('stream', *[gexc.ServiceUnavailable('down')] * 3)
+    assert service.get_user_interactions('U1').empty
+    assert service.get_counters()['errors'] == 1
+
+
+def test_retried_write_does_not_duplicate(service, fake_db):
+    fake_db.inject('set', gexc.DeadlineExceeded('ambiguous'))
+    assert service.save_interaction('U1', 'U2', 'like')
+    assert len(fake_db.collections['interactions']) == 1
+    assert len(fake_db.collections['swipes']) == 1
+
+
+def test_batch_commit_retried(service, fake_db):
+    fake_db.inject('commit', gexc.Aborted('contention'))
+    items = [{'user_id': 'U1', 'target_id': f"U{i}", 'action': 'like'} for i in range(2, 5)]
+    assert service.save_interactions_batch(items) == [True] * 3
+    assert len(fake_db.collections['interactions']) == 3
+
+    fake_db.inject('commit', gexc.ServiceUnavailable('blip'))
+    assert service.update_user_elo_scores({'U1': 1300, 'U2': 1100})
+    assert fake_db.collections['users']['U1']['elo_score'] == 1300
+
+
+def test_open_circuit_is_not_retried(service, fake_db):
+    service.breaker.state = 'open'
+    assert service.get_user_by_id('U1') is None
+    assert fake_db.rpcs == []
+    assert service.policy.stats()['get_user_by_id']['retries'] == 0
@@ -0,0 +1,103 @@
+"""
+Tests for circuit breaker state transitions.
+"""
+
+import time
+
+import pytest
+
+from production import circuit_breaker
+from production.circuit_breaker import CLOSED, OPEN, CircuitBreaker, CircuitOpenError
+
+
+def _fail(breaker):
+    with pytest.raises(RuntimeError):
+        with breaker.call():
+            raise RuntimeError("backend down")
+
+
+def _succeed(breaker):
+    with breaker.call():
+        pass
+
+
+def test_opens_on_failure_rate_once_window_has_min_calls():
+    breaker = CircuitBreaker('test', failure_rate_threshold=0.5, window_size=4, min_calls=4)
+    for _ in range(3):
+        _fail(breaker)
+    assert breaker.state == CLOSED   # too few calls to judge
+    _succeed(breaker)
+    assert breaker.state == OPEN     # 3 of 4 failed
+
+    called = []
+    with pytest.raises(CircuitOpenError):
+        with breaker.call():
+            called.append(True)
+    assert not called
+    stats = breaker.stats()
+    assert (stats['state'], stats['opened'], stats['short_circuited']) == (OPEN, 1, 1)
+
+
+def test_slow_calls_count_as_failures(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(circuit_breaker.time, 'monotonic', lambda: now[0])
+    breaker = CircuitBreaker('test', failure_rate_threshold=0.5, slow_call_seconds=1.0, window_size=4, min_calls=4)
+
+    for slow in (False, True, False, False):
+        with breaker.call():
+            now[0] += 2.0 if slow else 0.1
+    assert breaker.state == CLOSED and breaker.stats()['window_failure_rate'] == 0.25
+
+    with breaker.call():
+        now[0] += 2.0
+    assert breaker.state == OPEN     # window is now slow, false, false, slow
+
+
+def test_probe_closes_breaker_when_backend_answers():
+    answers = [False, True]
+    breaker = CircuitBreaker('test', window_size=2, min_calls=2, open_seconds=0.01,
+                             probe=lambda: answers.pop(0) if answers else True)
+    _fail(breaker)
+    _fail(breaker)
+    assert breaker.is_open
+
+    stop = time.monotonic() + 2
+    while breaker.is_open and time.monotonic() < stop:
+        time.sleep(0.01)
+    assert breaker.state == CLOSED and breaker.stats()['probes'] == 2
+    assert breaker.stats()['window_calls'] == 0
+    _succeed(breaker)
+
+
+def test_slow_threshold_is_per_site(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(circuit_breaker.time, 'monotonic', lambda: now[0])
+    breaker = CircuitBreaker('test', failure_rate_threshold=1.0, slow_call_seconds=1.0, window_size=2, min_calls=2,
+                             slow_call_seconds_by_site={'get_all_users': 30.0})
+    for _ in range(2):
+        with breaker.call('get_all_users'):
+            now[0] += 5.0
+    assert breaker.state == CLOSED and breaker.stats()['window_failure_rate'] == 0.0
+    for _ in range(2):
+        with breaker.call('get_user_by_id'):
+            now[0] += 5.0
+    assert breaker.state == OPEN
+
+
+def test_only_classified_errors_count_as_failures(fake_db):
+    from google.api_core import exceptions as gexc
+    from production.firebase_service import FirebaseService
+
+    service = FirebaseService()
+    service.db, service.connected = fake_db, True
+    breaker = service.breaker
+    for _ in range(breaker.min_calls):
+        with pytest.raises(gexc.NotFound):
+            service._rpc('update_user_elo_score', lambda: fake_db.collection('users').document('nope').update({}))
+    assert breaker.state == CLOSED and breaker.stats()['window_failure_rate'] == 0.0
+
+    fake_db.inject('update', *[gexc.ServiceUnavailable('down')] * 3 * breaker.min_calls)
+    for _ in range(breaker.min_calls):
+        with pytest.raises((gexc.ServiceUnavailable, CircuitOpenError)):
+            service._rpc('update_user_elo_score', lambda: fake_db.collection('users').document('U0').update({}))
+    assert breaker.state == OPEN
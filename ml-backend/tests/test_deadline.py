@@ -0,0 +1,73 @@
+"""
+Tests for the per-request deadline and its optional-stage budgeting.
+"""
+
+import pytest
+
+from production import deadline as deadline_module
+from production import main
+from production.deadline import Deadline, stage_cost
+from production.feed_cache import FeedCache
+from production.synthetic_data import populate
+
+
+@pytest.fixture(autouse=True)
+def stage_costs(monkeypatch):
+    monkeypatch.setattr(deadline_module, '_stage_costs', {})
+
+
+def _never(*args):
+    raise AssertionError("stage should have been skipped")
+
+
+def test_stage_skipped_when_budget_is_short():
+    deadline_module._observe('slow', 1.0)
+    deadline = Deadline(0.5)
+    assert deadline.run_optional('slow', _never, 'fallback') == 'fallback'
+    assert deadline.run_optional('fast', lambda x: x + 1, None, 1) == 2   # never observed, budget left
+    assert deadline.degraded == {'slow': 'budget'}
+
+
+def test_spent_budget_skips_unobserved_stages():
+    deadline = Deadline(0)
+    assert deadline.expired()
+    assert deadline.run_optional('new_stage', _never, 'fallback') == 'fallback'
+    assert deadline.degraded == {'new_stage': 'budget'}
+    assert Deadline(None).run_optional('new_stage', lambda: 'ran', None) == 'ran'
+
+
+def test_failed_stage_falls_back_and_is_recorded():
+    def broken():
+        raise KeyError('elo')
+
+    deadline = Deadline(None)
+    assert deadline.run_optional('elo', broken, 'base') == 'base'
+    deadline.merge({'elo': 'budget', 'backend': 'stale'})
+    assert deadline.degraded == {'elo': 'error', 'backend': 'stale'}   # first reason wins
+    assert deadline.degraded_stages == ['elo', 'backend']
+
+
+def test_cost_average_and_decay_on_skip():
+    deadline_module._observe('stage', 1.0)
+    deadline_module._observe('stage', 2.0)
+    assert stage_cost('stage') == pytest.approx(1.0 + deadline_module.COST_SMOOTHING * 1.0)
+
+    before = stage_cost('stage')
+    Deadline(0.1).run_optional('stage', _never, None)
+    assert stage_cost('stage') == pytest.approx(before * (1 - deadline_module.COST_SMOOTHING))
+
+
+def test_degraded_feeds_are_not_cached(memory_backend, monkeypatch):
+    populate(memory_backend, 80, 400, seed=3)
+    cache = FeedCache()
+    monkeypatch.setattr(main, 'get_feed_cache', lambda: cache)
+    user_id = memory_backend.get_all_users()['id'][0]
+
+    spent = Deadline(0)
+    assert main.get_user_recommendations(user_id, 10, spent)
+    assert {'interaction_weighting', 'elo'} <= set(spent.degraded_stages)
+    assert cache.peek(user_id) is None
+
+    full = Deadline(None)
+    recommendations = main.get_user_recommendations(user_id, 10, full)
+    assert not full.degraded and cache.peek(user_id)[:10] == recommendations
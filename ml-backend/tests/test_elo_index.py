@@ -0,0 +1,76 @@
+"""
+Tests for the Fenwick-tree Elo index against a brute-force reference.
+"""
+
+import numpy as np
+import pytest
+
+from production.elo_index import EloIndex
+
+
+def _reference_percentile(ratings, value):
+    ratings = np.floor(np.asarray(ratings))
+    value = np.floor(value)
+    return ((ratings < value).sum() + 0.5 * (ratings == value).sum()) / len(ratings)
+
+
+def test_build_matches_incremental_adds():
+    ratings = np.random.default_rng(0).normal(1200, 150, 2000)
+    built, added = EloIndex(), EloIndex()
+    built.build(ratings)
+    for r in ratings:
+        added.add(r)
+    assert len(built) == len(added) == 2000
+    assert np.array_equal(built._tree, added._tree)
+
+
+def test_percentile_rank_min_max():
+    ratings = np.random.default_rng(1).integers(900, 1600, 500).astype(float)
+    index = EloIndex()
+    index.build(ratings)
+
+    for value in (900.0, 1111.0, 1350.0, 1599.0):
+        assert index.percentile(value) == pytest.approx(_reference_percentile(ratings, value))
+        assert index.rank(value) == (ratings > value).sum() + 1
+
+    assert index.min() == ratings.min()
+    assert index.max() == ratings.max()
+    assert np.allclose(index.percentiles(ratings[:50]),
+                       [_reference_percentile(ratings, r) for r in ratings[:50]])
+
+
+def test_update_moves_rating():
+    index = EloIndex()
+    index.build([1000, 1200, 1400])
+    index.update(1400, 1100)
+    assert index.max() == 1200
+    assert index.rank(1100) == 2
+    assert len(index) == 3
+
+
+def test_out_of_range_ratings_are_clamped():
+    index = EloIndex(min_rating=800, max_rating=2400)
+    index.build([100, 5000])
+    assert index.min() == 800
+    assert index.max() == 2400
+
+
+def test_firebase_recommender_looks_up_percentiles_once(monkeypatch):
+    import pandas as pd
+    from production import firebase_recommender
+
+    lookups = []
+
+    class _Store:
+        def elo_percentiles(self, ratings):
+            ratings = list(ratings)
+            lookups.append(ratings)
+            return np.linspace(0, 1, len(ratings))
+
+    monkeypatch.setattr(firebase_recommender, 'get_user_store', lambda: _Store())
+    candidates = pd.DataFrame([{'user_id': f"U{i}", 'name': f"user {i}", 'age': 25, 'location': '', 'bio': '',
+                                'photos': [], 'elo_score': 1000 + 100 * i, 'profile_completeness': 0.5}
+                               for i in range(6)])
+    recommendations = firebase_recommender.get_recommendations_from_firebase('U0', candidates, top_n=5)
+    assert lookups == [[1000, 1100, 1200, 1300, 1400, 1500]]
+    assert len(recommendations) == 5
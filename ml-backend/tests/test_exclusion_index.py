@@ -0,0 +1,16 @@
+"""
+Tests for the swiped-target exclusion index.
+"""
+
+from production.exclusion_index import ExclusionIndex
+
+
+def test_stats_count_distinct_swipes_and_follow_eviction():
+    index = ExclusionIndex(max_users=2)
+    index.add_many([('A', 'X'), ('A', 'Y'), ('A', 'X'), ('B', 'X')])
+    assert index.stats() == {'users': 2, 'swipes': 3}
+    assert index.is_excluded('A', 'Y') and not index.is_excluded('B', 'Y')
+
+    index.add('C', 'Z')   # evicts A, the least recently active user
+    assert index.stats() == {'users': 2, 'swipes': 2}
+    assert index.swiped('A') == set() and index.swiped('C') == {'Z'}
@@ -0,0 +1,55 @@
+"""
+Tests for the per-user ranked feed cache.
+"""
+
+import pytest
+
+from production import main
+from production.feed_cache import POOL_SIZE, FeedCache
+from production.synthetic_data import populate
+from production.user_store import get_user_store
+
+
+def _feed(prefix, n):
+    return [{'user_id': f"{prefix}{i}", 'rank': i + 1} for i in range(n)]
+
+
+@pytest.fixture
+def users(memory_backend):
+    memory_backend.save_users([{'id': f"U{i}", 'elo_score': 1200} for i in range(4)])
+    return memory_backend
+
+
+def test_lru_eviction_and_ttl(users):
+    cache = FeedCache(max_users=2, max_age_seconds=60)
+    cache.put('U0', _feed('A', 5))
+    cache.put('U1', _feed('B', 5))
+    assert cache.get('U0', 3) == _feed('A', 3)   # U0 is now the most recently used
+    cache.put('U2', _feed('C', 5))
+    assert cache.get('U1', 3) is None and cache.get('U0', 3) is not None
+    assert cache.get('U0', 6) is None             # fewer cached than asked for
+
+    cache._entries['U2'].created_at -= 120
+    assert cache.get('U2', 3) is None and cache.stats()['invalidations'] == 1
+
+
+def test_swipes_consume_and_elo_moves_invalidate(users):
+    cache = FeedCache(elo_threshold=50)
+    cache.put('U0', _feed('A', 5))
+    cache.consume_many('U0', ['A0', 'A2'])
+    assert [rec['user_id'] for rec in cache.get('U0', 3)] == ['A1', 'A3', 'A4']
+    assert cache.get('U0', 3)[0]['rank'] == 1
+
+    get_user_store().update_elo('U0', 1300)
+    assert cache.get('U0', 1) is None
+    cache.put('U0', _feed('A', 5))
+    get_user_store().update_elo('U0', 1500)
+    assert cache.get('U0', 1, allow_stale=True) is not None   # served anyway while storage is down
+
+
+def test_direct_feed_is_a_prefix_of_the_cached_pool(memory_backend):
+    populate(memory_backend, n_users=300, n_swipes=3000, seed=7)
+    user_id = memory_backend.get_all_users()['id'].iloc[0]
+    direct = main.generate_user_feed(user_id, top_n=10)['user_id'].tolist()
+    pool = main.generate_user_feed(user_id, top_n=POOL_SIZE)['user_id'].tolist()
+    assert len(direct) == 10 and pool[:10] == direct
@@ -0,0 +1,54 @@
+"""
+Tests for cursor pagination over ranked feed snapshots.
+"""
+
+import pytest
+
+from production import feed_cursor
+from production.exclusion_index import ExclusionIndex
+from production.feed_cursor import CursorStore, encode_cursor
+
+
+@pytest.fixture
+def exclusions(monkeypatch):
+    index = ExclusionIndex()
+    monkeypatch.setattr(feed_cursor, 'get_exclusion_index', lambda: index)
+    return index
+
+
+def _ranked(n):
+    return [{'user_id': f"C{i}"} for i in range(n)]
+
+
+def test_pages_continue_ranks_and_skip_swiped(exclusions):
+    store = CursorStore()
+    cursor = store.create('U1', _ranked(7), rank_offset=3)   # 3 served with the first page
+
+    page, cursor = store.next_page(cursor, 'U1', 3)
+    assert [(rec['user_id'], rec['rank']) for rec in page] == [('C0', 4), ('C1', 5), ('C2', 6)]
+
+    exclusions.add_many([('U1', 'C3'), ('U1', 'C5')])
+    page, cursor = store.next_page(cursor, 'U1', 2)
+    assert [rec['user_id'] for rec in page] == ['C4', 'C6'] and cursor is None
+    assert store.create('U1', []) is None
+
+
+def test_rejects_foreign_expired_and_malformed_cursors(exclusions):
+    store = CursorStore(ttl_seconds=60, max_snapshots=2)
+    cursor = store.create('U1', _ranked(5))
+    with pytest.raises(ValueError, match='belong'):
+        store.next_page(cursor, 'U2', 2)
+    for bad in ('not-a-cursor', encode_cursor('missing', 0), encode_cursor('x', -1)):
+        with pytest.raises(ValueError):
+            store.next_page(bad, 'U1', 2)
+
+    next(iter(store._snapshots.values())).created_at -= 120
+    with pytest.raises(ValueError, match='expired'):
+        store.next_page(cursor, 'U1', 2)
+
+    oldest = store.create('U1', _ranked(5))
+    store.create('U1', _ranked(5))
+    store.create('U1', _ranked(5))
+    assert store.stats() == {'snapshots': 2}
+    with pytest.raises(ValueError):
+        store.next_page(oldest, 'U1', 2)
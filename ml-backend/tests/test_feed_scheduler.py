@@ -0,0 +1,75 @@
+"""
+Tests for the background feed queue scheduler.
+"""
+
+import threading
+import time
+
+import pytest
+
+from production.feed_scheduler import FeedScheduler
+
+
+def _wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.005)
+
+
+def _producer(calls):
+    def produce(user_id, n):
+        calls.append((user_id, n))
+        return [{'user_id': f"{user_id}-C{i}"} for i in range(100)]
+    return produce
+
+
+@pytest.fixture
+def scheduler():
+    scheduler = FeedScheduler(queue_size=6, low_watermark=2, workers=2, active_window_seconds=60, max_users=2)
+    yield scheduler
+    scheduler.stop()
+
+
+def test_miss_schedules_refill_and_served_are_not_repeated(scheduler):
+    calls = []
+    scheduler.start(_producer(calls))
+    assert scheduler.pop('A', 3) is None
+    _wait_for(lambda: scheduler.stats()['refills'] == 1)
+
+    first = scheduler.pop('A', 3)
+    assert [rec['rank'] for rec in first] == [1, 2, 3]
+    scheduler.pop('A', 2)                                    # below the watermark: refill
+    _wait_for(lambda: scheduler.stats()['refills'] == 2)
+    assert calls[-1] == ('A', 6 + 5)
+    assert {rec['user_id'] for rec in scheduler.peek('A')}.isdisjoint(rec['user_id'] for rec in first)
+
+
+def test_oldest_users_evicted_beyond_max_users(scheduler):
+    scheduler.start(_producer([]))
+    for user_id in ('A', 'B', 'C'):
+        scheduler.touch(user_id)
+        time.sleep(0.01)
+    _wait_for(lambda: scheduler.stats()['pending_refills'] == 0)
+    assert set(scheduler._last_activity) == {'B', 'C'}
+    assert set(scheduler._queues) <= {'B', 'C'} and 'A' not in scheduler._served
+
+
+def test_refill_for_evicted_user_is_dropped(scheduler):
+    release = threading.Event()
+
+    def slow_producer(user_id, n):
+        if user_id == 'A':
+            release.wait(2)
+        return [{'user_id': f"{user_id}-C{i}"} for i in range(n)]
+
+    scheduler.start(slow_producer)
+    scheduler.touch('A')
+    _wait_for(lambda: 'A' not in [entry[2] for entry in scheduler._pending])   # A's refill is running
+    with scheduler._wakeup:
+        scheduler._last_activity['A'] -= 120      # A goes idle while its refill runs
+        scheduler._evict_idle_locked()
+        assert 'A' not in scheduler._scheduled
+    release.set()
+    _wait_for(lambda: scheduler._slots._value == scheduler.workers)
+    assert 'A' not in scheduler._queues and scheduler.stats()['users'] == 0
@@ -0,0 +1,61 @@
+"""
+Tests for schema-driven document decoding.
+"""
+
+from datetime import datetime, timezone
+
+import pandas as pd
+
+from production import firestore_decode
+from production.firestore_decode import SWIPE_SCHEMA, USER_SCHEMA, decode_snapshots, decode_users
+
+
+class _Snapshot:
+    def __init__(self, doc_id, data):
+        self.id = doc_id
+        self._data = data
+
+    def to_dict(self):
+        return dict(self._data)
+
+
+def test_users_keep_schema_fields_with_column_types():
+    long_bio = 'x' * (firestore_decode.MAX_TEXT_CHARS + 50)
+    users = decode_users(['U1', 'U2', 'U3'], [
+        {'name': 'Asha', 'age': 22, 'interests': ['music'], 'bio': long_bio,
+         'photoUrls': ['https://example.com/1.jpg'], 'elo_score': 1250,
+         'elo_updated': datetime(2025, 1, 1, 12, tzinfo=timezone.utc)},
+        {'name': 'Ravi', 'age': None, 'interests': None, 'elo_updated': '2025-01-02T08:30:00'},
+        {'name': 'Meera', 'age': '27', 'interests': 'music, art'},
+    ])
+    assert list(users.columns) == ['id', 'name', 'age', 'interests', 'bio', 'elo_score', 'elo_updated']
+    assert users['age'].tolist()[::2] == [22, 27] and pd.isna(users['age'][1])
+    assert users['interests'].tolist() == [['music'], [], 'music, art']
+    assert len(users['bio'][0]) == firestore_decode.MAX_TEXT_CHARS
+    assert users['elo_updated'].dtype.kind == 'M'
+    assert users['elo_updated'][1] == pd.Timestamp('2025-01-02 08:30:00') and pd.isna(users['elo_updated'][2])
+    assert decode_users([], []).columns.tolist() == ['id']
+
+
+def test_snapshots_decode_to_naive_local_timestamps():
+    moment = datetime(2025, 3, 1, 9, 15, tzinfo=timezone.utc)
+    swipes = decode_snapshots([
+        _Snapshot('S1', {'user_id': 'U1', 'target_id': 'U2', 'action': 'like', 'timestamp': moment,
+                         'client': {'platform': 'ios'}}),
+        _Snapshot('S2', {'user_id': 'U2', 'target_id': 'U1', 'action': 'reject', 'timestamp': moment}),
+    ], SWIPE_SCHEMA)
+    assert swipes.columns.tolist() == ['id', 'user_id', 'target_id', 'action', 'timestamp']
+    assert swipes['timestamp'][0] == pd.Timestamp(moment.astimezone().replace(tzinfo=None))
+    assert set(USER_SCHEMA) >= {'age', 'interests', 'location', 'elo_score'} and 'photoUrls' not in USER_SCHEMA
+
+
+def test_app_written_swipes_keep_their_fields():
+    moment = datetime(2025, 3, 1, 9, 15, tzinfo=timezone.utc)
+    swipes = decode_snapshots([
+        _Snapshot('S1', {'userId': 'U1', 'targetUserId': 'U2', 'isLike': True, 'timestamp': moment}),
+        _Snapshot('S2', {'user_id': 'U1', 'target_id': 'U3', 'action': 'dislike', 'timestamp': moment}),
+    ], SWIPE_SCHEMA)
+    assert swipes['userId'][0] == 'U1' and swipes['isLike'][0] is True
+    # get_top_matches excludes targets from either column
+    swiped = set(swipes['targetUserId'].dropna()) | set(swipes['target_id'].dropna())
+    assert swiped == {'U2', 'U3'}
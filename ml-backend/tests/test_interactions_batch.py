@@ -0,0 +1,52 @@
+"""
+Tests for bulk interaction ingestion (api_handlers.interactions_batch).
+"""
+
+import pytest
+
+import api_handlers
+from production import main
+from production.exclusion_index import ExclusionIndex
+from production.feed_cache import FeedCache
+
+
+@pytest.fixture
+def backend(memory_backend, monkeypatch):
+    memory_backend.save_users([{'id': f"U{i}", 'elo_score': 1200} for i in range(4)])
+    exclusions, cache = ExclusionIndex(), FeedCache()
+    monkeypatch.setattr(main, 'get_exclusion_index', lambda: exclusions)
+    monkeypatch.setattr(main, 'get_feed_cache', lambda: cache)
+    memory_backend.exclusions, memory_backend.cache = exclusions, cache
+    return memory_backend
+
+
+def test_batch_reports_per_item_status_and_updates_state(backend):
+    backend.cache.put('U0', [{'user_id': 'U1'}, {'user_id': 'U3'}])
+    payload, status = api_handlers.interactions_batch({'interactions': [
+        {'user_id': 'U0', 'target_id': 'U1', 'action': 'like'},
+        {'user_id': 'U0', 'target_id': 'U2', 'action': 'poke'},
+        {'user_id': 'U0', 'action': 'like'},
+        {'user_id': 'U2', 'target_id': 'U1', 'action': 'superlike', 'timestamp': 'yesterday'},
+        {'user_id': 'U2', 'target_id': 'U1', 'action': 'superlike', 'timestamp': '2025-01-01T12:00:00Z'},
+    ]})
+    assert status == 200
+    assert [r['status'] for r in payload['results']] == ['recorded', 'invalid', 'invalid', 'invalid', 'recorded']
+    assert (payload['recorded'], payload['invalid'], payload['failed']) == (2, 3, 0) and payload['success']
+
+    assert backend.get_user_interactions('U0', days_back=1)['target_id'].tolist() == ['U1']
+    assert backend.get_user_interactions('U2', days_back=3650)['timestamp'].dt.year.tolist() == [2025]
+    assert backend.exclusions.is_excluded('U0', 'U1') and backend.exclusions.is_excluded('U2', 'U1')
+    assert [rec['user_id'] for rec in backend.cache.peek('U0')] == ['U3']
+    assert backend.get_user_by_id('U1')['elo_score'] != 1200
+
+
+def test_storage_failures_and_bad_requests(backend, monkeypatch):
+    monkeypatch.setattr(backend, 'save_interactions_batch', lambda items: [False] * len(items))
+    payload, status = api_handlers.interactions_batch(
+        {'interactions': [{'user_id': 'U0', 'target_id': 'U1', 'action': 'like'}]})
+    assert status == 200 and payload['failed'] == 1 and not payload['success']
+    assert not backend.exclusions.is_excluded('U0', 'U1')
+
+    assert api_handlers.interactions_batch({'interactions': []})[1] == 400
+    too_many = [{'user_id': 'U0', 'target_id': 'U1', 'action': 'like'}] * (api_handlers.MAX_BATCH_INTERACTIONS + 1)
+    assert api_handlers.interactions_batch({'interactions': too_many})[1] == 400
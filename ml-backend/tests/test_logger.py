@@ -0,0 +1,52 @@
+"""
+Tests for structured, sampled and queued logging.
+"""
+
+import json
+import logging
+import queue
+
+from production.logger import (JsonFormatter, RequestIdFilter, SamplingFilter, _DroppingQueueHandler,
+                               bind_request_id, new_request_id, reset_request_id)
+
+
+def _record(msg='hello %s', args=('world',), level=logging.INFO, lineno=10):
+    return logging.LogRecord('production.test', level, __file__, lineno, msg, args, None)
+
+
+def test_sampling_keeps_burst_then_one_in_every():
+    sampler = SamplingFilter(window_seconds=60, burst=5, every=10)
+    kept = [sampler.filter(_record()) for _ in range(105)]
+    assert kept[:5] == [True] * 5
+    assert sum(kept) == 5 + 10 and sampler.sampled_out == 90
+    # Other call sites and warnings are not affected
+    assert sampler.filter(_record(lineno=11))
+    assert all(sampler.filter(_record(level=logging.WARNING)) for _ in range(50))
+
+
+def test_json_records_carry_request_id():
+    token = bind_request_id(new_request_id('req-42'))
+    try:
+        record = _record()
+        RequestIdFilter().filter(record)
+    finally:
+        reset_request_id(token)
+    entry = json.loads(JsonFormatter().format(record))
+    assert entry['message'] == 'hello world' and entry['request_id'] == 'req-42'
+    assert entry['level'] == 'INFO' and entry['logger'] == 'production.test'
+
+    RequestIdFilter().filter(unbound := _record())
+    assert unbound.request_id is None and unbound.request_tag == ''
+    assert len(new_request_id('bad id with spaces')) == 16
+
+
+def test_queue_handler_defers_formatting_and_drops_on_overflow():
+    handler = _DroppingQueueHandler(queue.Queue(maxsize=2))
+    args = ['mutable']
+    handler.handle(_record(args=(args,)))
+    args.append('changed later')
+    handler.handle(_record())
+    handler.handle(_record())
+    assert handler.dropped == 1
+    first = handler.queue.get_nowait()
+    assert first.msg == "hello ['mutable']" and first.args is None
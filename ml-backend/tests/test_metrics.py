@@ -0,0 +1,71 @@
+"""
+Tests for the HDR-style histograms and cross-process metrics exposition.
+"""
+
+import json
+import os
+import re
+
+from production.metrics import HdrHistogram, MetricsRegistry
+
+
+def test_histogram_buckets_bound_relative_error():
+    histogram = HdrHistogram(sub_bits=3)
+    assert [histogram.index(v) for v in range(8)] == list(range(8))
+    previous = -1
+    for value in [8, 9, 15, 16, 17, 1000, 123_456, 10 ** 9]:
+        index = histogram.index(value)
+        assert index >= previous
+        previous = index
+        upper = histogram.upper_bound(index)
+        assert value < upper <= value * 1.125 + 1
+    assert histogram.index(2 ** 60) == len(histogram.counts) - 1
+
+
+def _lines(text, prefix):
+    return [line for line in text.splitlines() if line.startswith(prefix)]
+
+
+def test_render_histogram_and_gauges(tmp_path):
+    registry = MetricsRegistry(str(tmp_path))
+    for seconds in (0.002, 0.004, 0.25):
+        registry.observe('patra_request_duration_seconds', seconds, (('route', '/api/x'), ('status', '200')))
+    registry.register_gauges(lambda: {('patra_in_flight_requests', ()): 3,
+                                      ('patra_feed_cache_hits_total', ()): 3,
+                                      ('patra_feed_cache_misses_total', ()): 1})
+    text = registry.render()
+
+    assert '# TYPE patra_request_duration_seconds histogram' in text
+    buckets = _lines(text, 'patra_request_duration_seconds_bucket')
+    counts = [int(line.rsplit(' ', 1)[1]) for line in buckets]
+    assert counts == sorted(counts) and counts[-1] == 3
+    assert buckets[-1].startswith('patra_request_duration_seconds_bucket{route="/api/x",status="200",le="+Inf"}')
+    below_10ms = [c for line, c in zip(buckets, counts)
+                  if 'Inf' not in line and float(re.search(r'le="([^"]+)"', line).group(1)) <= 0.01]
+    assert below_10ms[-1] == 2
+    assert 'patra_request_duration_seconds_count{route="/api/x",status="200"} 3' in text
+    assert 'patra_in_flight_requests 3' in text
+    assert 'patra_feed_cache_hit_ratio 0.75' in text
+
+
+def test_merges_live_workers_and_drops_exited(tmp_path):
+    registry = MetricsRegistry(str(tmp_path))
+    registry.observe('patra_batch_size', 64, (('stage', 'batch_match'),))
+    registry.register_gauges(lambda: {('patra_in_flight_requests', ()): 2, ('patra_snapshot_users', ()): 100})
+
+    peer = MetricsRegistry(str(tmp_path))
+    peer.observe('patra_batch_size', 32, (('stage', 'batch_match'),))
+    peer.register_gauges(lambda: {('patra_in_flight_requests', ()): 5, ('patra_snapshot_users', ()): 120})
+    state = peer.state()
+    # Stand in for a sibling worker (the parent is alive) and for one that has exited
+    with open(tmp_path / f"{os.getppid()}.json", 'w') as f:
+        json.dump(state, f)
+    with open(tmp_path / "999999999.json", 'w') as f:
+        json.dump(state, f)
+
+    text = registry.render()
+    assert 'patra_batch_size_count{stage="batch_match"} 2' in text
+    assert 'patra_in_flight_requests 7' in text     # summed across workers
+    assert 'patra_snapshot_users 120' in text       # max across workers
+    assert 'patra_worker_processes 2' in text
+    assert not (tmp_path / "999999999.json").exists()
@@ -0,0 +1,85 @@
+"""
+Tests for the on-demand worker profiler.
+"""
+
+import threading
+import time
+
+import pytest
+
+from production import profiler
+
+
+def _spin_until(stop: threading.Event):
+    while not stop.is_set():
+        sum(range(1000))
+
+
+def _in_background(target, *args):
+    thread = threading.Thread(target=target, args=args, name="busy-worker", daemon=True)
+    thread.start()
+    return thread
+
+
+def test_sampler_returns_collapsed_stacks():
+    stop = threading.Event()
+    thread = _in_background(_spin_until, stop)
+    try:
+        report = profiler.capture('sample', 0.3, {'interval_ms': '2'})
+    finally:
+        stop.set()
+        thread.join()
+    busy = [line for line in report.splitlines() if line.startswith('busy-worker;')]
+    assert busy and all('_spin_until (test_profiler.py:' in line for line in busy)
+    assert all(int(line.rsplit(' ', 1)[1]) > 0 for line in busy)
+
+
+def test_cprofile_covers_sampled_requests():
+    handled = []
+
+    @profiler.profiled
+    def handler(n):
+        handled.append(sum(range(n)))
+        return n
+
+    def traffic():
+        for _ in range(50):
+            handler(10_000)
+            time.sleep(0.004)
+
+    thread = _in_background(traffic)
+    report = profiler.capture('cprofile', 0.3, {'fraction': '1'})
+    thread.join()
+    assert handler(5) == 5 and len(handled) == 51   # hook is transparent once the capture ends
+    first = report.splitlines()[0]
+    profiled_count = int(first.split()[1])
+    assert profiled_count > 0 and 'cumulative' in report and 'handler' in report
+
+
+def test_tracemalloc_reports_growth():
+    retained = []
+
+    def allocate():
+        for _ in range(20):
+            retained.append(bytearray(100_000))
+            time.sleep(0.005)
+
+    thread = threading.Timer(0.05, allocate)
+    thread.start()
+    report = profiler.capture('tracemalloc', 0.4, {'limit': '5'})
+    thread.join()
+    assert report.startswith('# allocation growth over 0.4s by lineno')
+    assert 'test_profiler.py' in report.splitlines()[1]
+
+
+def test_rejects_bad_requests_and_concurrent_captures():
+    with pytest.raises(ValueError):
+        profiler.capture('perf', 1, {})
+    with pytest.raises(ValueError):
+        profiler.capture('sample', profiler.MAX_SECONDS + 1, {})
+
+    thread = _in_background(profiler.capture, 'sample', 0.3, {})
+    time.sleep(0.05)
+    with pytest.raises(profiler.ProfilerBusy):
+        profiler.capture('sample', 0.1, {})
+    thread.join()
@@ -0,0 +1,78 @@
+"""
+Tests for request coalescing, alone and behind get_user_recommendations.
+"""
+
+import threading
+import time
+
+from production import main
+from production.feed_cache import FeedCache
+from production.singleflight import SingleFlight
+
+
+def _concurrently(*calls):
+    """Run zero-argument callables in parallel threads and return their results"""
+    results = [None] * len(calls)
+
+    def run(i):
+        results[i] = calls[i]()
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(len(calls))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_concurrent_callers_share_one_execution():
+    flight, calls = SingleFlight(), []
+
+    def slow(value):
+        calls.append(value)
+        time.sleep(0.1)
+        return [value]
+
+    results = _concurrently(*[lambda: flight.do('key', slow, 'v')] * 5)
+    assert calls == ['v'] and results == [['v']] * 5
+    stats = flight.stats()
+    assert stats['requests'] == 5 and stats['executions'] == 1 and stats['in_flight'] == 0
+
+    assert flight.do('key', slow, 'w') == ['w']   # nothing is kept once the call completes
+
+
+def test_errors_reach_every_waiter():
+    flight = SingleFlight()
+
+    def failing():
+        time.sleep(0.1)
+        raise RuntimeError('boom')
+
+    errors = []
+
+    def call():
+        try:
+            flight.do('key', failing)
+        except RuntimeError as e:
+            errors.append(e)
+
+    _concurrently(call, call, call)
+    assert len(errors) == 3 and len({id(e) for e in errors}) == 1
+
+
+def test_recommendations_with_different_counts_coalesce(memory_backend, monkeypatch):
+    builds = []
+
+    def build(user_id, count, deadline=None):
+        builds.append(count)
+        time.sleep(0.1)
+        return [{'user_id': f"C{i}", 'rank': i + 1} for i in range(count)]
+
+    monkeypatch.setattr(main, '_build_user_recommendations', build)
+    monkeypatch.setattr(main, 'get_feed_cache', lambda: FeedCache(enabled=False))
+    monkeypatch.setattr(main, 'recommendation_flight', SingleFlight())
+
+    pages = _concurrently(*[lambda n=n: main.get_user_recommendations('U1', n) for n in (5, 10, 20)])
+    assert builds == [main.POOL_SIZE]
+    assert [len(page) for page in pages] == [5, 10, 20]
+    assert pages[1][:5] == pages[0] and pages[2][-1]['rank'] == 20
@@ -0,0 +1,116 @@
+"""
+Conformance tests run against every StorageBackend implementation: the
+in-memory and SQLite backends, and FirebaseService on the fake Firestore.
+"""
+
+from datetime import datetime, timedelta
+
+import pandas as pd
+import pytest
+
+from production.firebase_service import FirebaseService
+from production.memory_backend import InMemoryBackend
+from production.sqlite_backend import SQLiteBackend
+from production.storage_backend import create_storage_backend, selected_backend
+
+USERS = [
+    {'id': 'U1', 'name': 'Asha', 'gender': 'female', 'looking_for': ['male'], 'interests': ['music', 'tech'],
+     'location': 'Delhi', 'elo_score': 1200},
+    {'id': 'U2', 'name': 'Ravi', 'gender': 'male', 'looking_for': ['female'], 'interests': ['music'],
+     'location': 'Delhi', 'elo_score': 1250},
+    {'id': 'U3', 'name': 'Kabir', 'gender': 'male', 'looking_for': ['female'], 'interests': ['sports'],
+     'location': 'Pune', 'elo_score': 1100},
+]
+
+
+@pytest.fixture(params=['memory', 'sqlite', 'firestore'])
+def backend(request, tmp_path, fake_db):
+    if request.param == 'memory':
+        store = InMemoryBackend()
+    elif request.param == 'sqlite':
+        store = SQLiteBackend(str(tmp_path / 'patra.sqlite3'))
+    else:
+        fake_db.collections.clear()
+        store = FirebaseService()
+        store.initialize = lambda path=None: setattr(store, 'connected', True) or True
+        store.db = fake_db
+    assert store.initialize()
+    assert store.save_users([dict(u) for u in USERS]) == len(USERS)
+    return store
+
+
+def test_users_roundtrip(backend):
+    users = backend.get_all_users()
+    assert sorted(users['id']) == ['U1', 'U2', 'U3']
+    assert backend.ping()
+
+    user = backend.get_user_by_id('U2')
+    assert user['id'] == 'U2' and user['name'] == 'Ravi'
+    assert user['interests'] == ['music'] and user['looking_for'] == ['female']
+    assert backend.get_user_by_id('missing') is None
+
+
+def test_save_users_replaces_documents(backend):
+    assert backend.save_users([dict(USERS[0], name='Asha K')]) == 1
+    assert backend.get_user_by_id('U1')['name'] == 'Asha K'
+    assert len(backend.get_all_users()) == 3
+
+
+def test_interactions_visible_in_both_collections(backend):
+    assert backend.save_interaction('U1', 'U2', 'like')
+    assert backend.save_interaction('U2', 'U1', 'superlike')
+
+    mine = backend.get_user_interactions('U1')
+    assert list(mine['target_id']) == ['U2'] and list(mine['action']) == ['like']
+    assert {'id', 'user_id', 'target_id', 'action', 'timestamp'} <= set(mine.columns)
+    assert pd.api.types.is_datetime64_any_dtype(pd.to_datetime(mine['timestamp']))
+
+    swipes = backend.get_swipe_data(days_back=1)
+    assert sorted(zip(swipes['user_id'], swipes['target_id'])) == [('U1', 'U2'), ('U2', 'U1')]
+    assert backend.get_counters()['interactions_saved'] == 2
+
+
+def test_batch_respects_timestamps_and_windows(backend):
+    now = datetime.now()
+    items = [
+        {'user_id': 'U1', 'target_id': 'U2', 'action': 'like', 'timestamp': now - timedelta(days=2)},
+        {'user_id': 'U1', 'target_id': 'U3', 'action': 'reject', 'timestamp': now - timedelta(days=40)},
+        {'user_id': 'U3', 'target_id': 'U1', 'action': 'like'},
+    ]
+    assert backend.save_interactions_batch(items) == [True, True, True]
+
+    assert sorted(backend.get_user_interactions('U1', days_back=30)['target_id']) == ['U2']
+    assert sorted(backend.get_user_interactions('U1', days_back=365)['target_id']) == ['U2', 'U3']
+    assert len(backend.get_swipe_data(days_back=30)) == 2
+    assert len(backend.get_swipe_data(days_back=365)) == 3
+    assert backend.get_user_interactions('U2').empty
+
+
+def test_elo_updates(backend):
+    assert backend.get_user_elo_score('U3') == 1100
+    assert backend.get_user_elo_score('missing') == 1200
+
+    assert backend.update_user_elo_score('U3', 1150)
+    assert backend.get_user_elo_score('U3') == 1150
+    assert not backend.update_user_elo_score('missing', 1000)
+
+    assert backend.update_user_elo_scores({'U1': 1300, 'U2': 1260})
+    scores = backend.get_all_users().set_index('id')['elo_score']
+    assert scores['U1'] == 1300 and scores['U2'] == 1260
+    assert not backend.update_user_elo_scores({'U1': 1310, 'missing': 900})
+
+
+def test_potential_matches_exclude_swiped(backend):
+    assert sorted(backend.get_potential_matches('U1')['id']) == ['U2', 'U3']
+    backend.save_interaction('U1', 'U3', 'reject')
+    assert list(backend.get_potential_matches('U1')['id']) == ['U2']
+
+
+def test_backend_selection(monkeypatch):
+    monkeypatch.setenv('PATRA_STORAGE_BACKEND', 'sqlite')
+    assert selected_backend() == 'sqlite'
+    monkeypatch.setenv('PATRA_STORAGE_BACKEND', 'memory')
+    assert isinstance(create_storage_backend(), InMemoryBackend)
+    monkeypatch.setenv('PATRA_STORAGE_BACKEND', 'redis')
+    with pytest.raises(ValueError):
+        selected_backend()
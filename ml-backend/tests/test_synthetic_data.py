@@ -0,0 +1,53 @@
+"""
+Tests for the seeded synthetic population and its storage sinks.
+"""
+
+from datetime import datetime
+
+import pandas as pd
+
+from production.memory_backend import InMemoryBackend
+from production.sqlite_backend import SQLiteBackend
+from production.synthetic_data import SyntheticPopulation, populate
+
+
+def _users(population):
+    return [user for chunk in population.users(chunk_size=50) for user in chunk]
+
+
+def test_same_seed_same_population():
+    now = datetime(2026, 1, 1)
+    first, second = SyntheticPopulation(200, seed=7, now=now), SyntheticPopulation(200, seed=7, now=now)
+    assert _users(first) == _users(second)
+    pd.testing.assert_frame_equal(pd.concat(first.swipes(500, chunk_size=200)),
+                                  pd.concat(second.swipes(500, chunk_size=200)))
+    assert _users(SyntheticPopulation(200, seed=8, now=now)) != _users(first)
+
+
+def test_users_have_profile_fields():
+    users = _users(SyntheticPopulation(100, seed=1))
+    assert len({user['id'] for user in users}) == 100
+    for user in users:
+        assert {'id', 'uid', 'name', 'age', 'gender', 'interests', 'location', 'bio', 'elo_score'} <= user.keys()
+        assert 18 <= user['age'] <= 99 and user['ageMin'] <= user['ageMax']
+        assert isinstance(user['interests'], list) and user['interests']
+
+
+def test_swipes_reference_known_users():
+    population = SyntheticPopulation(300, seed=3)
+    swipes = pd.concat(population.swipes(2000, chunk_size=700))
+    ids = {user['id'] for user in _users(population)}
+    assert len(swipes) == 2000
+    assert set(swipes['user_id']) <= ids and set(swipes['target_id']) <= ids
+    assert (swipes['user_id'] != swipes['target_id']).all()
+    assert set(swipes['action']) <= {'like', 'dislike', 'superlike'}
+
+
+def test_populate_local_backends(tmp_path):
+    for backend in (InMemoryBackend(), SQLiteBackend(str(tmp_path / 'patra.sqlite3'))):
+        backend.initialize()
+        populate(backend, n_users=150, n_swipes=600, seed=5)
+        assert len(backend.get_all_users()) == 150
+        swipes = backend.get_swipe_data(days_back=365)
+        assert len(swipes) == 600
+        assert pd.api.types.is_datetime64_any_dtype(swipes['timestamp'])
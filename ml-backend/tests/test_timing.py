@@ -0,0 +1,65 @@
+"""
+Tests for per-stage timing and the X-Timing breakdown.
+"""
+
+import pandas as pd
+import pytest
+
+from production import timing
+from production.memory_backend import InMemoryBackend
+
+
+@pytest.fixture
+def stage_timing(monkeypatch):
+    monkeypatch.setattr(timing, 'STAGE_TIMING', True)
+    timing.get_timing_registry().reset()
+    yield timing.get_timing_registry()
+    timing.get_timing_registry().reset()
+
+
+def test_disabled_stages_record_nothing(monkeypatch):
+    monkeypatch.setattr(timing, 'STAGE_TIMING', False)
+    timing.get_timing_registry().reset()
+    with timing.stage('feed.rank', rows_in=10) as stage:
+        stage.rows_out = 5
+    assert timing.stage('feed.elo') is timing.stage('feed.rank')
+    assert timing.get_timing_registry().snapshot()['stages'] == {}
+
+
+def test_stages_aggregate_and_trace(stage_timing):
+    with timing.trace() as request_timing:
+        for rows in (10, 30):
+            with timing.stage('match.score', rows_in=rows) as stage:
+                stage.rows_out = rows // 2
+    with timing.stage('match.score', rows_in=100):
+        pass
+
+    stats = stage_timing.snapshot()['stages']['match.score']
+    assert stats['count'] == 3
+    assert (stats['rows_in'], stats['rows_out']) == (140, 20)
+    assert len(request_timing.stages) == 2
+    header = request_timing.header()
+    assert header.startswith('total;dur=')
+    assert 'match.score;dur=' in header and ';in=30;out=15' in header
+
+
+def test_backend_calls_counted_with_bytes(stage_timing):
+    backend = InMemoryBackend()
+    backend.initialize()
+    backend.save_users([{'id': f'u{i}', 'name': f'user {i}', 'age': 30} for i in range(20)])
+
+    with timing.trace() as request_timing:
+        backend.get_all_users()
+        backend.get_all_users()
+
+    stats = stage_timing.snapshot()['backend']['get_all_users']
+    assert stats['calls'] == 2 and stats['bytes'] > 0
+    assert request_timing.backend['get_all_users'][0] == 2
+    assert 'backend.get_all_users;dur=' in request_timing.header()
+
+
+def test_approx_bytes_scales_sampled_results():
+    rows = [{'id': 'abcd', 'bio': 'x' * 100}] * 1000
+    assert timing.approx_bytes(rows) == 1000 * timing.approx_bytes(rows[0])
+    assert timing.approx_bytes(pd.DataFrame(rows)) > 100 * 1000
+    assert timing.approx_bytes(None) == 0 and timing.approx_bytes(pd.DataFrame()) == 0
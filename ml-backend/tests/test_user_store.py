@@ -0,0 +1,44 @@
+"""
+Tests for the cached users snapshot and its Elo rating vector.
+"""
+
+import numpy as np
+import pytest
+
+from production.user_store import DEFAULT_ELO, UserStore
+
+USERS = [{'id': f"U{i}", 'uid': f"U{i}", 'name': f"user {i}", 'elo_score': 1000 + 100 * i} for i in range(5)]
+
+
+@pytest.fixture
+def store(memory_backend):
+    memory_backend.save_users([dict(u) for u in USERS])
+    return UserStore(ttl_seconds=60)
+
+
+def test_elo_joined_by_row_with_default_for_unknown(store):
+    assert np.array_equal(store.elo_for(['U3', 'missing', 'U0']), [1300, DEFAULT_ELO, 1000])
+    assert store.elo_range() == (1000, 1400)
+    assert store.elo_percentiles([1000, 1400]).tolist() == [0.1, 0.9]
+
+
+def test_elo_updates_write_through_without_reload(store, memory_backend):
+    version = store.snapshot().version
+    store.update_elo('U0', 1500)
+    assert store.elo_for(['U0'])[0] == 1500
+    assert store.elo_range() == (1100, 1500)
+    assert store.snapshot().version == version
+    assert memory_backend.counters['reads'] == 1   # one collection read for all of the above
+
+
+def test_reload_after_ttl_keeps_previous_snapshot_when_empty(store, memory_backend):
+    first = store.snapshot()
+    first.loaded_at -= 120
+    memory_backend.save_users([{'id': 'U9', 'elo_score': 1700}])
+    second = store.snapshot()
+    assert second.version == first.version + 1 and store.elo_for(['U9'])[0] == 1700
+
+    memory_backend.users.clear()
+    memory_backend._users_df = None
+    second.loaded_at -= 120
+    assert store.snapshot() is second